@@ -0,0 +1,171 @@
+"""
+Cold-start report for every usable object detection model.
+
+Each model is measured in its own freshly spawned process so that module imports are not shared between models.
+Run from the repository root:
+
+    uv run python -m benchmarks.cold_start [--iterations 20] [--json cold_start.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from importlib import import_module
+from multiprocessing import Queue
+
+import cv2
+import numpy as np
+
+from benchmarks.common import sample_videos
+
+
+@dataclass
+class ColdStartResult:
+    model: str
+    import_ms: float | None = None
+    construct_ms: float | None = None
+    warmup_ms: float | None = None
+    first_frame_ms: float | None = None
+    steady_p50_ms: float | None = None
+    steady_mean_ms: float | None = None
+    error: str | None = None
+
+
+def load_sample_frame(sample_path: str | None = None) -> np.ndarray:
+    """Reads the first frame of the given video (or the first sample video), falling back to noise."""
+    candidates = [sample_path] if sample_path else sample_videos()
+    for candidate in candidates:
+        cap = cv2.VideoCapture(candidate)
+        ok, frame = cap.read()
+        cap.release()
+        if ok and frame is not None:
+            return frame
+    return np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+
+
+def _measure(
+    option: str,
+    module_name: str,
+    class_name: str,
+    frame: np.ndarray,
+    iterations: int,
+    warmup: bool,
+    result_queue: Queue,
+) -> None:
+    result = ColdStartResult(model=option)
+    try:
+        start = time.perf_counter()
+        model_class = getattr(import_module(module_name), class_name)
+        result.import_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        model = model_class()
+        result.construct_ms = (time.perf_counter() - start) * 1000
+
+        if warmup:
+            start = time.perf_counter()
+            model.warmup(frame.shape)
+            result.warmup_ms = (time.perf_counter() - start) * 1000
+
+        latencies = []
+        for _ in range(iterations + 1):
+            start = time.perf_counter()
+            model.detect_person(frame)
+            latencies.append((time.perf_counter() - start) * 1000)
+        result.first_frame_ms = latencies[0]
+        result.steady_p50_ms = statistics.median(latencies[1:])
+        result.steady_mean_ms = statistics.fmean(latencies[1:])
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result_queue.put(result)
+
+
+def run_report(
+    options: list[str] | None = None,
+    iterations: int = 20,
+    warmup: bool = True,
+    sample_path: str | None = None,
+    timeout_s: float = 600.0,
+) -> list[ColdStartResult]:
+    from src.tracking import USABLE_MODELS
+
+    ctx = multiprocessing.get_context("spawn")
+    frame = load_sample_frame(sample_path)
+    results = []
+    for option in options or list(USABLE_MODELS.keys()):
+        descriptor = USABLE_MODELS[option]
+        result_queue = ctx.Queue()
+        process = ctx.Process(
+            target=_measure,
+            args=(
+                option,
+                descriptor.module_path,
+                descriptor.class_name,
+                frame,
+                iterations,
+                warmup,
+                result_queue,
+            ),
+            daemon=True,
+        )
+        process.start()
+        try:
+            results.append(result_queue.get(timeout=timeout_s))
+        except Exception:
+            results.append(ColdStartResult(model=option, error="timed out"))
+        process.join(timeout=5.0)
+        if process.is_alive():
+            process.kill()
+    return results
+
+
+def format_table(results: list[ColdStartResult]) -> str:
+    def fmt(value: float | None) -> str:
+        return "-" if value is None else f"{value:.1f}"
+
+    header = f"{'model':<14}{'import':>10}{'construct':>11}{'warmup':>10}{'first':>10}{'p50':>10}{'mean':>10}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        if r.error is not None:
+            lines.append(f"{r.model:<14}  error: {r.error}")
+            continue
+        lines.append(
+            f"{r.model:<14}{fmt(r.import_ms):>10}{fmt(r.construct_ms):>11}{fmt(r.warmup_ms):>10}"
+            f"{fmt(r.first_frame_ms):>10}{fmt(r.steady_p50_ms):>10}{fmt(r.steady_mean_ms):>10}"
+        )
+    lines.append("(all values in ms)")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--model", action="append", help="Only measure this model (repeatable)"
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=20,
+        help="Steady-state frames per model",
+    )
+    parser.add_argument(
+        "--no-warmup",
+        action="store_true",
+        help="Skip ObjectModel.warmup to see the raw first frame cost",
+    )
+    parser.add_argument("--sample", help="Video file to take the test frame from")
+    parser.add_argument("--json", help="Write the results to this file as JSON")
+    args = parser.parse_args(argv)
+
+    results = run_report(args.model, args.iterations, not args.no_warmup, args.sample)
+    print(format_table(results))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
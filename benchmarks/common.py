@@ -0,0 +1,81 @@
+"""Helpers shared by the benchmark scripts."""
+
+import os
+import platform
+import subprocess
+import sys
+from glob import glob
+from os import path
+
+import numpy as np
+
+VIDEO_SAMPLE_GLOB = path.join(
+    path.dirname(__file__), "..", "tests", "video_sample", "*.mp4"
+)
+
+
+def sample_videos() -> list[str]:
+    return sorted(glob(VIDEO_SAMPLE_GLOB))
+
+
+def summarize_latencies(latencies_ms: list[float]) -> dict[str, float | None]:
+    """Returns mean and p50/p95/p99 of the given latencies in milliseconds."""
+    if len(latencies_ms) == 0:
+        return {"mean": None, "p50": None, "p95": None, "p99": None}
+    values = np.asarray(latencies_ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "mean": float(values.mean()),
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+    }
+
+
+def process_stats(pid: int) -> tuple[int | None, float | None]:
+    """
+    Returns (resident set size in bytes, user + system cpu seconds) of a process.
+    Uses psutil when it is installed and falls back to /proc on Linux, otherwise returns Nones.
+    """
+    try:
+        import psutil
+
+        proc = psutil.Process(pid)
+        cpu = proc.cpu_times()
+        return proc.memory_info().rss, cpu.user + cpu.system
+    except ImportError:
+        pass
+    except Exception:
+        return None, None
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        # Fields after the command name start at index 3 (state), utime is 14 and stime is 15
+        cpu_s = (int(fields[11]) + int(fields[12])) / ticks
+        rss = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+        return rss, cpu_s
+    except (OSError, ValueError, IndexError):
+        return None, None
+
+
+def machine_metadata() -> dict[str, str | int | None]:
+    """Information needed to compare benchmark runs across commits and machines."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
@@ -0,0 +1,373 @@
+"""
+Offline benchmark of every usable object detection model over recorded video.
+
+Frames go through the real Detector shared-memory path (send_input -> detection process -> get_bboxes), one frame at a time.
+For every (model, video) pair it reports throughput, p50/p95/p99 latency, detection worker RSS and CPU time, and, when an
+annotation file is available, agreement with the ground truth.
+
+Ground truth for `clip.mp4` is read from `clip.gt.json` next to it, in the format
+    {"frames": {"<frame index>": [[x1, y1, x2, y2], ...], ...}}
+Only annotated frames are compared. `--save-detections` writes model output in the same format to bootstrap annotations.
+
+Run from the repository root:
+
+    uv run python -m benchmarks.detector_bench [--model basic] [--video clip.mp4] [--compare previous.json]
+"""
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from multiprocessing.managers import SharedMemoryManager
+from os import makedirs, path
+from queue import Empty
+
+import cv2
+import numpy as np
+
+from benchmarks.common import (
+    machine_metadata,
+    process_stats,
+    sample_videos,
+    summarize_latencies,
+)
+
+BENCH_HOST = "benchmark"
+RESULTS_DIR = path.join(path.dirname(__file__), "results")
+
+
+class FileVideoSource:
+    """VideoConnection compatible source that steps through a video file one frame at a time."""
+
+    def __init__(self, video_path: str):
+        self.src = video_path
+        self.cap = cv2.VideoCapture(video_path)
+        self.index = -1
+        self.current: np.ndarray | None = None
+        self.shape: tuple | None = None
+        self.dtype: np.dtype | None = None
+        ok, self._first = self.cap.read()
+        if ok and self._first is not None:
+            self.shape = self._first.shape
+            self.dtype = self._first.dtype
+
+    def advance(self) -> bool:
+        """Moves to the next frame of the video, returns False at the end."""
+        if self._first is not None:
+            frame, self._first = self._first, None
+        else:
+            ok, frame = self.cap.read()
+            if not ok:
+                frame = None
+        if frame is None:
+            return False
+        self.current = frame
+        self.index += 1
+        return True
+
+    def get_frame(self) -> np.ndarray | None:
+        return self.current
+
+    def get_frame_with_time(self) -> tuple[np.ndarray | None, float | None]:
+        return self.current, time.time()
+
+    def close(self) -> None:
+        self.cap.release()
+
+
+@dataclass
+class BenchConnection:
+    """The part of Connection the Detector uses, without an operator socket."""
+
+    host: str
+    video_connection: FileVideoSource
+    _bboxes: list | None = field(default=None, init=False)
+
+    def get_bboxes(self):
+        return self._bboxes
+
+    def set_bboxes(self, bboxes, frame_time=None) -> None:
+        self._bboxes = bboxes
+
+    def close(self) -> None:
+        self.video_connection.close()
+
+
+@dataclass
+class BenchResult:
+    model: str
+    video: str
+    frames: int = 0
+    wall_s: float | None = None
+    throughput_fps: float | None = None
+    latency_ms: dict[str, float | None] = field(default_factory=dict)
+    worker_rss_mb: float | None = None
+    worker_peak_rss_mb: float | None = None
+    worker_cpu_s: float | None = None
+    startup_s: float | None = None
+    agreement: dict[str, float | int] | None = None
+    error: str | None = None
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between two (N x 4) and (M x 4) arrays of (x1, y1, x2, y2) boxes."""
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(
+        np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None
+    )
+    inter_h = np.clip(
+        np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None
+    )
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def compute_agreement(
+    detections: dict[int, list],
+    ground_truth: dict[int, list],
+    iou_threshold: float = 0.5,
+) -> dict[str, float | int]:
+    """Greedy IoU matching of detections against ground truth on every annotated frame that was benchmarked."""
+    true_pos = false_pos = false_neg = compared = 0
+    matched_ious = []
+    for index, truth in ground_truth.items():
+        if index not in detections:
+            continue
+        compared += 1
+        pred = np.asarray(detections[index], dtype=np.float64).reshape(-1, 4)
+        gt = np.asarray(truth, dtype=np.float64).reshape(-1, 4)
+        ious = iou_matrix(pred, gt)
+        matches = 0
+        while ious.size > 0:
+            i, j = np.unravel_index(np.argmax(ious), ious.shape)
+            if ious[i, j] < iou_threshold:
+                break
+            matched_ious.append(float(ious[i, j]))
+            matches += 1
+            ious[i, :] = -1
+            ious[:, j] = -1
+        true_pos += matches
+        false_pos += len(pred) - matches
+        false_neg += len(gt) - matches
+    precision = true_pos / (true_pos + false_pos) if true_pos + false_pos else 0.0
+    recall = true_pos / (true_pos + false_neg) if true_pos + false_neg else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "frames_compared": compared,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "mean_iou": float(np.mean(matched_ious)) if matched_ious else 0.0,
+    }
+
+
+def load_ground_truth(video_path: str) -> dict[int, list] | None:
+    gt_path = path.splitext(video_path)[0] + ".gt.json"
+    if not path.exists(gt_path):
+        return None
+    with open(gt_path) as f:
+        frames = json.load(f)["frames"]
+    return {int(index): boxes for index, boxes in frames.items()}
+
+
+def run_benchmark(
+    descriptor,
+    video_path: str,
+    max_frames: int | None = None,
+    startup_timeout_s: float = 300.0,
+    frame_timeout_s: float = 30.0,
+) -> tuple[BenchResult, dict[int, list]]:
+    """Benchmarks one model on one video. Returns the result and the raw detections by frame index."""
+    from src.connection.connection import ConnectionCollection
+    from src.tracking.detector import DetectionWaitingForModel, Detector
+
+    result = BenchResult(model=descriptor.name, video=path.basename(video_path))
+    detections: dict[int, list] = {}
+    source = FileVideoSource(video_path)
+    if source.shape is None:
+        source.close()
+        result.error = "Unable to read video"
+        return result, detections
+
+    connections = ConnectionCollection()
+    connections[BENCH_HOST] = BenchConnection(BENCH_HOST, source)  # pyright: ignore[reportArgumentType]
+    detector = Detector(descriptor, connections, SharedMemoryManager())
+    try:
+        start = time.perf_counter()
+        detector.start()
+        while not detector.is_model_ready():
+            if not detector.is_running():
+                raise RuntimeError("Detection process exited during start up")
+            if time.perf_counter() - start > startup_timeout_s:
+                raise TimeoutError("Model did not become ready")
+            time.sleep(0.01)
+        result.startup_s = time.perf_counter() - start
+
+        pid = detector.get_worker_pid()
+        assert pid is not None
+        _, cpu_start = process_stats(pid)
+        peak_rss = 0
+        latencies = []
+        wall_start = time.perf_counter()
+        while (max_frames is None or len(latencies) < max_frames) and source.advance():
+            sent = time.perf_counter()
+            detector.send_input()
+            while True:
+                try:
+                    bboxes = detector.get_bboxes()
+                    break
+                except (Empty, DetectionWaitingForModel):
+                    if time.perf_counter() - sent > frame_timeout_s:
+                        raise TimeoutError(f"No detection for frame {source.index}")
+                    time.sleep(0.0005)
+            latencies.append((time.perf_counter() - sent) * 1000)
+            detections[source.index] = [
+                [float(v) for v in box] for box in bboxes.get(BENCH_HOST, [])
+            ]
+            if len(latencies) % 10 == 1:
+                rss, _ = process_stats(pid)
+                peak_rss = max(peak_rss, rss or 0)
+        result.wall_s = time.perf_counter() - wall_start
+
+        rss, cpu_end = process_stats(pid)
+        result.frames = len(latencies)
+        result.throughput_fps = result.frames / result.wall_s if result.wall_s else None
+        result.latency_ms = summarize_latencies(latencies)
+        if rss is not None:
+            result.worker_rss_mb = rss / 2**20
+            result.worker_peak_rss_mb = max(peak_rss, rss) / 2**20
+        if cpu_start is not None and cpu_end is not None:
+            result.worker_cpu_s = cpu_end - cpu_start
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    finally:
+        connections.remove_listener(detector.on_connections_update)
+        detector.kill()
+        connections.close()
+
+    ground_truth = load_ground_truth(video_path)
+    if ground_truth is not None and result.error is None:
+        result.agreement = compute_agreement(detections, ground_truth)
+    return result, detections
+
+
+def compare_runs(baseline: dict, current: dict) -> str:
+    """Formats the throughput and latency change of every (model, video) pair found in both runs."""
+    previous = {(r["model"], r["video"]): r for r in baseline["results"]}
+    header = f"{'model':<14}{'video':<28}{'fps':>16}{'p50 ms':>18}{'p95 ms':>18}"
+    lines = [
+        f"baseline {baseline['metadata'].get('commit')} vs current {current['metadata'].get('commit')}",
+        header,
+        "-" * len(header),
+    ]
+
+    def delta(old: float | None, new: float | None) -> str:
+        if old is None or new is None:
+            return "-"
+        change = (new - old) / old * 100 if old else 0.0
+        return f"{new:.1f} ({change:+.0f}%)"
+
+    for r in current["results"]:
+        old = previous.get((r["model"], r["video"]))
+        if old is None or r["error"] or old["error"]:
+            continue
+        lines.append(
+            f"{r['model']:<14}{r['video']:<28}"
+            f"{delta(old['throughput_fps'], r['throughput_fps']):>16}"
+            f"{delta(old['latency_ms']['p50'], r['latency_ms']['p50']):>18}"
+            f"{delta(old['latency_ms']['p95'], r['latency_ms']['p95']):>18}"
+        )
+    return "\n".join(lines)
+
+
+def format_table(results: list[BenchResult]) -> str:
+    def fmt(value: float | None, digits: int = 1) -> str:
+        return "-" if value is None else f"{value:.{digits}f}"
+
+    header = f"{'model':<14}{'video':<28}{'frames':>7}{'fps':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'rss MB':>9}{'cpu s':>8}{'f1':>6}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        if r.error is not None:
+            lines.append(f"{r.model:<14}{r.video:<28}  error: {r.error}")
+            continue
+        lines.append(
+            f"{r.model:<14}{r.video:<28}{r.frames:>7}{fmt(r.throughput_fps):>8}"
+            f"{fmt(r.latency_ms['p50']):>8}{fmt(r.latency_ms['p95']):>8}{fmt(r.latency_ms['p99']):>8}"
+            f"{fmt(r.worker_peak_rss_mb, 0):>9}{fmt(r.worker_cpu_s):>8}"
+            f"{fmt(r.agreement['f1'] if r.agreement else None, 2):>6}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--model", action="append", help="Only benchmark this model (repeatable)"
+    )
+    parser.add_argument(
+        "--video",
+        action="append",
+        help="Video file to benchmark on (repeatable). Defaults to tests/video_sample/*.mp4",
+    )
+    parser.add_argument(
+        "--max-frames", type=int, help="Stop after this many frames per video"
+    )
+    parser.add_argument(
+        "--output",
+        help="Where to write the JSON results. Defaults to benchmarks/results/<commit>-<time>.json",
+    )
+    parser.add_argument(
+        "--compare", help="Previous JSON results to print the change against"
+    )
+    parser.add_argument(
+        "--save-detections",
+        help="Directory to write raw detections to, in the ground truth format",
+    )
+    args = parser.parse_args(argv)
+    # The detection process loads AppSettings, which parses sys.argv with the app's own argument parser
+    sys.argv = [sys.argv[0]]
+
+    from src.tracking import USABLE_MODELS
+
+    metadata = machine_metadata()
+    results = []
+    for option in args.model or list(USABLE_MODELS.keys()):
+        for video_path in args.video or sample_videos():
+            result, detections = run_benchmark(
+                USABLE_MODELS[option], video_path, args.max_frames
+            )
+            results.append(result)
+            if args.save_detections:
+                makedirs(args.save_detections, exist_ok=True)
+                name = f"{path.splitext(path.basename(video_path))[0]}.{option}.json"
+                with open(path.join(args.save_detections, name), "w") as f:
+                    json.dump({"frames": detections}, f)
+
+    print(format_table(results))
+    report = {
+        "metadata": metadata,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "results": [asdict(r) for r in results],
+    }
+    output = args.output or path.join(
+        RESULTS_DIR,
+        f"{metadata['commit'] or 'unknown'}-{datetime.now():%Y%m%d-%H%M%S}.json",
+    )
+    makedirs(path.dirname(path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare_runs(json.load(f), report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Closed-loop benchmark of the automatic directors against a simulated arm.
+
+Every (director, trajectory) pair runs in real time: the director drives a SimulatedArm through a real Publisher and
+OperatorConnection talking to a SimulatedOperator over TCP, and receives the ground truth box of a scripted subject
+as seen by the virtual camera on the arm, delivered after the configured detection latency.
+For every run it reports settle time, overshoot, time outside the acceptable box and command rate.
+
+Run from the repository root:
+
+    uv run python -m benchmarks.director_bench [--director pid] [--trajectory step] [--detection-latency-ms 150]
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from os import makedirs, path
+
+import numpy as np
+from loguru import logger
+
+from benchmarks.common import machine_metadata
+
+BENCH_HOST = "127.0.0.1"
+RESULTS_DIR = path.join(path.dirname(__file__), "results")
+DIRECTOR_NAMES = ["continuous", "pid", "discrete"]
+
+
+@dataclass
+class SimulationSettings:
+    pan_speed: float = 30.0
+    response_delay_ms: float = 50.0
+    detection_latency_ms: float = 100.0
+    detection_fps: float = 15.0
+    field_of_view: tuple[float, float] = (89.0, 48.0)
+    acceptable_box_percent: float = 0.4
+    # Tell directors the pan speed so they compensate for the detection latency
+    compensate_latency: bool = False
+    panorama: str | None = None
+
+
+@dataclass
+class DirectorRunResult:
+    director: str
+    trajectory: str
+    metrics: dict[str, float | int | None] = field(default_factory=dict)
+    error: str | None = None
+
+
+def get_director_class(name: str):
+    from src.directors import ContinuousDirector, DiscreteDirector, PIDDirector
+
+    return {
+        "continuous": ContinuousDirector,
+        "pid": PIDDirector,
+        "discrete": DiscreteDirector,
+    }[name]
+
+
+def run_scenario(
+    director_name: str, trajectory, settings: SimulationSettings
+) -> DirectorRunResult:
+    import src.config as config
+    from src.config.schema.robot import ConnectionConfig
+    from src.connection.connection import Connection, ConnectionCollection
+    from src.directors.geometry import compute_target_geometry
+    from src.simulator import (
+        SimulatedArm,
+        SimulatedOperator,
+        SimulatedVideoSource,
+        Subject,
+        VirtualCamera,
+        score_run,
+    )
+
+    result = DirectorRunResult(director=director_name, trajectory=trajectory.name)
+    arm = SimulatedArm(
+        pan_speed=settings.pan_speed,
+        response_delay_s=settings.response_delay_ms / 1000,
+    )
+    operator = SimulatedOperator(arm)
+    port = operator.start()
+    camera = VirtualCamera(settings.panorama, field_of_view=settings.field_of_view)
+    subject = Subject()
+    config.ROBOT_CONFIGS = {
+        BENCH_HOST: ConnectionConfig(
+            socket_host=BENCH_HOST,
+            socket_port=port,
+            camera_index=0,
+            horizontal_field_of_view=round(settings.field_of_view[0]),
+            vertical_field_of_view=round(settings.field_of_view[1]),
+            acceptable_box_percent=settings.acceptable_box_percent,
+            pan_speed=settings.pan_speed if settings.compensate_latency else None,
+        )
+    }
+    connections = ConnectionCollection()
+    director = get_director_class(director_name)(None, connections)
+    try:
+        conn = Connection(
+            BENCH_HOST,
+            port,
+            SimulatedVideoSource(camera, arm, [subject]),  # pyright: ignore[reportArgumentType]
+            is_manual=False,
+        )
+        connections[BENCH_HOST] = conn
+        if not operator.wait_for_client():
+            raise RuntimeError("Publisher did not connect to the simulated operator")
+
+        period = 1 / settings.detection_fps
+        latency = settings.detection_latency_ms / 1000
+        pending: deque[tuple[float, float, list]] = deque()
+        times, errors, outside = [], [], []
+        start = time.time()
+        commands_before = arm.commands_received
+        while (t := time.time() - start) < trajectory.duration_s:
+            now = start + t
+            subject.azimuth, subject.altitude = trajectory.position(t)
+            pose = arm.step(now)
+            bbox = camera.subject_bbox(subject, pose)
+            pending.append((now + latency, now, [] if bbox is None else [bbox]))
+            while pending and pending[0][0] <= now:
+                _, captured, boxes = pending.popleft()
+                conn.set_bboxes(boxes, captured)
+            director.track_obj()
+
+            truth = camera.subject_bbox(subject, pose, clip=False)
+            geometry = compute_target_geometry(
+                truth, camera.shape, settings.acceptable_box_percent
+            )
+            times.append(t)
+            errors.append(
+                (subject.azimuth - pose.azimuth, subject.altitude - pose.altitude)
+            )
+            outside.append(geometry.outside)
+            time.sleep(max(0.0, start + t + period - time.time()))
+        result.metrics = score_run(
+            np.asarray(times),
+            np.asarray(errors),
+            np.asarray(outside),
+            arm.commands_received - commands_before,
+        )
+    except Exception as e:
+        logger.exception(f"{director_name} failed on {trajectory.name}")
+        result.error = str(e)
+    finally:
+        connections.close()
+        connections.remove_listener(director.on_connection_update)
+        operator.stop()
+    return result
+
+
+def format_table(results: list[DirectorRunResult]) -> str:
+    def fmt(value, digits: int = 2) -> str:
+        return "-" if value is None else f"{value:.{digits}f}"
+
+    header = f"{'director':<12}{'trajectory':<16}{'settle s':>10}{'settle max':>12}{'unsettled':>11}{'overshoot':>11}{'outside %':>11}{'cmd/s':>8}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        if r.error is not None:
+            lines.append(f"{r.director:<12}{r.trajectory:<16}error: {r.error}")
+            continue
+        m = r.metrics
+        lines.append(
+            f"{r.director:<12}{r.trajectory:<16}"
+            f"{fmt(m['settle_time_mean_s']):>10}"
+            f"{fmt(m['settle_time_max_s']):>12}"
+            f"{m['unsettled_excursions']:>11}"
+            f"{fmt(m['overshoot_max_deg'], 1):>11}"
+            f"{fmt(m['time_outside_fraction'] * 100, 1):>11}"
+            f"{fmt(m['commands_per_second'], 1):>8}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--director", action="append", choices=DIRECTOR_NAMES, help="Repeatable"
+    )
+    parser.add_argument("--trajectory", action="append", help="Repeatable")
+    parser.add_argument("--pan-speed", type=float, default=30.0)
+    parser.add_argument("--response-delay-ms", type=float, default=50.0)
+    parser.add_argument("--detection-latency-ms", type=float, default=100.0)
+    parser.add_argument("--detection-fps", type=float, default=15.0)
+    parser.add_argument(
+        "--compensate-latency",
+        action="store_true",
+        help="Configure the pan speed so directors project detections forward",
+    )
+    parser.add_argument(
+        "--panorama", help="Image or video the virtual camera pans over"
+    )
+    parser.add_argument("--output", help="JSON file to write the results to")
+    args = parser.parse_args(argv)
+    # Directors load AppSettings, which parses sys.argv with the app's own argument parser
+    sys.argv = [sys.argv[0]]
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    from src.simulator import TRAJECTORIES
+
+    settings = SimulationSettings(
+        pan_speed=args.pan_speed,
+        response_delay_ms=args.response_delay_ms,
+        detection_latency_ms=args.detection_latency_ms,
+        detection_fps=args.detection_fps,
+        compensate_latency=args.compensate_latency,
+        panorama=args.panorama,
+    )
+    results = []
+    for director_name in args.director or DIRECTOR_NAMES:
+        for trajectory_name in args.trajectory or list(TRAJECTORIES):
+            results.append(
+                run_scenario(director_name, TRAJECTORIES[trajectory_name], settings)
+            )
+
+    print(format_table(results))
+    metadata = machine_metadata()
+    report = {
+        "metadata": metadata,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "settings": asdict(settings),
+        "results": [asdict(r) for r in results],
+    }
+    output = args.output or path.join(
+        RESULTS_DIR,
+        f"directors-{metadata['commit'] or 'unknown'}-{datetime.now():%Y%m%d-%H%M%S}.json",
+    )
+    makedirs(path.dirname(path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
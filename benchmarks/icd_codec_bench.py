@@ -0,0 +1,129 @@
+"""
+Micro-benchmark of ICD message encoding.
+
+Compares the table driven codec (src/icd_codec.py: precompiled structs packed into a reused buffer, word-wise XOR
+checksum) against the previous path, which converted every field through ctypes with toBytes, concatenated the parts
+and computed the checksum one byte at a time.
+
+Run from the repository root:
+
+    uv run python -m benchmarks.icd_codec_bench [--iterations 200000] [--output results.json]
+"""
+
+import argparse
+import json
+import time
+from typing import Any
+
+from benchmarks.common import machine_metadata
+from src.icd_codec import PAYLOAD_LAYOUTS, MessageEncoder, encode_payload
+from src.icd_config import Command, CTypesInt, toBytes
+
+# Representative field values for every command, in ICD order
+SAMPLE_COMMANDS: dict[Command, tuple[Any, ...]] = {
+    Command.POLAR_PAN_CONTINUOUS_START: (1, -1),
+    Command.POLAR_PAN_CONTINUOUS_STOP: (),
+    Command.POLAR_PAN_DISCRETE: (-12, 4, 0, 3000),
+    Command.SET_SPEED: (60,),
+    Command.HOME: (1000,),
+    Command.CARTESIAN_MOVE_DISCRETE: (10, -20, 30, 0, 1500),
+    Command.SET_POLAR_POSITION: ("stage-left", 150, -300, 0),
+    Command.SAVE_POSITION: ("podium", True, "stage-left"),
+    Command.EXECUTE_HARDWARE_OPERATION: (3, 0, bytes(range(64))),
+}
+
+_LEGACY_FIELD_TYPES = {
+    "b": CTypesInt.INT8,
+    "B": CTypesInt.UINT8,
+    "i": CTypesInt.INT32,
+    "I": CTypesInt.UINT32,
+}
+
+
+def legacy_payload(command: Command, *values: Any) -> bytes:
+    """Payload built like Publisher did before the codec, one toBytes call per field"""
+    payload = b""
+    for code, value in zip(PAYLOAD_LAYOUTS[command], values):
+        if code == "s":
+            payload += toBytes(len(value), CTypesInt.UINT8)
+            payload += value.encode("utf-8")
+        elif code == "?":
+            payload += b"\x01" if value else b"\x00"
+        elif code == "*":
+            payload += value
+        else:
+            payload += toBytes(value, _LEGACY_FIELD_TYPES[code])
+    return payload
+
+
+def legacy_message(command_id: int, command: int, payload: bytes) -> bytes:
+    """Message framed like OperatorConnection.publish did before the codec"""
+    message = (
+        toBytes(command_id, CTypesInt.UINT32)
+        + toBytes(0, CTypesInt.UINT16)
+        + toBytes(command, CTypesInt.UINT16)
+        + toBytes(len(payload), CTypesInt.UINT16)
+    )
+    message += payload
+    crc = 0
+    for byte in message:
+        crc ^= byte
+    return message + toBytes(crc, CTypesInt.UINT8)
+
+
+def time_per_call_ns(function, iterations: int) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def run(iterations: int) -> list[dict[str, Any]]:
+    encoder = MessageEncoder()
+    results = []
+    for command, values in SAMPLE_COMMANDS.items():
+
+        def legacy():
+            return legacy_message(0, command, legacy_payload(command, *values))
+
+        def codec():
+            return encoder.encode(0, command, encode_payload(command, *values))
+
+        if bytes(codec()) != legacy():
+            raise AssertionError(f"Codec and legacy encoding of {command.name} differ")
+        legacy_ns = time_per_call_ns(legacy, iterations)
+        codec_ns = time_per_call_ns(codec, iterations)
+        results.append(
+            {
+                "command": command.name,
+                "message_bytes": len(legacy()),
+                "legacy_ns": legacy_ns,
+                "codec_ns": codec_ns,
+                "speedup": legacy_ns / codec_ns,
+            }
+        )
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--output", help="JSON file to write the results to")
+    args = parser.parse_args(argv)
+
+    results = run(args.iterations)
+    print(
+        f"{'command':<34} {'bytes':>5} {'legacy ns':>10} {'codec ns':>9} {'speedup':>8}"
+    )
+    for result in results:
+        print(
+            f"{result['command']:<34} {result['message_bytes']:>5} {result['legacy_ns']:>10.0f} "
+            f"{result['codec_ns']:>9.0f} {result['speedup']:>7.1f}x"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"machine": machine_metadata(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Load test of Publisher against a fleet of mock operators.
+
+Every level connects one Publisher per virtual robot (src/simulator/mock_operator.py, all served from one asyncio
+loop) and has each of them send GET_SPEED requests at a fixed rate for a while, as a tracking director would send
+commands. It reports the returns per second the commander received, round trip times and failures, and doubles the
+number of robots until a level is no longer sustained: fewer returns than expected arrived, or the 99th percentile
+round trip time went over the budget. The mock operators share the process and its CPU with the publishers, so
+the robot count found is a lower bound of what one commander sustains against real robots.
+
+Run from the repository root:
+
+    uv run python -m benchmarks.operator_load_bench [--max-robots 256] [--rate-hz 30] [--latency-ms 5] [--output results.json]
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any
+
+from loguru import logger
+
+from benchmarks.common import machine_metadata, summarize_latencies
+from src.connection.publisher import Publisher
+from src.icd_config import Command
+from src.simulator.mock_operator import MockOperatorFleet, NetworkProfile
+
+BENCH_HOST = "127.0.0.1"
+CONNECT_TIMEOUT_S = 5.0
+# Share of the expected returns that must arrive for a level to count as sustained
+MIN_COMPLETION = 0.98
+
+
+class _Recorder:
+    """Collects the outcome of every request, called on the I/O loop thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rtts_ms: list[float] = []
+        self.failed = 0
+        self.outstanding = 0
+
+    def track(self, future: Future, sent_at: float):
+        with self._lock:
+            self.outstanding += 1
+        future.add_done_callback(lambda f: self._done(f, sent_at))
+
+    def _done(self, future: Future, sent_at: float):
+        rtt_ms = (time.monotonic() - sent_at) * 1000
+        with self._lock:
+            self.outstanding -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.rtts_ms.append(rtt_ms)
+
+
+def run_level(
+    robot_count: int,
+    rate_hz: float,
+    duration_s: float,
+    profile: NetworkProfile,
+    response_timeout_s: float = 2.0,
+) -> dict[str, Any]:
+    """Runs robot_count publishers at rate_hz requests each for duration_s, returns the measurements"""
+    with MockOperatorFleet(robot_count, BENCH_HOST, profile=profile) as fleet:
+        publishers = [
+            Publisher(BENCH_HOST, port, keepalive_s=0) for port in fleet.ports
+        ]
+        try:
+            for publisher in publishers:
+                if not publisher.operator_connection.wait_connected(CONNECT_TIMEOUT_S):
+                    raise ConnectionError(
+                        f"Publisher did not connect to port {publisher.operator_connection.port}"
+                    )
+            recorder = _Recorder()
+            sent = 0
+            interval = 1 / rate_hz
+            start = time.monotonic()
+            next_tick = start
+            while next_tick - start < duration_s:
+                for publisher in publishers:
+                    sent_at = time.monotonic()
+                    future = publisher.request(
+                        Command.GET_SPEED, timeout=response_timeout_s
+                    )
+                    recorder.track(future, sent_at)
+                    sent += 1
+                next_tick += interval
+                time.sleep(max(0.0, next_tick - time.monotonic()))
+            elapsed = time.monotonic() - start
+            deadline = time.monotonic() + response_timeout_s + 1
+            while recorder.outstanding and time.monotonic() < deadline:
+                time.sleep(0.01)
+            rejected = sum(
+                publisher.get_queue_stats()["rejected"] for publisher in publishers
+            )
+        finally:
+            for publisher in publishers:
+                publisher.close()
+        operator_stats = fleet.stats()
+    completed = len(recorder.rtts_ms)
+    return {
+        "robots": robot_count,
+        "sent": sent,
+        "completed": completed,
+        "failed": recorder.failed,
+        "rejected": rejected,
+        "offered_per_s": robot_count * rate_hz,
+        "returns_per_s": completed / elapsed,
+        # Longer than duration_s when the driver could not publish at the requested rate
+        "elapsed_s": elapsed,
+        "rtt_ms": summarize_latencies(recorder.rtts_ms),
+        "operator": operator_stats,
+    }
+
+
+def is_sustained(
+    result: dict[str, Any], profile: NetworkProfile, rtt_budget_ms: float
+) -> bool:
+    expected = result["sent"] * (1 - profile.drop_rate)
+    p99 = result["rtt_ms"]["p99"]
+    return (
+        result["completed"] >= MIN_COMPLETION * expected
+        and p99 is not None
+        and p99 <= rtt_budget_ms
+    )
+
+
+def run(
+    max_robots: int,
+    rate_hz: float,
+    duration_s: float,
+    profile: NetworkProfile,
+    rtt_budget_ms: float,
+) -> dict[str, Any]:
+    """Doubles the number of robots from 1 up to max_robots until a level is not sustained"""
+    levels = []
+    sustained = 0
+    robot_count = 1
+    while robot_count <= max_robots:
+        result = run_level(robot_count, rate_hz, duration_s, profile)
+        result["sustained"] = is_sustained(result, profile, rtt_budget_ms)
+        levels.append(result)
+        if not result["sustained"]:
+            break
+        sustained = robot_count
+        robot_count *= 2
+    return {"max_sustained_robots": sustained, "levels": levels}
+
+
+def _raise_open_file_limit():
+    """Every robot costs three sockets in this process, large fleets need more than the usual 1024"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--max-robots", type=int, default=256)
+    parser.add_argument("--rate-hz", type=float, default=30.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--max-returns-per-s", type=float, default=None)
+    parser.add_argument("--rtt-budget-ms", type=float, default=50.0)
+    parser.add_argument("--output", help="JSON file to write the results to")
+    args = parser.parse_args(argv)
+
+    _raise_open_file_limit()
+    logger.remove()  # Connection logs of hundreds of robots drown the results
+    profile = NetworkProfile(
+        latency_s=args.latency_ms / 1000,
+        jitter_s=args.jitter_ms / 1000,
+        drop_rate=args.drop_rate,
+        max_returns_per_s=args.max_returns_per_s,
+    )
+    results = run(
+        args.max_robots, args.rate_hz, args.duration, profile, args.rtt_budget_ms
+    )
+    print(
+        f"{'robots':>6} {'offered/s':>10} {'returns/s':>10} {'failed':>7} "
+        f"{'p50 ms':>7} {'p99 ms':>7} {'sustained':>9}"
+    )
+    for level in results["levels"]:
+        rtt = level["rtt_ms"]
+        print(
+            f"{level['robots']:>6} {level['offered_per_s']:>10.0f} {level['returns_per_s']:>10.0f} "
+            f"{level['failed']:>7} {rtt['p50'] or 0:>7.2f} {rtt['p99'] or 0:>7.2f} {str(level['sustained']):>9}"
+        )
+    print(f"Max sustained robots: {results['max_sustained_robots']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "machine": machine_metadata(),
+                    "settings": vars(args),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
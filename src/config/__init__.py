@@ -20,6 +20,10 @@ register_robot_config_observer = robot_config_handler.register_listener(
 )
 """Use this to register a callback to be called when the robot config file is modified or deleted. 
 The callback should take in a FileModifiedEvent or DirModifiedEvent as an argument."""
+unregister_robot_config_observer = robot_config_handler.unregister_listener(
+    ROBOT_CONFIG_FILE_HANDLER
+)
+"""Removes a callback added with register_robot_config_observer, e.g. when its owner is closed."""
 
 
 def _start_app_settings_watchdog():
@@ -1,3 +1,7 @@
+from typing import Callable
+
+from watchdog.events import FileSystemEvent
+
 import src.config.add as add
 import src.config.load as load
 import src.config.manager as manager
@@ -6,6 +10,14 @@ import src.config.read as read
 from src.config.__instance import __APP_SETTINGS as APP_SETTINGS
 from src.config.__instance import __ROBOT_CONFIGS as ROBOT_CONFIGS
 from src.config.load import DEFAULT_ROBOT_CONFIG
+from src.config.schema.robot import RobotConfigs
+
+def register_robot_config_observer(
+    callback: Callable[[FileSystemEvent, RobotConfigs], None],
+) -> None: ...
+def unregister_robot_config_observer(
+    callback: Callable[[FileSystemEvent, RobotConfigs], None],
+) -> None: ...
 
 __all__ = [
     "DEFAULT_ROBOT_CONFIG",
@@ -16,4 +28,6 @@ __all__ = [
     "manager",
     "path",
     "read",
+    "register_robot_config_observer",
+    "unregister_robot_config_observer",
 ]
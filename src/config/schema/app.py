@@ -80,6 +80,23 @@ class AppSettings(BaseSettings):
         default=30,
         description="Frames per second for pulling video streams (can be lower than max_fps to reduce load)",
     )
+    auto_director: Literal["continuous", "pid"] = Field(
+        default="continuous",
+        description="Director used in automatic control. 'continuous' pans at full speed until the subject is back in the acceptable box, 'pid' scales speed and direction with the error",
+    )
+    director_trigger: Literal["interval", "detection"] = Field(
+        default="interval",
+        description="'interval' runs the director at a fixed rate, 'detection' runs it as soon as new detections for a connection arrive",
+    )
+    director_watchdog_timeout: float = Field(
+        default=0.5,
+        description="Seconds without detections before the director stops the arm (only in 'detection' trigger mode)",
+        gt=0.0,
+    )
+    detection_latency_budget_ms: float | None = Field(
+        default=None,
+        description="Target detection latency per frame in milliseconds. Models that support it shrink or grow their input resolution to meet it (None disables resolution tuning)",
+    )
     disable_performance_warnings: bool = Field(
         default=False,
         description="Whether to disable warnings about performance issues (e.g., if processing is taking too long and frames are being dropped or the opposite)",
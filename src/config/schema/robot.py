@@ -3,7 +3,7 @@ Pydantic-based configuration schema for Talos application.
 Provides type validation, range checking, and default values for all configuration fields.
 """
 
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
@@ -56,6 +56,17 @@ class ConnectionConfig(BaseModel):
         le=10.0,
     )
 
+    target_policy: Literal["largest", "center", "sticky", "weighted"] = Field(
+        default="sticky",
+        description="Which detection is followed when there are several: the largest box, the one closest to the frame center, the one overlapping the previous target (largest when it is lost) or a weighted score",
+    )
+    target_weights: list[float] = Field(
+        default=[1.0, 1.0, 1.0],
+        description="[size, centrality, overlap with previous target] weights of the 'weighted' target policy",
+        min_length=3,
+        max_length=3,
+    )
+
     # Command timing
     command_delay: float = Field(
         default=0.25,
@@ -64,6 +75,25 @@ class ConnectionConfig(BaseModel):
         le=10.0,
     )
 
+    command_keepalive: float = Field(
+        default=1.0,
+        description="Seconds after which an unchanged continuous command is re-sent instead of suppressed (0 sends every command)",
+        ge=0.0,
+        le=60.0,
+    )
+
+    pan_speed: Optional[float] = Field(
+        default=None,
+        description="Degrees per second the arm pans at speed 100, enables latency compensation in automatic control (None disables it)",
+        gt=0.0,
+        le=360.0,
+    )
+
+    camera_calibration: Optional[str] = Field(
+        default=None,
+        description="Calibration YAML written by src.connection.camera_calibration, maps pixels to angles through the lens model (None uses the field of view linearly)",
+    )
+
     # Display parameters
     fps: int = Field(
         default=30,
@@ -1,3 +1,4 @@
+import importlib
 import os
 from typing import Callable
 
@@ -44,6 +45,13 @@ class RobotConfigFileHandler(FileSystemEventHandler):
     ):
         self.callbacks.append(callback)
 
+    def unregister_observer(
+        self,
+        callback: Callable[[FileSystemEvent, RobotConfigs], None],
+    ):
+        if callback in self.callbacks:
+            self.callbacks.remove(callback)
+
     @staticmethod
     def _is_target_file(event) -> bool:
         target = os.path.abspath(ROBOT_CONFIGS_PATH)
@@ -62,6 +70,13 @@ class RobotConfigFileHandler(FileSystemEventHandler):
         try:
             logger.info("Detected change in robot config file")
             new_configs = load_robot_config()
+            # Readers going through the config module see the new configs before any callback runs. Python never
+            # calls a module __setattr__, so set the instance the module __getattr__ reads instead of the module.
+            setattr(
+                importlib.import_module("src.config.__instance"),
+                "__ROBOT_CONFIGS",
+                new_configs,
+            )
             for callback in self.callbacks:
                 callback(event, new_configs)
 
@@ -102,3 +117,14 @@ def register_listener(fh: RobotConfigFileHandler):
         fh.register_observer(callback)
 
     return register_observer
+
+
+def unregister_listener(fh: RobotConfigFileHandler):
+    """Returns a function that removes a callback added with the function returned by register_listener."""
+
+    def unregister_observer(
+        callback: Callable[[FileSystemEvent, RobotConfigs], None],
+    ):
+        fh.unregister_observer(callback)
+
+    return unregister_observer
@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import deque
+
+# SET_SPEED value the configured pan speed of a connection is measured at
+FULL_SPEED = 100
+MOTION_HISTORY_S = 10.0
+
+
+class ArmMotionHistory:
+    """
+    Continuous pan direction and speed of the arm over time, reconstructed from the commands sent to it.
+
+    Times are wall clock seconds (time.time()) so they can be compared with frame capture timestamps.
+    Velocities and displacements are in full speed units, multiply them by the angular velocity of the arm at
+    FULL_SPEED to get degrees per second and degrees.
+    """
+
+    def __init__(self, speed: int = FULL_SPEED, max_age_s: float = MOTION_HISTORY_S):
+        self.max_age_s = max_age_s
+        self._moving = (0, 0)
+        self._speed = speed
+        # (start time, moving azimuth, moving altitude, speed), each segment lasts until the next one starts
+        self._segments: deque[tuple[float, int, int, int]] = deque()
+        self._lock = threading.Lock()
+
+    def set_direction(
+        self, moving_azimuth: int, moving_altitude: int, t: float | None = None
+    ):
+        with self._lock:
+            self._moving = (moving_azimuth, moving_altitude)
+            self._append(time.time() if t is None else t)
+
+    @property
+    def speed(self) -> int:
+        """Speed the arm was last set to"""
+        return self._speed
+
+    def set_speed(self, speed: int, t: float | None = None):
+        with self._lock:
+            self._speed = speed
+            self._append(time.time() if t is None else t)
+
+    def stop(self, t: float | None = None):
+        self.set_direction(0, 0, t)
+
+    def _append(self, t: float):
+        self._segments.append((t, *self._moving, self._speed))
+        # Keep the newest segment that started before the cutoff, it still covers the cutoff time
+        cutoff = t - self.max_age_s
+        while len(self._segments) > 1 and self._segments[1][0] <= cutoff:
+            self._segments.popleft()
+
+    def velocity(self, t: float | None = None) -> tuple[float, float]:
+        """(azimuth, altitude) velocity at time t, defaults to now"""
+        t = time.time() if t is None else t
+        with self._lock:
+            velocity = (0.0, 0.0)
+            for start, azimuth, altitude, speed in self._segments:
+                if start > t:
+                    break
+                velocity = (azimuth * speed / FULL_SPEED, altitude * speed / FULL_SPEED)
+            return velocity
+
+    def displacement(self, t0: float, t1: float | None = None) -> tuple[float, float]:
+        """(azimuth, altitude) the arm moved between t0 and t1 (defaults to now), integrating the commanded velocity"""
+        t1 = time.time() if t1 is None else t1
+        d_azimuth = d_altitude = 0.0
+        if t1 <= t0:
+            return d_azimuth, d_altitude
+        with self._lock:
+            segments = list(self._segments)
+        for index, (start, azimuth, altitude, speed) in enumerate(segments):
+            end = segments[index + 1][0] if index + 1 < len(segments) else t1
+            overlap = min(end, t1) - max(start, t0)
+            if overlap <= 0:
+                continue
+            d_azimuth += azimuth * speed / FULL_SPEED * overlap
+            d_altitude += altitude * speed / FULL_SPEED * overlap
+        return d_azimuth, d_altitude
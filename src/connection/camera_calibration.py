@@ -0,0 +1,297 @@
+"""
+Camera intrinsics and lens distortion, and the per-pixel angle tables derived from them.
+
+A calibration is computed offline from a recording of a checkerboard moved around in front of the camera:
+
+    uv run python -m src.connection.camera_calibration recording.mp4 --board 9x6 --square-mm 25 \\
+        --output config/calibration/camera0.yaml
+
+Point `camera_calibration` of a robot config at the written file. Angle tables are computed once per resolution
+and cached next to the calibration file, so later runs only load them.
+"""
+
+import argparse
+import hashlib
+import math
+import os
+import threading
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+import yaml
+from loguru import logger
+
+LUT_CACHE_DIRNAME = "cache"
+
+
+@dataclass(frozen=True, eq=False)
+class CameraCalibration:
+    """OpenCV pinhole intrinsics and distortion coefficients, valid for frames of image_size"""
+
+    camera_matrix: np.ndarray  # (3, 3)
+    dist_coeffs: np.ndarray  # (N,)
+    image_size: tuple[int, int]  # width, height
+    rms_error: float | None = None
+
+    @classmethod
+    def load(cls, file_path: str) -> "CameraCalibration":
+        with open(file_path) as f:
+            data = yaml.safe_load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"{file_path} does not hold a calibration mapping")
+        return cls(
+            camera_matrix=np.asarray(data["camera_matrix"], dtype=np.float64).reshape(
+                3, 3
+            ),
+            dist_coeffs=np.asarray(data["dist_coeffs"], dtype=np.float64).ravel(),
+            image_size=(int(data["image_size"][0]), int(data["image_size"][1])),
+            rms_error=data.get("rms_error"),
+        )
+
+    def save(self, file_path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        with open(file_path, "w") as f:
+            yaml.safe_dump(
+                {
+                    "image_size": list(self.image_size),
+                    "camera_matrix": self.camera_matrix.tolist(),
+                    "dist_coeffs": self.dist_coeffs.tolist(),
+                    "rms_error": self.rms_error,
+                },
+                f,
+            )
+
+    def scaled_camera_matrix(self, frame_size: tuple[int, int]) -> np.ndarray:
+        """Intrinsics for frames resized to frame_size, the distortion coefficients do not depend on the size"""
+        width, height = frame_size
+        calib_width, calib_height = self.image_size
+        if not math.isclose(width / height, calib_width / calib_height, rel_tol=0.01):
+            logger.warning(
+                f"Frame size {width}x{height} does not have the aspect ratio of the calibration "
+                f"{calib_width}x{calib_height}, angles will be off"
+            )
+        scale = np.diag([width / calib_width, height / calib_height, 1.0])
+        return scale @ self.camera_matrix
+
+    def fingerprint(self) -> str:
+        digest = hashlib.sha1()
+        for array in (self.camera_matrix, self.dist_coeffs):
+            digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+        digest.update(np.asarray(self.image_size, dtype=np.int64).tobytes())
+        return digest.hexdigest()[:16]
+
+
+class AngleMap:
+    """
+    Viewing direction of every pixel of a calibrated camera.
+
+    table[y, x] is the (azimuth, altitude) in degrees of the ray through pixel (x, y), relative to the optical axis.
+    Signs follow the pixel axes: azimuth grows to the right and altitude grows downwards.
+    Altitude is measured after panning, matching an arm that pans first and then tilts.
+    """
+
+    def __init__(self, table: np.ndarray):
+        self.table = table
+        self.frame_size = (table.shape[1], table.shape[0])
+
+    def angle(self, x: float, y: float) -> tuple[float, float]:
+        width, height = self.frame_size
+        column = min(max(int(round(x)), 0), width - 1)
+        row = min(max(int(round(y)), 0), height - 1)
+        azimuth, altitude = self.table[row, column]
+        return float(azimuth), float(altitude)
+
+    def angle_between(
+        self, start: tuple[float, float], end: tuple[float, float]
+    ) -> tuple[float, float]:
+        """Rotation in degrees that moves the view direction of pixel start onto pixel end"""
+        start_azimuth, start_altitude = self.angle(*start)
+        end_azimuth, end_altitude = self.angle(*end)
+        return end_azimuth - start_azimuth, end_altitude - start_altitude
+
+
+def compute_angle_table(
+    calibration: CameraCalibration, frame_size: tuple[int, int]
+) -> np.ndarray:
+    """Undistorts every pixel center of a frame_size frame and turns it into (azimuth, altitude) degrees"""
+    width, height = frame_size
+    xs, ys = np.meshgrid(
+        np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32)
+    )
+    pixels = np.stack([xs.ravel(), ys.ravel()], axis=1).reshape(-1, 1, 2)
+    normalized = cv2.undistortPoints(
+        pixels, calibration.scaled_camera_matrix(frame_size), calibration.dist_coeffs
+    ).reshape(height, width, 2)
+    x, y = normalized[..., 0], normalized[..., 1]
+    table = np.empty((height, width, 2), dtype=np.float32)
+    table[..., 0] = np.degrees(np.arctan(x))
+    table[..., 1] = np.degrees(np.arctan2(y, np.sqrt(1 + x * x)))
+    return table
+
+
+# (calibration path, its modification time, frame size) -> angle map
+_angle_maps: dict[tuple[str, int, tuple[int, int]], AngleMap] = {}
+_angle_maps_lock = threading.Lock()
+
+
+def load_angle_map(
+    calibration_path: str,
+    frame_size: tuple[int, int],
+    cache_dir: str | None = None,
+) -> AngleMap:
+    """
+    Angle table of the calibration at calibration_path for frames of frame_size.
+
+    Tables are kept in memory by path, modification time and resolution, so a hit only stats the calibration file.
+    On disk they are cached in `cache_dir` (a cache directory next to the calibration file by default), keyed by
+    resolution and the calibration values so an updated calibration never reuses a stale table.
+    """
+    calibration_path = os.path.abspath(calibration_path)
+    frame_size = (int(frame_size[0]), int(frame_size[1]))
+    key = (calibration_path, os.stat(calibration_path).st_mtime_ns, frame_size)
+    with _angle_maps_lock:
+        if (angle_map := _angle_maps.get(key)) is not None:
+            return angle_map
+
+        calibration = CameraCalibration.load(calibration_path)
+        fingerprint = calibration.fingerprint()
+        if cache_dir is None:
+            cache_dir = os.path.join(
+                os.path.dirname(os.path.abspath(calibration_path)), LUT_CACHE_DIRNAME
+            )
+        width, height = frame_size
+        cache_path = os.path.join(cache_dir, f"{fingerprint}-{width}x{height}.npy")
+        table = None
+        if os.path.exists(cache_path):
+            try:
+                table = np.load(cache_path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable angle table {cache_path}: {e}")
+            if table is not None and table.shape != (height, width, 2):
+                table = None
+        if table is None:
+            logger.info(f"Computing angle table for {width}x{height} frames")
+            table = compute_angle_table(calibration, frame_size)
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                np.save(cache_path, table)
+            except OSError as e:
+                logger.warning(f"Unable to cache angle table at {cache_path}: {e}")
+        angle_map = AngleMap(table)
+        # Tables of an older version of the file are never looked up again
+        for stale in [
+            k for k in _angle_maps if k[0] == calibration_path and k[2] == frame_size
+        ]:
+            del _angle_maps[stale]
+        _angle_maps[key] = angle_map
+        return angle_map
+
+
+def find_checkerboard_corners(
+    frame: np.ndarray, board_size: tuple[int, int]
+) -> np.ndarray | None:
+    """Subpixel inner corners of the checkerboard in frame, None when the whole board is not visible"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    found, corners = cv2.findChessboardCorners(
+        gray,
+        board_size,
+        flags=cv2.CALIB_CB_ADAPTIVE_THRESH | cv2.CALIB_CB_NORMALIZE_IMAGE,
+    )
+    if not found:
+        return None
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+    corners = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria)
+    # The layout of the returned points differs between OpenCV versions
+    return corners.reshape(-1, 1, 2)
+
+
+def calibrate(
+    frames,
+    board_size: tuple[int, int],
+    square_size: float = 1.0,
+    max_views: int = 40,
+) -> CameraCalibration:
+    """
+    Calibrates a camera from frames showing a checkerboard with board_size inner corners (columns, rows).
+
+    Every frame the full board is found in is a view, up to max_views spread evenly over the input are used.
+    """
+    board = np.zeros((board_size[0] * board_size[1], 3), dtype=np.float32)
+    board[:, :2] = np.mgrid[0 : board_size[0], 0 : board_size[1]].T.reshape(-1, 2)
+    board *= square_size
+
+    views = []
+    image_size = None
+    for frame in frames:
+        image_size = (frame.shape[1], frame.shape[0])
+        if (corners := find_checkerboard_corners(frame, board_size)) is not None:
+            views.append(corners)
+    if image_size is None or len(views) < 3:
+        raise ValueError(
+            f"Checkerboard found in {len(views)} frames, at least 3 are needed"
+        )
+    if len(views) > max_views:
+        views = [
+            views[i] for i in np.linspace(0, len(views) - 1, max_views).astype(int)
+        ]
+    rms, camera_matrix, dist_coeffs, _, _ = cv2.calibrateCamera(
+        [board] * len(views), views, image_size, None, None
+    )
+    return CameraCalibration(
+        camera_matrix=camera_matrix,
+        dist_coeffs=dist_coeffs.ravel(),
+        image_size=image_size,
+        rms_error=float(rms),
+    )
+
+
+def read_frames(video_path: str, step: int = 5):
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"Unable to open {video_path}")
+    index = 0
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if index % step == 0:
+                yield frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Calibrates a camera from a checkerboard recording"
+    )
+    parser.add_argument(
+        "video", help="Recording of a checkerboard moved around the frame"
+    )
+    parser.add_argument(
+        "--board", default="9x6", help="Inner corners per row and column, e.g. 9x6"
+    )
+    parser.add_argument("--square-mm", type=float, default=25.0)
+    parser.add_argument("--step", type=int, default=5, help="Use every n-th frame")
+    parser.add_argument("--max-views", type=int, default=40)
+    parser.add_argument("--output", required=True, help="Calibration YAML to write")
+    args = parser.parse_args(argv)
+
+    columns, rows = (int(value) for value in args.board.lower().split("x"))
+    calibration = calibrate(
+        read_frames(args.video, args.step),
+        (columns, rows),
+        args.square_mm,
+        args.max_views,
+    )
+    calibration.save(args.output)
+    print(
+        f"Calibrated {calibration.image_size[0]}x{calibration.image_size[1]} camera, "
+        f"reprojection error {calibration.rms_error:.3f} px, written to {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import yaml
+from loguru import logger
+
+from src.config.schema.robot import ConnectionConfig
+from src.connection.camera_calibration import AngleMap, load_angle_map
+from src.utils import calculate_acceptable_box
+
+
+@dataclass(frozen=True)
+class ConnectionSnapshot:
+    """
+    Read-only config of a connection with the frame geometry the directors need precomputed.
+
+    Connections replace the whole snapshot when the robot config file changes, so a reader that grabbed one keeps
+    a consistent view for the rest of its tick without touching the config module.
+    """
+
+    config: ConnectionConfig
+    # Derived from the video connection frame shape, None when the shape is unknown
+    frame_size: tuple[int, int] | None = None  # width, height
+    acceptable_box: tuple[int, int, int, int] | None = None  # left, top, right, bottom
+    degrees_per_pixel: tuple[float, float] | None = None  # horizontal, vertical
+    # Per pixel view angles of a calibrated camera, None without a calibration
+    angle_map: AngleMap | None = field(default=None, compare=False)
+
+    @classmethod
+    def build(
+        cls, robot_config: ConnectionConfig, frame_shape: tuple | None = None
+    ) -> ConnectionSnapshot:
+        # Copy so later edits to the loaded config objects can not leak into a published snapshot
+        robot_config = robot_config.model_copy(deep=True)
+        if frame_shape is None:
+            return cls(robot_config)
+        height, width = frame_shape[:2]
+        angle_map = None
+        if robot_config.camera_calibration is not None:
+            try:
+                angle_map = load_angle_map(
+                    robot_config.camera_calibration, (width, height)
+                )
+            except (OSError, ValueError, KeyError, TypeError, yaml.YAMLError) as e:
+                logger.error(
+                    f"Unable to load camera calibration {robot_config.camera_calibration}: {e}"
+                )
+        return cls(
+            robot_config,
+            frame_size=(width, height),
+            acceptable_box=calculate_acceptable_box(
+                width, height, robot_config.acceptable_box_percent
+            ),
+            degrees_per_pixel=(
+                robot_config.horizontal_field_of_view / width,
+                robot_config.vertical_field_of_view / height,
+            ),
+            angle_map=angle_map,
+        )
+
+    def with_frame_shape(self, frame_shape: tuple) -> ConnectionSnapshot:
+        """Snapshot of the same config for frames of another shape, self if the shape matches"""
+        if self.frame_size == (frame_shape[1], frame_shape[0]):
+            return self
+        return ConnectionSnapshot.build(self.config, frame_shape)
@@ -11,12 +11,21 @@ import numpy as np
 from loguru import logger
 
 import src.config as config
+from src.config.schema.robot import ConnectionConfig, RobotConfigs
+from src.connection.config_snapshot import ConnectionSnapshot
 from src.connection.publisher import Publisher
+from src.connection.reconnect import Backoff, ConnectionState
+from src.flight_recorder import get_flight_recorder
 from src.utils import (
     add_termination_handler,
     remove_termination_handler,
 )
 
+# Failed reads in a row after which a video source is considered gone and reopened
+FAILED_READS_BEFORE_RECONNECT = 30
+# Reads tried on a freshly opened source before giving up on getting a frame from it
+PROBE_READS = 6
+
 
 class PyAVCapture:
     _term: int | None = None
@@ -68,6 +77,11 @@ class PyAVCapture:
         except StopIteration:
             self.more = False
             return False, None, None
+        except av.error.FFmpegError as e:
+            # The stream dropped, demuxing can not continue on this container
+            logger.warning(f"Video stream read failed: {e}")
+            self.more = False
+            return False, None, None
 
     def release(self):
         self.container.close()
@@ -77,52 +91,162 @@ class PyAVCapture:
 
 @dataclass
 class VideoConnection:
+    """
+    Video source of a robot.
+
+    When the stream ends or reads keep failing, the source is reopened on a background thread with exponential
+    backoff. Reads return (None, None) meanwhile, the object stays the same so its users need not look it up again.
+    """
+
     src: str | int
     video_buffer_size: int = field(default=1)
-    cap: cv2.VideoCapture | PyAVCapture = field(init=False)
+    cap: cv2.VideoCapture | PyAVCapture | None = field(init=False)
     shape: tuple | None = field(init=False, default=None)
     dtype: np.dtype | None = field(init=False, default=None)
+    backoff: Backoff = field(init=False, default_factory=Backoff)
+    state: ConnectionState = field(init=False, default=ConnectionState.CONNECTING)
+    # Called with the new state whenever it changes, from the thread that noticed the change
+    on_state_change: Callable[[ConnectionState], None] | None = field(
+        init=False, default=None
+    )
+    # Times the source was reopened after it dropped
+    reconnect_count: int = field(init=False, default=0)
     _term: int | None = field(init=False)
     _read_lock: threading.Lock = field(init=False, default_factory=threading.Lock)
+    _failed_reads: int = field(init=False, default=0)
+    _reconnect_thread: threading.Thread | None = field(init=False, default=None)
+    _closed: threading.Event = field(init=False, default_factory=threading.Event)
 
     def __post_init__(self):
+        self.cap = self._open_capture()
+        if (frame := self._probe(self.cap)) is not None:
+            self.shape = frame.shape
+            self.dtype = frame.dtype
+        else:
+            logger.warning("Unable to pull frame from camera")
+        self._set_state(ConnectionState.CONNECTED)
+
+    def _open_capture(self) -> cv2.VideoCapture | PyAVCapture:
         source = None
         try:
             source = int(self.src)
         except ValueError:
             source = self.src
         if isinstance(source, str) and source.startswith("rtsp://"):
-            self.cap = PyAVCapture(
+            return PyAVCapture(
                 source, rtsp_transport="tcp", use_wallclock_as_timestamps="1"
             )
-        else:
-            self.cap = cv2.VideoCapture(source)
-            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, self.video_buffer_size)
-        frame = None
-        for _ in range(6):
-            ret, frame, *rest = self.cap.read()
+        cap = cv2.VideoCapture(source)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, self.video_buffer_size)
+        return cap
+
+    @staticmethod
+    def _probe(cap: cv2.VideoCapture | PyAVCapture) -> np.ndarray | None:
+        """First frame the source delivers within PROBE_READS reads"""
+        for _ in range(PROBE_READS):
+            ret, frame, *rest = cap.read()
             if len(rest) > 0:
                 logger.debug(f"{rest=}")
             if ret and frame is not None:
-                self.shape = frame.shape
-                self.dtype = frame.dtype
-                return
-        logger.warning("Unable to pull frame from camera")
+                return frame
+        return None
+
+    def _set_state(self, state: ConnectionState):
+        if state == self.state:
+            return
+        self.state = state
+        if self.on_state_change is not None:
+            self.on_state_change(state)
 
     def get_frame(self) -> np.ndarray | None:
-        if self.cap is not None:
+        return self.get_frame_with_time()[0]
+
+    def get_frame_with_time(self) -> tuple[np.ndarray | None, float | None]:
+        """Returns the next frame with the wall clock time it was captured at"""
+        if self.state != ConnectionState.CONNECTED:
+            return None, None
+        with self._read_lock:
+            if (cap := self.cap) is None:
+                return None, None
+            r, frame, *rest = (
+                cap.read()
+            )  # rest sometimes have timestamp info from PyAVCapture
+            capture_time = time.time()
+            if r:
+                self._failed_reads = 0
+                return frame, capture_time
+            self._failed_reads += 1
+            # A PyAV stream that ended will not deliver anything more, other sources get a few chances
+            dropped = (
+                isinstance(cap, PyAVCapture) and not cap.more
+            ) or self._failed_reads >= FAILED_READS_BEFORE_RECONNECT
+        if dropped:
+            self._start_reconnect()
+        return None, None
+
+    def _start_reconnect(self):
+        with self._read_lock:
+            if self._closed.is_set() or self._reconnect_thread is not None:
+                return
+            self._reconnect_thread = threading.Thread(
+                target=self._reconnect, name=f"video-reconnect-{self.src}", daemon=True
+            )
+        logger.warning(f"Lost video stream {self.src}, reconnecting")
+        self._set_state(ConnectionState.RECONNECTING)
+        self._reconnect_thread.start()
+
+    def _reconnect(self):
+        """Reopens the source until it delivers frames again or the connection is closed"""
+        with self._read_lock:
+            old, self.cap = self.cap, None
+        self._release(old)
+        self.backoff.reset()
+        while not self._closed.wait(self.backoff.next_delay()):
+            try:
+                cap = self._open_capture()
+            except Exception as e:
+                logger.warning(f"Reopening video stream {self.src} failed: {e}")
+                continue
+            if (frame := self._probe(cap)) is None:
+                logger.warning(f"Reopened video stream {self.src} delivers no frames")
+                self._release(cap)
+                continue
             with self._read_lock:
-                r, frame, *rest = (
-                    self.cap.read()
-                )  # rest sometimes have timestamp info from PyAVCapture
-            if not r:
-                return None
-            return frame
+                closed = self._closed.is_set()
+                if not closed:
+                    if frame.shape != self.shape:
+                        logger.warning(
+                            f"Video stream {self.src} came back as {frame.shape} instead of {self.shape}"
+                        )
+                    self.shape, self.dtype = frame.shape, frame.dtype
+                    self.cap = cap
+                    self._failed_reads = 0
+                    self._reconnect_thread = None
+                    self.reconnect_count += 1
+            if closed:
+                self._release(cap)  # Closed while the reopened source was being probed
+                return
+            logger.info(f"Reconnected video stream {self.src}")
+            self._set_state(ConnectionState.CONNECTED)
+            return
+
+    @staticmethod
+    def _release(cap: cv2.VideoCapture | PyAVCapture | None):
+        if cap is None:
+            return
+        try:
+            cap.release()
+        except Exception as e:
+            logger.debug(f"Releasing video capture failed: {e}")
 
     def close(self):
-        if self.cap is not None:
-            self.cap.release()
+        self._closed.set()
+        with self._read_lock:
+            cap, self.cap = self.cap, None
+        if cap is not None:
+            cap.release()
             logger.debug(f"Released video connection to {self.src}")
+        self._set_state(ConnectionState.CLOSED)
 
 
 @dataclass
@@ -132,14 +256,72 @@ class Connection:
     video_connection: VideoConnection | None
     is_manual: bool = True
     publisher: Publisher = field(init=False)
+    # Replaced as a whole by update_config, read it once per use instead of keeping a reference around
+    snapshot: ConnectionSnapshot = field(init=False)
     _bboxes: list[tuple[int, int, int, int]] | None = field(init=False, default=None)
+    # Incremented every time new detections are set, lets consumers skip boxes they already processed
+    _bbox_sequence: int = field(init=False, default=0)
+    # Wall clock capture time of the frame the current bounding boxes were detected on
+    _bbox_frame_time: float | None = field(init=False, default=None)
     _bboxes_lock: threading.Lock = field(init=False, default_factory=threading.Lock)
+    _snapshot_lock: threading.Lock = field(init=False, default_factory=threading.Lock)
+    # Called with the connection whenever its operator socket or video source changes state,
+    # the ConnectionCollection turns it into a STATE_CHANGED event
+    state_listener: Callable[["Connection"], None] | None = field(
+        init=False, default=None
+    )
 
     def __post_init__(self):
-        self.publisher = Publisher(self.host, self.port)
-        self.is_manual_only = config.ROBOT_CONFIGS[self.host].manual_only
+        robot_config = config.ROBOT_CONFIGS[self.host]
+        self.publisher = Publisher(
+            self.host, self.port, keepalive_s=robot_config.command_keepalive
+        )
+        self.publisher.on_state_change = self._on_state_change
+        if self.video_connection is not None:
+            self.video_connection.on_state_change = self._on_state_change
+        self.update_config(robot_config)
+
+    def _on_state_change(self, _state: ConnectionState) -> None:
+        if self.state_listener is not None:
+            self.state_listener(self)
+
+    @property
+    def operator_state(self) -> ConnectionState:
+        return self.publisher.operator_connection.state
+
+    @property
+    def video_state(self) -> ConnectionState | None:
+        return (
+            self.video_connection.state if self.video_connection is not None else None
+        )
+
+    def update_config(self, robot_config: ConnectionConfig) -> None:
+        """Publishes a new config snapshot for the connection, readers pick it up on their next tick"""
+        snapshot = ConnectionSnapshot.build(
+            robot_config,
+            self.video_connection.shape if self.video_connection is not None else None,
+        )
+        with self._snapshot_lock:
+            self.snapshot = snapshot
+        self.is_manual_only = robot_config.manual_only
+        self.publisher.keepalive_s = robot_config.command_keepalive
+
+    def snapshot_for_shape(self, frame_shape: tuple) -> ConnectionSnapshot:
+        """
+        Config snapshot for frames of frame_shape. A snapshot rebuilt for a new shape replaces the published one,
+        so it is only rebuilt once per shape change.
+        """
+        snapshot = self.snapshot
+        resized = snapshot.with_frame_shape(frame_shape)
+        if resized is not snapshot:
+            with self._snapshot_lock:
+                # Unless update_config published a newer config meanwhile
+                if self.snapshot is snapshot:
+                    self.snapshot = resized
+        return resized
 
     def close(self) -> None:
+        self.state_listener = None
         if self.video_connection is not None:
             self.video_connection.close()
         self.publisher.close()
@@ -148,15 +330,38 @@ class Connection:
         with self._bboxes_lock:
             return self._bboxes
 
-    def set_bboxes(self, bboxes: list[tuple[int, int, int, int]] | None) -> None:
+    def get_bboxes_with_sequence(
+        self,
+    ) -> tuple[list[tuple[int, int, int, int]] | None, int]:
+        """Returns the bounding boxes with the detection sequence number they were set with"""
+        with self._bboxes_lock:
+            return self._bboxes, self._bbox_sequence
+
+    def get_bbox_frame_time(self) -> float | None:
+        """Returns the capture time of the frame the current bounding boxes were detected on, None if unknown"""
+        with self._bboxes_lock:
+            return self._bbox_frame_time
+
+    def set_bboxes(
+        self,
+        bboxes: list[tuple[int, int, int, int]] | None,
+        frame_time: float | None = None,
+    ) -> None:
         with self._bboxes_lock:
             self._bboxes = bboxes
+            self._bbox_frame_time = frame_time
+            self._bbox_sequence += 1
+        if bboxes is not None and (recorder := get_flight_recorder()) is not None:
+            recorder.record_detection(self.host, frame_time, bboxes)
 
 
 class ConnectionCollectionEvent(Enum):
     ADDED = "added"
     REMOVED = "removed"
     ACTIVE_CHANGED = "active_changed"
+    # The operator socket or video source of a connection dropped or came back, see Connection.operator_state
+    # and Connection.video_state. Sent from the thread that noticed the change.
+    STATE_CHANGED = "state_changed"
 
 
 class ConnectionCollection(dict[str, Connection]):
@@ -166,6 +371,21 @@ class ConnectionCollection(dict[str, Connection]):
     ] = []
     _term: int | None = None
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        config.register_robot_config_observer(self.on_robot_configs_changed)
+
+    def on_robot_configs_changed(
+        self, _event: Any, robot_configs: RobotConfigs
+    ) -> None:
+        """Robot config file listener, swaps the config snapshot of every connection whose config changed"""
+        for hostname, connection in list(self.items()):
+            robot_config = robot_configs.get(hostname)
+            if robot_config is None or robot_config == connection.snapshot.config:
+                continue
+            logger.info(f"Applying updated config to {hostname}")
+            connection.update_config(robot_config)
+
     def set_active(self, hostname: str | None) -> Connection | None:
         if hostname is None:
             self._active_host = None
@@ -179,7 +399,7 @@ class ConnectionCollection(dict[str, Connection]):
         self._active_host = hostname
         self._notify_listeners(ConnectionCollectionEvent.ACTIVE_CHANGED, hostname, conn)
         if hostname is not None and self._term is None:
-            self._term = add_termination_handler(self.clear)
+            self._term = add_termination_handler(self.close)
         return self.get_active()
 
     def get_active(self) -> Connection | None:
@@ -210,6 +430,9 @@ class ConnectionCollection(dict[str, Connection]):
 
     def __setitem__(self, hostname: str, connection: Connection) -> None:
         super().__setitem__(hostname, connection)
+        connection.state_listener = lambda conn: self._notify_listeners(
+            ConnectionCollectionEvent.STATE_CHANGED, hostname, conn
+        )
         self._notify_listeners(ConnectionCollectionEvent.ADDED, hostname, connection)
         self.set_active(hostname)
 
@@ -245,6 +468,11 @@ class ConnectionCollection(dict[str, Connection]):
             remove_termination_handler(self._term)
             self._term = None
 
+    def close(self) -> None:
+        """Closes every connection and stops following the robot config file, the collection is not used again"""
+        self.clear()
+        config.unregister_robot_config_observer(self.on_robot_configs_changed)
+
     def clear_bboxes(self) -> None:
         for connection in self.values():
             connection.set_bboxes(None)
@@ -0,0 +1,188 @@
+import heapq
+import itertools
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+from loguru import logger
+
+type IOHandler = Callable[[int], None]
+"""Called on the loop thread with the ready event mask (selectors.EVENT_READ / EVENT_WRITE) of a socket"""
+
+
+class TimerHandle:
+    def __init__(self, when: float, callback: Callable[[], None]):
+        self.when = when
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class IOLoop:
+    """
+    Single thread multiplexing every operator socket with a selector.
+
+    Sockets register a handler that is called with the ready events, so connects, reads and writes only run when the
+    socket is ready. Between events the thread blocks in select, an idle loop uses no CPU however many sockets are
+    registered. Other threads interact with the loop through call_soon / call_later, which wake it up through a
+    socket pair. Handlers and callbacks run on the loop thread and must not block.
+    """
+
+    def __init__(self, name: str = "operator-io"):
+        self.name = name
+        self._selector = selectors.DefaultSelector()
+        self._wake_reader, self._wake_writer = socket.socketpair()
+        self._wake_reader.setblocking(False)
+        self._wake_writer.setblocking(False)
+        self._selector.register(self._wake_reader, selectors.EVENT_READ, None)
+        self._callbacks: deque[Callable[[], None]] = deque()
+        self._timers: list[tuple[float, int, TimerHandle]] = []
+        self._timer_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.is_running = False
+
+    def start(self) -> None:
+        with self._lock:
+            if self.is_running:
+                return
+            self.is_running = True
+            self._thread = threading.Thread(
+                target=self._run, name=self.name, daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """Stops the thread, registered sockets are left for their owners to close"""
+        self.is_running = False
+        self._wake()
+        if self._thread is not None and not self.in_loop_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def in_loop_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def call_soon(self, callback: Callable[[], None]) -> None:
+        """Runs callback on the loop thread, safe to call from any thread"""
+        with self._lock:
+            self._callbacks.append(callback)
+        self._wake()
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> TimerHandle:
+        """Runs callback on the loop thread after delay seconds, safe to call from any thread"""
+        handle = TimerHandle(time.monotonic() + delay, callback)
+        with self._lock:
+            heapq.heappush(self._timers, (handle.when, next(self._timer_ids), handle))
+        self._wake()
+        return handle
+
+    def run_sync(self, callback: Callable[[], None], timeout: float = 1.0) -> bool:
+        """Runs callback on the loop thread and waits for it, returns False if it did not run within timeout"""
+        if self.in_loop_thread() or not self.is_running:
+            callback()
+            return True
+        done = threading.Event()
+
+        def run():
+            try:
+                callback()
+            finally:
+                done.set()
+
+        self.call_soon(run)
+        return done.wait(timeout)
+
+    # The methods below must be called on the loop thread
+
+    def register(self, sock: socket.socket, events: int, handler: IOHandler) -> None:
+        self._selector.register(sock, events, handler)
+
+    def modify(self, sock: socket.socket, events: int, handler: IOHandler) -> None:
+        self._selector.modify(sock, events, handler)
+
+    def unregister(self, sock: socket.socket) -> None:
+        try:
+            self._selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+
+    def is_registered(self, sock: socket.socket) -> bool:
+        try:
+            self._selector.get_key(sock)
+        except (KeyError, ValueError):
+            return False
+        return True
+
+    def _wake(self) -> None:
+        try:
+            self._wake_writer.send(b"\0")
+        except (BlockingIOError, OSError):
+            # The buffer is full of wake ups already, or the loop is shutting down
+            pass
+
+    def _next_timeout(self) -> float | None:
+        with self._lock:
+            if self._callbacks:
+                return 0
+            if not self._timers:
+                return None
+            return max(0.0, self._timers[0][0] - time.monotonic())
+
+    def _run(self) -> None:
+        logger.debug(f"{self.name} loop started")
+        while self.is_running:
+            for key, mask in self._selector.select(self._next_timeout()):
+                if key.data is None:
+                    self._drain_wake_ups()
+                    continue
+                self._call(key.data, mask)
+            self._run_due()
+        logger.debug(f"{self.name} loop stopped")
+
+    def _drain_wake_ups(self) -> None:
+        try:
+            while self._wake_reader.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def _run_due(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            due = []
+            while self._timers and self._timers[0][0] <= now:
+                due.append(heapq.heappop(self._timers)[2])
+            callbacks = list(self._callbacks)
+            self._callbacks.clear()
+        for handle in due:
+            if not handle.cancelled:
+                self._call(handle.callback)
+        for callback in callbacks:
+            self._call(callback)
+
+    def _call(self, callback: Callable, *args) -> None:
+        try:
+            callback(*args)
+        except Exception:
+            # A failing handler must not take down the sockets of every other robot
+            logger.exception(f"Unhandled error in {self.name} loop callback")
+
+
+_io_loop: IOLoop | None = None
+_io_loop_lock = threading.Lock()
+
+
+def get_io_loop() -> IOLoop:
+    """The process wide loop all operator connections share, started on first use"""
+    global _io_loop
+    with _io_loop_lock:
+        if _io_loop is None:
+            _io_loop = IOLoop()
+        _io_loop.start()
+        return _io_loop
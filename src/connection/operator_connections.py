@@ -1,92 +1,299 @@
-import select
+import errno
+import selectors
 import socket
 import threading
+import time
+from typing import Callable
 
 from loguru import logger
 
-from src.icd_config import CTypesInt, toBytes
+from src.connection.io_loop import IOLoop, TimerHandle, get_io_loop
+from src.connection.outbound_queue import OutboundQueue, QueuedCommand
+from src.connection.reconnect import Backoff, ConnectionState
+from src.connection.responses import LatencyStats
+from src.flight_recorder import RecordKind, get_flight_recorder
+from src.icd_codec import Frame, FrameDecoder, MessageEncoder, xor_checksum
+
+# How long a single connect attempt may take, failed attempts are retried with backoff until closed
+CONNECT_TIMEOUT_S = 5.0
 
 
 class OperatorConnection:
-    """Base Connection Class, Creates Socket connection on initialization."""
+    """
+    Base Connection Class, Creates Socket connection on initialization.
+
+    All connections share one IOLoop thread: connecting, reading and writing happen there when the socket
+    is ready, every message received is handed to `_on_message` on that thread.
+    `publish` never touches the socket, it puts the command in a bounded OutboundQueue the loop drains,
+    so a full TCP window on one robot can not stall the thread that published.
+    Failed connects and dropped connections are retried with exponential backoff until `close`, the object
+    stays the same and reports where it is through `on_state_change`.
+    """
 
     is_running = False
+    is_connected = False
     command_count = 0
-    thread: threading.Thread | None = None
-    _term: int | None = None
+    state = ConnectionState.CLOSED
 
-    def __init__(self, host, port, connect_on_init=True):
+    def __init__(
+        self,
+        host,
+        port,
+        connect_on_init=True,
+        io_loop: IOLoop | None = None,
+        backoff: Backoff | None = None,
+    ):
         self.host = host
         self.port = port
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.socket.setblocking(False)  # Set socket to non-blocking mode
+        self.socket = self._create_socket()
+        self._io_loop = io_loop
+        # Attempts since the last successful connect
+        self._attempt = 0
+        self.backoff = backoff or Backoff()
+        self._connect_timer: TimerHandle | None = None
+        self._retry_timer: TimerHandle | None = None
+        # Successful connects, more than one means the connection was re-established
+        self.connect_count = 0
+        self._queue = OutboundQueue()
+        # Rest of a message the kernel did not take in full, sent once the socket is writable again.
+        # Only touched on the loop thread, queued commands are encoded there into the reused encoder buffer.
+        self._outbox = bytearray()
+        self._write_interest = False
+        self._encoder = MessageEncoder()
+        # Time from publish until a message was handed to the kernel
+        self.send_latency = LatencyStats()
+        self.sent_count = 0
+        self._connected_event = threading.Event()
+        self._command_lock = threading.Lock()
+        # Reads go straight into the decoder, which keeps partial messages until the rest arrives
+        self._decoder = FrameDecoder()
+        # Called on the I/O loop thread with (command id, command, payload) of every message from the operator.
+        # The payload is a view into the receive buffer, it must be copied to keep it past the call.
+        self.on_response: Callable[[int, int, memoryview], None] | None = None
+        # Called with the command id of every published command that was dropped from the queue unsent
+        self.on_dropped: Callable[[int], None] | None = None
+        # Called with the new state whenever it changes, on the I/O loop thread except for the CLOSED set by close
+        self.on_state_change: Callable[[ConnectionState], None] | None = None
         if connect_on_init:
-            # Start connection on a separate thread so it doesn't block
-            self.connect_on_thread()
+            self.connect()
 
-    def connect_on_thread(self):
-        self.thread = threading.Thread(target=self.connect, daemon=True)
-        self.thread.start()
+    @property
+    def io_loop(self) -> IOLoop:
+        if self._io_loop is None:
+            self._io_loop = get_io_loop()
+        return self._io_loop
+
+    @staticmethod
+    def _create_socket() -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # Commands are a few bytes each and latency matters more than packet count
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setblocking(False)  # Set socket to non-blocking mode
+        return sock
 
     def connect(self):
+        """Starts connecting on the I/O loop and returns right away, see wait_connected"""
         self.is_running = True
-        for attempt in range(5):
-            if not self.is_running:
-                return  # Exit since this connection is not needed anymore
-            try:
-                self.socket.connect((self.host, self.port))
-                logger.info(f"Connected to socket: {self.host}:{self.port}")
+        self._attempt = 0
+        self.backoff.reset()
+        self._set_state(ConnectionState.CONNECTING)
+        self.io_loop.call_soon(self._start_connect)
+
+    def wait_connected(self, timeout: float | None = None) -> bool:
+        return self._connected_event.wait(timeout)
+
+    def _set_state(self, state: ConnectionState):
+        if state == self.state:
+            return
+        self.state = state
+        if self.on_state_change is not None:
+            self.on_state_change(state)
+
+    def _start_connect(self):
+        self._retry_timer = None
+        if not self.is_running:
+            return  # Exit since this connection is not needed anymore
+        self._attempt += 1
+        try:
+            err = self.socket.connect_ex((self.host, self.port))
+        except OSError as e:
+            self._connect_failed(str(e))
+            return
+        if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY):
+            self._connect_failed(f"error {err}")
+            return
+        # Writable once the connect finished, SO_ERROR tells whether it succeeded
+        self.io_loop.register(
+            self.socket, selectors.EVENT_WRITE, self._on_connect_ready
+        )
+        self._connect_timer = self.io_loop.call_later(
+            CONNECT_TIMEOUT_S, lambda: self._connect_failed("timeout")
+        )
+
+    def _on_connect_ready(self, _mask: int):
+        if self._connect_timer is not None:
+            self._connect_timer.cancel()
+            self._connect_timer = None
+        if not self.is_running:
+            return  # Closed while connecting
+        err = self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if err != 0:
+            self._connect_failed(f"error {err}")
+            return
+        logger.info(f"Connected to socket: {self.host}:{self.port}")
+        self._attempt = 0
+        self.backoff.reset()
+        self.connect_count += 1
+        self.is_connected = True
+        self._connected_event.set()
+        self._update_interest()
+        self._set_state(ConnectionState.CONNECTED)
+
+    def _connect_failed(self, reason: str):
+        self._connect_timer = None
+        self.io_loop.unregister(self.socket)
+        if not self.is_running:
+            return
+        self._schedule_reconnect(f"Connection failed ({reason})")
+
+    def _schedule_reconnect(self, reason: str):
+        """Retries on a fresh socket after the next backoff delay, a socket that failed once can not be reused"""
+        delay = self.backoff.next_delay()
+        logger.error(
+            f"[Connection]: {reason} to {self.host}:{self.port}, retrying in {delay:.1f}s (attempt {self._attempt + 1})"
+        )
+        self.socket.close()
+        self.socket = self._create_socket()
+        self._retry_timer = self.io_loop.call_later(delay, self._start_connect)
+
+    def _update_interest(self):
+        """Reads are always wanted once connected, writes only while data is waiting in the outbox"""
+        if not self.is_connected:
+            return
+        events = selectors.EVENT_READ
+        self._write_interest = bool(self._outbox)
+        if self._write_interest:
+            events |= selectors.EVENT_WRITE
+        if self.io_loop.is_registered(self.socket):
+            self.io_loop.modify(self.socket, events, self._on_ready)
+        else:
+            self.io_loop.register(self.socket, events, self._on_ready)
+
+    def _on_ready(self, mask: int):
+        if mask & selectors.EVENT_READ:
+            self._read()
+        if mask & selectors.EVENT_WRITE and self.is_connected:
+            self._flush()
+
+    def _read(self):
+        try:
+            received = self.socket.recv_into(self._decoder.writable())
+        except BlockingIOError:
+            return
+        except OSError as e:
+            if self.is_running:
+                logger.error(f"Socket receive from {self.host} failed: {e}")
+            self._disconnected()
+            return
+        if not received:
+            logger.info(f"Connection closed by {self.host}")
+            self._disconnected()  # Connection closed by the other side
+            return
+        self._decoder.advance(received)
+        # TCP merges and splits messages, a read can hold several of them or only part of one
+        recorder = get_flight_recorder()
+        for frame in self._decoder.frames():
+            if recorder is not None:
+                recorder.record_frame(RecordKind.RETURN_RECEIVED, self.host, *frame)
+            self._on_message(frame)
+
+    def _flush(self):
+        """Writes queued commands until the queue is empty or the kernel buffer is full, runs on the loop thread"""
+        while self.is_connected:
+            if self._outbox:
+                try:
+                    sent = self.socket.send(self._outbox)
+                except BlockingIOError:
+                    break
+                except OSError as e:
+                    self._send_failed(e)
+                    return
+                del self._outbox[:sent]
+                if self._outbox:
+                    break
+            if (item := self._queue.pop()) is None:
                 break
+            message = self._encoder.encode(item.command_id, item.command, item.payload)
+            try:
+                sent = self.socket.send(message)
             except BlockingIOError:
-                # Wait for 5 seconds to see if socket connected or has an error
-                _, writeable, exceptional = select.select(
-                    [], [self.socket], [self.socket], 5.0
-                )
-                if exceptional:
-                    logger.error(
-                        f"[Connection]: Connection failed, retrying in 5s({attempt + 1}/5)"
-                    )
-                elif writeable:
-                    # Check if the socket actually connected
-                    err = self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
-                    if err == 0:
-                        logger.info(f"Connected to socket: {self.host}:{self.port}")
-                        break
-                    else:
-                        logger.error(
-                            f"[Connection]: Connection failed with error {err}, retrying in 5s({attempt + 1}/5)"
-                        )
-                else:
-                    logger.error(
-                        f"[Connection]: Connection timeout, retrying in 5s({attempt + 1}/5)"
-                    )
+                sent = 0
             except OSError as e:
-                logger.error(
-                    f"[Connection]: Connection failed, retrying in 5s({attempt + 1}/5) {e}"
+                self._send_failed(e)
+                return
+            self.sent_count += 1
+            self.send_latency.record(time.monotonic() - item.enqueued_at)
+            if (recorder := get_flight_recorder()) is not None:
+                recorder.record_frame(
+                    RecordKind.COMMAND_SENT,
+                    self.host,
+                    item.command_id,
+                    item.command,
+                    item.payload,
                 )
-        else:
-            return  # Failed to connect after retries
+            if sent < len(message):
+                self._outbox += message[sent:]
+        if bool(self._outbox) != self._write_interest:
+            self._update_interest()
+
+    def _send_failed(self, error: OSError):
+        logger.error(f"Socket send to {self.host} failed: {error}")
+        self._disconnected()
+
+    def _disconnected(self):
+        self.is_connected = False
+        self._connected_event.clear()
+        self.io_loop.unregister(self.socket)
+        self._outbox.clear()
+        self._write_interest = False
+        self._decoder.clear()
+        self._drop(self._queue.clear())
+        if self.is_running:
+            self._set_state(ConnectionState.RECONNECTING)
+            self._schedule_reconnect("Connection lost")
 
-        self.listen()
+    def _drop(self, items: list[QueuedCommand]):
+        if self.on_dropped is None:
+            return
+        for item in items:
+            self.on_dropped(item.command_id)
 
     def close(self):
         """Cleanly close the socket port and stop listening to new connections."""
         self.is_running = False
+
+        def detach():
+            for timer in (self._connect_timer, self._retry_timer):
+                if timer is not None:
+                    timer.cancel()
+            self.io_loop.unregister(self.socket)
+
+        if self._io_loop is not None:
+            self._io_loop.run_sync(detach)
+        self.is_connected = False
+        self._connected_event.clear()
+        self._drop(self._queue.clear())
         try:
             self.socket.shutdown(socket.SHUT_RDWR)
         except OSError:
             pass
-        if self.thread is not None:
-            self.thread.join()
         self.socket.close()
+        self._set_state(ConnectionState.CLOSED)
         logger.debug(f"Socket closed cleanly {self.host}:{self.port}")
 
     def xor_checksum(self, data: bytes) -> int:
-        result = 0
-        for byte in data:
-            result ^= byte
-        return result
+        return xor_checksum(data)
 
     def publish(self, command: int, payload: bytes | None = None):
         """
@@ -97,61 +304,54 @@ class OperatorConnection:
         Length	        UINT16	Length of Payload
         Payload	        UINT8[]	Command Info
         CRC	            UINT8	Checksum
+
+        The command is queued for the I/O loop, which encodes and sends it once the commands before it are out.
+        Returns the command id the message is sent with, the operator answers with command id + 1.
+        Returns -1 when not connected or the queue is full.
         """
+        if not self.is_connected:
+            logger.error(f"Socket send to {self.host} failed: not connected")
+            return -1
         # Get a unique, incrementing command id. Increment by 2, so that the response
         # from the operator always returns odd command ids and the publisher always sends
         # even command ids. Commands can be associated with each other by checking if they
         # have the same modulus of 2.
-        command_id = self.command_count
-        self.command_count += 2
-        payload_length = 0 if payload is None else len(payload)
-
-        command_id = toBytes(command_id, CTypesInt.UINT32)
-        reserved = toBytes(0, CTypesInt.UINT16)
-        command_byte = toBytes(command, CTypesInt.UINT16)
-        payload_length = toBytes(payload_length, CTypesInt.UINT16)
-
-        # Put header together
-        header = command_id + reserved + command_byte + payload_length
-
-        # Put everything together
-        message = header
-
-        if payload is not None:
-            message += payload
-
-        crc_value = self.xor_checksum(message)
-        crc = toBytes(crc_value, CTypesInt.UINT8)
-
-        message += crc
-
-        try:
-            self.socket.sendall(message)  # safer than send()
-        except OSError as e:
-            logger.error(f"Socket send to {self.host} failed: {e}")
+        with self._command_lock:
+            command_id = self.command_count
+            self.command_count = (self.command_count + 2) & 0xFFFFFFFF
+        accepted, dropped, was_empty = self._queue.put(
+            QueuedCommand(command_id, command, payload, time.monotonic())
+        )
+        self._drop(dropped)
+        if not accepted:
+            logger.warning(
+                f"Outbound queue to {self.host} is full, dropping command {command:#06x}"
+            )
             return -1
+        if was_empty:
+            # Otherwise a flush is already scheduled or waits for the socket to become writable
+            self.io_loop.call_soon(self._flush)
+        return command_id
 
-        # TODO: Implement response handling if needed
-        # response = self.socket.recv(2048)
-        return 0
-
-    def listen(self):
-        while self.is_running:
-            try:
-                message = self.socket.recv(2048)
-
-                if not message:
-                    logger.info(f"Connection closed by {self.host}")
-                    break  # Connection closed by the other side
-
-                self._on_message(message)
-            except BlockingIOError:
-                continue
-            except OSError as e:
-                if self.is_running:
-                    logger.error(f"Socket receive from {self.host} failed: {e}")
-                break
+    def get_queue_stats(self) -> dict[str, float | int]:
+        return {
+            "depth": len(self._queue),
+            "max_depth": self._queue.max_depth,
+            "sent": self.sent_count,
+            "coalesced": self._queue.coalesced_count,
+            "preempted": self._queue.preempted_count,
+            "rejected": self._queue.rejected_count,
+            "send_latency_last_ms": self.send_latency.last_ms,
+            "send_latency_mean_ms": self.send_latency.mean_ms,
+            "send_latency_max_ms": self.send_latency.max_ms,
+            "connects": self.connect_count,
+        }
 
-    def _on_message(self, message: bytes):
-        logger.info(f"RECEIVED MESSAGE: {message.decode(errors='replace')}")
-        logger.info("subclass must implement on_message method")
+    def _on_message(self, frame: Frame):
+        """Hands every message from the operator to on_response"""
+        if self.on_response is None:
+            logger.debug(
+                f"Unhandled command {frame.command:#06x} ({frame.command_id}) from {self.host}"
+            )
+            return
+        self.on_response(frame.command_id, frame.command, frame.payload)
@@ -0,0 +1,106 @@
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+from src.icd_config import Command
+
+MAX_QUEUED_COMMANDS = 128
+
+_POLAR_MOTION = frozenset(
+    {Command.POLAR_PAN_CONTINUOUS_START, Command.POLAR_PAN_DISCRETE}
+)
+_CARTESIAN_MOTION = frozenset(
+    {Command.CARTESIAN_MOVE_CONTINUOUS_START, Command.CARTESIAN_MOVE_DISCRETE}
+)
+# Commands that jump ahead of everything queued, mapped to the queued commands they make obsolete.
+# Sending an older start after the stop that was meant to end it would set the arm moving again.
+PREEMPTING_COMMANDS: dict[int, frozenset[int]] = {
+    Command.POLAR_PAN_CONTINUOUS_STOP: _POLAR_MOTION,
+    Command.CARTESIAN_MOVE_CONTINUOUS_STOP: _CARTESIAN_MOTION,
+    Command.HOME: _POLAR_MOTION | _CARTESIAN_MOTION | {Command.GO_TO_POSITION},
+}
+# Only the newest queued command of each of these kinds is worth sending
+COALESCED_COMMANDS = frozenset(
+    {Command.POLAR_PAN_CONTINUOUS_START, Command.CARTESIAN_MOVE_CONTINUOUS_START}
+)
+
+
+@dataclass(slots=True)
+class QueuedCommand:
+    command_id: int
+    command: int
+    payload: bytes | None
+    # time.monotonic() when the command was published
+    enqueued_at: float
+
+
+class OutboundQueue:
+    """
+    Bounded queue of the commands of one connection waiting for the I/O loop to write them, safe to use from any
+    thread.
+
+    Stop and home commands are sent before anything else that is queued and drop the queued motion commands they
+    supersede. A continuous start replaces a start of the same kind that is still queued, the arm only needs the
+    latest direction.
+    """
+
+    def __init__(self, max_size: int = MAX_QUEUED_COMMANDS):
+        self.max_size = max_size
+        self._urgent: deque[QueuedCommand] = deque()
+        self._normal: deque[QueuedCommand] = deque()
+        self._lock = threading.Lock()
+        self.max_depth = 0
+        self.coalesced_count = 0
+        self.preempted_count = 0
+        self.rejected_count = 0
+
+    def __len__(self) -> int:
+        return len(self._urgent) + len(self._normal)
+
+    def put(self, item: QueuedCommand) -> tuple[bool, list[QueuedCommand], bool]:
+        """
+        Queues item, returns (accepted, queued commands it made obsolete, whether the queue was empty before).
+        Commands are rejected when the queue is full, stop and home are always accepted.
+        """
+        with self._lock:
+            was_empty = len(self) == 0
+            dropped: list[QueuedCommand] = []
+            if (obsolete := PREEMPTING_COMMANDS.get(item.command)) is not None:
+                dropped = self._remove(self._normal, obsolete | {item.command})
+                dropped += self._remove(self._urgent, {item.command})
+                self.preempted_count += len(dropped)
+                self._urgent.append(item)
+            else:
+                if item.command in COALESCED_COMMANDS:
+                    dropped = self._remove(self._normal, {item.command})
+                    self.coalesced_count += len(dropped)
+                if len(self) >= self.max_size:
+                    self.rejected_count += 1
+                    return False, dropped, was_empty
+                self._normal.append(item)
+            self.max_depth = max(self.max_depth, len(self))
+            return True, dropped, was_empty
+
+    @staticmethod
+    def _remove(queue: deque[QueuedCommand], commands) -> list[QueuedCommand]:
+        removed = [item for item in queue if item.command in commands]
+        if removed:
+            kept = [item for item in queue if item.command not in commands]
+            queue.clear()
+            queue.extend(kept)
+        return removed
+
+    def pop(self) -> QueuedCommand | None:
+        with self._lock:
+            if self._urgent:
+                return self._urgent.popleft()
+            if self._normal:
+                return self._normal.popleft()
+            return None
+
+    def clear(self) -> list[QueuedCommand]:
+        with self._lock:
+            dropped = [*self._urgent, *self._normal]
+            self._urgent.clear()
+            self._normal.clear()
+            return dropped
@@ -1,9 +1,18 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
 from enum import IntEnum
+from typing import Any, Callable
 
 from loguru import logger
 
+from src.connection.arm_motion import ArmMotionHistory
 from src.connection.operator_connections import OperatorConnection
-from src.icd_config import Command, CTypesInt, toBytes
+from src.connection.reconnect import ConnectionState
+from src.connection.responses import DEFAULT_RESPONSE_TIMEOUT_S, ResponseRouter
+from src.icd_codec import CartesianPosition, PolarPosition, encode_payload
+from src.icd_config import Command
 
 DIRECTION_OFFSET_MAPPING: dict[int, tuple[int, int]] = {
     -4: (-1, 1),
@@ -44,6 +53,30 @@ class Direction(IntEnum):
         return DIRECTION_OFFSET_MAPPING[sum_direction]
 
 
+DEFAULT_KEEPALIVE_S = 1.0
+# Commands that set a state on the arm, re-sending the same payload does nothing but keep the state alive.
+# Commands on the same channel overwrite each other.
+STATEFUL_COMMAND_CHANNELS: dict[Command, str] = {
+    Command.POLAR_PAN_CONTINUOUS_START: "polar_pan",
+    Command.CARTESIAN_MOVE_CONTINUOUS_START: "cartesian_move",
+    Command.SET_SPEED: "speed",
+}
+# Stops are never suppressed, a stop that did not reach the arm leaves it moving. They clear the state of their
+# channel, so the next start is sent.
+STOP_COMMAND_CHANNELS: dict[Command, str] = {
+    Command.POLAR_PAN_CONTINUOUS_STOP: "polar_pan",
+    Command.CARTESIAN_MOVE_CONTINUOUS_STOP: "cartesian_move",
+}
+# After these the motion state of the arm is unknown, so the next continuous command is always sent
+MOTION_COMMANDS = {
+    Command.POLAR_PAN_DISCRETE,
+    Command.HOME,
+    Command.CARTESIAN_MOVE_DISCRETE,
+    Command.GO_TO_POSITION,
+    Command.EXECUTE_HARDWARE_OPERATION,
+}
+
+
 def assert_normalized(*nums: int):
     nums_abs = [abs(x) for x in nums]
     return all(x in [0, 1] for x in nums_abs)
@@ -52,24 +85,176 @@ def assert_normalized(*nums: int):
 class Publisher:
     """
     A class that is used to publish instructions to the operator.
+
+    Every command method returns a concurrent.futures.Future resolved with the decoded *_RETURN of the command
+    (the UINT16 status code unless the return carries a value), failed with TimeoutError when the operator does not
+    answer in time, or None when the command repeated the current arm state and was suppressed.
+    Futures of commands a later stop, home or continuous start superseded before they were sent are cancelled.
+    The publisher survives reconnects of its OperatorConnection: futures still waiting when the link drops fail with
+    ConnectionError and the cached arm state is forgotten, so the first commands after the reconnect are all sent.
+    Use `asyncio.wrap_future` or the `*_async` methods from asyncio code.
     """
 
     command_count = 0
     CHAR_ENCODING = "utf-8"
 
     def __init__(
-        self, socket_host: str, socket_port: int, start_connection: bool = True
+        self,
+        socket_host: str,
+        socket_port: int,
+        start_connection: bool = True,
+        keepalive_s: float = DEFAULT_KEEPALIVE_S,
     ):
+        """
+        Args:
+            keepalive_s (float, optional): Identical continuous commands are suppressed, but re-sent once this many seconds
+                passed since they were last sent. 0 disables suppression. Defaults to DEFAULT_KEEPALIVE_S.
+        """
         self.operator_connection = OperatorConnection(
             host=socket_host, port=socket_port, connect_on_init=start_connection
         )
+        self.keepalive_s = keepalive_s
+        self.sent_count = 0
+        self.suppressed_count = 0
+        # channel -> (command, payload, monotonic time it was sent)
+        self._command_state: dict[str, tuple[Command, bytes | None, float]] = {}
+        self._state_lock = threading.Lock()
+        self.motion_history = ArmMotionHistory()
+        self.responses = ResponseRouter()
+        self.operator_connection.on_response = self.responses.resolve
+        self.operator_connection.on_dropped = self.responses.cancel
+        # Called with every state change of the operator connection, after the publisher handled it
+        self.on_state_change: Callable[[ConnectionState], None] | None = None
+        self.operator_connection.on_state_change = self._on_connection_state
+
+    def _publish(
+        self,
+        command: Command,
+        payload: bytes | None = None,
+        timeout: float | None = DEFAULT_RESPONSE_TIMEOUT_S,
+    ) -> Future | None:
+        """Publishes the command unless it repeats the current state of its channel within the keepalive window.
+        Returns the future of the command's return, None when the command was not sent."""
+        channel = STATEFUL_COMMAND_CHANNELS.get(command)
+        with self._state_lock:
+            now = time.monotonic()
+            if channel is not None:
+                last = self._command_state.get(channel)
+                if (
+                    self.keepalive_s > 0
+                    and last is not None
+                    and last[0] == command
+                    and last[1] == payload
+                    and now - last[2] < self.keepalive_s
+                ):
+                    self.suppressed_count += 1
+                    return None
+            elif (stop_channel := STOP_COMMAND_CHANNELS.get(command)) is not None:
+                self._command_state.pop(stop_channel, None)
+            elif command in MOTION_COMMANDS:
+                self._command_state.pop("polar_pan", None)
+                self._command_state.pop("cartesian_move", None)
+        sent_at = time.monotonic()
+        if payload is None:
+            command_id = self.operator_connection.publish(command=command)
+        else:
+            command_id = self.operator_connection.publish(
+                command=command, payload=payload
+            )
+        # The cached state only changes once the command is on its way, a failed send must not suppress the retry
+        with self._state_lock:
+            if command_id < 0:
+                if channel is not None:
+                    self._command_state.pop(channel, None)
+            else:
+                if channel is not None:
+                    self._command_state[channel] = (command, payload, now)
+                self.sent_count += 1
+                self._record_motion(command, payload)
+        if command_id < 0:
+            future: Future = Future()
+            future.set_exception(
+                ConnectionError(
+                    f"Unable to send {command.name} to {self.operator_connection.host}"
+                )
+            )
+            return future
+        return self.responses.register(command_id, command, sent_at, timeout)
+
+    def request(
+        self,
+        command: Command,
+        payload: bytes | None = None,
+        timeout: float | None = DEFAULT_RESPONSE_TIMEOUT_S,
+    ) -> Future:
+        """Sends any command and returns the future of its return, suppressed commands resolve to None right away"""
+        if (future := self._publish(command, payload, timeout)) is None:
+            future = Future()
+            future.set_result(None)
+        return future
+
+    async def request_async(
+        self,
+        command: Command,
+        payload: bytes | None = None,
+        timeout: float | None = DEFAULT_RESPONSE_TIMEOUT_S,
+    ) -> Any:
+        return await asyncio.wrap_future(self.request(command, payload, timeout))
+
+    def _record_motion(self, command: Command, payload: bytes | None):
+        """Keeps the motion history in sync with the commands sent to the arm"""
+        if command == Command.POLAR_PAN_CONTINUOUS_START and payload is not None:
+            self.motion_history.set_direction(
+                int.from_bytes(payload[0:1], signed=True),
+                int.from_bytes(payload[1:2], signed=True),
+            )
+        elif command == Command.SET_SPEED and payload:
+            self.motion_history.set_speed(payload[0])
+        elif command == Command.POLAR_PAN_CONTINUOUS_STOP or command in MOTION_COMMANDS:
+            # Discrete moves are not continuous pans, they are not tracked
+            self.motion_history.stop()
+
+    def _on_connection_state(self, state: ConnectionState):
+        if state == ConnectionState.RECONNECTING:
+            logger.warning(f"Lost connection to {self.operator_connection.host}")
+            self.responses.fail_all(
+                ConnectionError(
+                    f"Connection to {self.operator_connection.host} was lost"
+                )
+            )
+            self.reset_command_state()
+        elif (
+            state == ConnectionState.CONNECTED
+            and self.operator_connection.connect_count > 1
+        ):
+            logger.info(f"Reconnected to {self.operator_connection.host}")
+            self.reset_command_state()
+        if self.on_state_change is not None:
+            self.on_state_change(state)
+
+    def reset_command_state(self):
+        """Forgets the cached arm state so the next command of every kind is sent, e.g. after a reconnect."""
+        with self._state_lock:
+            self._command_state.clear()
+
+    def get_command_stats(self) -> dict[str, int]:
+        return {"sent": self.sent_count, "suppressed": self.suppressed_count}
+
+    def get_latency_stats(self) -> dict[str, dict[str, float | int]]:
+        """Round trip time to the operator per command type, see LatencyStats"""
+        return self.responses.get_latency_stats()
+
+    def get_queue_stats(self) -> dict[str, float | int]:
+        """Depth of the outbound queue and time commands waited in it, see OperatorConnection.get_queue_stats"""
+        return self.operator_connection.get_queue_stats()
 
     def close(self):
         logger.debug("Closing publisher connection")
         self.operator_connection.close()
+        self.responses.fail_all(ConnectionError("Publisher closed"))
 
     def handshake(self):
-        self.operator_connection.publish(command=Command.HANDSHAKE, payload=b"")
+        return self._publish(Command.HANDSHAKE, b"")
 
     def polar_pan_discrete(
         self,
@@ -84,18 +269,16 @@ class Publisher:
         Delay (ms)  	UINT32	How long to wait until executing pan
         Duration (ms)	UINT32	How long the pan should take to execute
         """
-        delta_azimuth = toBytes(delta_azimuth_int, CTypesInt.INT32)
-        delta_altitude = toBytes(delta_altitude_int, CTypesInt.INT32)
-        delay = toBytes(delay_int, CTypesInt.UINT32)
-        duration = toBytes(duration_int, CTypesInt.UINT32)
-
-        # Put everything together
-        payload = delta_azimuth + delta_altitude + delay + duration
-
-        self.operator_connection.publish(
-            command=Command.POLAR_PAN_DISCRETE, payload=payload
+        payload = encode_payload(
+            Command.POLAR_PAN_DISCRETE,
+            delta_azimuth_int,
+            delta_altitude_int,
+            delay_int,
+            duration_int,
         )
 
+        return self._publish(Command.POLAR_PAN_DISCRETE, payload)
+
     def polar_pan_continuous_direction_start(self, dir_sum: int):
         """
         Starts/maintains a continuous polar pan rotation.
@@ -129,36 +312,32 @@ class Publisher:
         """
         assert assert_normalized(moving_azimuth_int, moving_altitude_int)
 
-        moving_azimuth = toBytes(moving_azimuth_int, CTypesInt.INT8)
-        moving_altitude = toBytes(moving_altitude_int, CTypesInt.INT8)
-
-        # Put everything together
-        payload = moving_azimuth + moving_altitude
-
-        self.operator_connection.publish(
-            command=Command.POLAR_PAN_CONTINUOUS_START, payload=payload
+        payload = encode_payload(
+            Command.POLAR_PAN_CONTINUOUS_START, moving_azimuth_int, moving_altitude_int
         )
 
+        return self._publish(Command.POLAR_PAN_CONTINUOUS_START, payload)
+
     def polar_pan_continuous_stop(self):
         """
         Stops a continuous polar pan rotation.
         """
-        self.operator_connection.publish(command=Command.POLAR_PAN_CONTINUOUS_STOP)
+        return self._publish(Command.POLAR_PAN_CONTINUOUS_STOP)
 
     def home(self, delay_ms: int):
         """
         Delay (ms)	UINT32	How long to wait until executing pan
         """
-        delay = toBytes(delay_ms, CTypesInt.UINT32)
+        delay = encode_payload(Command.HOME, delay_ms)
 
-        self.operator_connection.publish(command=Command.HOME, payload=delay)
+        return self._publish(Command.HOME, delay)
 
     def set_speed(self, speed: int):
         """
         Speed 	UINT8 	What to set the speed of all axes to on the scorbot
         """
-        speed_bytes = toBytes(speed, CTypesInt.UINT8)
-        self.operator_connection.publish(command=Command.SET_SPEED, payload=speed_bytes)
+        speed_bytes = encode_payload(Command.SET_SPEED, speed)
+        return self._publish(Command.SET_SPEED, speed_bytes)
 
     def save_position(self, name: str, anchor: bool, parent: str):
         """
@@ -176,19 +355,8 @@ class Publisher:
             Anchor  BOOLEAN     Whether the position will move relative to the parent position (0x01 for True, 0x00 for False)
             Parent  CHAR[]      Another previously saved position to act as a parent (or refernce) position
         """
-
-        name_len_bytes = toBytes(len(name), CTypesInt.UINT8)
-        name_bytes = name.encode(self.CHAR_ENCODING)
-
-        anchor_bytes = b"\x01" if anchor else b"\x00"
-
-        parent_len_bytes = toBytes(len(parent), CTypesInt.UINT8)
-        parent_bytes = parent.encode(self.CHAR_ENCODING)
-
-        payload = (
-            name_len_bytes + name_bytes + anchor_bytes + parent_len_bytes + parent_bytes
-        )
-        self.operator_connection.publish(command=Command.SAVE_POSITION, payload=payload)
+        payload = encode_payload(Command.SAVE_POSITION, name, anchor, parent)
+        return self._publish(Command.SAVE_POSITION, payload)
 
     def delete_position(self, name: str):
         """
@@ -196,14 +364,8 @@ class Publisher:
 
         Name    CHAR[]  Name descriptor for the position (non null terminated)
         """
-
-        name_len_bytes = toBytes(len(name), CTypesInt.UINT8)
-        name_bytes = name.encode(self.CHAR_ENCODING)
-
-        payload = name_len_bytes + name_bytes
-        self.operator_connection.publish(
-            command=Command.DELETE_POSITION, payload=payload
-        )
+        payload = encode_payload(Command.DELETE_POSITION, name)
+        return self._publish(Command.DELETE_POSITION, payload)
 
     def go_to_position(self, name: str):
         """
@@ -211,13 +373,8 @@ class Publisher:
 
         Name    CHAR[]  Name descriptor for the position (non null terminated)
         """
-        name_len_bytes = toBytes(len(name), CTypesInt.UINT8)
-        name_bytes = name.encode(self.CHAR_ENCODING)
-
-        payload = name_len_bytes + name_bytes
-        self.operator_connection.publish(
-            command=Command.GO_TO_POSITION, payload=payload
-        )
+        payload = encode_payload(Command.GO_TO_POSITION, name)
+        return self._publish(Command.GO_TO_POSITION, payload)
 
     def set_polar_position(self, name: str, delta: int, azimuth: int, radius: int):
         """
@@ -228,35 +385,27 @@ class Publisher:
         Azimuth     INT32   Tenths of degrees on azimuth axis
         Radius      INT32   Tenths of distance to extend outwards
         """
-
-        name_len_bytes = toBytes(len(name), CTypesInt.UINT8)
-        name_bytes = name.encode(self.CHAR_ENCODING)
-
-        delta_bytes = toBytes(delta, CTypesInt.INT32)
-        azimuth_bytes = toBytes(azimuth, CTypesInt.INT32)
-        radius_bytes = toBytes(radius, CTypesInt.INT32)
-
-        payload = (
-            name_len_bytes + name_bytes + delta_bytes + azimuth_bytes + radius_bytes
-        )
-        self.operator_connection.publish(
-            command=Command.SET_POLAR_POSITION, payload=payload
+        payload = encode_payload(
+            Command.SET_POLAR_POSITION, name, delta, azimuth, radius
         )
+        return self._publish(Command.SET_POLAR_POSITION, payload)
 
-    def get_polar_position(self, name: str):
+    def get_polar_position(
+        self, name: str, timeout: float | None = DEFAULT_RESPONSE_TIMEOUT_S
+    ) -> Future[PolarPosition]:
         """
         Returns the polar coordinates of a named position
 
         Name    CHAR[]  Name descriptor for the position (non null terminated)
         """
-        name_len_bytes = toBytes(len(name), CTypesInt.UINT8)
-        name_bytes = name.encode(self.CHAR_ENCODING)
+        payload = encode_payload(Command.GET_POLAR_POSITION, name)
 
-        payload = name_len_bytes + name_bytes
+        return self.request(Command.GET_POLAR_POSITION, payload, timeout)
 
-        self.operator_connection.publish(
-            command=Command.GET_POLAR_POSITION, payload=payload
-        )
+    async def get_polar_position_async(
+        self, name: str, timeout: float | None = DEFAULT_RESPONSE_TIMEOUT_S
+    ) -> PolarPosition:
+        return await asyncio.wrap_future(self.get_polar_position(name, timeout))
 
     def set_cartesian_position(
         self, name: str, x_mm_tenths: int, y_mm_tenths: int, z_mm_tenths: int
@@ -269,48 +418,43 @@ class Publisher:
         Y       INT32   Tenths of millimeters on Y-axis
         Z       INT32   Tenths of millimeters on Z-axis
         """
-
-        name_len_bytes = toBytes(len(name), CTypesInt.UINT8)
-        name_bytes = name.encode(self.CHAR_ENCODING)
-
-        x_mm_tenths_bytes = toBytes(x_mm_tenths, CTypesInt.INT32)
-        y_mm_tenths_bytes = toBytes(y_mm_tenths, CTypesInt.INT32)
-        z_mm_tenths_bytes = toBytes(z_mm_tenths, CTypesInt.INT32)
-
-        payload = (
-            name_len_bytes
-            + name_bytes
-            + x_mm_tenths_bytes
-            + y_mm_tenths_bytes
-            + z_mm_tenths_bytes
-        )
-        self.operator_connection.publish(
-            command=Command.SET_CARTESIAN_POSITION, payload=payload
+        payload = encode_payload(
+            Command.SET_CARTESIAN_POSITION, name, x_mm_tenths, y_mm_tenths, z_mm_tenths
         )
+        return self._publish(Command.SET_CARTESIAN_POSITION, payload)
 
-    def get_cartesian_position(self, name: str):
+    def get_cartesian_position(
+        self, name: str, timeout: float | None = DEFAULT_RESPONSE_TIMEOUT_S
+    ) -> Future[CartesianPosition]:
         """
         Returns the cartesian coordinates of a named position
 
         Name    CHAR[]  Name descriptor for the position (non null terminated)
         """
-        name_len_bytes = toBytes(len(name), CTypesInt.UINT8)
-        name_bytes = name.encode(self.CHAR_ENCODING)
+        payload = encode_payload(Command.GET_CARTESIAN_POSITION, name)
 
-        payload = name_len_bytes + name_bytes
+        return self.request(Command.GET_CARTESIAN_POSITION, payload, timeout)
 
-        self.operator_connection.publish(
-            command=Command.GET_CARTESIAN_POSITION, payload=payload
-        )
+    async def get_cartesian_position_async(
+        self, name: str, timeout: float | None = DEFAULT_RESPONSE_TIMEOUT_S
+    ) -> CartesianPosition:
+        return await asyncio.wrap_future(self.get_cartesian_position(name, timeout))
 
-    def get_speed(self):
+    def get_speed(
+        self, timeout: float | None = DEFAULT_RESPONSE_TIMEOUT_S
+    ) -> Future[int]:
         """
         Command to get the speed of all axes on Talos
         """
         # Sends an empty payload
         payload = b""
 
-        self.operator_connection.publish(command=Command.GET_SPEED, payload=payload)
+        return self.request(Command.GET_SPEED, payload, timeout)
+
+    async def get_speed_async(
+        self, timeout: float | None = DEFAULT_RESPONSE_TIMEOUT_S
+    ) -> int:
+        return await asyncio.wrap_future(self.get_speed(timeout))
 
     def cartesian_move_discrete(self, delta_x, delta_y, delta_z, delay_ms, time):
         """
@@ -321,18 +465,11 @@ class Publisher:
         Delay (ms) 	UINT32 	How long to wait until executing pan
         Time 	    UINT32 	How long the pan should take to execute
         """
-        delta_x_bytes = toBytes(delta_x, CTypesInt.INT32)
-        delta_y_bytes = toBytes(delta_y, CTypesInt.INT32)
-        delta_z_bytes = toBytes(delta_z, CTypesInt.INT32)
-        delay_ms_bytes = toBytes(delay_ms, CTypesInt.UINT32)
-        time_bytes = toBytes(time, CTypesInt.UINT32)
-        payload = (
-            delta_x_bytes + delta_y_bytes + delta_z_bytes + delay_ms_bytes + time_bytes
+        payload = encode_payload(
+            Command.CARTESIAN_MOVE_DISCRETE, delta_x, delta_y, delta_z, delay_ms, time
         )
 
-        self.operator_connection.publish(
-            command=Command.CARTESIAN_MOVE_DISCRETE, payload=payload
-        )
+        return self._publish(Command.CARTESIAN_MOVE_DISCRETE, payload)
 
     def cartesian_move_continuous_start(self, moving_x, moving_y, moving_z):
         """
@@ -345,16 +482,12 @@ class Publisher:
         """
         assert assert_normalized(moving_x, moving_y, moving_z)
 
-        moving_x_bytes = toBytes(moving_x, CTypesInt.INT8)
-        moving_y_bytes = toBytes(moving_y, CTypesInt.INT8)
-        moving_z_bytes = toBytes(moving_z, CTypesInt.INT8)
-
-        payload = moving_x_bytes + moving_y_bytes + moving_z_bytes
-
-        self.operator_connection.publish(
-            command=Command.CARTESIAN_MOVE_CONTINUOUS_START, payload=payload
+        payload = encode_payload(
+            Command.CARTESIAN_MOVE_CONTINUOUS_START, moving_x, moving_y, moving_z
         )
 
+        return self._publish(Command.CARTESIAN_MOVE_CONTINUOUS_START, payload)
+
     def cartesian_move_continuous_stop(self):
         """
         Stops a continuous cartesian move.
@@ -362,9 +495,7 @@ class Publisher:
         # Sends an empty payload
         payload = b""
 
-        self.operator_connection.publish(
-            command=Command.CARTESIAN_MOVE_CONTINUOUS_STOP, payload=payload
-        )
+        return self._publish(Command.CARTESIAN_MOVE_CONTINUOUS_STOP, payload)
 
     def execute_hardware_operation(self, subcommand_value, operations_payload):
         """
@@ -377,12 +508,8 @@ class Publisher:
         RESERVED 	        UINT32 	    RESERVED
         Payload 	        UINT8[] 	Payload defined by hardware specific ICD
         """
-
-        subcommand_value_bytes = toBytes(subcommand_value, CTypesInt.UINT8)
-        reserved_bytes = toBytes(0, CTypesInt.UINT32)
-
-        payload = subcommand_value_bytes + reserved_bytes + operations_payload
-
-        self.operator_connection.publish(
-            command=Command.EXECUTE_HARDWARE_OPERATION, payload=payload
+        payload = encode_payload(
+            Command.EXECUTE_HARDWARE_OPERATION, subcommand_value, 0, operations_payload
         )
+
+        return self._publish(Command.EXECUTE_HARDWARE_OPERATION, payload)
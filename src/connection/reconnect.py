@@ -0,0 +1,54 @@
+import random
+from enum import Enum
+
+RECONNECT_INITIAL_S = 0.5
+RECONNECT_MAX_S = 30.0
+RECONNECT_MULTIPLIER = 2.0
+# Fraction of every delay that is randomized, so robots that dropped together do not retry in lockstep
+RECONNECT_JITTER = 0.5
+
+
+class ConnectionState(Enum):
+    CONNECTING = "connecting"
+    CONNECTED = "connected"
+    # The link dropped and is being re-established in the background
+    RECONNECTING = "reconnecting"
+    CLOSED = "closed"
+
+
+class Backoff:
+    """
+    Exponential backoff with jitter between reconnect attempts.
+
+    The nominal delay starts at initial_s and is multiplied after every attempt up to max_s. The delay returned is
+    drawn uniformly from the last `jitter` fraction below the nominal delay. Call reset once connected again.
+    """
+
+    def __init__(
+        self,
+        initial_s: float = RECONNECT_INITIAL_S,
+        max_s: float = RECONNECT_MAX_S,
+        multiplier: float = RECONNECT_MULTIPLIER,
+        jitter: float = RECONNECT_JITTER,
+        rng: random.Random | None = None,
+    ):
+        if not 0 <= jitter <= 1:
+            raise ValueError(f"Jitter must be between 0 and 1, got {jitter}")
+        self.initial_s = initial_s
+        self.max_s = max_s
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self._rng = rng or random.Random()
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        """Seconds to wait before the next attempt"""
+        # The exponent is capped, the delay stopped growing long before and a float power would overflow
+        nominal = min(
+            self.max_s, self.initial_s * self.multiplier ** min(self.attempts, 64)
+        )
+        self.attempts += 1
+        return nominal * (1 - self.jitter * self._rng.random())
+
+    def reset(self) -> None:
+        self.attempts = 0
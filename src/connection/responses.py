@@ -0,0 +1,202 @@
+import struct
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+from loguru import logger
+
+from src.connection.io_loop import IOLoop, TimerHandle, get_io_loop
+from src.icd_codec import decode_return
+from src.icd_config import RETURN_FLAG, Command
+
+DEFAULT_RESPONSE_TIMEOUT_S = 2.0
+# Returns that arrived before their command was registered, kept until the publisher catches up
+EARLY_RESPONSE_LIMIT = 64
+# Weight of the newest sample in the smoothed round trip time
+RTT_SMOOTHING = 0.2
+
+
+@dataclass
+class LatencyStats:
+    """Round trip times of one command type, in milliseconds"""
+
+    count: int = 0
+    timeouts: int = 0
+    last_ms: float = 0.0
+    mean_ms: float = 0.0
+    smoothed_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def record(self, rtt_s: float):
+        rtt_ms = rtt_s * 1000
+        self.count += 1
+        self.last_ms = rtt_ms
+        self.mean_ms += (rtt_ms - self.mean_ms) / self.count
+        self.smoothed_ms = (
+            rtt_ms
+            if self.count == 1
+            else self.smoothed_ms + RTT_SMOOTHING * (rtt_ms - self.smoothed_ms)
+        )
+        self.max_ms = max(self.max_ms, rtt_ms)
+
+
+@dataclass
+class _PendingRequest:
+    command: Command
+    future: Future
+    sent_at: float
+    timer: TimerHandle | None = None
+
+
+class ResponseRouter:
+    """
+    Matches operator *_RETURN messages to the commands they answer.
+
+    Commands go out with even ids and the operator answers with the id + 1, so every sent command gets a Future
+    that the matching return resolves with the decoded payload, or fails with TimeoutError when no return came
+    in time. Round trip times are tracked per command type.
+    """
+
+    def __init__(self, io_loop: IOLoop | None = None):
+        self._io_loop = io_loop
+        self._pending: dict[int, _PendingRequest] = {}
+        # Returns that came in before their command was registered, None for commands dropped before being sent
+        self._early: OrderedDict[int, tuple[int, bytes, float] | None] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: dict[Command, LatencyStats] = {}
+
+    @property
+    def io_loop(self) -> IOLoop:
+        if self._io_loop is None:
+            self._io_loop = get_io_loop()
+        return self._io_loop
+
+    def register(
+        self,
+        command_id: int,
+        command: Command,
+        sent_at: float,
+        timeout: float | None = DEFAULT_RESPONSE_TIMEOUT_S,
+    ) -> Future:
+        """Future for the return of the command sent with command_id at monotonic time sent_at"""
+        future: Future = Future()
+        request = _PendingRequest(command, future, sent_at)
+        with self._lock:
+            is_early = command_id + 1 in self._early
+            early = self._early.pop(command_id + 1) if is_early else None
+            if not is_early:
+                self._pending[command_id] = request
+        if is_early:
+            if early is None:
+                future.cancel()
+            else:
+                self._complete(request, *early)
+            return future
+        if timeout is not None:
+            request.timer = self.io_loop.call_later(
+                timeout, lambda: self._expire(command_id, timeout)
+            )
+        return future
+
+    def resolve(
+        self, command_id: int, return_command: int, payload: bytes | memoryview
+    ) -> None:
+        """Handles a message from the operator, called on the I/O loop thread. payload is only read during the call."""
+        received_at = time.monotonic()
+        if not return_command & RETURN_FLAG:
+            logger.warning(f"Ignoring non return command {return_command:#06x}")
+            return
+        with self._lock:
+            request = self._pending.pop(command_id - 1, None)
+            if request is None:
+                self._remember_early(
+                    command_id, (return_command, bytes(payload), received_at)
+                )
+                return
+        if request.timer is not None:
+            request.timer.cancel()
+        self._complete(request, return_command, payload, received_at)
+
+    def cancel(self, command_id: int) -> None:
+        """Cancels the future of a command that was dropped before it was sent, it will never get a return"""
+        with self._lock:
+            request = self._pending.pop(command_id, None)
+            if request is None:
+                self._remember_early(command_id + 1, None)
+                return
+        if request.timer is not None:
+            request.timer.cancel()
+        request.future.cancel()
+
+    def _remember_early(
+        self, return_id: int, early: tuple[int, bytes, float] | None
+    ) -> None:
+        self._early[return_id] = early
+        while len(self._early) > EARLY_RESPONSE_LIMIT:
+            self._early.popitem(last=False)
+
+    def _complete(
+        self,
+        request: _PendingRequest,
+        return_command: int,
+        payload: bytes | memoryview,
+        received_at: float,
+    ) -> None:
+        if return_command & ~RETURN_FLAG != request.command:
+            request.future.set_exception(
+                ValueError(
+                    f"Return {return_command:#06x} does not answer {request.command.name}"
+                )
+            )
+            return
+        with self._lock:
+            self.stats.setdefault(request.command, LatencyStats()).record(
+                received_at - request.sent_at
+            )
+        try:
+            request.future.set_result(decode_return(request.command, payload))
+        except struct.error as e:
+            request.future.set_exception(
+                ValueError(f"Malformed {request.command.name} return: {e}")
+            )
+
+    def _expire(self, command_id: int, timeout: float) -> None:
+        with self._lock:
+            request = self._pending.pop(command_id, None)
+            if request is None:
+                return
+            self.stats.setdefault(request.command, LatencyStats()).timeouts += 1
+        request.future.set_exception(
+            TimeoutError(f"No return for {request.command.name} within {timeout}s")
+        )
+
+    def fail_all(self, exception: BaseException) -> None:
+        """Fails every pending request, e.g. when the connection is closed"""
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._early.clear()
+        for request in pending:
+            if request.timer is not None:
+                request.timer.cancel()
+            request.future.set_exception(exception)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def get_latency_stats(self) -> dict[str, dict[str, float | int]]:
+        with self._lock:
+            return {
+                command.name: {
+                    "count": stats.count,
+                    "timeouts": stats.timeouts,
+                    "last_ms": stats.last_ms,
+                    "mean_ms": stats.mean_ms,
+                    "smoothed_ms": stats.smoothed_ms,
+                    "max_ms": stats.max_ms,
+                }
+                for command, stats in self.stats.items()
+            }
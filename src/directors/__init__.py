@@ -1,5 +1,6 @@
 from .base_director import BaseDirector
 from .continuous_director import ContinuousDirector
 from .discrete_director import DiscreteDirector
+from .pid_director import PIDDirector
 
-__all__ = ["BaseDirector", "ContinuousDirector", "DiscreteDirector"]
+__all__ = ["BaseDirector", "ContinuousDirector", "DiscreteDirector", "PIDDirector"]
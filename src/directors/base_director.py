@@ -1,12 +1,20 @@
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Iterable
 
+import numpy as np
 from loguru import logger
 
-from src.connection.connection import ConnectionCollectionEvent
+import src.config as config
+from src.connection.config_snapshot import ConnectionSnapshot
+from src.connection.connection import ConnectionCollection, ConnectionCollectionEvent
 from src.connection.publisher import Publisher
+from src.directors.geometry import TargetGeometry, compute_geometry
+from src.directors.latency import LatencyState, project_bbox
+from src.directors.target_selection import select_target
+from src.flight_recorder import get_flight_recorder
 from src.scheduler import IterativeTask, Scheduler
-from src.talos_app import ConnectionCollection
 from src.utils import add_termination_handler, remove_termination_handler
 
 DIRECTOR_CONTROL_RATE = 10  # control per sec
@@ -17,6 +25,10 @@ class BaseDirector(ABC):
     control_task: IterativeTask | None = None
     _term: int | None = None
     connections: ConnectionCollection
+    # Per host state objects, created from state_class on first use
+    state_class: type | None = None
+    states: dict[str, Any]
+    _listening_to_detections: bool = False
 
     def __init__(
         self,
@@ -26,12 +38,30 @@ class BaseDirector(ABC):
     ):
         self.tracker = tracker
         self.scheduler = scheduler
+        self.states = {}
+        self.latency_states: dict[str, LatencyState] = {}
+        # Box of the subject each host followed last, used by the sticky and weighted target policies
+        self.targets: dict[str, tuple[int, int, int, int]] = {}
+        # Detection sequence number last processed and monotonic time of the last fresh detection, by host
+        self._last_sequence: dict[str, int] = {}
+        self._last_detection_time: dict[str, float] = {}
+        self._watchdog_stopped: set[str] = set()
+        self._lock = threading.Lock()
         self.connections = connections
         self.connections.add_listener(self.on_connection_update)
         if len(self.connections) > 0 and self.scheduler is not None:
             self.start_auto_control()
 
-    def on_connection_update(self, event: ConnectionCollectionEvent, *_: Any):
+    def on_connection_update(
+        self, event: ConnectionCollectionEvent, hostname: str | None = None, *_: Any
+    ):
+        if event == ConnectionCollectionEvent.REMOVED and hostname is not None:
+            self.states.pop(hostname, None)
+            self.latency_states.pop(hostname, None)
+            self.targets.pop(hostname, None)
+            self._last_sequence.pop(hostname, None)
+            self._last_detection_time.pop(hostname, None)
+            self._watchdog_stopped.discard(hostname)
         if (
             event == ConnectionCollectionEvent.ADDED
             and self.scheduler is not None
@@ -41,6 +71,14 @@ class BaseDirector(ABC):
         elif event == ConnectionCollectionEvent.REMOVED and not self.connections:
             self.stop_auto_control()
 
+    def get_state(self, hostname: str) -> Any:
+        """Returns the director state of the host, creating it on first use"""
+        if (
+            state := self.states.get(hostname)
+        ) is None and self.state_class is not None:
+            state = self.states[hostname] = self.state_class()
+        return state
+
     # Processes the bounding box and sends commands
     @abstractmethod
     def process_frame(
@@ -49,41 +87,206 @@ class BaseDirector(ABC):
         bounding_box: list,
         frame_shape: tuple,
         publisher: Publisher,
+        geometry: TargetGeometry | None = None,
+        snapshot: ConnectionSnapshot | None = None,
     ) -> Any:
+        """
+        geometry is precomputed by track_obj for all hosts at once and snapshot is the config of the connection.
+        They are None when process_frame is called directly, implementations then compute them themselves.
+        """
         raise NotImplementedError("Subclasses must implement this method.")
 
-    def track_obj(self) -> Any | None:
-        for host, conn in self.connections.items():
-            bbox = conn.get_bboxes()
-            if host in self.connections and bbox is not None and len(bbox) > 0:
+    def track_obj(
+        self, hosts: Iterable[str] | None = None, only_new: bool = False
+    ) -> dict[str, Any]:
+        """
+        Runs process_frame for every connection in automatic mode that has a subject, returns the results by host.
+
+        Args:
+            hosts (Iterable[str] | None, optional): Only direct these hosts. Defaults to None (all connections).
+            only_new (bool, optional): Skip hosts whose detections were already processed. Defaults to False.
+        """
+        targets = []
+        for host in list(self.connections.keys()) if hosts is None else hosts:
+            if (conn := self.connections.get(host)) is None or conn.is_manual:
+                continue  # skip manual feeds
+            try:
+                bbox, sequence = conn.get_bboxes_with_sequence()
+                if self._last_sequence.get(host) != sequence:
+                    self._last_sequence[host] = sequence
+                    self._last_detection_time[host] = time.monotonic()
+                    self._watchdog_stopped.discard(host)
+                elif only_new:
+                    continue
                 video_conn = conn.video_connection
                 if (
-                    conn.is_manual
+                    bbox is None
+                    or len(bbox) == 0
                     or video_conn is None
                     or (shape := video_conn.shape) is None
                 ):
-                    continue  # skip manual feeds
-                return self.process_frame(
-                    host,
-                    bbox,
-                    shape,
-                    conn.publisher,
+                    continue
+                snapshot = conn.snapshot_for_shape(shape)
+                bbox = self.order_targets(host, bbox, snapshot)
+                bbox = [
+                    self.compensate_latency(host, conn, bbox[0], snapshot),
+                    *bbox[1:],
+                ]
+                targets.append((host, bbox, shape, conn.publisher, snapshot))
+            except Exception as e:
+                # One failing robot must not stop the others from being directed
+                logger.error(f"Director failed to prepare the frame of {host}: {e}")
+        if len(targets) == 0:
+            return {}
+
+        geometry = compute_geometry(
+            np.asarray([bbox[0] for _, bbox, *_ in targets]),
+            np.asarray([target[4].frame_size for target in targets]),
+            np.asarray([target[4].config.acceptable_box_percent for target in targets]),
+            acceptable_boxes=np.asarray(
+                [target[4].acceptable_box for target in targets]
+            ),
+        )
+        results = {}
+        recorder = get_flight_recorder()
+        for index, (host, bbox, shape, publisher, snapshot) in enumerate(targets):
+            try:
+                row = geometry.row(index)
+                if recorder is not None:
+                    recorder.record_decision(host, row.box_error, row.outside)
+                results[host] = self.process_frame(
+                    host, bbox, shape, publisher, row, snapshot
                 )
+            except Exception as e:
+                # One failing robot must not stop the others from being directed
+                logger.error(f"Director failed to process frame for {host}: {e}")
+        return results
+
+    def order_targets(
+        self, hostname: str, bboxes: list, snapshot: ConnectionSnapshot
+    ) -> list:
+        """Moves the detection to follow, chosen by the target policy of the connection, to the front of the list"""
+        if len(bboxes) > 1 and snapshot.frame_size is not None:
+            robot_config = snapshot.config
+            index = select_target(
+                bboxes,
+                snapshot.frame_size,
+                robot_config.target_policy,
+                self.targets.get(hostname),
+                robot_config.target_weights,
+            )
+            if index != 0:
+                bboxes = [bboxes[index], *bboxes[:index], *bboxes[index + 1 :]]
+        self.targets[hostname] = tuple(bboxes[0])
+        return bboxes
+
+    def compensate_latency(
+        self, hostname: str, conn, bbox, snapshot: ConnectionSnapshot
+    ):
+        """
+        Projects the subject box forward to the present.
+
+        Measures the delay between the capture of the frame the box was detected on and now,
+        and shifts the box by how far the arm panned in that time according to its command history.
+        Only the delay is measured when the connection has no pan_speed configured.
+        """
+        if (frame_time := conn.get_bbox_frame_time()) is None:
+            return bbox
+        now = time.time()
+        state = self.latency_states.setdefault(hostname, LatencyState())
+        state.update_delay(now - frame_time)
+        robot_config = snapshot.config
+        if robot_config.pan_speed is None or snapshot.frame_size is None:
+            return bbox
+        d_azimuth, d_altitude = conn.publisher.motion_history.displacement(
+            frame_time, now
+        )
+        state.compensation_deg = (
+            d_azimuth * robot_config.pan_speed,
+            d_altitude * robot_config.pan_speed,
+        )
+        projected, state.compensation_px = project_bbox(
+            bbox,
+            snapshot.frame_size,
+            (
+                robot_config.horizontal_field_of_view,
+                robot_config.vertical_field_of_view,
+            ),
+            state.compensation_deg,
+        )
+        return projected
+
+    def get_latency_metrics(self, hostname: str) -> dict[str, float | None]:
+        """Estimated end-to-end delay and the last latency compensation applied to a connection"""
+        state = self.latency_states.get(hostname, LatencyState())
+        return {
+            "delay_ms": state.delay_s * 1000 if state.delay_s is not None else None,
+            "last_delay_ms": state.last_delay_s * 1000
+            if state.last_delay_s is not None
+            else None,
+            "compensation_azimuth_deg": state.compensation_deg[0],
+            "compensation_altitude_deg": state.compensation_deg[1],
+            "compensation_x_px": state.compensation_px[0],
+            "compensation_y_px": state.compensation_px[1],
+        }
 
     def is_active(self) -> bool:
         return self.control_task is not None
 
+    def on_detections(self, bboxes_by_host: dict[str, list]) -> dict[str, Any]:
+        """Detection listener, directs the hosts that just received new detections"""
+        with self._lock:
+            return self.track_obj(bboxes_by_host.keys(), only_new=True)
+
+    def check_watchdog(self) -> None:
+        """Stops every automatic arm that has not received detections within the watchdog timeout"""
+        timeout = config.APP_SETTINGS.director_watchdog_timeout
+        now = time.monotonic()
+        with self._lock:
+            for host, last_detection in list(self._last_detection_time.items()):
+                if host in self._watchdog_stopped or now - last_detection < timeout:
+                    continue
+                if (conn := self.connections.get(host)) is None or conn.is_manual:
+                    continue
+                logger.warning(
+                    f"No detections for {host} in {timeout}s, stopping the arm"
+                )
+                conn.publisher.polar_pan_continuous_stop()
+                self.release(host)
+                self._watchdog_stopped.add(host)
+                # The arm is stopped, start over instead of continuing from the old state
+                self.states.pop(host, None)
+                self.targets.pop(host, None)
+
     def start_auto_control(self) -> None:
-        if self.scheduler is not None:
+        if self.scheduler is None:
+            # TODO: implement this
+            raise NotImplementedError("No GUI mode not implemented")
+        if (
+            config.APP_SETTINGS.director_trigger == "detection"
+            and self.tracker is not None
+        ):
+            self.tracker.add_detection_listener(self.on_detections)
+            self._listening_to_detections = True
             self.control_task = self.scheduler.set_interval(
-                1000 / DIRECTOR_CONTROL_RATE, self.track_obj
+                config.APP_SETTINGS.director_watchdog_timeout * 1000 / 2,
+                self.check_watchdog,
             )
-            self._term = add_termination_handler(self.stop_auto_control)
         else:
-            # TODO: implement this
-            raise NotImplementedError("No GUI mode not implemented")
+            self.control_task = self.scheduler.set_interval(
+                1000 / DIRECTOR_CONTROL_RATE, self.track_obj
+            )
+        self._term = add_termination_handler(self.stop_auto_control)
+
+    def release(self, hostname: str) -> None:
+        """Called when the director stops driving a host, undoes what it changed on the arm. Does nothing by default."""
 
     def stop_auto_control(self) -> None:
+        for host in list(self.states):
+            self.release(host)
+        if self._listening_to_detections:
+            self.tracker.remove_detection_listener(self.on_detections)
+            self._listening_to_detections = False
         if self.control_task is not None:
             self.control_task.cancel()
         if self._term is not None:
@@ -107,6 +310,8 @@ class BaseDirector(ABC):
             logger.warning(f"Connection for hostname {hostname} is manual only.")
             conn.is_manual = True
             return False
+        if manual and not conn.is_manual:
+            self.release(conn.host)
         conn.is_manual = manual
         return conn.is_manual
 
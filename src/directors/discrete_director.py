@@ -1,111 +1,106 @@
 import time
+from dataclasses import dataclass
 
 from loguru import logger
 
 import src.config as config
+from src.connection.config_snapshot import ConnectionSnapshot
 from src.connection.publisher import Publisher
 from src.directors.base_director import BaseDirector
-from src.utils import (
-    calculate_acceptable_box,
-    calculate_center_bbox,
-)
+from src.directors.geometry import TargetGeometry, compute_target_geometry
 
 
-class DiscreteDirector(BaseDirector):
-    last_command_time = 0  # Track the time of the last command
-
+@dataclass
+class DiscreteDirectorState:
+    last_command_time: float = 0  # Track the time of the last command
     # Time when the person first moved outside the box
-    movement_detection_start_time = None
+    movement_detection_start_time: float | None = None
+
+
+class DiscreteDirector(BaseDirector):
+    state_class = DiscreteDirectorState
 
     # This method is called to process each frame
     def process_frame(
-        self, hostname: str, bounding_box: list, frame_shape, publisher: Publisher
+        self,
+        hostname: str,
+        bounding_box: list,
+        frame_shape,
+        publisher: Publisher,
+        geometry: TargetGeometry | None = None,
+        snapshot: ConnectionSnapshot | None = None,
     ):
+        if len(bounding_box) == 0:
+            return
         # Load config values
-        horizontal_field_of_view = config.ROBOT_CONFIGS[
-            hostname
-        ].horizontal_field_of_view
-        vertical_field_of_view = config.ROBOT_CONFIGS[hostname].vertical_field_of_view
-        confirmation_delay = config.ROBOT_CONFIGS[hostname].confirmation_delay
-        command_delay = config.ROBOT_CONFIGS[hostname].command_delay
-        # Do something with the frame
+        if snapshot is None:
+            snapshot = ConnectionSnapshot.build(
+                config.ROBOT_CONFIGS[hostname], frame_shape
+            )
+        robot_config = snapshot.config
+        confirmation_delay = robot_config.confirmation_delay
+        command_delay = robot_config.command_delay
+        if geometry is None:
+            geometry = compute_target_geometry(
+                bounding_box[0], frame_shape, robot_config.acceptable_box_percent
+            )
+        state: DiscreteDirectorState = self.get_state(hostname)
 
-        # Getting frame width and frame height
-        frame_height = frame_shape[0]
-        frame_width = frame_shape[1]
-
-        if len(bounding_box) == 0:
+        # Are we inside the acceptable box
+        if not geometry.outside:
+            state.movement_detection_start_time = None
             return
-        (
-            acceptable_box_left,
-            acceptable_box_top,
-            acceptable_box_right,
-            acceptable_box_bottom,
-        ) = calculate_acceptable_box(frame_width, frame_height)
-        # Calculate where the middle point of the bounding box lies in relation to the box
-        # Unpack bounding box
-        # TODO: Right now I am going to assume we only want the first face
 
-        # Calculate the center of the bounding box
-        bbox_center_x, bbox_center_y = calculate_center_bbox(bounding_box[0])
+        current_time = time.time()
+        if state.movement_detection_start_time is None:
+            state.movement_detection_start_time = current_time
 
-        # Are we inside the acceptable box
-        if (
-            bbox_center_x < acceptable_box_left
-            or bbox_center_x > acceptable_box_right
-            or bbox_center_y < acceptable_box_top
-            or bbox_center_y > acceptable_box_bottom
-        ):
-            current_time = time.time()
-            if self.movement_detection_start_time is None:
-                self.movement_detection_start_time = current_time
+        # Check if they've been outside for at least the confirmation delay
+        if current_time - state.movement_detection_start_time < confirmation_delay:
+            return
 
-            # Check if they've been outside for at least the confirmation delay
-            if current_time - self.movement_detection_start_time < confirmation_delay:
-                return
+        # Move accordinly
+        change_in_x, change_in_y = geometry.box_error
+        angle_x, angle_y = self.box_error_to_angles(snapshot, geometry)
 
-            change_in_x = 0
-            change_in_y = 0
-            # Move accordinly
-            # This is where it gets tricky, deciding how far to move the camera
-            if bbox_center_x < acceptable_box_left:
-                # print("Move camera left: " + "Bbox center x= " + str(bbox_center_x) + " acceptable left: " + str(acceptable_box_left))
-                change_in_x = bbox_center_x - acceptable_box_left
-            elif bbox_center_x > acceptable_box_right:
-                # print("Move camera right: " + "Bbox center x= " + str(bbox_center_x) + " acceptable right: " + str(acceptable_box_right))
-                change_in_x = bbox_center_x - acceptable_box_right
-            if bbox_center_y < acceptable_box_top:
-                # print("Move camera up: " + "Bbox center y= " + str(bbox_center_y) + " acceptable top: " + str(acceptable_box_top))
-                change_in_y = bbox_center_y - acceptable_box_top
-            elif bbox_center_y > acceptable_box_bottom:
-                # print("Move camera down: " + "Bbox center y= " + str(bbox_center_y) + " acceptable bottom: " + str(acceptable_box_bottom))
-                change_in_y = bbox_center_y - acceptable_box_bottom
+        if change_in_x != 0 and (
+            current_time - state.last_command_time >= command_delay
+            or state.last_command_time == 0
+        ):
+            rotation = -angle_x
+            logger.info(rotation)
+            rotation = int(round(rotation))
+            publisher.polar_pan_discrete(rotation, 0, 0, 3000)
+            state.last_command_time = current_time
+            state.movement_detection_start_time = None
 
-            if change_in_x != 0 and (
-                current_time - self.last_command_time >= command_delay
-                or self.last_command_time == 0
-            ):
-                horizontal_dpp = horizontal_field_of_view / frame_width
-                rotation = -(change_in_x * horizontal_dpp)
-                logger.info(rotation)
-                rotation = int(round(rotation))
-                publisher.polar_pan_discrete(rotation, 0, 0, 3000)
-                self.last_command_time = current_time
-                self.movement_detection_start_time = None
+        if change_in_y == 0:
+            return
+        if (
+            current_time - state.last_command_time >= command_delay
+            or state.last_command_time == 0
+        ):
+            rotation = angle_y
+            logger.info(rotation)
+            rotation = int(round(rotation))
+            # publisher.rotate_altitude(rotation)
+            # publisher.polar_pan_discrete(0, rotation, 0, 3000)
+            state.last_command_time = current_time
+            state.movement_detection_start_time = None
 
-            if change_in_y == 0:
-                return
-            if (
-                current_time - self.last_command_time >= command_delay
-                or self.last_command_time == 0
-            ):
-                vertical_dpp = vertical_field_of_view / frame_height
-                rotation = change_in_y * vertical_dpp
-                logger.info(rotation)
-                rotation = int(round(rotation))
-                # publisher.rotate_altitude(rotation)
-                # publisher.polar_pan_discrete(0, rotation, 0, 3000)
-                self.last_command_time = current_time
-                self.movement_detection_start_time = None
-        else:
-            self.movement_detection_start_time = None
+    @staticmethod
+    def box_error_to_angles(
+        snapshot: ConnectionSnapshot, geometry: TargetGeometry
+    ) -> tuple[float, float]:
+        """
+        Degrees between the acceptable box edge and the subject center, signed like the pixel axes.
+        Goes through the lens model when the camera is calibrated, so moves far from the image center land in one go.
+        """
+        change_in_x, change_in_y = geometry.box_error
+        if snapshot.angle_map is not None:
+            center_x, center_y = geometry.center
+            return snapshot.angle_map.angle_between(
+                (center_x - change_in_x, center_y - change_in_y), geometry.center
+            )
+        horizontal_dpp, vertical_dpp = snapshot.degrees_per_pixel
+        return change_in_x * horizontal_dpp, change_in_y * vertical_dpp
@@ -0,0 +1,114 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class TargetGeometry:
+    """Geometry of the tracked subject in a single frame, all values in pixels"""
+
+    frame_width: int
+    frame_height: int
+    center: tuple[int, int]
+    # Subject center minus frame center
+    offset: tuple[int, int]
+    # (left, top, right, bottom) of the acceptable box
+    acceptable_box: tuple[int, int, int, int]
+    # Distance from the acceptable box edge to the subject center, 0 on axes where the subject is inside the box
+    box_error: tuple[int, int]
+    outside: bool
+
+
+@dataclass(frozen=True)
+class BatchGeometry:
+    """Director geometry for many hosts, one row per host"""
+
+    frame_sizes: np.ndarray  # (N, 2) width, height
+    centers: np.ndarray  # (N, 2)
+    offsets: np.ndarray  # (N, 2)
+    acceptable_boxes: np.ndarray  # (N, 4)
+    box_errors: np.ndarray  # (N, 2)
+    outside: np.ndarray  # (N,) bool
+
+    def __len__(self):
+        return len(self.outside)
+
+    def row(self, index: int) -> TargetGeometry:
+        width, height = self.frame_sizes[index].tolist()
+        return TargetGeometry(
+            frame_width=width,
+            frame_height=height,
+            center=tuple(self.centers[index].tolist()),
+            offset=tuple(self.offsets[index].tolist()),
+            acceptable_box=tuple(self.acceptable_boxes[index].tolist()),
+            box_error=tuple(self.box_errors[index].tolist()),
+            outside=bool(self.outside[index]),
+        )
+
+
+def compute_geometry(
+    bboxes: np.ndarray,
+    frame_sizes: np.ndarray,
+    acceptable_box_percents: np.ndarray,
+    acceptable_boxes: np.ndarray | None = None,
+) -> BatchGeometry:
+    """
+    Computes subject centers, acceptable boxes and errors for every host in one pass.
+    Uses the same integer math as `calculate_acceptable_box` and `calculate_center_bbox`.
+
+    Args:
+        bboxes (np.ndarray): (N, 4) xyxy box of the tracked subject of each host
+        frame_sizes (np.ndarray): (N, 2) frame width and height of each host
+        acceptable_box_percents (np.ndarray): (N,) acceptable box size of each host as a fraction of the frame
+        acceptable_boxes (np.ndarray | None, optional): (N, 4) precomputed acceptable boxes, replaces the percents.
+    """
+    bboxes = np.asarray(bboxes, dtype=np.int64).reshape(-1, 4)
+    frame_sizes = np.asarray(frame_sizes, dtype=np.int64).reshape(-1, 2)
+    percents = np.asarray(acceptable_box_percents, dtype=np.float64).reshape(-1, 1)
+
+    centers = (bboxes[:, :2] + bboxes[:, 2:]) // 2
+    frame_centers = frame_sizes // 2
+    if acceptable_boxes is None:
+        half_box = (frame_sizes * percents).astype(np.int64) // 2
+        box_min = frame_centers - half_box
+        box_max = frame_centers + half_box
+    else:
+        acceptable_boxes = np.asarray(acceptable_boxes, dtype=np.int64).reshape(-1, 4)
+        box_min, box_max = acceptable_boxes[:, :2], acceptable_boxes[:, 2:]
+    box_errors = np.where(
+        centers < box_min,
+        centers - box_min,
+        np.where(centers > box_max, centers - box_max, 0),
+    )
+    return BatchGeometry(
+        frame_sizes=frame_sizes,
+        centers=centers,
+        offsets=centers - frame_centers,
+        acceptable_boxes=np.concatenate([box_min, box_max], axis=1),
+        box_errors=box_errors,
+        outside=np.any(box_errors != 0, axis=1),
+    )
+
+
+def compute_target_geometry(
+    bbox, frame_shape: tuple, acceptable_box_percent: float
+) -> TargetGeometry:
+    """Single host version of compute_geometry, frame_shape is (height, width, ...)"""
+    return compute_geometry(
+        np.asarray([bbox]),
+        np.asarray([[frame_shape[1], frame_shape[0]]]),
+        np.asarray([acceptable_box_percent]),
+    ).row(0)
+
+
+def pixel_to_angle(offset_px: float, frame_size_px: int, fov_deg: float) -> float:
+    """Angle in degrees between the optical axis and a pixel `offset_px` away from the frame center (pinhole camera)."""
+    focal_px = (frame_size_px / 2) / math.tan(math.radians(fov_deg) / 2)
+    return math.degrees(math.atan2(offset_px, focal_px))
+
+
+def angle_to_pixel(angle_deg: float, frame_size_px: int, fov_deg: float) -> float:
+    """Inverse of pixel_to_angle, offset from the frame center of a point `angle_deg` off the optical axis."""
+    focal_px = (frame_size_px / 2) / math.tan(math.radians(fov_deg) / 2)
+    return focal_px * math.tan(math.radians(angle_deg))
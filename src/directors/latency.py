@@ -0,0 +1,66 @@
+from dataclasses import dataclass
+
+from src.directors.geometry import angle_to_pixel, pixel_to_angle
+
+DELAY_SMOOTHING = 0.2
+MAX_PROJECTED_ANGLE = 89.0  # keeps the projection finite when the subject is projected far outside the frame
+
+
+@dataclass
+class LatencyState:
+    """End-to-end delay estimate and the last applied compensation of a single connection"""
+
+    # Smoothed time between frame capture and the director acting on its detections
+    delay_s: float | None = None
+    last_delay_s: float | None = None
+    # How far the arm moved since the frame was captured, (azimuth, altitude) in degrees
+    compensation_deg: tuple[float, float] = (0.0, 0.0)
+    # How far the subject box was shifted to account for it, (x, y) in pixels
+    compensation_px: tuple[int, int] = (0, 0)
+
+    def update_delay(self, delay_s: float):
+        self.last_delay_s = delay_s
+        self.delay_s = (
+            delay_s
+            if self.delay_s is None
+            else self.delay_s + DELAY_SMOOTHING * (delay_s - self.delay_s)
+        )
+
+
+def project_bbox(
+    bbox,
+    frame_size: tuple[int, int],
+    field_of_view: tuple[float, float],
+    arm_displacement_deg: tuple[float, float],
+) -> tuple[tuple[int, int, int, int], tuple[int, int]]:
+    """
+    Moves a box to where the subject appears after the arm panned `arm_displacement_deg` (azimuth, altitude) degrees.
+
+    Panning right (positive azimuth) moves the subject left in the frame, tilting up (positive altitude) moves it down.
+    Returns the shifted box and the (x, y) shift in pixels.
+
+    Args:
+        frame_size (tuple[int, int]): frame width and height
+        field_of_view (tuple[float, float]): horizontal and vertical field of view in degrees
+    """
+    x1, y1, x2, y2 = bbox
+    width, height = frame_size
+    horizontal_fov, vertical_fov = field_of_view
+    d_azimuth, d_altitude = arm_displacement_deg
+    offset_x = (x1 + x2) / 2 - width / 2
+    offset_y = (y1 + y2) / 2 - height / 2
+    angle_x = pixel_to_angle(offset_x, width, horizontal_fov) - d_azimuth
+    angle_y = pixel_to_angle(offset_y, height, vertical_fov) + d_altitude
+    new_offset_x = angle_to_pixel(
+        max(-MAX_PROJECTED_ANGLE, min(MAX_PROJECTED_ANGLE, angle_x)),
+        width,
+        horizontal_fov,
+    )
+    new_offset_y = angle_to_pixel(
+        max(-MAX_PROJECTED_ANGLE, min(MAX_PROJECTED_ANGLE, angle_y)),
+        height,
+        vertical_fov,
+    )
+    shift_x = round(new_offset_x - offset_x)
+    shift_y = round(new_offset_y - offset_y)
+    return (x1 + shift_x, y1 + shift_y, x2 + shift_x, y2 + shift_y), (shift_x, shift_y)
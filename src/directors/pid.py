@@ -0,0 +1,54 @@
+class PIDController:
+    """
+    Single axis PID controller with output clamping and anti-windup.
+
+    The integral only accumulates while the output is not saturated in the direction of the error
+    (conditional integration) and is additionally clamped to `integral_limit`.
+    The derivative is taken on the error and low-pass filtered, since detections are noisy.
+    """
+
+    def __init__(
+        self,
+        kp: float,
+        ki: float,
+        kd: float,
+        output_limit: float,
+        integral_limit: float | None = None,
+        derivative_smoothing: float = 0.5,
+    ):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.output_limit = output_limit
+        self.integral_limit = (
+            integral_limit if integral_limit is not None else output_limit
+        )
+        self.derivative_smoothing = derivative_smoothing
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self.derivative = 0.0
+        self.previous_error: float | None = None
+
+    def update(self, error: float, dt: float) -> float:
+        if dt <= 0:
+            dt = 1e-3
+        if self.previous_error is not None:
+            raw_derivative = (error - self.previous_error) / dt
+            self.derivative += self.derivative_smoothing * (
+                raw_derivative - self.derivative
+            )
+        self.previous_error = error
+
+        unclamped = (
+            self.kp * error + self.ki * self.integral + self.kd * self.derivative
+        )
+        saturated = abs(unclamped) >= self.output_limit
+        if not saturated or (unclamped > 0) != (error > 0):
+            self.integral += error * dt
+            self.integral = max(
+                -self.integral_limit, min(self.integral_limit, self.integral)
+            )
+        output = self.kp * error + self.ki * self.integral + self.kd * self.derivative
+        return max(-self.output_limit, min(self.output_limit, output))
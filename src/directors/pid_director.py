@@ -0,0 +1,209 @@
+import math
+import time
+from dataclasses import dataclass, field
+
+from loguru import logger
+
+import src.config as config
+from src.connection.config_snapshot import ConnectionSnapshot
+from src.connection.publisher import DIRECTION_OFFSET_MAPPING, Publisher
+from src.directors.base_director import BaseDirector
+from src.directors.geometry import (
+    TargetGeometry,
+    compute_target_geometry,
+    pixel_to_angle,
+)
+from src.directors.pid import PIDController
+
+MIN_SPEED = 5  # percent, slower than this the arm stalls
+MAX_SPEED = 100
+SPEED_STEP = 5  # speed is only re-sent when it changes by at least this much
+# Gains map angular error in degrees to speed percent
+KP = 4.0
+KI = 0.5
+KD = 0.3
+# Stop once the error is within this fraction of the acceptable box, so the arm does not stop right on the box edge
+SETTLE_FRACTION = 0.5
+# An axis only moves if its share of the command is at least this large, otherwise the other axis moves alone
+DIAGONAL_RATIO = 0.35
+# Direction sum for each (azimuth, altitude) movement tuple
+MOVEMENT_TO_DIRECTION = {
+    movement: direction for direction, movement in DIRECTION_OFFSET_MAPPING.items()
+}
+
+
+@dataclass
+class PIDDirectorState:
+    """Controller and command state of a single connection"""
+
+    azimuth: PIDController = field(
+        default_factory=lambda: PIDController(KP, KI, KD, MAX_SPEED)
+    )
+    altitude: PIDController = field(
+        default_factory=lambda: PIDController(KP, KI, KD, MAX_SPEED)
+    )
+    last_update: float | None = None
+    moving: bool = False
+    direction: int = 0
+    speed: int | None = None
+    # Speed the arm ran at before the director changed it, restored once the director lets go of the arm
+    restore_speed: int | None = None
+    # Metrics
+    commands_sent: int = 0
+    first_command_time: float | None = None
+    outside_since: float | None = None
+    last_convergence_s: float | None = None
+
+
+class PIDDirector(BaseDirector):
+    """
+    Drives the arm with a PID controller per axis instead of full speed starts and stops.
+
+    The pixel offset between the subject and the frame center is converted to an angular error using the camera
+    field of view, the controllers turn it into a signed speed per axis and the arm is driven with `set_speed` and a
+    combined (possibly diagonal) `polar_pan_continuous_direction_start`. Commands are only sent when the
+    quantized speed or the direction changes. The speed the arm had before is restored whenever the arm stops, so
+    manual and discrete moves are not left at the last speed the controller chose.
+    """
+
+    state_class = PIDDirectorState
+
+    def process_frame(
+        self,
+        hostname: str,
+        bounding_box: list,
+        frame_shape,
+        publisher: Publisher,
+        geometry: TargetGeometry | None = None,
+        snapshot: ConnectionSnapshot | None = None,
+    ):
+        if len(bounding_box) == 0:
+            return
+        if snapshot is None:
+            snapshot = ConnectionSnapshot.build(
+                config.ROBOT_CONFIGS[hostname], frame_shape
+            )
+        robot_config = snapshot.config
+        if geometry is None:
+            geometry = compute_target_geometry(
+                bounding_box[0], frame_shape, robot_config.acceptable_box_percent
+            )
+        state: PIDDirectorState = self.get_state(hostname)
+        now = time.monotonic()
+        dt = now - state.last_update if state.last_update is not None else 0.0
+        state.last_update = now
+
+        frame_width, frame_height = geometry.frame_width, geometry.frame_height
+        error_x, error_y = geometry.offset
+        box_left, box_top, box_right, box_bottom = geometry.acceptable_box
+        half_box_x = (box_right - box_left) / 2
+        half_box_y = (box_bottom - box_top) / 2
+
+        outside = geometry.outside
+        settled = (
+            abs(error_x) <= half_box_x * SETTLE_FRACTION
+            and abs(error_y) <= half_box_y * SETTLE_FRACTION
+        )
+        if outside and state.outside_since is None:
+            state.outside_since = now
+        if not state.moving and not outside:
+            return
+        if state.moving and settled:
+            self.stop(state, publisher)
+            if state.outside_since is not None:
+                state.last_convergence_s = now - state.outside_since
+                logger.debug(f"{hostname} converged in {state.last_convergence_s:.2f}s")
+                state.outside_since = None
+            return
+
+        azimuth_output = state.azimuth.update(
+            pixel_to_angle(error_x, frame_width, robot_config.horizontal_field_of_view),
+            dt,
+        )
+        altitude_output = state.altitude.update(
+            pixel_to_angle(error_y, frame_height, robot_config.vertical_field_of_view),
+            dt,
+        )
+        self.drive(state, publisher, azimuth_output, altitude_output)
+
+    def drive(
+        self,
+        state: PIDDirectorState,
+        publisher: Publisher,
+        azimuth_output: float,
+        altitude_output: float,
+    ):
+        magnitude = max(abs(azimuth_output), abs(altitude_output))
+        if magnitude == 0:
+            return
+        # Subject right of center pans right (+1 like Direction.RIGHT), subject above center (negative y) tilts up (+1 like Direction.UP)
+        moving_azimuth = (
+            int(math.copysign(1, azimuth_output))
+            if abs(azimuth_output) >= magnitude * DIAGONAL_RATIO
+            else 0
+        )
+        moving_altitude = (
+            int(math.copysign(1, -altitude_output))
+            if abs(altitude_output) >= magnitude * DIAGONAL_RATIO
+            else 0
+        )
+        direction = MOVEMENT_TO_DIRECTION[(moving_azimuth, moving_altitude)]
+        speed = int(
+            max(MIN_SPEED, min(MAX_SPEED, round(magnitude / SPEED_STEP) * SPEED_STEP))
+        )
+        if speed != state.speed:
+            if state.restore_speed is None:
+                state.restore_speed = publisher.motion_history.speed
+            publisher.set_speed(speed)
+            state.speed = speed
+            self.count_command(state)
+        if not state.moving or direction != state.direction:
+            publisher.polar_pan_continuous_direction_start(direction)
+            state.direction = direction
+            state.moving = True
+            self.count_command(state)
+
+    def stop(self, state: PIDDirectorState, publisher: Publisher):
+        publisher.polar_pan_continuous_stop()
+        self.count_command(state)
+        state.moving = False
+        state.direction = 0
+        state.azimuth.reset()
+        state.altitude.reset()
+        self.restore_speed(state, publisher)
+
+    def restore_speed(self, state: PIDDirectorState, publisher: Publisher):
+        if state.restore_speed is None:
+            return
+        if state.restore_speed != state.speed:
+            publisher.set_speed(state.restore_speed)
+            self.count_command(state)
+        state.speed = None
+        state.restore_speed = None
+
+    def release(self, hostname: str):
+        state: PIDDirectorState | None = self.states.get(hostname)
+        if state is None or (conn := self.connections.get(hostname)) is None:
+            return
+        self.restore_speed(state, conn.publisher)
+
+    def count_command(self, state: PIDDirectorState):
+        state.commands_sent += 1
+        if state.first_command_time is None:
+            state.first_command_time = time.monotonic()
+
+    def get_metrics(self, hostname: str) -> dict[str, float | int | None]:
+        """Commands sent, command rate and the time the last excursion took to converge for a connection."""
+        state: PIDDirectorState = self.get_state(hostname)
+        elapsed = (
+            time.monotonic() - state.first_command_time
+            if state.first_command_time is not None
+            else 0.0
+        )
+        return {
+            "commands_sent": state.commands_sent,
+            "commands_per_second": state.commands_sent / elapsed
+            if elapsed > 0
+            else 0.0,
+            "last_convergence_s": state.last_convergence_s,
+        }
@@ -0,0 +1,79 @@
+import math
+from enum import StrEnum
+
+import numpy as np
+
+# Below this overlap with the previous target the sticky policy considers it lost and falls back to the largest box
+MIN_STICKY_IOU = 0.1
+
+
+class TargetPolicy(StrEnum):
+    LARGEST = "largest"
+    CENTER = "center"
+    STICKY = "sticky"
+    WEIGHTED = "weighted"
+
+
+def score_targets(
+    bboxes,
+    frame_size: tuple[int, int],
+    policy: TargetPolicy | str,
+    previous=None,
+    weights=(1.0, 1.0, 1.0),
+) -> np.ndarray:
+    """
+    Scores every detection of a frame at once, the highest score is the subject to follow.
+
+    Args:
+        bboxes: (N, 4) xyxy boxes
+        frame_size (tuple[int, int]): frame width and height
+        policy (TargetPolicy | str): largest box, closest to the frame center, most overlap with the previous target
+            or a weighted sum of the three
+        previous (optional): xyxy box of the previously followed subject. Defaults to None.
+        weights (optional): (size, centrality, overlap) weights of the weighted policy
+    """
+    boxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    width, height = frame_size
+    sizes = np.clip(boxes[:, 2:] - boxes[:, :2], 0, None)
+    areas = sizes[:, 0] * sizes[:, 1]
+    if policy == TargetPolicy.LARGEST:
+        return areas
+
+    half_frame = np.array([width / 2, height / 2])
+    centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+    # 1 at the frame center, 0 in the corners
+    centrality = 1 - np.hypot(*((centers - half_frame) / half_frame).T) / math.sqrt(2)
+    if policy == TargetPolicy.CENTER:
+        return centrality
+
+    overlap = np.zeros(len(boxes))
+    if previous is not None:
+        prev = np.asarray(previous, dtype=np.float64)
+        top_left = np.maximum(boxes[:, :2], prev[:2])
+        bottom_right = np.minimum(boxes[:, 2:], prev[2:])
+        inter = np.clip(bottom_right - top_left, 0, None).prod(axis=1)
+        prev_area = max(prev[2] - prev[0], 0) * max(prev[3] - prev[1], 0)
+        union = areas + prev_area - inter
+        overlap = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+    if policy == TargetPolicy.STICKY:
+        return overlap if overlap.max(initial=0) >= MIN_STICKY_IOU else areas
+
+    size_weight, center_weight, overlap_weight = weights
+    max_area = areas.max(initial=0)
+    relative_areas = areas / max_area if max_area > 0 else areas
+    return (
+        size_weight * relative_areas
+        + center_weight * centrality
+        + overlap_weight * overlap
+    )
+
+
+def select_target(
+    bboxes,
+    frame_size: tuple[int, int],
+    policy: TargetPolicy | str,
+    previous=None,
+    weights=(1.0, 1.0, 1.0),
+) -> int:
+    """Index of the detection to follow, see score_targets"""
+    return int(np.argmax(score_targets(bboxes, frame_size, policy, previous, weights)))
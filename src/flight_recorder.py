@@ -0,0 +1,477 @@
+"""
+Always-on binary flight recorder.
+
+Commands sent to and returns received from the operators, detections and director decisions are written as fixed
+size records into a ring in a memory mapped file. Writing a record is a few pack_into calls into the map under a
+lock, nothing is formatted and no buffer is allocated, so it can stay on in production next to the text logs. The ring lives in
+the page cache: when the process dies, even without running any Python, the file holds the last records. The file of
+the previous run is kept next to it when the recorder starts, and `dump` copies the ring to a separate file on
+demand or from the crash hooks.
+
+File layout, little-endian:
+
+    File header  FILE_HEADER: magic, version, slot size, slot count, wall clock minus monotonic clock at start
+    Host table   MAX_HOSTS names, a UINT8 length and up to HOST_NAME_SIZE - 1 bytes each
+    Slots        slot count * SLOT_SIZE bytes, record n is written to slot n % slot count
+
+Every slot starts with RECORD (sequence, monotonic time, kind, host index, data length), sequence 0 marks a slot
+that was never written. The data layout depends on the kind, see RecordKind.
+
+Read a ring back, optionally replaying the commands of a host into the simulated arm:
+
+    uv run python -m src.flight_recorder .flight/recorder.bin [--host unctalos] [--replay]
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Sequence
+
+from loguru import logger
+
+from src.icd_config import RETURN_FLAG, Command
+
+if TYPE_CHECKING:
+    # The simulator is only needed to replay, not on the recording side
+    from src.simulator.arm import ArmPose, SimulatedArm
+
+MAGIC = b"TALOSFR1"
+VERSION = 1
+FILE_HEADER = struct.Struct("<8sHHId")
+MAX_HOSTS = 32
+HOST_NAME_SIZE = 64
+HOST_TABLE_OFFSET = FILE_HEADER.size
+SLOTS_OFFSET = HOST_TABLE_OFFSET + MAX_HOSTS * HOST_NAME_SIZE
+# Host index of records from hosts that did not fit the host table
+UNKNOWN_HOST = 0xFF
+
+# Sequence UINT64, monotonic time DOUBLE, kind UINT8, host index UINT8, data length UINT16
+RECORD = struct.Struct("<QdBBH")
+SLOT_SIZE = 128
+DATA_SIZE = SLOT_SIZE - RECORD.size
+DEFAULT_SLOT_COUNT = 1 << 16  # 8 MiB
+DEFAULT_PATH = ".flight/recorder.bin"
+DUMP_DIRECTORY = ".flight"
+
+# Command ID UINT32, command UINT16, payload length UINT16, then as much of the payload as fits
+FRAME = struct.Struct("<IHH")
+# Packs the start of a bytes payload, zero padded, so truncating it needs no slice
+PAYLOAD = struct.Struct(f"<{DATA_SIZE - FRAME.size}s")
+# Wall clock capture time of the frame DOUBLE, number of boxes UINT8, then as many boxes as fit
+DETECTION = struct.Struct("<dB")
+# left, top, right, bottom INT16
+BBOX = struct.Struct("<hhhh")
+MAX_RECORDED_BBOXES = (DATA_SIZE - DETECTION.size) // BBOX.size
+# Box error x, y INT32, subject outside the acceptable box BOOLEAN
+DECISION = struct.Struct("<ii?")
+# Uncaught exceptions dump the ring at most this often, a thread failing in a loop would otherwise fill the disk
+CRASH_DUMP_INTERVAL_S = 60.0
+
+
+class RecordKind(IntEnum):
+    COMMAND_SENT = 1  # FRAME
+    RETURN_RECEIVED = 2  # FRAME
+    DETECTION = 3  # DETECTION followed by BBOX per box
+    DIRECTOR_DECISION = 4  # DECISION
+
+
+def _clamp_int16(value: int) -> int:
+    return max(-0x8000, min(0x7FFF, int(value)))
+
+
+class FlightRecorder:
+    """
+    Fixed size ring of binary records in a memory mapped file, safe to write from any thread.
+
+    path None keeps the ring in anonymous memory, it then only survives through `dump`.
+    """
+
+    def __init__(
+        self, path: str | None = DEFAULT_PATH, slot_count: int = DEFAULT_SLOT_COUNT
+    ):
+        self.path = path
+        self.slot_count = slot_count
+        size = SLOTS_OFFSET + slot_count * SLOT_SIZE
+        self._file = None
+        if path is None:
+            self._map = mmap.mmap(-1, size)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            if os.path.exists(path):
+                # The ring of the previous run, possibly all that is left of a crash
+                os.replace(path, self.previous_path)
+            self._file = open(path, "w+b")
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+        # Payloads that are views already are copied through this, so writing them allocates no buffer
+        self._view = memoryview(self._map)
+        FILE_HEADER.pack_into(
+            self._map,
+            0,
+            MAGIC,
+            VERSION,
+            SLOT_SIZE,
+            slot_count,
+            time.time() - time.monotonic(),
+        )
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._hosts: dict[str, int] = {}
+
+    @property
+    def previous_path(self) -> str:
+        assert self.path is not None
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.prev{ext}"
+
+    @property
+    def records_written(self) -> int:
+        return self._sequence
+
+    def _host_index(self, host: str) -> int:
+        """Index of host in the host table, adding it on first use. Called with the lock held."""
+        if (index := self._hosts.get(host)) is not None:
+            return index
+        index = len(self._hosts) if len(self._hosts) < MAX_HOSTS else UNKNOWN_HOST
+        if index != UNKNOWN_HOST:
+            name = host.encode("utf-8")[: HOST_NAME_SIZE - 1]
+            offset = HOST_TABLE_OFFSET + index * HOST_NAME_SIZE
+            self._map[offset] = len(name)
+            self._map[offset + 1 : offset + 1 + len(name)] = name
+        self._hosts[host] = index
+        return index
+
+    def _begin(self, kind: RecordKind, host: str, length: int) -> int:
+        """Writes the record header of the next slot and returns where its data goes. Called with the lock held."""
+        self._sequence += 1
+        offset = SLOTS_OFFSET + (self._sequence % self.slot_count) * SLOT_SIZE
+        RECORD.pack_into(
+            self._map,
+            offset,
+            self._sequence,
+            time.monotonic(),
+            kind,
+            self._host_index(host),
+            length,
+        )
+        return offset + RECORD.size
+
+    def record_frame(
+        self,
+        kind: RecordKind,
+        host: str,
+        command_id: int,
+        command: int,
+        payload: bytes | bytearray | memoryview | None,
+    ) -> None:
+        """Records an ICD message, payloads longer than the slot are cut, their full length is kept"""
+        length = 0 if payload is None else len(payload)
+        stored = min(length, DATA_SIZE - FRAME.size)
+        with self._lock:
+            if self._map.closed:
+                return
+            offset = self._begin(kind, host, FRAME.size + stored)
+            FRAME.pack_into(self._map, offset, command_id, command, length)
+            if not stored:
+                return
+            start = offset + FRAME.size
+            if isinstance(payload, memoryview):
+                self._view[start : start + stored] = (
+                    payload if stored == length else payload[:stored]
+                )
+            else:
+                PAYLOAD.pack_into(self._map, start, payload)
+
+    def record_detection(
+        self,
+        host: str,
+        frame_time: float | None,
+        bboxes: Sequence[tuple[int, int, int, int]] | None,
+    ) -> None:
+        count = len(bboxes) if bboxes else 0
+        stored = min(count, MAX_RECORDED_BBOXES)
+        with self._lock:
+            if self._map.closed:
+                return
+            offset = self._begin(
+                RecordKind.DETECTION, host, DETECTION.size + stored * BBOX.size
+            )
+            DETECTION.pack_into(self._map, offset, frame_time or 0.0, min(count, 0xFF))
+            offset += DETECTION.size
+            for index in range(stored):
+                box = bboxes[index]  # pyright: ignore[reportOptionalSubscript]
+                BBOX.pack_into(
+                    self._map,
+                    offset,
+                    _clamp_int16(box[0]),
+                    _clamp_int16(box[1]),
+                    _clamp_int16(box[2]),
+                    _clamp_int16(box[3]),
+                )
+                offset += BBOX.size
+
+    def record_decision(
+        self, host: str, box_error: tuple[int, int], outside: bool
+    ) -> None:
+        with self._lock:
+            if self._map.closed:
+                return
+            offset = self._begin(RecordKind.DIRECTOR_DECISION, host, DECISION.size)
+            DECISION.pack_into(
+                self._map, offset, int(box_error[0]), int(box_error[1]), outside
+            )
+
+    def dump(self, path: str | None = None) -> str:
+        """Copies the ring to path, by default a time stamped file in DUMP_DIRECTORY, and returns the path"""
+        if path is None:
+            stamp = time.strftime("%Y%m%d_%H%M%S")
+            path = os.path.join(DUMP_DIRECTORY, f"flight_{stamp}_{os.getpid()}.bin")
+        data = self._snapshot()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        logger.info(f"Flight recorder dumped to {path}")
+        return path
+
+    def _snapshot(self) -> bytearray:
+        """
+        Copy of the ring taken without holding the writers up. Slots written while copying may be torn, they are
+        found from the sequence counter and blanked in the copy. Only when writers lapped the whole ring meanwhile
+        is the copy retaken under the lock.
+        """
+        with self._lock:
+            if self._map.closed:
+                raise ValueError("Flight recorder is closed")
+            first = self._sequence
+        data = bytearray(self._map)
+        with self._lock:
+            last = self._sequence
+            if last - first >= self.slot_count:
+                return bytearray(self._map)
+        for sequence in range(first + 1, last + 1):
+            offset = SLOTS_OFFSET + (sequence % self.slot_count) * SLOT_SIZE
+            data[offset : offset + SLOT_SIZE] = bytes(SLOT_SIZE)
+        return data
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map.closed:
+                return
+            if self._file is not None:
+                self._map.flush()
+            self._view.release()
+            self._map.close()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_recorder: FlightRecorder | None = None
+_recorder_lock = threading.Lock()
+# Monotonic time of the last dump taken by the crash hooks
+_last_crash_dump: float | None = None
+
+
+def get_flight_recorder() -> FlightRecorder | None:
+    """The process wide recorder, None until start_flight_recorder was called"""
+    return _recorder
+
+
+def start_flight_recorder(
+    path: str | None = DEFAULT_PATH,
+    slot_count: int = DEFAULT_SLOT_COUNT,
+    dump_on_crash: bool = True,
+) -> FlightRecorder:
+    """Starts the process wide recorder the connections, detector and directors write to"""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = FlightRecorder(path, slot_count)
+            if dump_on_crash:
+                _install_crash_hooks()
+        return _recorder
+
+
+def stop_flight_recorder() -> None:
+    global _recorder
+    with _recorder_lock:
+        recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.close()
+
+
+def _dump_after_crash() -> None:
+    global _last_crash_dump
+    if (recorder := _recorder) is None:
+        return
+    with _recorder_lock:
+        now = time.monotonic()
+        if (
+            _last_crash_dump is not None
+            and now - _last_crash_dump < CRASH_DUMP_INTERVAL_S
+        ):
+            return
+        _last_crash_dump = now
+    try:
+        recorder.dump()
+    except Exception as e:
+        logger.error(f"Flight recorder dump failed: {e}")
+
+
+def _install_crash_hooks() -> None:
+    """
+    Dumps the ring when an exception reaches the top of the main thread or of any other thread, at most once every
+    CRASH_DUMP_INTERVAL_S. Ctrl+C is not a crash and does not dump.
+    """
+    previous_excepthook = sys.excepthook
+    previous_thread_excepthook = threading.excepthook
+
+    def excepthook(exc_type, exc_value, exc_traceback):
+        if not issubclass(exc_type, KeyboardInterrupt):
+            _dump_after_crash()
+        previous_excepthook(exc_type, exc_value, exc_traceback)
+
+    def thread_excepthook(args):
+        _dump_after_crash()
+        previous_thread_excepthook(args)
+
+    sys.excepthook = excepthook
+    threading.excepthook = thread_excepthook
+
+
+@dataclass(frozen=True)
+class Record:
+    sequence: int
+    # Monotonic clock of the recording process
+    time: float
+    # Wall clock, from the clock offset stored when the recorder started
+    wall_time: float
+    kind: RecordKind
+    host: str
+    data: dict[str, Any]
+
+
+def _decode_data(kind: RecordKind, data: bytes) -> dict[str, Any]:
+    if kind in (RecordKind.COMMAND_SENT, RecordKind.RETURN_RECEIVED):
+        command_id, command, length = FRAME.unpack_from(data)
+        payload = data[FRAME.size :]
+        return {
+            "command_id": command_id,
+            "command": command,
+            "payload": payload,
+            "truncated": len(payload) < length,
+        }
+    if kind == RecordKind.DETECTION:
+        frame_time, count = DETECTION.unpack_from(data)
+        bboxes = [
+            BBOX.unpack_from(data, offset)
+            for offset in range(DETECTION.size, len(data), BBOX.size)
+        ]
+        return {"frame_time": frame_time or None, "count": count, "bboxes": bboxes}
+    box_x, box_y, outside = DECISION.unpack_from(data)
+    return {"box_error": (box_x, box_y), "outside": outside}
+
+
+def read_records(path: str) -> list[Record]:
+    """Records of a ring file or dump, oldest first"""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, slot_size, slot_count, clock_offset = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a flight recorder file of version {VERSION}")
+    hosts = []
+    for index in range(MAX_HOSTS):
+        offset = HOST_TABLE_OFFSET + index * HOST_NAME_SIZE
+        hosts.append(data[offset + 1 : offset + 1 + data[offset]].decode("utf-8"))
+    records = []
+    for slot in range(slot_count):
+        offset = SLOTS_OFFSET + slot * slot_size
+        sequence, monotonic, kind, host, length = RECORD.unpack_from(data, offset)
+        if sequence == 0:
+            continue
+        start = offset + RECORD.size
+        kind = RecordKind(kind)
+        records.append(
+            Record(
+                sequence,
+                monotonic,
+                monotonic + clock_offset,
+                kind,
+                hosts[host] if host < MAX_HOSTS else "?",
+                _decode_data(kind, data[start : start + length]),
+            )
+        )
+    records.sort(key=lambda record: record.sequence)
+    return records
+
+
+def replay(
+    records: Iterable[Record], arm: "SimulatedArm", host: str | None = None
+) -> Iterator[tuple[Record, "ArmPose"]]:
+    """
+    Feeds the recorded commands into arm at the time they were sent and yields every record with the pose the arm
+    had at that time, so detections and decisions can be compared with where the camera pointed.
+    Pass host when the recording holds more than one robot.
+    """
+    for record in records:
+        if host is not None and record.host != host:
+            continue
+        if record.kind == RecordKind.COMMAND_SENT:
+            arm.receive(record.data["command"], record.data["payload"], record.time)
+        yield record, arm.step(record.time)
+
+
+def _describe(record: Record) -> str:
+    data = record.data
+    if record.kind in (RecordKind.COMMAND_SENT, RecordKind.RETURN_RECEIVED):
+        command = data["command"] & ~RETURN_FLAG
+        name = (
+            Command(command).name
+            if command in Command._value2member_map_
+            else hex(command)
+        )
+        details = f"{name} id={data['command_id']} payload={data['payload'].hex()}"
+        return details + (" (truncated)" if data["truncated"] else "")
+    if record.kind == RecordKind.DETECTION:
+        return f"{data['count']} boxes {data['bboxes']}"
+    return f"box_error={data['box_error']} outside={data['outside']}"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Prints a flight recorder file")
+    parser.add_argument("path", help="Ring file or dump to read")
+    parser.add_argument("--host", help="Only show the records of this host")
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Replay the sent commands into the simulated arm and show its pose",
+    )
+    args = parser.parse_args(argv)
+
+    records = read_records(args.path)
+    if args.replay:
+        from src.simulator.arm import SimulatedArm
+
+        rows = replay(records, SimulatedArm(), args.host)
+    else:
+        rows = (
+            (record, None)
+            for record in records
+            if args.host is None or record.host == args.host
+        )
+    for record, pose in rows:
+        wall = time.strftime("%H:%M:%S", time.localtime(record.wall_time))
+        line = f"{record.sequence:>8} {wall}.{int(record.wall_time % 1 * 1000):03d} {record.host:<20} {record.kind.name:<17} {_describe(record)}"
+        if pose is not None:
+            line += f" | azimuth={pose.azimuth:.1f} altitude={pose.altitude:.1f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
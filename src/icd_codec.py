@@ -0,0 +1,316 @@
+"""
+Table driven encoding and streaming decoding of ICD messages.
+
+The payload layout of every command is described once in PAYLOAD_LAYOUTS and compiled into precompiled big-endian
+struct.Struct objects, so encoding a command is a single pack call instead of one ctypes round trip per field.
+MessageEncoder frames payloads into a reusable buffer with pack_into, nothing is allocated per message.
+FrameDecoder cuts the received byte stream back into messages, however TCP split or merged them.
+
+Message layout, see OperatorConnection.publish:
+
+    Command ID  UINT32 | RESERVED UINT16 | Command Value UINT16 | Length UINT16 | Payload UINT8[] | CRC UINT8
+"""
+
+import struct
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, NamedTuple
+
+from loguru import logger
+
+from src.icd_config import RETURN_FLAG, Command
+
+HEADER = struct.Struct(">IHHH")
+CRC = struct.Struct(">B")
+CRC_SIZE = CRC.size
+NAME_LENGTH = struct.Struct(">B")
+MAX_PAYLOAD_SIZE = 0xFFFF
+MAX_FRAME_SIZE = HEADER.size + MAX_PAYLOAD_SIZE + CRC_SIZE
+CHAR_ENCODING = "utf-8"
+
+# Field codes of the payload layouts: struct format characters for fixed size fields,
+# NAME for a CHAR[] prefixed with its UINT8 length and REST for trailing raw bytes
+NAME = "s"
+REST = "*"
+
+PAYLOAD_LAYOUTS: dict[Command, str] = {
+    Command.HANDSHAKE: "",
+    # Delta Azimuth INT32, Delta Altitude INT32, Delay (ms) UINT32, Duration (ms) UINT32
+    Command.POLAR_PAN_DISCRETE: "iiII",
+    # Delay (ms) UINT32
+    Command.HOME: "I",
+    # Moving Azimuth INT8, Moving Altitude INT8
+    Command.POLAR_PAN_CONTINUOUS_START: "bb",
+    Command.POLAR_PAN_CONTINUOUS_STOP: "",
+    # Delta X INT32, Delta Y INT32, Delta Z INT32, Delay (ms) UINT32, Time UINT32
+    Command.CARTESIAN_MOVE_DISCRETE: "iiiII",
+    # Moving X INT8, Moving Y INT8, Moving Z INT8
+    Command.CARTESIAN_MOVE_CONTINUOUS_START: "bbb",
+    Command.CARTESIAN_MOVE_CONTINUOUS_STOP: "",
+    # Subcommand Value, RESERVED UINT32, hardware specific payload.
+    # The ICD lists the subcommand as UINT16, the operator has always been sent a single byte.
+    Command.EXECUTE_HARDWARE_OPERATION: "BI*",
+    Command.GET_SPEED: "",
+    # Speed UINT8
+    Command.SET_SPEED: "B",
+    # Name, Anchor BOOLEAN, Parent
+    Command.SAVE_POSITION: "s?s",
+    Command.DELETE_POSITION: "s",
+    Command.GO_TO_POSITION: "s",
+    # Name, Delta INT32, Azimuth INT32, Radius INT32
+    Command.SET_POLAR_POSITION: "siii",
+    Command.GET_POLAR_POSITION: "s",
+    # Name, X INT32, Y INT32, Z INT32
+    Command.SET_CARTESIAN_POSITION: "siii",
+    Command.GET_CARTESIAN_POSITION: "s",
+}
+
+
+class PayloadCodec:
+    """Compiled layout of one command payload"""
+
+    def __init__(self, layout: str):
+        self.layout = layout
+        # Runs of fixed size fields share one Struct, NAME and REST fields sit between them
+        self.segments: list[struct.Struct | str] = []
+        fixed = ""
+        for code in layout:
+            if code in (NAME, REST):
+                if fixed:
+                    self.segments.append(struct.Struct(">" + fixed))
+                    fixed = ""
+                self.segments.append(code)
+            else:
+                fixed += code
+        if fixed:
+            self.segments.append(struct.Struct(">" + fixed))
+        self.field_count = len(layout)
+        self.fixed: struct.Struct | None = (
+            self.segments[0]
+            if len(self.segments) == 1 and isinstance(self.segments[0], struct.Struct)
+            else None
+        )
+
+    def encode(self, *values: Any) -> bytes:
+        if len(values) != self.field_count:
+            raise ValueError(
+                f"Layout {self.layout!r} takes {self.field_count} values, got {len(values)}"
+            )
+        if self.fixed is not None:
+            return self.fixed.pack(*values)
+        if not self.segments:
+            return b""
+        parts = []
+        index = 0
+        for segment in self.segments:
+            if segment == NAME:
+                name = values[index].encode(CHAR_ENCODING)
+                parts.append(NAME_LENGTH.pack(len(name)))
+                parts.append(name)
+                index += 1
+            elif segment == REST:
+                parts.append(bytes(values[index]))
+                index += 1
+            else:
+                count = len(segment.format) - 1
+                parts.append(segment.pack(*values[index : index + count]))
+                index += count
+        return b"".join(parts)
+
+
+PAYLOAD_CODECS: dict[Command, PayloadCodec] = {
+    command: PayloadCodec(layout) for command, layout in PAYLOAD_LAYOUTS.items()
+}
+
+
+def encode_payload(command: Command, *values: Any) -> bytes:
+    """Payload of command from its field values in ICD order, names are passed as str"""
+    return PAYLOAD_CODECS[command].encode(*values)
+
+
+@dataclass(frozen=True)
+class PolarPosition:
+    """Tenths of degrees on the delta and azimuth axes and tenths of distance outwards"""
+
+    delta: int
+    azimuth: int
+    radius: int
+
+
+@dataclass(frozen=True)
+class CartesianPosition:
+    """Tenths of millimeters on each axis"""
+
+    x: int
+    y: int
+    z: int
+
+
+STATUS = struct.Struct(">H")
+SPEED = struct.Struct(">B")
+POSITION = struct.Struct(">iii")
+
+# Payload of a *_RETURN, by the command it answers. Everything else returns a UINT16 status code.
+RETURN_DECODERS: dict[Command, Callable[[bytes | memoryview], Any]] = {
+    # Speed    UINT8
+    Command.GET_SPEED: lambda payload: SPEED.unpack_from(payload)[0],
+    # Delta, Azimuth, Radius    INT32
+    Command.GET_POLAR_POSITION: lambda payload: PolarPosition(
+        *POSITION.unpack_from(payload)
+    ),
+    # X, Y, Z    INT32
+    Command.GET_CARTESIAN_POSITION: lambda payload: CartesianPosition(
+        *POSITION.unpack_from(payload)
+    ),
+}
+
+
+def decode_return(command: Command, payload: bytes | memoryview) -> Any:
+    """Typed value of the return payload answering command, raises struct.error when it is too short"""
+    if (decoder := RETURN_DECODERS.get(command)) is not None:
+        return decoder(payload)
+    return STATUS.unpack_from(payload)[0]
+
+
+def xor_checksum(data: bytes | bytearray | memoryview) -> int:
+    """
+    XOR of every byte of data.
+
+    The bytes are read as one integer and folded in halves, so the XOR runs on whole machine words in C instead of
+    one byte at a time in Python.
+    """
+    value = int.from_bytes(data, "little")
+    width = len(data)
+    while width > 8:
+        width = (width + 1) // 2
+        value = (value ^ (value >> (width * 8))) & ((1 << (width * 8)) - 1)
+    value ^= value >> 32
+    value ^= value >> 16
+    value ^= value >> 8
+    return value & 0xFF
+
+
+class MessageEncoder:
+    """
+    Frames payloads into ICD messages inside one reusable buffer.
+
+    The returned view is only valid until the next encode, callers must send or copy it first and must not share an
+    encoder between threads without a lock.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self._buffer = bytearray(capacity)
+
+    def encode(
+        self,
+        command_id: int,
+        command: int,
+        payload: bytes | bytearray | memoryview | None = None,
+    ) -> memoryview:
+        length = 0 if payload is None else len(payload)
+        if length > MAX_PAYLOAD_SIZE:
+            raise ValueError(f"Payload of {length} bytes does not fit the ICD")
+        end = HEADER.size + length
+        if end + CRC_SIZE > len(self._buffer):
+            self._buffer = bytearray(max(end + CRC_SIZE, 2 * len(self._buffer)))
+        buffer = self._buffer
+        HEADER.pack_into(buffer, 0, command_id, 0, command, length)
+        if length:
+            buffer[HEADER.size : end] = payload
+        view = memoryview(buffer)
+        CRC.pack_into(buffer, end, xor_checksum(view[:end]))
+        return view[: end + CRC_SIZE]
+
+
+def build_message(command_id: int, command: int, payload: bytes = b"") -> bytes:
+    return bytes(
+        MessageEncoder(HEADER.size + len(payload) + CRC_SIZE).encode(
+            command_id, command, payload
+        )
+    )
+
+
+class Frame(NamedTuple):
+    command_id: int
+    command: int
+    # View into the buffer of the FrameDecoder, copy it to keep it past the next read
+    payload: memoryview
+
+    def decode(self) -> Any:
+        """Typed payload of a *_RETURN, see decode_return"""
+        if not self.command & RETURN_FLAG:
+            raise ValueError(f"Command {self.command:#06x} is not a return")
+        return decode_return(Command(self.command & ~RETURN_FLAG), self.payload)
+
+
+class FrameDecoder:
+    """
+    Incremental decoder of an ICD byte stream.
+
+    Sockets receive straight into the buffer (`recv_into(decoder.writable())`, then `advance`), and `frames` yields
+    every complete message with its payload as a view into the buffer, so nothing is copied on the way. Partial
+    messages stay buffered until the rest arrives, any number of back-to-back messages are returned from one read.
+    The buffer works as a ring: once its end is reached, the unread bytes (at most one partial message) move back
+    to the front. Views handed out by `frames` are only valid until the next `writable` or `feed`.
+    """
+
+    # Free space below which the unread bytes move back to the front before the next read
+    MIN_READ_SIZE = 4096
+
+    def __init__(self, capacity: int = 2 * MAX_FRAME_SIZE):
+        self._buffer = bytearray(max(capacity, MAX_FRAME_SIZE + self.MIN_READ_SIZE))
+        self._view = memoryview(self._buffer)
+        self._start = 0  # First unread byte
+        self._end = 0  # End of the received bytes
+        self.frames_decoded = 0
+        self.bad_checksums = 0
+
+    @property
+    def buffered(self) -> int:
+        return self._end - self._start
+
+    def writable(self) -> memoryview:
+        """Free space at the end of the buffer to receive into"""
+        if self._start == self._end:
+            self._start = self._end = 0
+        elif len(self._buffer) - self._end < self.MIN_READ_SIZE:
+            unread = self._end - self._start
+            # memoryview assignment is a memmove, the ranges may overlap
+            self._view[:unread] = self._view[self._start : self._end]
+            self._start, self._end = 0, unread
+        return self._view[self._end :]
+
+    def advance(self, received: int) -> None:
+        """Marks received bytes written to the view returned by writable as filled"""
+        self._end += received
+
+    def feed(self, data: bytes | bytearray | memoryview) -> None:
+        """Copies data into the buffer, for streams that are not read from a socket"""
+        data = memoryview(data)
+        while data:
+            target = self.writable()
+            if not target:
+                raise BufferError("Frame decoder is full, read the frames first")
+            count = min(len(target), len(data))
+            target[:count] = data[:count]
+            self.advance(count)
+            data = data[count:]
+
+    def frames(self) -> Iterator[Frame]:
+        """Yields the complete messages received so far, messages with a bad checksum are logged and dropped"""
+        buffer, view = self._buffer, self._view
+        while self._end - self._start >= HEADER.size:
+            start = self._start
+            command_id, _, command, length = HEADER.unpack_from(buffer, start)
+            crc_at = start + HEADER.size + length
+            if crc_at + CRC_SIZE > self._end:
+                break
+            self._start = crc_at + CRC_SIZE
+            if xor_checksum(view[start:crc_at]) != buffer[crc_at]:
+                self.bad_checksums += 1
+                logger.warning(f"Dropping command {command_id} with bad checksum")
+                continue
+            self.frames_decoded += 1
+            yield Frame(command_id, command, view[start + HEADER.size : crc_at])
+
+    def clear(self) -> None:
+        self._start = self._end = 0
@@ -67,3 +67,7 @@ class Command(IntEnum):
         Used for casting Enum object to integer
         """
         return self.value
+
+
+# Set on the command value of the *_RETURN answering a command
+RETURN_FLAG = 0x8000
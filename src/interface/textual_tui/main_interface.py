@@ -114,6 +114,38 @@ class TextualInterface(App):
                                     label="Det. Output FPS",
                                     max_value=60.0,
                                 )
+                                yield MetricDisplay(
+                                    id="input-height",
+                                    poll_data=self.get_input_height,
+                                    num_cached=5,
+                                    rate=0.5,
+                                    label="Model Input Height",
+                                    max_value=1080.0,
+                                )
+                                yield MetricDisplay(
+                                    id="detection-latency",
+                                    poll_data=self.get_detection_latency,
+                                    num_cached=5,
+                                    rate=0.1,
+                                    label="Det. Latency (ms)",
+                                    max_value=100.0,
+                                )
+                                yield MetricDisplay(
+                                    id="control-delay",
+                                    poll_data=self.get_control_delay,
+                                    num_cached=5,
+                                    rate=0.1,
+                                    label="Control Delay (ms)",
+                                    max_value=500.0,
+                                )
+                                yield MetricDisplay(
+                                    id="latency-compensation",
+                                    poll_data=self.get_latency_compensation,
+                                    num_cached=5,
+                                    rate=0.1,
+                                    label="Delay Comp. (px)",
+                                    max_value=100.0,
+                                )
                 with Horizontal():
                     yield ReactiveButton(
                         "LEFT", id="left", classes="widget", on_blur=focus_home
@@ -346,6 +378,30 @@ class TextualInterface(App):
             return 0.0
         return self._talos_app.get_tracker_output_fps()
 
+    def get_input_height(self) -> float:
+        if not hasattr(self, "_talos_app"):
+            return 0.0
+        return self._talos_app.get_tracker_input_height()
+
+    def get_detection_latency(self) -> float:
+        if not hasattr(self, "_talos_app"):
+            return 0.0
+        return self._talos_app.get_tracker_latency()
+
+    def get_control_delay(self) -> float:
+        if not hasattr(self, "_talos_app"):
+            return 0.0
+        metrics = self._talos_app.get_director_latency_metrics()
+        return metrics.get("delay_ms") or 0.0
+
+    def get_latency_compensation(self) -> float:
+        if not hasattr(self, "_talos_app"):
+            return 0.0
+        metrics = self._talos_app.get_director_latency_metrics()
+        return abs(metrics.get("compensation_x_px") or 0) + abs(
+            metrics.get("compensation_y_px") or 0
+        )
+
 
 if __name__ == "__main__":
     try:
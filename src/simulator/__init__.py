@@ -0,0 +1,16 @@
+from .arm import ArmPose, SimulatedArm
+from .camera import SimulatedVideoSource, Subject, VirtualCamera
+from .operator import SimulatedOperator
+from .scenarios import TRAJECTORIES, Trajectory, score_run
+
+__all__ = [
+    "ArmPose",
+    "SimulatedArm",
+    "SimulatedOperator",
+    "SimulatedVideoSource",
+    "Subject",
+    "TRAJECTORIES",
+    "Trajectory",
+    "VirtualCamera",
+    "score_run",
+]
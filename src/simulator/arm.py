@@ -0,0 +1,130 @@
+import heapq
+import threading
+import time
+from dataclasses import dataclass, field
+
+from src.icd_config import Command, toInt
+
+DEFAULT_PAN_SPEED = 30.0  # degrees per second at speed 100
+FULL_SPEED = 100
+AZIMUTH_LIMITS = (-170.0, 170.0)
+ALTITUDE_LIMITS = (-45.0, 60.0)
+# DiscreteDirector sends negative azimuth deltas to pan right, continuous pans use +1 for right
+DISCRETE_AZIMUTH_SIGN = -1
+
+
+@dataclass
+class ArmPose:
+    azimuth: float = 0.0
+    altitude: float = 0.0
+
+
+@dataclass
+class SimulatedArm:
+    """
+    Pan/tilt kinematics of the arm, driven by ICD commands.
+
+    Positive azimuth pans the camera right and positive altitude tilts it up, like the continuous pan directions.
+    Commands take effect `response_delay_s` after they are received to model the operator and motor controller.
+    """
+
+    pan_speed: float = DEFAULT_PAN_SPEED
+    response_delay_s: float = 0.05
+    speed: int = FULL_SPEED
+    pose: ArmPose = field(default_factory=ArmPose)
+    # (azimuth, altitude) in degrees per second
+    velocity: tuple[float, float] = (0.0, 0.0)
+    # Discrete moves: remaining (azimuth, altitude) degrees and the time they end at
+    _discrete_end: float | None = field(default=None, init=False)
+    _moving: tuple[int, int] = field(default=(0, 0), init=False)
+    _last_step: float | None = field(default=None, init=False)
+    # (effective time, sequence, command, payload)
+    _pending: list = field(default_factory=list, init=False)
+    _sequence: int = field(default=0, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+    commands_received: int = field(default=0, init=False)
+
+    def receive(self, command: int, payload: bytes, now: float | None = None):
+        """Queues a command received over the wire, it is applied by step once the response delay passed"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self.commands_received += 1
+            self._sequence += 1
+            heapq.heappush(
+                self._pending,
+                (now + self.response_delay_s, self._sequence, command, payload),
+            )
+
+    def step(self, now: float | None = None) -> ArmPose:
+        """Advances the arm to `now`, applying queued commands at the time they take effect"""
+        now = time.time() if now is None else now
+        with self._lock:
+            if self._last_step is None:
+                self._last_step = now
+            while self._pending and self._pending[0][0] <= now:
+                effective, _, command, payload = heapq.heappop(self._pending)
+                self._advance(max(effective, self._last_step))
+                self._apply(command, payload, effective)
+            self._advance(now)
+            return ArmPose(self.pose.azimuth, self.pose.altitude)
+
+    def _advance(self, t: float):
+        if self._last_step is None or t <= self._last_step:
+            return
+        end = t
+        if self._discrete_end is not None and self._discrete_end <= t:
+            end = self._discrete_end
+        dt = end - self._last_step
+        self.pose.azimuth = min(
+            AZIMUTH_LIMITS[1],
+            max(AZIMUTH_LIMITS[0], self.pose.azimuth + self.velocity[0] * dt),
+        )
+        self.pose.altitude = min(
+            ALTITUDE_LIMITS[1],
+            max(ALTITUDE_LIMITS[0], self.pose.altitude + self.velocity[1] * dt),
+        )
+        self._last_step = end
+        if end < t:
+            # Discrete move finished before t
+            self._discrete_end = None
+            self.velocity = (0.0, 0.0)
+            self._last_step = t
+
+    def _continuous_velocity(self) -> tuple[float, float]:
+        rate = self.pan_speed * self.speed / FULL_SPEED
+        return self._moving[0] * rate, self._moving[1] * rate
+
+    def _apply(self, command: int, payload: bytes, now: float):
+        if command == Command.POLAR_PAN_CONTINUOUS_START and len(payload) >= 2:
+            self._moving = (
+                int.from_bytes(payload[0:1], signed=True),
+                int.from_bytes(payload[1:2], signed=True),
+            )
+            self._discrete_end = None
+            self.velocity = self._continuous_velocity()
+        elif command == Command.POLAR_PAN_CONTINUOUS_STOP:
+            self._moving = (0, 0)
+            self._discrete_end = None
+            self.velocity = (0.0, 0.0)
+        elif command == Command.SET_SPEED and len(payload) >= 1:
+            self.speed = min(FULL_SPEED, payload[0])
+            if self._discrete_end is None:
+                self.velocity = self._continuous_velocity()
+        elif command == Command.POLAR_PAN_DISCRETE and len(payload) >= 16:
+            delta_azimuth = int.from_bytes(payload[0:4], "big", signed=True)
+            delta_altitude = int.from_bytes(payload[4:8], "big", signed=True)
+            delay_s = toInt(payload[8:12]) / 1000
+            duration_s = max(toInt(payload[12:16]) / 1000, 1e-3)
+            # The delay is folded into the duration, the arm only needs to arrive in time
+            duration_s += delay_s
+            self._moving = (0, 0)
+            self.velocity = (
+                DISCRETE_AZIMUTH_SIGN * delta_azimuth / duration_s,
+                delta_altitude / duration_s,
+            )
+            self._discrete_end = now + duration_s
+        elif command == Command.HOME:
+            self._moving = (0, 0)
+            self._discrete_end = None
+            self.velocity = (0.0, 0.0)
+            self.pose = ArmPose()
@@ -0,0 +1,154 @@
+import threading
+import time
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from src.connection.reconnect import ConnectionState
+from src.simulator.arm import ArmPose, SimulatedArm
+
+
+@dataclass
+class Subject:
+    """A person standing in the simulated world, position and size in degrees"""
+
+    azimuth: float = 0.0
+    altitude: float = 0.0
+    width: float = 8.0
+    height: float = 20.0
+
+
+def synthetic_panorama(width: int = 4096, height: int = 1536) -> np.ndarray:
+    """Textured panorama with a grid, so camera motion is visible without a real image"""
+    rng = np.random.default_rng(0)
+    panorama = rng.integers(60, 120, (height, width, 3), dtype=np.uint8)
+    panorama[:, :, 0] = np.linspace(40, 200, width, dtype=np.uint8)[None, :]
+    panorama[::64, :] = 220
+    panorama[:, ::64] = 220
+    return panorama
+
+
+class VirtualCamera:
+    """
+    Camera window panned over a panorama by the simulated arm.
+
+    Angles map linearly to panorama pixels, one degree is frame_width / horizontal_fov pixels wide.
+    The panorama center is azimuth 0 and altitude 0.
+    The panorama is an image, a path to an image or video file (videos advance one frame per render and loop),
+    or a synthetic texture when None.
+    """
+
+    _video: cv2.VideoCapture | None = None
+
+    def __init__(
+        self,
+        panorama: np.ndarray | str | None = None,
+        frame_size: tuple[int, int] = (640, 480),
+        field_of_view: tuple[float, float] = (89.0, 48.0),
+    ):
+        if isinstance(panorama, str):
+            image = cv2.imread(panorama)
+            if image is None:
+                self._video = cv2.VideoCapture(panorama)
+                ok, image = self._video.read()
+                if not ok or image is None:
+                    raise ValueError(f"Unable to read panorama from {panorama}")
+            panorama = image
+        self.panorama = synthetic_panorama() if panorama is None else panorama
+        self.frame_width, self.frame_height = frame_size
+        self.horizontal_fov, self.vertical_fov = field_of_view
+        self.px_per_deg_x = self.frame_width / self.horizontal_fov
+        self.px_per_deg_y = self.frame_height / self.vertical_fov
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        return (self.frame_height, self.frame_width, 3)
+
+    def to_frame(
+        self, azimuth: float, altitude: float, pose: ArmPose
+    ) -> tuple[float, float]:
+        """Pixel position of a world direction in the frame of a camera pointing at pose"""
+        x = self.frame_width / 2 + (azimuth - pose.azimuth) * self.px_per_deg_x
+        y = self.frame_height / 2 - (altitude - pose.altitude) * self.px_per_deg_y
+        return x, y
+
+    def subject_bbox(
+        self, subject: Subject, pose: ArmPose, clip: bool = True
+    ) -> tuple[int, int, int, int] | None:
+        """Ground truth xyxy box of the subject, None when its center is out of frame"""
+        cx, cy = self.to_frame(subject.azimuth, subject.altitude, pose)
+        half_w = subject.width * self.px_per_deg_x / 2
+        half_h = subject.height * self.px_per_deg_y / 2
+        if clip and not (0 <= cx < self.frame_width and 0 <= cy < self.frame_height):
+            return None
+        x1, y1, x2, y2 = cx - half_w, cy - half_h, cx + half_w, cy + half_h
+        if clip:
+            x1, x2 = max(0, x1), min(self.frame_width - 1, x2)
+            y1, y2 = max(0, y1), min(self.frame_height - 1, y2)
+        return (round(x1), round(y1), round(x2), round(y2))
+
+    def render(
+        self, pose: ArmPose, subjects: list[Subject] | None = None
+    ) -> np.ndarray:
+        """Crops the camera window out of the panorama and draws the subjects into it"""
+        if self._video is not None:
+            ok, image = self._video.read()
+            if not ok:
+                self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, image = self._video.read()
+            if ok and image is not None:
+                self.panorama = image
+        pano_h, pano_w = self.panorama.shape[:2]
+        left = round(
+            pano_w / 2 + pose.azimuth * self.px_per_deg_x - self.frame_width / 2
+        )
+        top = round(
+            pano_h / 2 - pose.altitude * self.px_per_deg_y - self.frame_height / 2
+        )
+        frame = np.zeros(self.shape, dtype=np.uint8)
+        src_x1, src_y1 = max(0, left), max(0, top)
+        src_x2 = min(pano_w, left + self.frame_width)
+        src_y2 = min(pano_h, top + self.frame_height)
+        if src_x2 > src_x1 and src_y2 > src_y1:
+            frame[src_y1 - top : src_y2 - top, src_x1 - left : src_x2 - left] = (
+                self.panorama[src_y1:src_y2, src_x1:src_x2]
+            )
+        for subject in subjects or []:
+            if (bbox := self.subject_bbox(subject, pose)) is not None:
+                cv2.rectangle(frame, bbox[:2], bbox[2:], (40, 40, 200), thickness=-1)
+        return frame
+
+
+class SimulatedVideoSource:
+    """
+    VideoConnection compatible frame source, renders what the camera on the simulated arm sees.
+
+    Can be passed as the video_connection of a Connection, so the tracker and directors run unchanged.
+    """
+
+    def __init__(
+        self, camera: VirtualCamera, arm: SimulatedArm, subjects: list[Subject]
+    ):
+        self.src = "simulator"
+        self.camera = camera
+        self.arm = arm
+        self.subjects = subjects
+        self.shape = camera.shape
+        self.dtype = np.dtype(np.uint8)
+        # Rendered frames never drop
+        self.state = ConnectionState.CONNECTED
+        self.on_state_change = None
+        self._read_lock = threading.Lock()
+
+    def get_frame(self) -> np.ndarray | None:
+        return self.get_frame_with_time()[0]
+
+    def get_frame_with_time(self) -> tuple[np.ndarray | None, float | None]:
+        with self._read_lock:
+            now = time.time()
+            return self.camera.render(self.arm.step(now), self.subjects), now
+
+    def close(self):
+        if self.camera._video is not None:
+            self.camera._video.release()
@@ -0,0 +1,291 @@
+"""
+Asyncio mock operator for protocol and load testing.
+
+Every MockRobot listens on its own port and answers each ICD command with its *_RETURN, like the operator on a
+real robot: SET_* commands are remembered and read back by the matching GET_*, everything else returns a UINT16
+success status. Network conditions are set per fleet with a NetworkProfile (latency, jitter, dropped returns and a
+cap on returns per second). MockOperatorFleet runs any number of robots on one event loop in a background thread,
+so synchronous code such as Publisher can talk to hundreds of them from the same process.
+
+Run standalone, e.g. to point a commander at it:
+
+    uv run python -m src.simulator.mock_operator --robots 10 --base-port 9000 --latency-ms 5 --jitter-ms 2
+"""
+
+import argparse
+import asyncio
+import random
+import struct
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from loguru import logger
+
+from src.icd_codec import (
+    CHAR_ENCODING,
+    NAME_LENGTH,
+    POSITION,
+    SPEED,
+    STATUS,
+    FrameDecoder,
+    build_message,
+)
+from src.icd_config import RETURN_FLAG, Command
+
+STATUS_SUCCESS = 1
+STATUS_FAILURE = 0
+DEFAULT_SPEED = 100
+
+
+@dataclass(frozen=True)
+class NetworkProfile:
+    """Conditions every return of a robot goes through"""
+
+    latency_s: float = 0.0
+    # Added to the latency, uniformly drawn from [-jitter_s, jitter_s]
+    jitter_s: float = 0.0
+    # Fraction of commands that are never answered
+    drop_rate: float = 0.0
+    # Returns per second a robot sends at most, later ones wait for their slot. None for no cap.
+    max_returns_per_s: float | None = None
+
+
+def _read_name(payload: bytes, offset: int = 0) -> tuple[str, int]:
+    (length,) = NAME_LENGTH.unpack_from(payload, offset)
+    start = offset + NAME_LENGTH.size
+    return payload[start : start + length].decode(CHAR_ENCODING), start + length
+
+
+class MockRobot:
+    """One virtual robot: a TCP server on the event loop that answers every command it receives"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        profile: NetworkProfile = NetworkProfile(),
+        seed: int | None = None,
+    ):
+        self.host = host
+        self.port = port
+        self.profile = profile
+        self._rng = random.Random(seed)
+        self._server: asyncio.Server | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+        # Monotonic time of the next free slot under max_returns_per_s
+        self._next_slot = 0.0
+        self.speed = DEFAULT_SPEED
+        self.polar_positions: dict[str, tuple[int, int, int]] = {}
+        self.cartesian_positions: dict[str, tuple[int, int, int]] = {}
+        self.received: Counter[int] = Counter()
+        self.answered = 0
+        self.dropped = 0
+        self.bad_checksums = 0
+
+    async def start(self) -> int:
+        """Starts listening, returns the port (picked by the OS when port is 0)"""
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        if self._server is not None:
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._writers.add(writer)
+        decoder = FrameDecoder()
+        try:
+            while data := await reader.read(1 << 16):
+                decoder.feed(data)
+                for command_id, command, payload in decoder.frames():
+                    self._answer(writer, command_id, command, bytes(payload))
+        except ConnectionError:
+            pass
+        finally:
+            self.bad_checksums += decoder.bad_checksums
+            self._writers.discard(writer)
+            writer.close()
+
+    def _answer(
+        self,
+        writer: asyncio.StreamWriter,
+        command_id: int,
+        command: int,
+        payload: bytes,
+    ) -> None:
+        self.received[command] += 1
+        profile = self.profile
+        if profile.drop_rate and self._rng.random() < profile.drop_rate:
+            self.dropped += 1
+            return
+        message = build_message(
+            command_id + 1, command | RETURN_FLAG, self.handle(command, payload)
+        )
+        delay = profile.latency_s
+        if profile.jitter_s:
+            delay += self._rng.uniform(-profile.jitter_s, profile.jitter_s)
+        if profile.max_returns_per_s:
+            now = time.monotonic()
+            self._next_slot = max(self._next_slot, now) + 1 / profile.max_returns_per_s
+            delay = max(delay, self._next_slot - now)
+        if delay <= 0:
+            self._write(writer, message)
+        else:
+            asyncio.get_running_loop().call_later(delay, self._write, writer, message)
+
+    def _write(self, writer: asyncio.StreamWriter, message: bytes) -> None:
+        if writer.is_closing():
+            return
+        writer.write(message)
+        self.answered += 1
+
+    def handle(self, command: int, payload: bytes) -> bytes:
+        """Applies command to the robot state and returns the payload of its *_RETURN"""
+        try:
+            if command & RETURN_FLAG:
+                raise ValueError("returns are not commands")
+            command = Command(command)
+            match command:
+                case Command.SET_SPEED:
+                    (self.speed,) = SPEED.unpack_from(payload)
+                case Command.GET_SPEED:
+                    return SPEED.pack(self.speed)
+                case Command.SET_POLAR_POSITION | Command.SET_CARTESIAN_POSITION:
+                    name, offset = _read_name(payload)
+                    positions = (
+                        self.polar_positions
+                        if command == Command.SET_POLAR_POSITION
+                        else self.cartesian_positions
+                    )
+                    positions[name] = POSITION.unpack_from(payload, offset)
+                case Command.GET_POLAR_POSITION | Command.GET_CARTESIAN_POSITION:
+                    name, _ = _read_name(payload)
+                    positions = (
+                        self.polar_positions
+                        if command == Command.GET_POLAR_POSITION
+                        else self.cartesian_positions
+                    )
+                    return POSITION.pack(*positions.get(name, (0, 0, 0)))
+                case Command.DELETE_POSITION:
+                    name, _ = _read_name(payload)
+                    found = self.polar_positions.pop(name, None) is not None
+                    found |= self.cartesian_positions.pop(name, None) is not None
+                    return STATUS.pack(STATUS_SUCCESS if found else STATUS_FAILURE)
+        except (ValueError, struct.error, UnicodeDecodeError) as e:
+            # Unknown commands and malformed payloads are answered, with a failure status
+            logger.debug(f"Mock operator rejecting command {command:#06x}: {e}")
+            return STATUS.pack(STATUS_FAILURE)
+        return STATUS.pack(STATUS_SUCCESS)
+
+
+class MockOperatorFleet:
+    """
+    Any number of MockRobots served from one asyncio event loop on a background thread.
+
+    Robots listen on consecutive ports from base_port, or on free ports picked by the OS when base_port is 0.
+    Each robot holds a listening socket plus one per connected publisher, raise the open file limit for large fleets.
+    """
+
+    def __init__(
+        self,
+        count: int,
+        host: str = "127.0.0.1",
+        base_port: int = 0,
+        profile: NetworkProfile = NetworkProfile(),
+        seed: int | None = None,
+    ):
+        self.robots = [
+            MockRobot(
+                host,
+                base_port + index if base_port else 0,
+                profile,
+                None if seed is None else seed + index,
+            )
+            for index in range(count)
+        ]
+        self._loop = asyncio.new_event_loop()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def ports(self) -> list[int]:
+        return [robot.port for robot in self.robots]
+
+    def start(self, timeout: float = 10.0) -> list[int]:
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="mock-operator", daemon=True
+        )
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start_all(), self._loop).result(timeout)
+        logger.debug(f"Mock operator serving {len(self.robots)} robots")
+        return self.ports
+
+    async def _start_all(self) -> None:
+        await asyncio.gather(*(robot.start() for robot in self.robots))
+
+    async def _stop_all(self) -> None:
+        await asyncio.gather(*(robot.stop() for robot in self.robots))
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._stop_all(), self._loop).result(timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+        self._loop.close()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "received": sum(sum(robot.received.values()) for robot in self.robots),
+            "answered": sum(robot.answered for robot in self.robots),
+            "dropped": sum(robot.dropped for robot in self.robots),
+            "bad_checksums": sum(robot.bad_checksums for robot in self.robots),
+        }
+
+    def __enter__(self) -> "MockOperatorFleet":
+        self.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--robots", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base-port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--max-returns-per-s", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    profile = NetworkProfile(
+        latency_s=args.latency_ms / 1000,
+        jitter_s=args.jitter_ms / 1000,
+        drop_rate=args.drop_rate,
+        max_returns_per_s=args.max_returns_per_s,
+    )
+    with MockOperatorFleet(args.robots, args.host, args.base_port, profile) as fleet:
+        print(f"Mock operator listening on {args.host} ports {fleet.ports}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        print(fleet.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import socket
+import threading
+import time
+
+from loguru import logger
+
+from src.icd_codec import POSITION, SPEED, STATUS, FrameDecoder, build_message
+from src.icd_config import RETURN_FLAG, Command
+from src.simulator.arm import SimulatedArm
+from src.simulator.mock_operator import STATUS_SUCCESS
+
+
+class SimulatedOperator:
+    """
+    Stand-in for the operator running on the robot, drives a SimulatedArm instead of a real one.
+
+    Listens on a TCP port, decodes the same frames OperatorConnection sends and answers every command with its
+    *_RETURN (odd command id, command | 0x8000 and a UINT16 success payload, or the value asked for by GET_*).
+    Port 0 picks a free port, read it back from `port` after `start`.
+    """
+
+    def __init__(self, arm: SimulatedArm, host: str = "127.0.0.1", port: int = 0):
+        self.arm = arm
+        self.host = host
+        self.port = port
+        self.is_running = False
+        self._server: socket.socket | None = None
+        self._threads: list[threading.Thread] = []
+        self._clients: list[socket.socket] = []
+
+    def start(self) -> int:
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((self.host, self.port))
+        self._server.listen()
+        self._server.settimeout(0.1)
+        self.port = self._server.getsockname()[1]
+        self.is_running = True
+        self._start_thread(self._accept_loop)
+        logger.debug(f"Simulated operator listening on {self.host}:{self.port}")
+        return self.port
+
+    def _start_thread(self, target, *args):
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _accept_loop(self):
+        while self.is_running and self._server is not None:
+            try:
+                client, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            client.settimeout(0.1)
+            self._clients.append(client)
+            self._start_thread(self._client_loop, client)
+
+    def _client_loop(self, client: socket.socket):
+        decoder = FrameDecoder()
+        while self.is_running:
+            try:
+                received = client.recv_into(decoder.writable())
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if not received:
+                break
+            decoder.advance(received)
+            now = time.time()
+            for command_id, command, payload in decoder.frames():
+                self.arm.receive(command, bytes(payload), now)
+                try:
+                    client.sendall(self.build_return(command_id, command))
+                except OSError:
+                    break
+        client.close()
+
+    def wait_for_client(self, timeout: float = 5.0) -> bool:
+        """Blocks until a publisher connected, returns False on timeout"""
+        deadline = time.monotonic() + timeout
+        while not self._clients and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return bool(self._clients)
+
+    def build_return(self, command_id: int, command: int) -> bytes:
+        payload = STATUS.pack(STATUS_SUCCESS)
+        if command == Command.GET_SPEED:
+            # Commands that took effect by now are applied before reading the state back
+            self.arm.step()
+            payload = SPEED.pack(self.arm.speed)
+        elif command == Command.GET_POLAR_POSITION:
+            # The named position is ignored, the simulated arm only knows where it points now
+            pose = self.arm.step()
+            payload = POSITION.pack(
+                round(pose.altitude * 10), round(pose.azimuth * 10), 0
+            )
+        elif command == Command.GET_CARTESIAN_POSITION:
+            payload = POSITION.pack(0, 0, 0)
+        return build_message(command_id + 1, command | RETURN_FLAG, payload)
+
+    def stop(self):
+        self.is_running = False
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for client in self._clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        for thread in self._threads:
+            thread.join(timeout=1)
+        self._threads.clear()
+        self._clients.clear()
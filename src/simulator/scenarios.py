@@ -0,0 +1,129 @@
+import math
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+SETTLE_HOLD_S = (
+    0.5  # the subject has to stay in the acceptable box this long to count as settled
+)
+
+
+@dataclass(frozen=True)
+class Trajectory:
+    """Scripted subject motion, position(t) returns (azimuth, altitude) in degrees t seconds into the run"""
+
+    name: str
+    position: Callable[[float], tuple[float, float]]
+    duration_s: float
+
+
+def step(azimuth: float = 30.0, altitude: float = 0.0, at_s: float = 0.5):
+    return lambda t: (azimuth, altitude) if t >= at_s else (0.0, 0.0)
+
+
+def walk(speed: float = 10.0, turn_every_s: float = 3.0):
+    """Walks back and forth at a constant angular speed"""
+
+    def position(t: float):
+        period = 2 * turn_every_s
+        phase = t % period
+        distance = phase if phase < turn_every_s else period - phase
+        return speed * (distance - turn_every_s / 2), 0.0
+
+    return position
+
+
+def sway(amplitude: float = 25.0, period_s: float = 4.0, altitude: float = 5.0):
+    return lambda t: (
+        amplitude * math.sin(2 * math.pi * t / period_s),
+        altitude * math.sin(4 * math.pi * t / period_s),
+    )
+
+
+def stop_and_go(distance: float = 25.0, speed: float = 20.0, pause_s: float = 1.5):
+    """Moves `distance` degrees at `speed`, pauses, then moves on in the same direction"""
+    move_s = distance / speed
+
+    def position(t: float):
+        leg, into_leg = divmod(t, move_s + pause_s)
+        travelled = min(into_leg, move_s) * speed
+        return leg * distance + travelled, 0.0
+
+    return position
+
+
+TRAJECTORIES: dict[str, Trajectory] = {
+    trajectory.name: trajectory
+    for trajectory in [
+        Trajectory("step", step(), 5.0),
+        Trajectory("diagonal_step", step(25.0, 10.0), 5.0),
+        Trajectory("walk", walk(15.0, 4.0), 8.0),
+        Trajectory("sway", sway(), 8.0),
+        Trajectory("stop_and_go", stop_and_go(), 8.0),
+    ]
+}
+
+
+def score_run(
+    times: np.ndarray,
+    errors: np.ndarray,
+    outside: np.ndarray,
+    commands: int,
+) -> dict[str, float | int | None]:
+    """
+    Control quality of a simulated run.
+
+    Args:
+        times (np.ndarray): (N,) sample times in seconds
+        errors (np.ndarray): (N, 2) subject minus camera direction (azimuth, altitude) in degrees
+        outside (np.ndarray): (N,) whether the subject was outside the acceptable box
+        commands (int): commands the operator received during the run
+    """
+    times = np.asarray(times, dtype=np.float64)
+    errors = np.asarray(errors, dtype=np.float64).reshape(-1, 2)
+    outside = np.asarray(outside, dtype=bool)
+    duration = float(times[-1] - times[0]) if len(times) > 1 else 0.0
+    dt = np.diff(times, append=times[-1] if len(times) else 0.0)
+
+    # An excursion starts when the subject leaves the box and ends when it stayed inside for SETTLE_HOLD_S
+    starts = np.flatnonzero(outside & ~np.concatenate([[False], outside[:-1]]))
+    settle_times = []
+    overshoots = []
+    unsettled = 0
+    for index, start in enumerate(starts):
+        end = starts[index + 1] if index + 1 < len(starts) else len(times)
+        inside = np.flatnonzero(~outside[start:end]) + start
+        settled_at = None
+        for candidate in inside:
+            if times[end - 1] - times[candidate] < SETTLE_HOLD_S:
+                break
+            hold = (times[start:end] >= times[candidate]) & (
+                times[start:end] < times[candidate] + SETTLE_HOLD_S
+            )
+            if not outside[start:end][hold].any():
+                settled_at = candidate
+                break
+        if settled_at is None:
+            unsettled += 1
+        else:
+            settle_times.append(times[settled_at] - times[start])
+        # Overshoot is how far the camera went past the subject, against the error it started correcting
+        sign = np.sign(errors[start])
+        past = -(errors[start:end] * sign)
+        overshoots.append(float(max(0.0, past.max(initial=0.0))))
+
+    return {
+        "duration_s": duration,
+        "settle_time_mean_s": float(np.mean(settle_times)) if settle_times else None,
+        "settle_time_max_s": float(np.max(settle_times)) if settle_times else None,
+        "unsettled_excursions": unsettled,
+        "overshoot_max_deg": max(overshoots) if overshoots else 0.0,
+        "time_outside_s": float(dt[outside].sum()),
+        "time_outside_fraction": float(dt[outside].sum() / duration)
+        if duration > 0
+        else 0.0,
+        "mean_abs_error_deg": float(np.abs(errors).mean()) if len(errors) else 0.0,
+        "commands": commands,
+        "commands_per_second": commands / duration if duration > 0 else 0.0,
+    }
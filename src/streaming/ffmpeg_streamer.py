@@ -4,7 +4,7 @@ import subprocess
 import threading
 import time
 import uuid
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from typing import Callable
 
 import cv2
@@ -14,6 +14,9 @@ from loguru import logger
 from src.streaming.stream_controller import StreamConfig, StreamController
 from src.utils import add_termination_handler, remove_termination_handler
 
+# Frame rate the stream is paced at when the config does not set one
+DEFAULT_FPS = 30
+
 
 @dataclass
 class FfmpegStreamConfig(StreamConfig):
@@ -29,7 +32,29 @@ class FfmpegStreamConfig(StreamConfig):
     loglevel: str = "warning"
 
 
+@dataclass
+class FfmpegStreamStats:
+    # Frames written to the ffmpeg pipe
+    frames_written: int = 0
+    # Ticks the frame getter had no new frame for, nothing is written on them
+    frames_missing: int = 0
+    # Ticks missed because writing to the pipe took longer than a frame period
+    frames_dropped: int = 0
+    # Time spent blocked writing to the pipe
+    stall_s: float = 0.0
+    max_stall_s: float = 0.0
+
+
 class FfmpegStreamController(StreamController):
+    """
+    Pipes frames to ffmpeg at the configured fps.
+
+    Every frame period the frame getter is asked for a frame once. Nothing is written on ticks where it returns
+    None, or the same array as last time for getters that cache their latest frame. ffmpeg timestamps the input by
+    wall clock and is not guaranteed to fill those ticks in. Frames are written from a memoryview of the array,
+    without copying them.
+    """
+
     def __init__(
         self,
         frame_getter: Callable[[], np.ndarray | None],
@@ -42,6 +67,11 @@ class FfmpegStreamController(StreamController):
         self._stop_event = threading.Event()
         self._stderr_thread: threading.Thread | None = None
         self._term_id: int | None = None
+        self.stats = FfmpegStreamStats()
+
+    @property
+    def fps(self) -> int:
+        return self._config.fps or DEFAULT_FPS
 
     def start(self) -> None:
         if self._process is not None:
@@ -56,8 +86,11 @@ class FfmpegStreamController(StreamController):
         command = self._build_command(width, height)
 
         logger.info("Starting ffmpeg stream: {}", " ".join(command))
+        self.stats = FfmpegStreamStats()
+        # Unbuffered, frames go straight from the array to the pipe
         self._process = subprocess.Popen(
             command,
+            bufsize=0,
             stdin=subprocess.PIPE,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.PIPE,
@@ -104,6 +137,9 @@ class FfmpegStreamController(StreamController):
     def is_running(self) -> bool:
         return self._process is not None and self._process.poll() is None
 
+    def get_stats(self) -> dict[str, int | float]:
+        return asdict(self.stats)
+
     def _wait_for_frame(self, timeout_s: float = 5.0) -> np.ndarray:
         deadline = time.monotonic() + timeout_s
         while time.monotonic() < deadline:
@@ -114,28 +150,60 @@ class FfmpegStreamController(StreamController):
         raise RuntimeError("Timed out waiting for a video frame")
 
     def _stream_loop(self, width: int, height: int) -> None:
-        logger.info("Entering ffmpeg stream loop with frame size {}x{}", width, height)
+        logger.info(
+            "Entering ffmpeg stream loop with frame size {}x{} at {} fps",
+            width,
+            height,
+            self.fps,
+        )
         assert self._process is not None
         assert self._process.stdin is not None
+        stdin = self._process.stdin
+        stats = self.stats
+        period = 1 / self.fps
+        last_frame: np.ndarray | None = None
+        next_deadline = time.monotonic()
 
         while not self._stop_event.is_set():
+            wait = next_deadline - time.monotonic()
+            if wait > 0 and self._stop_event.wait(wait):
+                break
+            next_deadline += period
+
             frame = self._frame_getter()
-            if frame is None:
-                time.sleep(0.01)
-                continue
+            if frame is None or frame is last_frame:
+                stats.frames_missing += 1
+            else:
+                last_frame = frame
+                if frame.shape[0] != height or frame.shape[1] != width:
+                    frame = cv2.resize(frame, (width, height))
+                started = time.monotonic()
+                try:
+                    self._write_frame(stdin, frame)
+                except (BrokenPipeError, ValueError):
+                    logger.error("ffmpeg stdin closed; stopping stream")
+                    break
+                stall = time.monotonic() - started
+                stats.frames_written += 1
+                stats.stall_s += stall
+                stats.max_stall_s = max(stats.max_stall_s, stall)
 
-            if frame.shape[0] != height or frame.shape[1] != width:
-                frame = cv2.resize(frame, (width, height))
-
-            try:
-                self._process.stdin.write(frame.tobytes())
-                self._process.stdin.flush()
-            except BrokenPipeError:
-                logger.error("ffmpeg stdin closed; stopping stream")
-                break
+            # Skip the ticks a slow write overran instead of bursting frames to catch up
+            behind = time.monotonic() - next_deadline
+            if behind >= period:
+                missed = int(behind // period)
+                stats.frames_dropped += missed
+                next_deadline += missed * period
 
         self._stop_event.set()
 
+    @staticmethod
+    def _write_frame(stdin, frame: np.ndarray) -> None:
+        view = memoryview(np.ascontiguousarray(frame)).cast("B")
+        while view:
+            written = stdin.write(view)
+            view = view[written:]
+
     def _build_command(self, width: int, height: int) -> list[str]:
         cfg = self._config
 
@@ -147,6 +215,10 @@ class FfmpegStreamController(StreamController):
             "bgr24",
             "-s",
             f"{width}x{height}",
+            "-r",
+            str(self.fps),
+            "-use_wallclock_as_timestamps",
+            "1",
             "-fflags",
             "nobuffer",
             "-flags",
@@ -162,6 +234,8 @@ class FfmpegStreamController(StreamController):
             cfg.preset or "ultrafast",
             "-tune",
             cfg.tune or "zerolatency",
+            "-r",
+            str(self.fps),
         ]
 
         if cfg.output_url.startswith("rtsp://"):
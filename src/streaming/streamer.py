@@ -3,7 +3,7 @@ from enum import Enum
 import cv2
 from loguru import logger
 
-from ..connection.connection import ConnectionCollection
+from ..connection.connection import Connection, ConnectionCollection
 from ..utils import calculate_acceptable_box, calculate_center_bbox
 
 
@@ -14,13 +14,14 @@ class BBOX_COLOR(Enum):
     CYAN = (0, 150, 150)
 
 
-def draw_visuals(bboxes, frame):  # -> Any:
+def draw_visuals(bboxes, frame, acceptable_box=None):  # -> Any:
     """
     Draws all the visuals we need on the frame. Rectangles around bounding boxes, circles in the middle, acceptable box for director, red dot for speaker.
 
     Parameters:
     - bounding_box - bounding boxes from capture frame
     - frame - frame to draw on
+    - acceptable_box - precomputed acceptable box of the connection, the default one when None
     """
     # Draw the acceptable box
     frame_height = frame.shape[0]
@@ -30,7 +31,7 @@ def draw_visuals(bboxes, frame):  # -> Any:
         acceptable_box_top,
         acceptable_box_right,
         acceptable_box_bottom,
-    ) = calculate_acceptable_box(frame_width, frame_height)
+    ) = acceptable_box or calculate_acceptable_box(frame_width, frame_height)
     cv2.rectangle(
         frame,
         (acceptable_box_left, acceptable_box_top),
@@ -56,6 +57,10 @@ def draw_visuals(bboxes, frame):  # -> Any:
     return frame
 
 
+def _acceptable_box(conn: Connection, frame):
+    return conn.snapshot_for_shape(frame.shape).acceptable_box
+
+
 class Streamer:
     draw_bboxes: bool
 
@@ -73,7 +78,7 @@ class Streamer:
                 and self.draw_bboxes
                 and (bboxes := conn.get_bboxes()) is not None
             ):
-                frame = draw_visuals(bboxes, frame)
+                frame = draw_visuals(bboxes, frame, _acceptable_box(conn, frame))
             return frame
         else:
             logger.error(f"Connection to {hostname} does not exist")
@@ -89,7 +94,7 @@ class Streamer:
                 and self.draw_bboxes
                 and (bboxes := active_conn.get_bboxes()) is not None
             ):
-                frame = draw_visuals(bboxes, frame)
+                frame = draw_visuals(bboxes, frame, _acceptable_box(active_conn, frame))
             return frame
         else:
             logger.warning("No active connection found.")
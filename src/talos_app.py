@@ -9,7 +9,7 @@ from . import config
 from .config.schema.robot import ConnectionConfig
 from .connection.connection import Connection, ConnectionCollection, VideoConnection
 from .connection.publisher import Direction
-from .directors import BaseDirector, ContinuousDirector
+from .directors import BaseDirector, ContinuousDirector, PIDDirector
 from .scheduler import IterativeTask, Scheduler
 from .streaming.streamer import Streamer
 from .thread_scheduler import ThreadScheduler
@@ -57,9 +57,12 @@ class App:
         self.streamer = Streamer(
             self.connections, draw_bboxes=args.draw_bboxes if args else False
         )
-        self.director = ContinuousDirector(
-            self.tracker, self.connections, self.scheduler
+        director_class = (
+            PIDDirector
+            if config.APP_SETTINGS.auto_director == "pid"
+            else ContinuousDirector
         )
+        self.director = director_class(self.tracker, self.connections, self.scheduler)
         if args:
             if args.connection is not None:
                 self.open_connection(args.connection)
@@ -242,8 +245,7 @@ class App:
                 f"Model option was not found skipping initialization({option=})"
             )
             return False
-        model_class = USABLE_MODELS[option]
-        self.tracker.swap_model(model_class)
+        self.tracker.swap_model(USABLE_MODELS[option])
         logger.info(f"Initialized {option} model")
         self.model_selection = option
         return True
@@ -309,6 +311,7 @@ class App:
             return logger.error("No active connection found for streaming")
         if fps is None:
             fps = cfg.fps
+        stream_config = {**stream_config, "fps": stream_config.get("fps") or fps}
         if self._streamer is not None:
             self._streamer.stop()
             self._streamer = None
@@ -336,3 +339,36 @@ class App:
 
     def get_tracker_output_fps(self) -> float:
         return self.tracker.get_output_fps()
+
+    def get_tracker_input_height(self) -> int:
+        return self.tracker.get_model_input_height()
+
+    def get_tracker_latency(self) -> float:
+        return self.tracker.get_detection_latency()
+
+    def get_director_latency_metrics(
+        self, hostname: str | None = None
+    ) -> dict[str, float | None]:
+        """End-to-end delay and latency compensation of the director for a host, defaults to the active host"""
+        hostname = hostname or self.get_active_hostname()
+        if self.director is None or hostname is None:
+            return {}
+        return self.director.get_latency_metrics(hostname)
+
+    def get_operator_latency_metrics(
+        self, hostname: str | None = None
+    ) -> dict[str, dict[str, float | int]]:
+        """Round trip time to the operator per command type for a host, defaults to the active host"""
+        hostname = hostname or self.get_active_hostname()
+        if hostname is None or (conn := self.connections.get(hostname)) is None:
+            return {}
+        return conn.publisher.get_latency_stats()
+
+    def get_operator_queue_metrics(
+        self, hostname: str | None = None
+    ) -> dict[str, float | int]:
+        """Outbound command queue depth and send latency for a host, defaults to the active host"""
+        hostname = hostname or self.get_active_hostname()
+        if hostname is None or (conn := self.connections.get(hostname)) is None:
+            return {}
+        return conn.publisher.get_queue_stats()
@@ -8,6 +8,7 @@ from fastapi import Depends, FastAPI, HTTPException
 from fastapi.responses import RedirectResponse
 from loguru import logger
 
+from src.flight_recorder import get_flight_recorder
 from src.talos_app import App as TalosApp
 
 from .connection.connection import ConnectionCollection
@@ -184,6 +185,14 @@ async def stop_stream(context: Context = Depends(ctx)):
     return {"status": "stopped"}
 
 
+@app.post("/flight-recorder/dump")
+async def dump_flight_recorder():
+    """Copy the flight recorder ring to a time stamped file, see src/flight_recorder.py"""
+    if (recorder := get_flight_recorder()) is None:
+        raise HTTPException(status_code=503, detail="Flight recorder is not running")
+    return {"status": "dumped", "path": recorder.dump()}
+
+
 class TalosEndpoint:
     thread: threading.Thread
 
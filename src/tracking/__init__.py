@@ -1,3 +1,3 @@
-from .options import MODEL_OPTIONS, USABLE_MODELS, ModelOption
+from .options import MODEL_OPTIONS, USABLE_MODELS, ModelDescriptor, ModelOption
 
-__all__ = ["ModelOption", "MODEL_OPTIONS", "USABLE_MODELS"]
+__all__ = ["ModelDescriptor", "ModelOption", "MODEL_OPTIONS", "USABLE_MODELS"]
@@ -0,0 +1,3 @@
+from .cascade_model import CascadeModel, EscalationReason
+
+__all__ = ["CascadeModel", "EscalationReason"]
@@ -0,0 +1,82 @@
+from enum import StrEnum
+
+from loguru import logger
+
+from src.tracking.detector import WARMUP_ITERATIONS, ObjectModel
+from src.tracking.types import BBox
+
+STATS_LOG_INTERVAL = 300
+
+
+class EscalationReason(StrEnum):
+    LOW_CONFIDENCE = "low_confidence"
+    COUNT_CHANGED = "count_changed"
+    REFRESH = "refresh"
+
+
+class CascadeModel(ObjectModel):
+    """
+    Runs a cheap model on every frame and only escalates to a more accurate model when the cheap result looks unreliable:
+    - the lowest confidence of the cheap detections drops below `min_confidence`
+    - the number of cheap detections changes from the previous frame (someone entered or left, or a false positive)
+    - `refresh_interval` frames went by without an escalation
+
+    Both models are constructed once and stay warm inside the detection process, so escalating costs one inference of the
+    larger model and no load time. Subclasses pick the pair by setting `cheap_model_class` and `accurate_model_class`.
+    """
+
+    cheap_model_class: type[ObjectModel]
+    accurate_model_class: type[ObjectModel]
+    min_confidence: float = 0.5
+    refresh_interval: int = 30
+
+    def __init__(self):
+        self.cheap_model = self.cheap_model_class()
+        self.accurate_model = self.accurate_model_class()
+        self.frames_since_refresh = 0
+        self.last_cheap_count: int | None = None
+        self.frame_count = 0
+        self.escalation_counts = {reason: 0 for reason in EscalationReason}
+
+    def warmup(self, shape, iterations=WARMUP_ITERATIONS):
+        self.cheap_model.warmup(shape, iterations)
+        self.accurate_model.warmup(shape, iterations)
+
+    def detect_person(self, frame) -> list[BBox]:
+        bboxes, _ = self.detect_with_scores(frame)
+        return bboxes
+
+    def detect_with_scores(self, frame) -> tuple[list[BBox], list[float]]:
+        bboxes, scores = self.cheap_model.detect_with_scores(frame)
+        reason = self.get_escalation_reason(scores)
+        self.last_cheap_count = len(bboxes)
+        self.frame_count += 1
+        if reason is not None:
+            self.escalation_counts[reason] += 1
+            self.frames_since_refresh = 0
+            bboxes, scores = self.accurate_model.detect_with_scores(frame)
+        else:
+            self.frames_since_refresh += 1
+        if self.frame_count % STATS_LOG_INTERVAL == 0:
+            logger.debug(
+                f"Cascade escalated {self.escalation_rate() * 100:.1f}% of {self.frame_count} frames: {self.escalation_counts}"
+            )
+        return bboxes, scores
+
+    def get_escalation_reason(self, scores: list[float]) -> EscalationReason | None:
+        """Decides from the cheap model output whether the accurate model should run on this frame."""
+        if len(scores) > 0 and min(scores) < self.min_confidence:
+            return EscalationReason.LOW_CONFIDENCE
+        if self.last_cheap_count is not None and len(scores) != self.last_cheap_count:
+            return EscalationReason.COUNT_CHANGED
+        if (
+            self.last_cheap_count is None
+            or self.frames_since_refresh >= self.refresh_interval
+        ):
+            return EscalationReason.REFRESH
+        return None
+
+    def escalation_rate(self) -> float:
+        if self.frame_count == 0:
+            return 0.0
+        return sum(self.escalation_counts.values()) / self.frame_count
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from multiprocessing import Event, Process, Queue, shared_memory, synchronize
+from multiprocessing import Event, Process, Queue, Value, shared_memory, synchronize
 from multiprocessing.managers import SharedMemoryManager
 from queue import Empty, Full
 from typing import TYPE_CHECKING, Callable
@@ -12,6 +13,7 @@ import numpy as np
 from loguru import logger
 
 from src.logger import configure_logger
+from src.tracking.resolution_tuner import ResolutionTuner
 from src.tracking.types import BBox, BBoxMapping, Frame
 from src.utils import add_termination_handler, remove_termination_handler
 
@@ -21,6 +23,7 @@ if TYPE_CHECKING:
         ConnectionCollection,
         ConnectionCollectionEvent,
     )
+    from src.tracking.options import ModelDescriptor
 
 
 class DetectionWaitingForModel(Exception):
@@ -43,6 +46,9 @@ class FrameSizeData:
 
 type FrameSizeDeterminer = Callable[[np.ndarray, int, int | None], Frame]
 
+WARMUP_ITERATIONS = 2
+"""Number of dummy frames the detection worker runs through the model before it signals ready."""
+
 
 class ObjectModel(ABC):
     """
@@ -50,11 +56,39 @@ class ObjectModel(ABC):
     The reason why this is separated is due to the fact that this will be running in a separate process.
     """
 
+    # (min, max) input height the detection process may resize frames to in order to meet the latency budget.
+    # Models that set this must read their input height from `inHeight`. None disables tuning.
+    input_height_bounds: tuple[int, int] | None = None
+    inHeight: int | None = None
+
     # Capture a frame from the source
     @abstractmethod
     def detect_person(self, frame) -> list[BBox]:
         raise NotImplementedError()
 
+    def detect_with_scores(self, frame) -> tuple[list[BBox], list[float]]:
+        """
+        Same as detect_person but also returns a confidence score (0.0 to 1.0) for each bounding box.
+        Models that do not produce a confidence report 1.0 for every box.
+        """
+        bboxes = self.detect_person(frame)
+        return bboxes, [1.0] * len(bboxes)
+
+    def detect_batch_with_scores(
+        self, frames: list[np.ndarray]
+    ) -> list[tuple[list[BBox], list[float]]]:
+        """Runs detect_with_scores on several frames. Override this if the model can infer a batch in one call."""
+        return [self.detect_with_scores(frame) for frame in frames]
+
+    def warmup(self, shape: tuple[int, ...], iterations: int = WARMUP_ITERATIONS):
+        """
+        Runs the model on dummy frames of the given shape so lazy initialization (graph building, kernel selection, memory allocation)
+        happens before the first real frame arrives. Override this if the model keeps state between frames that dummy frames would pollute.
+        """
+        dummy = np.zeros(shape, dtype=np.uint8)
+        for _ in range(iterations):
+            self.detect_person(dummy)
+
     @classmethod
     def determine_frame_size(
         cls, frame, inHeight: int | float, inWidth: int | float | None = None
@@ -135,21 +169,36 @@ class DetectorInterface(ABC):
 class Detector(DetectorInterface):
     connections: ConnectionCollection
     frame_order: list[tuple[str, int]] = []
-    model: ObjectModel.__class__ | None
+    model: ModelDescriptor | None
     _smm: SharedMemoryManager
     _detection_process: Process | None = None
-    _bbox_queue: Queue[list[BBox] | None]
+    # (capture time of the frame, detections)
+    _bbox_queue: Queue[tuple[float, list[BBox] | None]]
     _model_stopper: synchronize.Event
     _frame_ready_event: synchronize.Event
+    _model_ready_event: synchronize.Event
     _frame_memory: shared_memory.SharedMemory | None = None
 
     def __init__(
         self,
-        model: ObjectModel.__class__ | None,
+        model: ModelDescriptor | None,
         connections: ConnectionCollection,
         smm: SharedMemoryManager = SharedMemoryManager(),
+        latency_budget_ms: float | None = None,
     ):
+        """
+        Args:
+            latency_budget_ms (float | None, optional): Detection latency per frame the model input size is tuned to. Defaults to None (no tuning).
+        """
         self.model = model
+        self.latency_budget_ms = latency_budget_ms
+        # Written by the detection process, 0 until the first frame is processed
+        self._input_height = Value("i", 0)
+        self._detection_latency_ms = Value("d", 0.0)
+        # Set by the detection process while the resolution tuner is still changing the model input size
+        self._tuning_resolution = Value("b", 0)
+        # Capture time of the frame in the frame buffer, read by the detection process with the frame
+        self._frame_time = Value("d", 0.0)
         self.connections = connections
         self.connections.add_listener(self.on_connections_update)
         self.frame_order = self._create_frame_order(connections)
@@ -164,6 +213,7 @@ class Detector(DetectorInterface):
         self._bbox_queue = Queue(maxsize=2)
         self._model_stopper = Event()
         self._frame_ready_event = Event()
+        self._model_ready_event = Event()
         total_shape = self.total_frame_shape(self.connections)
         # idk why but gc keeps deleting shared memory without me holding reference via "self."
         self._frame_memory = self._smm.SharedMemory(size=self.total_nbytes())
@@ -182,9 +232,15 @@ class Detector(DetectorInterface):
                 self._bbox_queue,
                 self._model_stopper,
                 self._frame_ready_event,
+                self._model_ready_event,
                 self._frame_memory,
                 total_shape,
                 np.uint8,
+                self.latency_budget_ms,
+                self._input_height,
+                self._detection_latency_ms,
+                self._frame_time,
+                self._tuning_resolution,
             ),
             daemon=True,
         )
@@ -247,6 +303,10 @@ class Detector(DetectorInterface):
             self.reset_frame_order()
 
     def send_input(self):
+        if not self._model_ready_event.is_set():
+            raise DetectionWaitingForModel(
+                "Detection process is still warming up the model, please wait and try again."
+            )
         if self._frame_ready_event.is_set():
             if not self.waiting_startup:
                 raise SendingFrameTooFast(
@@ -259,18 +319,23 @@ class Detector(DetectorInterface):
             (host, _) = self.frame_order[0]
             conn = self.connections[host]
             video_conn = conn.video_connection
-            self.new_frame = video_conn.get_frame() if video_conn is not None else None
+            self.new_frame, frame_time = (
+                video_conn.get_frame_with_time()
+                if video_conn is not None
+                else (None, None)
+            )
             if self.new_frame is not None and not self._frame_ready_event.is_set():
                 np.copyto(self._frame_buf, self.new_frame)
+                self._frame_time.value = frame_time or time.time()
                 self._frame_ready_event.set()
             return
 
-        frames = [
-            video_conn.get_frame()
+        captures = [
+            video_conn.get_frame_with_time()
             for host, _ in self.frame_order
             if (video_conn := self.connections[host].video_connection) is not None
         ]
-        frames = [f for f in frames if f is not None]
+        frames = [f for f, _ in captures if f is not None]
         if len(frames) == 0:
             logger.warning(
                 f"No frames available to update frame buffer. {frames=} {self.frame_order=}"
@@ -291,6 +356,11 @@ class Detector(DetectorInterface):
         ]
         hstack = np.hstack(resized_frames)
         np.copyto(self._frame_buf, hstack)
+        # The stacked frame is as old as its oldest part
+        self._frame_time.value = min(
+            (t for f, t in captures if f is not None and t is not None),
+            default=time.time(),
+        )
         self._frame_ready_event.set()
 
     def get_bboxes(self) -> BBoxMapping:
@@ -300,7 +370,7 @@ class Detector(DetectorInterface):
         Throws ValueError if the bbox queue is closed.
         """
         try:
-            raw_bboxes: None | list[BBox] = self._bbox_queue.get(block=False)
+            frame_time, raw_bboxes = self._bbox_queue.get(block=False)
         except (ValueError, Empty) as e:
             if self.waiting_startup:
                 raise DetectionWaitingForModel(
@@ -316,10 +386,11 @@ class Detector(DetectorInterface):
         if self.waiting_startup:
             self.waiting_startup = False
             logger.info("Model loaded, starting to poll bounding boxes.")
+        frame_time = frame_time or None  # 0 when the capture time is unknown
 
         if 1 == len(self.frame_order):
             (host, _) = self.frame_order[0]
-            self.connections[host].set_bboxes(raw_bboxes)
+            self.connections[host].set_bboxes(raw_bboxes, frame_time)
             return {host: raw_bboxes}
 
         bboxes_by_host: BBoxMapping = {host: [] for host, _ in self.frame_order}
@@ -339,7 +410,7 @@ class Detector(DetectorInterface):
                     )
 
         for host, bboxes in bboxes_by_host.items():
-            self.connections[host].set_bboxes(bboxes)
+            self.connections[host].set_bboxes(bboxes, frame_time)
         return bboxes_by_host
 
     def is_running(self):
@@ -347,9 +418,30 @@ class Detector(DetectorInterface):
             self._detection_process is not None and self._detection_process.is_alive()
         )
 
-    def set_model(self, model: ObjectModel.__class__ | None):
+    def is_model_ready(self) -> bool:
+        """Returns True once the detection process has loaded and warmed up the model."""
+        return self.is_running() and self._model_ready_event.is_set()
+
+    def get_worker_pid(self) -> int | None:
+        if self._detection_process is None:
+            return None
+        return self._detection_process.pid
+
+    def get_input_height(self) -> int:
+        """Input height the model currently resizes frames to, 0 if unknown or the model does not resize."""
+        return self._input_height.value
+
+    def get_detection_latency_ms(self) -> float:
+        """Smoothed detection latency per frame measured in the detection process."""
+        return self._detection_latency_ms.value
+
+    def is_tuning_resolution(self) -> bool:
+        """Whether the resolution tuner is still changing the model input size to meet the latency budget."""
+        return bool(self._tuning_resolution.value)
+
+    def set_model(self, model: ModelDescriptor | None):
         self.model = model
-        logger.info(f"Model set to {model.__name__ if model is not None else 'None'}")
+        logger.info(f"Model set to {model.name if model is not None else 'None'}")
         if self.is_running() and model is not None:
             self.restart()
         if self.is_running() and model is None:
@@ -398,21 +490,59 @@ class Detector(DetectorInterface):
 
     @staticmethod
     def _detect_person_worker(
-        model_class,
+        model_descriptor: ModelDescriptor | None,
         bbox_queue: Queue,
         stopper,
         frame_ready_event: synchronize.Event,
+        model_ready_event: synchronize.Event,
         frame_mem: shared_memory.SharedMemory,
         frame_shape,
         frame_dtype,
+        latency_budget_ms: float | None = None,
+        input_height=None,
+        detection_latency_ms=None,
+        frame_time=None,
+        tuning_resolution=None,
     ) -> None:
         configure_logger(process_name="detection_process", remove_existing=True)
         logger.info("Detection process started.")
-        if model_class is None:
+        if model_descriptor is None:
             logger.error("Model was not found please pass a model into Tracker to run.")
             return
         frame = np.ndarray(frame_shape, dtype=frame_dtype, buffer=frame_mem.buf)
+        # Heavy model dependencies are only ever imported here, inside the detection process
+        try:
+            model_class = model_descriptor.load()
+        except Exception:
+            logger.exception(f"Failed to import model {model_descriptor.name}")
+            return
         model: ObjectModel = model_class()
+        warmup_start = time.perf_counter()
+        try:
+            model.warmup(frame_shape)
+            logger.info(
+                f"Model warm-up took {(time.perf_counter() - warmup_start) * 1000:.1f}ms"
+            )
+        except Exception as e:
+            logger.warning(f"Model warm-up failed, continuing without it: {e}")
+        tuner = None
+        if (
+            latency_budget_ms is not None
+            and model.input_height_bounds is not None
+            and model.inHeight is not None
+        ):
+            tuner = ResolutionTuner(
+                model.inHeight, *model.input_height_bounds, budget_ms=latency_budget_ms
+            )
+            logger.info(
+                f"Tuning model input height within {model.input_height_bounds} for a {latency_budget_ms:.1f}ms budget"
+            )
+        if input_height is not None:
+            input_height.value = model.inHeight or 0
+        if tuning_resolution is not None:
+            tuning_resolution.value = tuner is not None and tuner.adjusting
+        latency_ewma = None
+        model_ready_event.set()
         try:
             while not stopper.is_set():
                 if not frame_ready_event.wait(0.1):
@@ -420,12 +550,30 @@ class Detector(DetectorInterface):
                     continue
                 # Not clear immediately to make a copy here safely
                 raw_frame = np.copy(frame)
+                raw_frame_time = frame_time.value if frame_time is not None else 0.0
                 frame_ready_event.clear()
+                detect_start = time.perf_counter()
                 try:
                     bboxes = model.detect_person(frame=raw_frame)
                 except Exception as e:
                     logger.error(f"Error during detection: {e}")
                     continue
+                latency = (time.perf_counter() - detect_start) * 1000
+                if tuner is not None:
+                    model.inHeight = tuner.update(latency)
+                    latency_ewma = tuner.latency_ms
+                    if input_height is not None:
+                        input_height.value = model.inHeight
+                    if tuning_resolution is not None:
+                        tuning_resolution.value = tuner.adjusting
+                else:
+                    latency_ewma = (
+                        latency
+                        if latency_ewma is None
+                        else latency_ewma + 0.2 * (latency - latency_ewma)
+                    )
+                if detection_latency_ms is not None:
+                    detection_latency_ms.value = latency_ewma
                 if bbox_queue.full():
                     logger.warning("bbox_queue is full, deleting oldest output")
                     try:
@@ -433,7 +581,7 @@ class Detector(DetectorInterface):
                     except Empty:
                         pass  # This sometimes happens just ignore it since we just wanted to make space in the queue
                 try:
-                    bbox_queue.put_nowait(bboxes)
+                    bbox_queue.put_nowait((raw_frame_time, bboxes))
                 except Full:
                     logger.warning("bbox_queue is full, skipping frame")
             else:
@@ -2,6 +2,7 @@ import cv2
 
 from assets import join_paths
 from src.tracking.detector import ObjectModel
+from src.tracking.tiling import TiledModel
 
 from ..types import BBox
 
@@ -9,14 +10,27 @@ MODEL_FILE = join_paths("haarcascade_frontalface_default.xml")
 
 
 class BasicModel(ObjectModel):
+    inHeight = 500
+    inWidth = None
+    input_height_bounds = (240, 1080)
+
     # The tracker class is responsible for capturing frames from the source and detecting faces in the frames
     def __init__(self):
         self.faceCascade = cv2.CascadeClassifier(MODEL_FILE)
 
     # Detect faces in the frame
-    def detect_person(self, frame, inHeight=500, inWidth=None):
+    def detect_person(self, frame, inHeight=None, inWidth=None):
         frameGray, meta = self.resize_frame(
-            frame, inHeight, inWidth, cvtColorCode=cv2.COLOR_BGR2GRAY
+            frame,
+            inHeight or self.inHeight,
+            inWidth or self.inWidth,
+            cvtColorCode=cv2.COLOR_BGR2GRAY,
         )
         faces: list[BBox] = self.faceCascade.detectMultiScale(frameGray)  # pyright: ignore[reportAssignmentType]
         return [self.fix_bbox_scale(self.xywh_to_xyxy(xywh), meta) for xywh in faces]
+
+
+class BasicTiledModel(TiledModel):
+    """Face detection over full resolution tiles, for high resolution streams"""
+
+    base_model_class = BasicModel
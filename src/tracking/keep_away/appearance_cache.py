@@ -0,0 +1,136 @@
+import cv2
+import numpy as np
+
+from src.tracking.types import BBox
+
+
+def get_appearance_embedding(
+    image: np.ndarray, bins: tuple[int, int, int] = (16, 4, 4)
+) -> np.ndarray:
+    """
+    Builds a compact appearance descriptor for a cropped region of a person.
+
+    The descriptor is a multi-bin HSV histogram, L1 normalized and square rooted so that
+    the euclidean distance between two descriptors is sqrt(2) times their Hellinger distance (0 to sqrt(2)).
+
+    Parameters:
+    - image: cropped region (H x W x 3) in BGR
+    - bins: number of bins for the hue, saturation and value channels
+    """
+    image = cv2.resize(image, (32, 64), interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1, 2], None, list(bins), [0, 180, 0, 256, 0, 256])
+    hist = hist.flatten()
+    total = hist.sum()
+    if total > 0:
+        hist /= total
+    return np.sqrt(hist, dtype=np.float32)
+
+
+def get_torso_crop(bbox: BBox, frame: np.ndarray) -> np.ndarray:
+    """
+    Crops the torso of a person bounding box, which is the most stable region for appearance matching.
+    """
+    x1, y1, x2, y2 = (int(v) for v in bbox)
+    height = y2 - y1
+    width = x2 - x1
+    top = max(0, y1 + int(height * 0.2))
+    bottom = max(0, y1 + int(height * 0.6))
+    left = max(0, x1 + int(width * 0.25))
+    right = max(0, x1 + int(width * 0.75))
+    return frame[top:bottom, left:right]
+
+
+class AppearanceCache:
+    """
+    Fixed size cache of appearance embeddings, one slot per identity.
+
+    All embeddings live in a single preallocated array so a set of candidate detections can be
+    compared against every cached identity with one vectorized distance computation.
+    When the cache is full the least recently matched identity is evicted.
+    """
+
+    def __init__(self, capacity: int = 8, dim: int = 16 * 4 * 4, momentum: float = 0.8):
+        """
+        Args:
+            capacity (int, optional): Maximum number of identities held. Defaults to 8.
+            dim (int, optional): Length of each embedding. Defaults to the size of the default HSV histogram.
+            momentum (float, optional): Weight of the stored embedding when blending in a new observation. Defaults to 0.8.
+        """
+        self.capacity = capacity
+        self.dim = dim
+        self.momentum = momentum
+        self._embeddings = np.zeros((capacity, dim), dtype=np.float32)
+        self._ids = np.full(capacity, -1, dtype=np.int64)
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._clock = 0
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._ids >= 0))
+
+    def __contains__(self, identity: int) -> bool:
+        return identity >= 0 and bool(np.any(self._ids == identity))
+
+    def clear(self) -> None:
+        self._ids[:] = -1
+        self._last_used[:] = 0
+
+    def add(self, embedding: np.ndarray) -> int:
+        """Stores a new identity and returns its id, evicting the least recently used one if needed."""
+        identity = self._next_id
+        self._next_id += 1
+        free = np.flatnonzero(self._ids < 0)
+        slot = int(free[0]) if len(free) > 0 else int(np.argmin(self._last_used))
+        self._embeddings[slot] = embedding
+        self._ids[slot] = identity
+        self._touch(slot)
+        return identity
+
+    def update(self, identity: int, embedding: np.ndarray) -> None:
+        """Blends a new observation into an existing identity and marks it as recently used."""
+        slots = np.flatnonzero(self._ids == identity)
+        if len(slots) == 0:
+            return
+        slot = int(slots[0])
+        blended = (
+            self.momentum * self._embeddings[slot] + (1 - self.momentum) * embedding
+        )
+        # Keep the blended histogram on the unit sphere so distances stay comparable
+        norm = np.linalg.norm(blended)
+        self._embeddings[slot] = blended / norm if norm > 0 else blended
+        self._touch(slot)
+
+    def distances(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Returns the (num_candidates x num_identities) distance matrix between the candidate embeddings
+        and all cached identities, with unused slots set to infinity.
+        """
+        embeddings = np.atleast_2d(embeddings).astype(np.float32, copy=False)
+        diff = embeddings[:, None, :] - self._embeddings[None, :, :]
+        dist = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+        dist[:, self._ids < 0] = np.inf
+        return dist
+
+    def match(
+        self, embeddings: np.ndarray, threshold: float, identity: int | None = None
+    ) -> tuple[int, int] | None:
+        """
+        Finds the closest (candidate index, identity) pair below the threshold.
+        If identity is given only that identity is considered.
+        Returns None if nothing matched.
+        """
+        if len(embeddings) == 0 or len(self) == 0:
+            return None
+        dist = self.distances(embeddings)
+        if identity is not None:
+            dist[:, self._ids != identity] = np.inf
+        candidate, slot = np.unravel_index(np.argmin(dist), dist.shape)
+        if not dist[candidate, slot] < threshold:
+            return None
+        self._touch(int(slot))
+        return int(candidate), int(self._ids[slot])
+
+    def _touch(self, slot: int) -> None:
+        self._clock += 1
+        self._last_used[slot] = self._clock
@@ -3,6 +3,7 @@ import time
 from loguru import logger
 
 import src.config as config
+from src.connection.config_snapshot import ConnectionSnapshot
 from src.connection.publisher import Publisher
 from src.directors.base_director import BaseDirector
 from src.utils import (
@@ -21,7 +22,13 @@ class KeepAwayDirector(BaseDirector):
 
     # This method is called to process each frame
     def process_frame(
-        self, hostname: str, bounding_box: list, frame_shape, publisher: Publisher
+        self,
+        hostname: str,
+        bounding_box: list,
+        frame_shape,
+        publisher: Publisher,
+        geometry=None,
+        snapshot: ConnectionSnapshot | None = None,
     ) -> None:
         """
         Based on received bounding box, this method tells the arm where to move the keep the subject in the acceptable box..
@@ -29,7 +36,12 @@ class KeepAwayDirector(BaseDirector):
         Then it sends a polar pan stop.
         """
         # Load config values
-        confirmation_delay = config.ROBOT_CONFIGS[hostname].confirmation_delay
+        if snapshot is None:
+            snapshot = ConnectionSnapshot.build(
+                config.ROBOT_CONFIGS[hostname], frame_shape
+            )
+        robot_config = snapshot.config
+        confirmation_delay = robot_config.confirmation_delay
 
         frame_height = frame_shape[0]
         frame_width = frame_shape[1]
@@ -8,6 +8,11 @@ from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
 
 from src.tracking.detector import ObjectModel
+from src.tracking.keep_away.appearance_cache import (
+    AppearanceCache,
+    get_appearance_embedding,
+    get_torso_crop,
+)
 from src.tracking.media_pipe.model_path import (
     path_efficientdet_lite0,
     path_pose_landmarker_lite,
@@ -19,8 +24,9 @@ from src.utils import calculate_acceptable_box
 class KeepAwayModel(ObjectModel):
     lost_counter = 0
     lost_threshold = 100
-    speaker_color = None
-    color_threshold = 15
+    speaker_id: int | None = None
+    # Euclidean distance between torso descriptors, sqrt(2) times the Hellinger distance
+    appearance_threshold = 0.35
     keep_away_mode = False
     countdown_start = None
     game_over = True
@@ -43,6 +49,7 @@ class KeepAwayModel(ObjectModel):
             # Additional options (e.g., running on CPU) can be specified here.
         )
         self.pose_detector = vision.PoseLandmarker.create_from_options(pose_options)
+        self.appearance_cache = AppearanceCache()
 
     # Detect people in the frame
     def detectPerson(self, object_detector, frame, inHeight=500, inWidth=None):
@@ -97,16 +104,36 @@ class KeepAwayModel(ObjectModel):
         """
         Finds all the people in the frame, and then decides what to send to the director.
         Looks for x pose to determine primary speaker.
-        Uses color matching to maintain that primary speaker.
+        Uses appearance matching to maintain that primary speaker, and to re-acquire a
+        previously locked speaker without the pose gate after they were lost.
         Sends primary speaker box to the director.
         """
         bboxes = self.detectPerson(self.object_detector, frame)
 
         if self.speaker_bbox is None or self.game_over is True:
+            # Before falling back to the pose gate, check if a cached speaker came back into frame.
+            if (
+                not self.game_over
+                and len(bboxes) > 0
+                and len(self.appearance_cache) > 0
+            ):
+                embeddings = self.get_embeddings(bboxes, frame)
+                match = self.appearance_cache.match(
+                    embeddings, self.appearance_threshold
+                )
+                if match is not None:
+                    index, identity = match
+                    self.speaker_id = identity
+                    self.speaker_bbox = bboxes[index]
+                    self.appearance_cache.update(identity, embeddings[index])
+                    self.lost_counter = 0
+                    logger.info(f"Speaker {identity} re-acquired: {self.speaker_bbox}")
+                    return [self.speaker_bbox]
+
             # If no speaker is locked in yet, look for the X pose.
             for box in bboxes:
                 bbox = box
-                x1, y1, x2, y2 = bbox
+                x1, y1, x2, y2 = (int(v) for v in bbox)
                 cropped = frame[y1:y2, x1:x2]
                 if cropped.size == 0:
                     continue
@@ -125,9 +152,8 @@ class KeepAwayModel(ObjectModel):
 
                 self.speaker_bbox = bbox
 
-                smaller_box = self.get_cropped_box(box, frame)
-                color = self.get_dominant_color(smaller_box)
-                self.speaker_color = color
+                embedding = self.get_embeddings([box], frame)[0]
+                self.speaker_id = self.appearance_cache.add(embedding)
                 self.countdown_start = time.time()
                 self.game_over = False
                 self.keep_away_mode = True
@@ -143,85 +169,42 @@ class KeepAwayModel(ObjectModel):
         # If frame is empty after detecting a speaker, increment the lost speaker counter
         # No detections
         self.lost_counter += 1
-        if len(bboxes) > 0:
-            # Speaker is already locked. Find the current detection that is
-            # closest to the stored speaker bbox. Based solely on color.
-            best_bbox = None
-            best_candidate_color = None
-
-            for bbox in bboxes:
-                smaller_box = self.get_cropped_box(bbox, frame)
-                color = self.get_dominant_color(smaller_box)
-                # Compute the Euclidean distance between the candidate color and the stored speaker color.
-                color_diff = abs((self.speaker_color or 0) - color)
-
-                if color_diff < self.color_threshold:
-                    best_bbox = bbox
-                    best_candidate_color = color
-
-            self.lost_counter += 1
-            if best_bbox is not None:
-                # Found a candidate that has similar color.
-                self.speaker_bbox = best_bbox
-                self.speaker_color = best_candidate_color
+        if len(bboxes) > 0 and self.speaker_id is not None:
+            # Speaker is already locked. Match every detection against the locked
+            # speaker's appearance in one pass and keep the closest one.
+            embeddings = self.get_embeddings(bboxes, frame)
+            match = self.appearance_cache.match(
+                embeddings, self.appearance_threshold, identity=self.speaker_id
+            )
+            if match is not None:
+                index, _ = match
+                self.speaker_bbox = bboxes[index]
+                self.appearance_cache.update(self.speaker_id, embeddings[index])
                 self.lost_counter = 0
 
         if self.lost_counter >= self.lost_threshold:
             logger.info("Speaker lost for too many frames. Resetting single speaker.")
+            # The identity stays in the appearance cache so it can be re-acquired later
             self.speaker_bbox = None
-            self.speaker_color = None
+            self.speaker_id = None
             self.lost_counter = 0
 
         return [self.speaker_bbox] if self.speaker_bbox is not None else []
 
-    def get_cropped_box(self, bbox, frame):
-        """
-        Get cropped box for color tracking. Takes a much smaller portion of the bbox to get most dominant color.
-
-        Parameters:
-        - bbox - Current bounding box we are looking at
-        - frame
-        """
-        x1, y1, x2, y2 = bbox
-
-        # Default crop is just middle of box, where t-shirt is
-        height = y2 - y1
-        width = x2 - x1
-        chest_start = y1 + int(height * 0.3)
-        chest_end = y1 + int(height * 0.5)
-        exclude_extra = x1 + int(width * 0.4)
-        exclude_extra2 = x1 + int(width * 0.6)
-        chest_crop = frame[chest_start:chest_end, exclude_extra:exclude_extra2]
-
-        return chest_crop
-
-    def get_dominant_color(self, image, quantize_level=16):
+    def get_embeddings(self, bboxes, frame) -> np.ndarray:
         """
-        Finds the most dominant color in an image using color quantization.
-
-        Parameters:
-        - image: cropped region (H x W x 3)
-        - quantize_level: smaller numbers = more grouping (e.g., 24, 32)
-
-        Returns:
-        - Dominant color as (B, G, R)
+        Returns the appearance embeddings of every bounding box as a (N x D) array.
+        Boxes with an empty torso crop get an all zero embedding, which never matches.
         """
-        # Resize to reduce noise and speed up
-
-        image = cv2.resize(image, (50, 50), interpolation=cv2.INTER_AREA)
-        # image = cv2.GaussianBlur(image, (5, 5), 0)
-
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        hue_channel = hsv[:, :, 0]  # Hue ranges from 0 to 179 in OpenCV
-
-        # Quantize hue values
-        quantized_hue = (hue_channel // quantize_level) * quantize_level
-
-        # Flatten and find the most common hue bin
-        unique_hues, counts = np.unique(quantized_hue.flatten(), return_counts=True)
-        dominant_hue = unique_hues[np.argmax(counts)]
-
-        return int(dominant_hue)
+        embeddings = np.zeros(
+            (len(bboxes), self.appearance_cache.dim), dtype=np.float32
+        )
+        for index, bbox in enumerate(bboxes):
+            crop = get_torso_crop(bbox, frame)
+            if crop.size == 0:
+                continue
+            embeddings[index] = get_appearance_embedding(crop)
+        return embeddings
 
     def draw_visuals(self, bounding_box, frame):
         h, w = frame.shape[:2]
@@ -19,6 +19,7 @@ def detection_result_to_xywh(detection_result) -> BBox:
 class MediaPipeModel(ObjectModel):
     inHeight = 500
     inWidth = None
+    input_height_bounds = (256, 720)
 
     # The tracker class is responsible for capturing frames from the source and detecting people in the frames
     def __init__(
@@ -33,12 +34,20 @@ class MediaPipeModel(ObjectModel):
         self.object_detector = vision.ObjectDetector.create_from_options(options)
 
     def detect_person(self, frame) -> list[BBox]:
+        bboxes, _ = self.detect_with_scores(frame)
+        return bboxes
+
+    def detect_with_scores(self, frame) -> tuple[list[BBox], list[float]]:
         frameRGB, size = self.resize_frame(frame, self.inHeight, self.inWidth)
         mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=frameRGB)
         detection_result = self.object_detector.detect(mp_image)
         bboxes = []
+        scores = []
         if detection_result:
             for detection in detection_result.detections:
                 xywh = detection_result_to_xywh(detection)
                 bboxes.append(self.fix_bbox_scale(self.xywh_to_xyxy(xywh), size))
-        return bboxes
+                scores.append(
+                    detection.categories[0].score if detection.categories else 1.0
+                )
+        return bboxes, scores
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from enum import StrEnum
+from functools import cache
 from importlib import import_module
 from importlib.util import find_spec
 from typing import TYPE_CHECKING
@@ -9,7 +11,6 @@ from loguru import logger
 
 if TYPE_CHECKING:
     from .detector import ObjectModel
-from .haar_cascade.basic_model import BasicModel
 
 
 class ModelOption(StrEnum):
@@ -18,69 +19,104 @@ class ModelOption(StrEnum):
     YOLO_MEDIUM = "yolo_medium"
     YOLO_LARGE = "yolo_large"
     YOLO_XLARGE = "yolo_xlarge"
+    YOLO_CASCADE = "yolo_cascade"
+    YOLO_NANO_TILED = "yolo_nano_tiled"
     MEDIAPIPE = "mediapipe"
     MEDIAPIPEPOSE = "mediapipepose"
     KEEPAWAY = "keepaway"
     BASIC = "basic"
+    BASIC_TILED = "basic_tiled"
 
 
-USABLE_MODELS: dict[str, ObjectModel.__class__] = {}
+@cache
+def _is_installed(dependency: str) -> bool:
+    return find_spec(dependency) is not None
 
-# haar_cascade is imported via opencv-python by default
-USABLE_MODELS["basic"] = BasicModel
 
+@dataclass(frozen=True)
+class ModelDescriptor:
+    """
+    Lazy reference to an ObjectModel class.
 
-def _register_optional_models(
-    module_path: str,
-    model_map: dict[ModelOption, str],
-    feature_name: str,
-    extra_name: str,
-    dependency: list[str] = [],
-) -> None:
-    if any(find_spec(dep) is None for dep in dependency):
-        logger.warning(
-            f"""One or more dependencies for {feature_name} are not installed. 
-            Failed to import {feature_name}. This is an optional import, but may limit the ability to run this model.
-            This can be installed using `uv sync --extra {extra_name}` or `uv sync --all-extras`"""
-        )
-        return
-    try:
-        module = import_module(module_path, package=__package__)
-        for option, class_name in model_map.items():
-            USABLE_MODELS[option] = getattr(module, class_name)
-    except ModuleNotFoundError as e:
-        logger.warning(
-            f"""{e}
-            Failed to import {feature_name}. This is an optional import, but may limit the ability to run this model.
-            This can be installed using `uv sync --extra {extra_name}` or `uv sync --all-extras`"""
+    Only holds the import path, so it is cheap to create and pickle into the detection process.
+    The model module (and heavy dependencies such as torch or mediapipe) is only imported when `load` is called,
+    which should only happen inside the detection worker.
+    """
+
+    name: str
+    module_path: str
+    class_name: str
+    dependencies: tuple[str, ...] = ()
+    extra_name: str | None = None
+
+    def missing_dependencies(self) -> list[str]:
+        return [dep for dep in self.dependencies if not _is_installed(dep)]
+
+    def is_available(self) -> bool:
+        return len(self.missing_dependencies()) == 0
+
+    def load(self) -> type[ObjectModel]:
+        """Imports the model module and returns the model class."""
+        return getattr(import_module(self.module_path), self.class_name)
+
+
+MODEL_DESCRIPTORS: list[ModelDescriptor] = [
+    # haar_cascade is imported via opencv-python by default
+    ModelDescriptor(
+        ModelOption.BASIC, "src.tracking.haar_cascade.basic_model", "BasicModel"
+    ),
+    ModelDescriptor(
+        ModelOption.BASIC_TILED,
+        "src.tracking.haar_cascade.basic_model",
+        "BasicTiledModel",
+    ),
+    # KEEPAWAY and MEDIAPIPEPOSE are not registered yet, they would use "KeepAwayModel"/"MediaPipePoseModel"
+    ModelDescriptor(
+        ModelOption.MEDIAPIPE,
+        "src.tracking.media_pipe",
+        "MediaPipeModel",
+        dependencies=("mediapipe",),
+        extra_name="mediapipe",
+    ),
+    *(
+        ModelDescriptor(
+            option,
+            "src.tracking.yolo.model",
+            class_name,
+            dependencies=("torch", "ultralytics"),
+            extra_name="yolo",
         )
-    except Exception:
-        logger.exception(f"Failed to initialize optional model package: {module_path}")
-
-
-_register_optional_models(
-    ".media_pipe",
-    {
-        # USABLE_MODELS[ModelOption.KEEPAWAY] = (KeepAwayModel, KeepAwayDirector)
-        # ModelOption.MEDIAPIPEPOSE: "MediaPipePoseModel",
-        ModelOption.MEDIAPIPE: "MediaPipeModel",
-    },
-    feature_name="mediapipe",
-    extra_name="mediapipe",
-    dependency=["mediapipe"],
-)
-
-_register_optional_models(
-    ".yolo.model",
-    {
-        ModelOption.YOLO_NANO: "YOLONanoModel",
-        ModelOption.YOLO_SMALL: "YOLOSmallModel",
-        ModelOption.YOLO_MEDIUM: "YOLOMediumModel",
-        ModelOption.YOLO_LARGE: "YOLOLargeModel",
-        ModelOption.YOLO_XLARGE: "YOLOXLargeModel",
-    },
-    feature_name="Yolo model",
-    extra_name="yolo",
-    dependency=["torch", "ultralytics"],
-)
+        for option, class_name in {
+            ModelOption.YOLO_NANO: "YOLONanoModel",
+            ModelOption.YOLO_SMALL: "YOLOSmallModel",
+            ModelOption.YOLO_MEDIUM: "YOLOMediumModel",
+            ModelOption.YOLO_LARGE: "YOLOLargeModel",
+            ModelOption.YOLO_XLARGE: "YOLOXLargeModel",
+            ModelOption.YOLO_CASCADE: "YOLOCascadeModel",
+            ModelOption.YOLO_NANO_TILED: "YOLONanoTiledModel",
+        }.items()
+    ),
+]
+
+
+def _register_models(descriptors: list[ModelDescriptor]) -> dict[str, ModelDescriptor]:
+    """Registers every descriptor whose dependencies are installed, without importing any of them."""
+    usable: dict[str, ModelDescriptor] = {}
+    warned_extras = set()
+    for descriptor in descriptors:
+        if (missing := descriptor.missing_dependencies()) and (
+            descriptor.extra_name not in warned_extras
+        ):
+            warned_extras.add(descriptor.extra_name)
+            logger.warning(
+                f"""{", ".join(missing)} not installed.
+            Failed to register {descriptor.extra_name} models. This is an optional import, but may limit the ability to run this model.
+            This can be installed using `uv sync --extra {descriptor.extra_name}` or `uv sync --all-extras`"""
+            )
+        if not missing:
+            usable[descriptor.name] = descriptor
+    return usable
+
+
+USABLE_MODELS: dict[str, ModelDescriptor] = _register_models(MODEL_DESCRIPTORS)
 MODEL_OPTIONS = list(USABLE_MODELS.keys())
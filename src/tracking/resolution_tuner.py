@@ -0,0 +1,96 @@
+import math
+
+from loguru import logger
+
+
+class ResolutionTuner:
+    """
+    Picks the model input height that keeps detection latency within a budget.
+
+    Latency is tracked with an exponentially weighted moving average. Inference cost grows with the pixel count,
+    so when over budget the height is scaled down by sqrt(budget / latency) in one go, and when comfortably under
+    budget it grows back one step at a time. After each change the tuner waits `cooldown` frames so the average
+    reflects the new size before deciding again. The initial height is kept as is and is a stop on the way back up,
+    even when it is not a multiple of `step`.
+    """
+
+    def __init__(
+        self,
+        initial_height: int,
+        min_height: int,
+        max_height: int,
+        budget_ms: float,
+        smoothing: float = 0.2,
+        step: int = 32,
+        headroom: float = 0.7,
+        cooldown: int = 10,
+    ):
+        """
+        Args:
+            initial_height (int): Input height the model starts with.
+            min_height (int): Lowest input height allowed for the model.
+            max_height (int): Highest input height allowed for the model.
+            budget_ms (float): Target detection latency per frame.
+            smoothing (float, optional): Weight of a new sample in the moving average. Defaults to 0.2.
+            step (int, optional): Heights are multiples of this. Defaults to 32.
+            headroom (float, optional): Only grow when the average is below this fraction of the budget. Defaults to 0.7.
+            cooldown (int, optional): Frames to wait after a change. Defaults to 10.
+        """
+        self.min_height = min_height
+        self.max_height = max_height
+        self.budget_ms = budget_ms
+        self.smoothing = smoothing
+        self.step = step
+        self.headroom = headroom
+        self.cooldown = cooldown
+        self.initial_height = max(min_height, min(max_height, int(initial_height)))
+        self.height = self.initial_height
+        self.latency_ms: float | None = None
+        self._frames_since_change = 0
+
+    def clamp(self, height: float) -> int:
+        stepped = int(height // self.step * self.step)
+        return max(
+            self.min_height, min(self.max_height // self.step * self.step, stepped)
+        )
+
+    @property
+    def adjusting(self) -> bool:
+        """Whether the height may still change to meet the budget, other latency controls should hold off meanwhile"""
+        if self._frames_since_change < self.cooldown:
+            return True
+        return (
+            self.latency_ms is not None
+            and self.latency_ms > self.budget_ms
+            and self.height > self.min_height
+        )
+
+    def update(self, latency_ms: float) -> int:
+        """Records the latency of the last frame and returns the input height to use for the next one."""
+        if self.latency_ms is None:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms += self.smoothing * (latency_ms - self.latency_ms)
+        self._frames_since_change += 1
+        if self._frames_since_change < self.cooldown:
+            return self.height
+
+        new_height = self.height
+        if self.latency_ms > self.budget_ms:
+            new_height = self.clamp(
+                self.height * math.sqrt(self.budget_ms / self.latency_ms)
+            )
+        elif self.latency_ms < self.budget_ms * self.headroom:
+            new_height = self.clamp(self.height + self.step)
+            if self.height < self.initial_height < new_height:
+                new_height = self.initial_height
+
+        if new_height != self.height:
+            logger.debug(
+                f"Model input height {self.height} -> {new_height} (latency {self.latency_ms:.1f}ms, budget {self.budget_ms:.1f}ms)"
+            )
+            # Predict the average at the new size instead of waiting for it to decay from the old one
+            self.latency_ms *= (new_height / self.height) ** 2
+            self.height = new_height
+            self._frames_since_change = 0
+        return self.height
@@ -0,0 +1,4 @@
+from .tiled_model import TiledModel
+from .tiles import compute_tiles, non_max_suppression
+
+__all__ = ["TiledModel", "compute_tiles", "non_max_suppression"]
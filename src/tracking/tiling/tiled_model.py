@@ -0,0 +1,122 @@
+import time
+
+import numpy as np
+from loguru import logger
+
+from src import config
+from src.tracking.detector import WARMUP_ITERATIONS, ObjectModel
+from src.tracking.types import BBox
+
+from .tiles import compute_tiles, non_max_suppression
+
+
+class TiledModel(ObjectModel):
+    """
+    Runs the wrapped model on overlapping full resolution tiles instead of one downscaled frame,
+    so small (far away) people keep enough pixels to be detected on high resolution streams.
+
+    Tiles are inferred in one batch (see ObjectModel.detect_batch_with_scores) and merged with NMS.
+    The tile size is picked from `tile_sizes` as the smallest one whose estimated frame latency
+    (number of crops x measured per crop latency) fits in the frame budget of `frame_process_fps`.
+    Per crop latency is measured during warmup and kept up to date with an exponentially weighted average.
+    """
+
+    base_model_class: type[ObjectModel]
+    tile_sizes: tuple[int, ...] = (640, 960, 1280)
+    overlap: float = 0.2
+    merge_threshold: float = 0.6
+    # Also run the model on the whole frame so people larger than a tile are still found
+    include_full_frame: bool = True
+    latency_smoothing: float = 0.2
+    reselect_interval: int = 30
+
+    def __init__(self, target_fps: float | None = None):
+        self.model = self.base_model_class()
+        self.budget_ms = 1000 / (target_fps or config.APP_SETTINGS.frame_process_fps)
+        # Per crop latency in ms, keyed by tile size (None is the untiled frame)
+        self.crop_latency_ms: dict[int | None, float] = {}
+        self.tile_size: int | None = None
+        self.frame_count = 0
+
+    def warmup(self, shape, iterations=WARMUP_ITERATIONS):
+        self.model.warmup(shape, iterations)
+        dummy = np.zeros(shape, dtype=np.uint8)
+        for tile_size in (None, *self.tile_sizes):
+            self.run_tiles(dummy, tile_size)
+        self.select_tile_size(shape)
+
+    def detect_person(self, frame) -> list[BBox]:
+        bboxes, _ = self.detect_with_scores(frame)
+        return bboxes
+
+    def detect_with_scores(self, frame) -> tuple[list[BBox], list[float]]:
+        if self.frame_count % self.reselect_interval == 0:
+            self.select_tile_size(frame.shape)
+        self.frame_count += 1
+        boxes, scores = self.run_tiles(frame, self.tile_size)
+        if len(boxes) == 0:
+            return [], []
+        keep = non_max_suppression(boxes, scores, self.merge_threshold, metric="ios")
+        return boxes[keep].astype(int).tolist(), scores[keep].tolist()
+
+    def run_tiles(
+        self, frame: np.ndarray, tile_size: int | None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Infers every crop for the tile size and returns all boxes in frame coordinates (before NMS)."""
+        tiles = self.get_crops(frame.shape, tile_size)
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+        start = time.perf_counter()
+        results = self.model.detect_batch_with_scores(crops)
+        self.record_latency(
+            tile_size, (time.perf_counter() - start) * 1000 / len(crops)
+        )
+        all_boxes, all_scores = [], []
+        for (x1, y1, _, _), (boxes, scores) in zip(tiles, results):
+            if len(boxes) == 0:
+                continue
+            all_boxes.append(
+                np.asarray(boxes, dtype=np.float64).reshape(-1, 4) + (x1, y1, x1, y1)
+            )
+            all_scores.append(np.asarray(scores, dtype=np.float64))
+        if len(all_boxes) == 0:
+            return np.empty((0, 4)), np.empty(0)
+        return np.concatenate(all_boxes), np.concatenate(all_scores)
+
+    def get_crops(self, shape: tuple[int, ...], tile_size: int | None) -> np.ndarray:
+        height, width = shape[:2]
+        full_frame = np.array([[0, 0, width, height]])
+        if tile_size is None or tile_size >= max(height, width):
+            return full_frame
+        tiles = compute_tiles(shape, tile_size, self.overlap)
+        return np.concatenate([tiles, full_frame]) if self.include_full_frame else tiles
+
+    def record_latency(self, tile_size: int | None, latency_ms: float):
+        previous = self.crop_latency_ms.get(tile_size)
+        self.crop_latency_ms[tile_size] = (
+            latency_ms
+            if previous is None
+            else previous + self.latency_smoothing * (latency_ms - previous)
+        )
+
+    def estimate_latency_ms(
+        self, shape: tuple[int, ...], tile_size: int | None
+    ) -> float | None:
+        # The wrapped model resizes every crop to its own input size, so an unmeasured tile size costs about as much per crop as the full frame
+        per_crop = self.crop_latency_ms.get(tile_size, self.crop_latency_ms.get(None))
+        if per_crop is None:
+            return None
+        return per_crop * len(self.get_crops(shape, tile_size))
+
+    def select_tile_size(self, shape: tuple[int, ...]) -> int | None:
+        previous = self.tile_size
+        self.tile_size = None
+        for tile_size in sorted(s for s in self.tile_sizes if s < max(shape[:2])):
+            estimate = self.estimate_latency_ms(shape, tile_size)
+            if estimate is not None and estimate <= self.budget_ms:
+                self.tile_size = tile_size
+                break
+        if self.tile_size != previous:
+            logger.info(
+                f"Tile size set to {self.tile_size or 'full frame'} for {shape[1]}x{shape[0]} frames (budget {self.budget_ms:.1f}ms)"
+            )
+        return self.tile_size
@@ -0,0 +1,71 @@
+from typing import Literal
+
+import numpy as np
+
+
+def get_tile_origins(length: int, tile: int, overlap: float) -> np.ndarray:
+    """Start offsets of tiles of size `tile` covering `length` pixels, the last tile is aligned to the end."""
+    if tile >= length:
+        return np.zeros(1, dtype=int)
+    stride = max(1, int(tile * (1 - overlap)))
+    origins = np.arange(0, length - tile, stride)
+    return np.append(origins, length - tile)
+
+
+def compute_tiles(
+    frame_shape: tuple[int, ...], tile_size: int, overlap: float = 0.2
+) -> np.ndarray:
+    """
+    Returns an (N, 4) array of square (x1, y1, x2, y2) tiles covering the frame.
+    Neighbouring tiles overlap by `overlap` of the tile size so people on a tile edge are fully visible in at least one tile.
+    """
+    height, width = frame_shape[:2]
+    tile_height, tile_width = min(tile_size, height), min(tile_size, width)
+    ys, xs = np.meshgrid(
+        get_tile_origins(height, tile_height, overlap),
+        get_tile_origins(width, tile_width, overlap),
+        indexing="ij",
+    )
+    xs, ys = xs.ravel(), ys.ravel()
+    return np.stack([xs, ys, xs + tile_width, ys + tile_height], axis=1)
+
+
+def non_max_suppression(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    threshold: float = 0.5,
+    metric: Literal["iou", "ios"] = "iou",
+) -> np.ndarray:
+    """
+    Greedy NMS over (N, 4) xyxy boxes, returns the indices of the kept boxes ordered by score.
+
+    metric "iou" is the usual intersection over union. "ios" divides the intersection by the smaller box instead,
+    which also removes the partial box of a person cut by a tile edge when the neighbouring tile saw them whole.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=np.float64)
+    areas = np.maximum(boxes[:, 2] - boxes[:, 0], 0) * np.maximum(
+        boxes[:, 3] - boxes[:, 1], 0
+    )
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size > 0:
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        x1 = np.maximum(boxes[best, 0], boxes[rest, 0])
+        y1 = np.maximum(boxes[best, 1], boxes[rest, 1])
+        x2 = np.minimum(boxes[best, 2], boxes[rest, 2])
+        y2 = np.minimum(boxes[best, 3], boxes[rest, 3])
+        intersection = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+        if metric == "ios":
+            denominator = np.minimum(areas[best], areas[rest])
+        else:
+            denominator = areas[best] + areas[rest] - intersection
+        overlap = np.divide(
+            intersection,
+            denominator,
+            out=np.zeros_like(intersection),
+            where=denominator > 0,
+        )
+        order = rest[overlap < threshold]
+    return np.asarray(keep, dtype=int)
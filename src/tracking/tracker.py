@@ -1,7 +1,7 @@
 from enum import Enum
 from multiprocessing.managers import SharedMemoryManager
 from queue import Empty
-from typing import Any
+from typing import Any, Callable
 
 from loguru import logger
 
@@ -11,9 +11,10 @@ from src.talos_app import ConnectionCollection
 from src.tracking.detector import (
     DetectionWaitingForModel,
     Detector,
-    ObjectModel,
     SendingFrameTooFast,
 )
+from src.tracking.options import ModelDescriptor
+from src.tracking.types import BBoxMapping
 from src.utils import (
     add_termination_handler,
     remove_termination_handler,
@@ -66,8 +67,14 @@ class Tracker:
         self.max_fps = config.APP_SETTINGS.bbox_max_fps
         self.frame_delay = 1000 / config.APP_SETTINGS.frame_process_fps
         self.bbox_delay = 1000 / self.max_fps
-        self._detector = Detector(model, connections, smm)
+        self._detector = Detector(
+            model,
+            connections,
+            smm,
+            latency_budget_ms=config.APP_SETTINGS.detection_latency_budget_ms,
+        )
         self.disable_perf_warnings = config.APP_SETTINGS.disable_performance_warnings
+        self._detection_listeners: list[Callable[[BBoxMapping], None]] = []
         logger.debug(f"Tracker initialized with max_fps: {self.max_fps}")
 
     def on_connection_update(self, event: ConnectionCollectionEvent, *_: Any):
@@ -91,9 +98,19 @@ class Tracker:
             int(self.bbox_delay), self.poll_bboxes
         )
 
+    def add_detection_listener(self, listener: Callable[[BBoxMapping], None]) -> None:
+        """Registers a callback that receives the bounding boxes by host every time new detections arrive"""
+        self._detection_listeners.append(listener)
+
+    def remove_detection_listener(
+        self, listener: Callable[[BBoxMapping], None]
+    ) -> None:
+        if listener in self._detection_listeners:
+            self._detection_listeners.remove(listener)
+
     def poll_bboxes(self) -> None:
         try:
-            self._detector.get_bboxes()
+            bboxes_by_host = self._detector.get_bboxes()
         except DetectionWaitingForModel:
             return
         except ValueError as e:
@@ -101,6 +118,9 @@ class Tracker:
             self.stop()
             return
         except Empty:
+            if self._detector.is_tuning_resolution():
+                # Detections are slow until the tuner has shrunk the input, backing off as well would overshoot
+                return
             if self._bbox_success_count < 1:
                 self.decrease_bbox_frame_rate()
             self._bbox_success_count -= 1
@@ -108,6 +128,11 @@ class Tracker:
         self._bbox_success_count += 1
         if self._bbox_success_count > 10:
             self.increase_bbox_frame_rate()
+        for listener in self._detection_listeners:
+            try:
+                listener(bboxes_by_host)
+            except Exception as e:
+                logger.error(f"Detection listener failed: {e}")
 
     def send_latest_frame(self) -> None:
         try:
@@ -115,6 +140,9 @@ class Tracker:
         except DetectionWaitingForModel:
             return
         except SendingFrameTooFast:
+            if self._detector.is_tuning_resolution():
+                # The tuner reacts to the same latency, only lower the fps once it settled
+                return
             if self._send_frame_success_count < 1:
                 self.decrease_send_frame_rate()
             self._send_frame_success_count -= 1
@@ -142,7 +170,7 @@ class Tracker:
             self._term_handler_id = None
         return self.stop_pipeline_tasks()
 
-    def swap_model(self, new_model: ObjectModel.__class__ | None):
+    def swap_model(self, new_model: ModelDescriptor | None):
         """This will stop the current detection process and start a new process on the new model"""
         self._detector.set_model(new_model)
         if new_model is not None and not self._detector.is_running():
@@ -192,6 +220,14 @@ class Tracker:
             return 0.0
         return 1000.0 / self.frame_delay
 
+    def get_model_input_height(self) -> int:
+        """Get the input height the detection model currently runs at (0 if unknown)."""
+        return self._detector.get_input_height()
+
+    def get_detection_latency(self) -> float:
+        """Get the smoothed detection latency per frame in milliseconds."""
+        return self._detector.get_detection_latency_ms()
+
     def increase_send_frame_rate(self) -> None:
         """Increase frame sending rate by 10%, down to a minimum of max_fps in config."""
         if self._send_frame_task is None:
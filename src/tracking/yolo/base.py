@@ -8,7 +8,7 @@ from ultralytics import YOLO  # pyright: ignore[reportPrivateImportUsage]
 from ultralytics.engine.model import Model  # pyright: ignore[reportPrivateImportUsage]
 
 from assets import join_paths
-from src.tracking.detector import ObjectModel
+from src.tracking.detector import WARMUP_ITERATIONS, ObjectModel
 from src.tracking.types import BBox
 
 HUMAN_DETECTION_CLASS_ID = 0
@@ -69,7 +69,22 @@ class YOLOBaseModel(ObjectModel):
             path.join(_yolo_pt_dir, _pt_file or self.model_size.pt_file), verbose=False
         )
 
+    def warmup(self, shape, iterations=WARMUP_ITERATIONS):
+        # Use predict instead of track so the dummy frames do not leave ghost tracks behind
+        dummy = np.zeros(shape, dtype=np.uint8)
+        for _ in range(iterations):
+            self.object_detector.predict(
+                dummy,
+                classes=HUMAN_DETECTION_CLASS_ID,
+                device=self.device,
+                verbose=False,
+            )
+
     def detect_person(self, frame, *_) -> list[BBox]:
+        bboxes, _ = self.detect_with_scores(frame)
+        return bboxes
+
+    def detect_with_scores(self, frame) -> tuple[list[BBox], list[float]]:
         (detection_result,) = self.object_detector.track(
             frame,
             classes=HUMAN_DETECTION_CLASS_ID,
@@ -78,14 +93,42 @@ class YOLOBaseModel(ObjectModel):
             persist=True,
         )
         if detection_result is None or detection_result.boxes is None:
-            return []
+            return [], []
         ids = detection_result.boxes.id  # ndarray
         xyxy = detection_result.boxes.xyxy  # ndarray
-        if ids is None or xyxy is None:
-            return self.to_numpy(xyxy).astype(int).tolist() if xyxy is not None else []
-        sorted_idx = np.argsort(ids.flatten())
-        sorted_xyxy = self.to_numpy(xyxy[sorted_idx]).astype(int).tolist()
-        return sorted_xyxy
+        conf = detection_result.boxes.conf  # ndarray
+        if xyxy is None:
+            return [], []
+        if ids is None:
+            return (
+                self.to_numpy(xyxy).astype(int).tolist(),
+                self.to_numpy(conf).tolist(),
+            )
+        sorted_idx = np.argsort(self.to_numpy(ids).flatten())
+        sorted_xyxy = self.to_numpy(xyxy)[sorted_idx].astype(int).tolist()
+        sorted_conf = self.to_numpy(conf)[sorted_idx].tolist()
+        return sorted_xyxy, sorted_conf
+
+    def detect_batch_with_scores(self, frames):
+        # Batched predict instead of track, track ids would not mean anything across different crops
+        results = self.object_detector.predict(
+            list(frames),
+            classes=HUMAN_DETECTION_CLASS_ID,
+            device=self.device,
+            verbose=False,
+        )
+        batch = []
+        for result in results:
+            if result.boxes is None or result.boxes.xyxy is None:
+                batch.append(([], []))
+                continue
+            batch.append(
+                (
+                    self.to_numpy(result.boxes.xyxy).astype(int).tolist(),
+                    self.to_numpy(result.boxes.conf).tolist(),
+                )
+            )
+        return batch
 
     def to_numpy(self, tensor_or_array):
         if hasattr(tensor_or_array, "numpy"):
@@ -1,3 +1,6 @@
+from src.tracking.cascade import CascadeModel
+from src.tracking.tiling import TiledModel
+
 from .base import YOLOBaseModel, YOLOModelSize
 
 
@@ -19,3 +22,16 @@ class YOLOLargeModel(YOLOBaseModel):
 
 class YOLOXLargeModel(YOLOBaseModel):
     model_size: YOLOModelSize = YOLOModelSize.XLARGE
+
+
+class YOLOCascadeModel(CascadeModel):
+    """YOLO nano on every frame, YOLO medium when nano is unsure"""
+
+    cheap_model_class = YOLONanoModel
+    accurate_model_class = YOLOMediumModel
+
+
+class YOLONanoTiledModel(TiledModel):
+    """YOLO nano over full resolution tiles, for high resolution streams"""
+
+    base_model_class = YOLONanoModel
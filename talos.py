@@ -10,6 +10,7 @@ if sys.platform == "darwin" or sys.platform == "linux":
     multiprocessing.set_start_method("spawn", force=True)
 
 from src.arg_parser import ARG_PARSER
+from src.flight_recorder import start_flight_recorder
 from src.logger import configure_logger
 from src.talos_app import App
 from src.talos_endpoint import TalosEndpoint
@@ -91,6 +92,7 @@ def main() -> None:
     # This is a required call for pyinstaller
     # https://pyinstaller.org/en/stable/common-issues-and-pitfalls.html#multi-processing
     multiprocessing.freeze_support()
+    start_flight_recorder()
 
     if args.terminal:
         terminal_interface(args)
@@ -0,0 +1,70 @@
+"""
+Integration tests of the asyncio mock operator in src/simulator/mock_operator.py, driven by real Publishers over TCP.
+"""
+
+import time
+
+import pytest
+
+from src.connection.publisher import Publisher
+from src.icd_codec import CartesianPosition, PolarPosition
+from src.simulator.mock_operator import MockOperatorFleet, NetworkProfile
+
+
+def connected_publisher(port: int) -> Publisher:
+    publisher = Publisher("127.0.0.1", port, keepalive_s=0)
+    assert publisher.operator_connection.wait_connected(timeout=2.0)
+    return publisher
+
+
+def test_mock_operator_answers_the_icd():
+    with MockOperatorFleet(1) as fleet:
+        publisher = connected_publisher(fleet.ports[0])
+        assert publisher.home(0).result(timeout=2.0) == 1
+        assert publisher.set_speed(40).result(timeout=2.0) == 1
+        assert publisher.get_speed().result(timeout=2.0) == 40
+        publisher.set_polar_position("stage", 150, -300, 20).result(timeout=2.0)
+        assert publisher.get_polar_position("stage").result(timeout=2.0) == (
+            PolarPosition(150, -300, 20)
+        )
+        publisher.set_cartesian_position("desk", 1, 2, 3).result(timeout=2.0)
+        assert publisher.get_cartesian_position("desk").result(timeout=2.0) == (
+            CartesianPosition(1, 2, 3)
+        )
+        assert publisher.delete_position("missing").result(timeout=2.0) == 0
+        publisher.close()
+        assert fleet.stats()["answered"] == 8
+
+
+def test_mock_operator_serves_many_robots_with_latency():
+    profile = NetworkProfile(latency_s=0.02, jitter_s=0.005)
+    with MockOperatorFleet(20, profile=profile, seed=1) as fleet:
+        assert len(set(fleet.ports)) == 20
+        publishers = [connected_publisher(port) for port in fleet.ports]
+        start = time.monotonic()
+        futures = [publisher.get_speed() for publisher in publishers]
+        assert [future.result(timeout=2.0) for future in futures] == [100] * 20
+        assert time.monotonic() - start >= 0.015
+        for publisher in publishers:
+            publisher.close()
+
+
+def test_mock_operator_drops_returns():
+    with MockOperatorFleet(1, profile=NetworkProfile(drop_rate=1.0)) as fleet:
+        publisher = connected_publisher(fleet.ports[0])
+        with pytest.raises(TimeoutError):
+            publisher.get_speed(timeout=0.1).result(timeout=2.0)
+        publisher.close()
+        assert fleet.stats()["dropped"] == 1
+
+
+def test_mock_operator_caps_returns_per_second():
+    with MockOperatorFleet(1, profile=NetworkProfile(max_returns_per_s=100)) as fleet:
+        publisher = connected_publisher(fleet.ports[0])
+        start = time.monotonic()
+        futures = [publisher.get_speed() for _ in range(20)]
+        for future in futures:
+            future.result(timeout=2.0)
+        # 20 returns at 100 per second take at least 0.2s
+        assert time.monotonic() - start >= 0.18
+        publisher.close()
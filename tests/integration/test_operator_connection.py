@@ -11,6 +11,8 @@ import time
 
 import pytest
 from src.connection.operator_connections import OperatorConnection
+from src.icd_codec import Frame, build_message
+from src.icd_config import Command
 
 
 def wait_until(predicate, timeout=2.0, interval=0.01):
@@ -76,8 +78,8 @@ class RecordingOperatorConnection(OperatorConnection):
         self.messages = []
         self.received_event = threading.Event()
 
-    def _on_message(self, message: bytes):
-        self.messages.append(message)
+    def _on_message(self, frame: Frame):
+        self.messages.append((frame.command_id, frame.command, bytes(frame.payload)))
         self.received_event.set()
 
 
@@ -96,11 +98,11 @@ def test_connects_to_socket(tcp_server):
     start_server(handler)
 
     connection = OperatorConnection(host, port, connect_on_init=False)
-    connection.connect_on_thread()
+    connection.connect()
 
     assert resources["connected"].wait(timeout=2.0)
-    assert connection.thread is not None
-    assert connection.thread.is_alive()
+    assert connection.wait_connected(timeout=2.0)
+    assert connection.is_connected
 
     connection.close()
 
@@ -109,21 +111,21 @@ def test_receives_messages(tcp_server):
     (host, port), start_server, _ = tcp_server
 
     def handler(client):
-        client.sendall(b"hello-from-server")
+        client.sendall(build_message(1, Command.HANDSHAKE_RETURN, b"hello-from-server"))
         time.sleep(0.2)
 
     start_server(handler)
 
     connection = RecordingOperatorConnection(host, port, connect_on_init=False)
-    connection.connect_on_thread()
+    connection.connect()
 
     assert connection.received_event.wait(timeout=2.0)
-    assert any(message == b"hello-from-server" for message in connection.messages)
+    assert (1, Command.HANDSHAKE_RETURN, b"hello-from-server") in connection.messages
 
     connection.close()
 
 
-def test_shutdown_closes_socket_and_thread(tcp_server):
+def test_shutdown_closes_socket(tcp_server):
     (host, port), start_server, resources = tcp_server
 
     def handler(client):
@@ -138,16 +140,15 @@ def test_shutdown_closes_socket_and_thread(tcp_server):
     start_server(handler)
 
     connection = OperatorConnection(host, port, connect_on_init=False)
-    connection.connect_on_thread()
+    connection.connect()
 
     assert resources["connected"].wait(timeout=2.0)
 
     connection.close()
 
     assert connection.is_running is False
+    assert connection.is_connected is False
     assert connection.socket.fileno() == -1
-    assert connection.thread is not None
-    assert not connection.thread.is_alive()
 
 
 def test_handles_peer_closing_connection(tcp_server):
@@ -160,12 +161,10 @@ def test_handles_peer_closing_connection(tcp_server):
     start_server(handler)
 
     connection = OperatorConnection(host, port, connect_on_init=False)
-    connection.connect_on_thread()
+    connection.connect()
 
     assert resources["connected"].wait(timeout=2.0)
-    assert wait_until(
-        lambda: connection.thread is not None and not connection.thread.is_alive(),
-        timeout=2.0,
-    )
+    assert connection.wait_connected(timeout=2.0)
+    assert wait_until(lambda: not connection.is_connected, timeout=2.0)
 
     connection.close()
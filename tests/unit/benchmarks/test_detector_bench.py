@@ -0,0 +1,41 @@
+import numpy as np
+
+from benchmarks.common import summarize_latencies
+from benchmarks.detector_bench import compute_agreement, iou_matrix
+
+
+def test_iou_matrix_pairwise():
+    a = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=float)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10]], dtype=float)
+
+    ious = iou_matrix(a, b)
+
+    assert ious.shape == (2, 2)
+    assert np.isclose(ious[0, 0], 1.0)
+    assert np.isclose(ious[0, 1], 50 / 150)
+    assert np.allclose(ious[1], 0.0)
+
+
+def test_compute_agreement_counts_matches_misses_and_extras():
+    detections = {
+        0: [[0, 0, 10, 10], [50, 50, 60, 60]],  # one hit, one false positive
+        1: [],  # one miss
+        2: [[0, 0, 10, 10]],  # not annotated, ignored
+    }
+    ground_truth = {0: [[1, 1, 10, 10]], 1: [[0, 0, 10, 10]], 5: [[0, 0, 1, 1]]}
+
+    agreement = compute_agreement(detections, ground_truth)
+
+    assert agreement["frames_compared"] == 2
+    assert agreement["precision"] == 0.5
+    assert agreement["recall"] == 0.5
+    assert agreement["f1"] == 0.5
+    assert np.isclose(agreement["mean_iou"], 81 / 100)
+
+
+def test_summarize_latencies():
+    summary = summarize_latencies([float(i) for i in range(1, 101)])
+    assert summary["mean"] == 50.5
+    assert np.isclose(summary["p50"], 50.5)
+    assert summary["p99"] > summary["p95"] > summary["p50"]
+    assert summarize_latencies([])["p50"] is None
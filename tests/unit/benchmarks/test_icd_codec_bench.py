@@ -0,0 +1,17 @@
+from benchmarks.icd_codec_bench import (
+    SAMPLE_COMMANDS,
+    legacy_message,
+    legacy_payload,
+    run,
+)
+from src.icd_codec import build_message, encode_payload
+
+
+def test_codec_encodes_like_the_legacy_path():
+    for command, values in SAMPLE_COMMANDS.items():
+        assert build_message(10, command, encode_payload(command, *values)) == (
+            legacy_message(10, command, legacy_payload(command, *values))
+        )
+    results = run(iterations=10)
+    assert len(results) == len(SAMPLE_COMMANDS)
+    assert all(result["codec_ns"] > 0 for result in results)
@@ -0,0 +1,13 @@
+from benchmarks.operator_load_bench import is_sustained, run_level
+from src.simulator.mock_operator import NetworkProfile
+
+
+def test_run_level_measures_round_trips():
+    profile = NetworkProfile(latency_s=0.002)
+    result = run_level(robot_count=3, rate_hz=20, duration_s=0.3, profile=profile)
+    assert result["sent"] > 0
+    assert result["completed"] == result["sent"]
+    assert result["failed"] == 0
+    assert result["rtt_ms"]["p50"] >= 2.0
+    assert is_sustained(result, profile, rtt_budget_ms=1000)
+    assert not is_sustained(result, profile, rtt_budget_ms=0.5)
@@ -0,0 +1,31 @@
+import pytest
+
+from src.connection.arm_motion import ArmMotionHistory
+
+
+def test_displacement_integrates_direction_and_speed():
+    history = ArmMotionHistory()
+    history.set_direction(1, 0, t=10.0)
+    history.set_speed(50, t=11.0)
+    history.set_direction(0, -1, t=12.0)
+    history.stop(t=13.0)
+    assert history.displacement(10.0, 14.0) == pytest.approx((1.5, -0.5))
+    # Partial overlap with the first and last moving segments
+    assert history.displacement(10.5, 12.5) == pytest.approx((1.0, -0.25))
+    assert history.velocity(11.5) == (0.5, 0.0)
+
+
+def test_stationary_before_first_command():
+    history = ArmMotionHistory()
+    history.set_direction(1, 1, t=5.0)
+    assert history.velocity(4.0) == (0.0, 0.0)
+    assert history.displacement(3.0, 6.0) == pytest.approx((1.0, 1.0))
+
+
+def test_old_segments_are_pruned_but_cover_the_window():
+    history = ArmMotionHistory(max_age_s=5.0)
+    history.set_direction(1, 0, t=0.0)
+    for t in range(1, 20):
+        history.set_speed(100, t=float(t))
+    assert len(history._segments) <= 7
+    assert history.displacement(15.0, 20.0) == pytest.approx((5.0, 0.0))
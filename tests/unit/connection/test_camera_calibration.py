@@ -0,0 +1,130 @@
+import os
+
+import numpy as np
+import pytest
+
+import src.connection.camera_calibration as calibration_module
+from src.connection.camera_calibration import (
+    CameraCalibration,
+    calibrate,
+    find_checkerboard_corners,
+    load_angle_map,
+)
+from src.directors.geometry import pixel_to_angle
+
+
+def make_calibration(dist_coeffs=(0, 0, 0, 0, 0), size=(640, 480), fov=90.0):
+    focal = (size[0] / 2) / np.tan(np.radians(fov) / 2)
+    return CameraCalibration(
+        camera_matrix=np.array(
+            [[focal, 0, size[0] / 2], [0, focal, size[1] / 2], [0, 0, 1]]
+        ),
+        dist_coeffs=np.asarray(dist_coeffs, dtype=np.float64),
+        image_size=size,
+    )
+
+
+@pytest.fixture
+def calibration_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(calibration_module, "_angle_maps", {})
+
+    def write(calibration: CameraCalibration) -> str:
+        path = str(tmp_path / "camera.yaml")
+        calibration.save(path)
+        return path
+
+    return write
+
+
+def test_undistorted_table_matches_pinhole_model(calibration_file):
+    path = calibration_file(make_calibration())
+    angle_map = load_angle_map(path, (320, 240))  # half the calibrated resolution
+    for x in (0, 40, 160, 300):
+        azimuth, altitude = angle_map.angle(x, 120)
+        assert azimuth == pytest.approx(pixel_to_angle(x - 160, 320, 90), abs=0.2)
+        assert altitude == pytest.approx(0, abs=0.2)
+    # Tilting happens after panning, so the altitude of a corner is smaller than its vertical pinhole angle
+    _, corner_altitude = angle_map.angle(0, 0)
+    assert -pixel_to_angle(120, 240, 90) < corner_altitude < 0
+
+
+def test_angle_tables_are_cached_on_disk(calibration_file, tmp_path, monkeypatch):
+    path = calibration_file(make_calibration((-0.3, 0.1, 0, 0, 0)))
+    table = load_angle_map(path, (640, 480)).table
+    cached = list((tmp_path / "cache").glob("*-640x480.npy"))
+    assert len(cached) == 1
+
+    def fail(*_):
+        raise AssertionError("angle table recomputed")
+
+    monkeypatch.setattr(calibration_module, "_angle_maps", {})
+    monkeypatch.setattr(calibration_module, "compute_angle_table", fail)
+    np.testing.assert_array_equal(load_angle_map(path, (640, 480)).table, table)
+
+
+def test_memory_cache_hit_does_not_read_the_file(calibration_file, monkeypatch):
+    path = calibration_file(make_calibration())
+    angle_map = load_angle_map(path, (320, 240))
+
+    def fail(*_):
+        raise AssertionError("calibration read again")
+
+    monkeypatch.setattr(CameraCalibration, "load", fail)
+    assert load_angle_map(path, (320, 240)) is angle_map
+
+
+def test_updated_calibration_file_is_reloaded(calibration_file):
+    path = calibration_file(make_calibration())
+    angle_map = load_angle_map(path, (320, 240))
+    stat = os.stat(path)
+    calibration_file(make_calibration((-0.3, 0.1, 0, 0, 0)))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    reloaded = load_angle_map(path, (320, 240))
+    assert reloaded is not angle_map
+    assert len(calibration_module._angle_maps) == 1
+
+
+def test_barrel_distortion_widens_edge_angles(calibration_file):
+    linear = load_angle_map(calibration_file(make_calibration()), (640, 480))
+    barrel = load_angle_map(
+        calibration_file(make_calibration((-0.3, 0.1, 0, 0, 0))), (640, 480)
+    )
+    assert barrel.angle(620, 240)[0] > linear.angle(620, 240)[0]
+    assert barrel.angle(320, 240) == pytest.approx((0, 0), abs=0.1)
+
+
+def test_checkerboard_corners_are_found():
+    board = np.kron(
+        (np.indices((7, 10)).sum(axis=0) % 2).astype(np.uint8) * 255,
+        np.ones((40, 40), dtype=np.uint8),
+    )
+    frame = np.full((480, 640), 255, dtype=np.uint8)
+    frame[60:340, 80:480] = board
+    corners = find_checkerboard_corners(frame, (9, 6))
+    assert corners is not None and corners.shape == (54, 1, 2)
+    with pytest.raises(ValueError):
+        calibrate([np.zeros((480, 640, 3), dtype=np.uint8)], (9, 6))
+
+
+def test_discrete_director_uses_the_calibration(calibration_file):
+    from src.config.schema.robot import ConnectionConfig
+    from src.connection.config_snapshot import ConnectionSnapshot
+    from src.directors import DiscreteDirector
+    from src.directors.geometry import compute_target_geometry
+
+    path = calibration_file(make_calibration((-0.3, 0.1, 0, 0, 0)))
+    robot_config = ConnectionConfig(
+        socket_host="a", socket_port=1, camera_index=0, camera_calibration=path
+    )
+    snapshot = ConnectionSnapshot.build(robot_config, (480, 640, 3))
+    assert snapshot.angle_map is not None
+    geometry = compute_target_geometry((600, 220, 630, 260), (480, 640, 3), 0.4)
+    angles = DiscreteDirector.box_error_to_angles(snapshot, geometry)
+    edge = geometry.acceptable_box[2]
+    expected = (
+        snapshot.angle_map.angle(615, 240)[0] - snapshot.angle_map.angle(edge, 240)[0]
+    )
+    assert angles == pytest.approx((expected, 0.0), abs=1e-6)
+    # The linear mapping underestimates the move near the frame edge
+    assert angles[0] > geometry.box_error[0] * snapshot.degrees_per_pixel[0]
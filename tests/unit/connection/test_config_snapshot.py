@@ -0,0 +1,132 @@
+import importlib
+
+import pytest
+from watchdog.events import FileModifiedEvent
+
+import src.config as config
+import src.connection.connection as connection_module
+from src.config.path import ROBOT_CONFIGS_PATH
+from src.config.schema.robot import ConnectionConfig
+from src.config.watchers.robot_config_handler import RobotConfigFileHandler
+from src.connection.config_snapshot import ConnectionSnapshot
+from src.directors import DiscreteDirector
+from src.utils import calculate_acceptable_box
+
+
+def make_config(**kwargs) -> ConnectionConfig:
+    return ConnectionConfig(socket_host="host", socket_port=1, camera_index=0, **kwargs)
+
+
+def test_snapshot_precomputes_geometry():
+    robot_config = make_config(
+        acceptable_box_percent=0.5,
+        horizontal_field_of_view=64,
+        vertical_field_of_view=48,
+    )
+    snapshot = ConnectionSnapshot.build(robot_config, (480, 640, 3))
+    assert snapshot.frame_size == (640, 480)
+    assert snapshot.acceptable_box == calculate_acceptable_box(640, 480, 0.5)
+    assert snapshot.degrees_per_pixel == (0.1, 0.1)
+    # Edits to the loaded config do not leak into the snapshot
+    robot_config.acceptable_box_percent = 0.9
+    assert snapshot.config.acceptable_box_percent == 0.5
+    with pytest.raises(AttributeError):
+        snapshot.frame_size = (1, 1)  # pyright: ignore[reportAttributeAccessIssue]
+
+
+def test_snapshot_without_frame_shape():
+    snapshot = ConnectionSnapshot.build(make_config())
+    assert snapshot.frame_size is None and snapshot.acceptable_box is None
+    assert snapshot.with_frame_shape((480, 640, 3)).frame_size == (640, 480)
+    resized = snapshot.with_frame_shape((480, 640, 3))
+    assert resized.with_frame_shape((480, 640)) is resized
+
+
+@pytest.mark.parametrize(
+    "content", ["", "camera_matrix: [1, 2\n", "- not\n- a mapping\n"]
+)
+def test_broken_calibration_falls_back_to_the_field_of_view(tmp_path, content):
+    calibration = tmp_path / "broken.yaml"
+    calibration.write_text(content)
+
+    snapshot = ConnectionSnapshot.build(
+        make_config(camera_calibration=str(calibration)), (480, 640, 3)
+    )
+
+    assert snapshot.angle_map is None
+    assert snapshot.frame_size == (640, 480)
+
+
+def test_config_file_change_swaps_snapshot(
+    monkeypatch, mocker, no_termination_handlers
+):
+    no_termination_handlers(connection_module)
+    monkeypatch.setattr(RobotConfigFileHandler, "callbacks", [])
+    # The handler swaps the instance the module reads lazily, drop attributes patched over it by other tests
+    monkeypatch.delitem(vars(config), "ROBOT_CONFIGS", raising=False)
+    monkeypatch.setattr(
+        importlib.import_module("src.config.__instance"),
+        "__ROBOT_CONFIGS",
+        {"host": make_config()},
+    )
+    monkeypatch.setattr(
+        connection_module,
+        "Publisher",
+        mocker.Mock(return_value=mocker.Mock(spec=connection_module.Publisher)),
+    )
+    collection = connection_module.ConnectionCollection()
+    video = mocker.Mock(spec=connection_module.VideoConnection, shape=(480, 640, 3))
+    conn = connection_module.Connection("host", 1, video, is_manual=False)
+    collection["host"] = conn
+    old = conn.snapshot
+
+    updated = {"host": make_config(acceptable_box_percent=0.2, manual_only=True)}
+    monkeypatch.setattr("src.config.load.load_robot_config", lambda: updated)
+    config.ROBOT_CONFIG_FILE_HANDLER.on_modified(FileModifiedEvent(ROBOT_CONFIGS_PATH))
+
+    assert config.ROBOT_CONFIGS is updated
+    assert conn.snapshot is not old
+    assert conn.snapshot.acceptable_box == calculate_acceptable_box(640, 480, 0.2)
+    assert conn.is_manual_only is True
+    # Readers holding the old snapshot keep a consistent view
+    assert old.config.acceptable_box_percent == 0.4
+    collection.close()
+    assert RobotConfigFileHandler.callbacks == []
+
+
+def test_resized_snapshot_is_published_once(monkeypatch, mocker):
+    monkeypatch.setattr(config, "ROBOT_CONFIGS", {"host": make_config()})
+    monkeypatch.setattr(
+        connection_module,
+        "Publisher",
+        mocker.Mock(return_value=mocker.Mock(spec=connection_module.Publisher)),
+    )
+    video = mocker.Mock(spec=connection_module.VideoConnection, shape=(480, 640, 3))
+    conn = connection_module.Connection("host", 1, video, is_manual=False)
+    build = mocker.spy(ConnectionSnapshot, "build")
+
+    resized = conn.snapshot_for_shape((720, 1280, 3))
+    assert resized.frame_size == (1280, 720)
+    assert conn.snapshot is resized
+    assert conn.snapshot_for_shape((720, 1280, 3)) is resized
+    assert build.call_count == 1
+
+
+def test_director_reads_the_snapshot_only(monkeypatch, mocker):
+    snapshot = ConnectionSnapshot.build(
+        make_config(confirmation_delay=0, horizontal_field_of_view=64),
+        (480, 640, 3),
+    )
+    monkeypatch.setattr(config, "ROBOT_CONFIGS", {})
+    conn = mocker.Mock(is_manual=False, snapshot=snapshot)
+    conn.snapshot_for_shape.side_effect = snapshot.with_frame_shape
+    conn.video_connection.shape = (480, 640, 3)
+    conn.get_bboxes_with_sequence.return_value = ([(600, 220, 630, 260)], 1)
+    conn.get_bbox_frame_time.return_value = None
+    collection = mocker.MagicMock()
+    collection.__len__.return_value = 0
+    collection.keys.return_value = ["host"]
+    collection.get.side_effect = {"host": conn}.get
+    director = DiscreteDirector(None, collection)
+    director.track_obj()
+    conn.publisher.polar_pan_discrete.assert_called_once()
@@ -4,6 +4,7 @@ import numpy as np
 import pytest
 
 import src.connection.connection as connection_module
+from src.config.schema.robot import ConnectionConfig
 
 
 class DummyVideoFrame:
@@ -116,12 +117,64 @@ def test_video_connection_falls_back_when_no_frame(monkeypatch, mocker):
     assert vc.shape is None
 
 
+def test_video_connection_reopens_a_dropped_source(monkeypatch, mocker):
+    frame = np.zeros((5, 5, 3), dtype=np.uint8)
+    first_cap = mocker.Mock()
+    first_cap.read.side_effect = [(True, frame)] + [(False, None)] * 3
+    second_cap = mocker.Mock()
+    second_cap.read.return_value = (True, frame)
+    caps = iter([first_cap, second_cap])
+
+    monkeypatch.setattr(connection_module.cv2, "VideoCapture", lambda source: next(caps))
+    monkeypatch.setattr(connection_module.cv2, "CAP_PROP_BUFFERSIZE", 1)
+    monkeypatch.setattr(connection_module, "FAILED_READS_BEFORE_RECONNECT", 3)
+
+    vc = connection_module.VideoConnection(src="0")
+    vc.backoff = connection_module.Backoff(initial_s=0.01, max_s=0.01)
+    states = []
+    vc.on_state_change = states.append
+
+    for _ in range(3):
+        assert vc.get_frame() is None
+    assert vc.state == connection_module.ConnectionState.RECONNECTING
+    deadline = time.time() + 2.0
+    while vc.state != connection_module.ConnectionState.CONNECTED and time.time() < deadline:
+        time.sleep(0.01)
+
+    # Same object, reading from the reopened source
+    assert vc.get_frame() is frame
+    assert vc.reconnect_count == 1
+    first_cap.release.assert_called_once()
+    assert states == [connection_module.ConnectionState.RECONNECTING, connection_module.ConnectionState.CONNECTED]
+    vc.close()
+    second_cap.release.assert_called_once()
+
+
+def test_video_connection_close_stops_reconnecting(monkeypatch, mocker):
+    fake_cap = mocker.Mock()
+    fake_cap.read.return_value = (False, None)
+
+    monkeypatch.setattr(connection_module.cv2, "VideoCapture", lambda source: fake_cap)
+    monkeypatch.setattr(connection_module.cv2, "CAP_PROP_BUFFERSIZE", 1)
+    monkeypatch.setattr(connection_module, "FAILED_READS_BEFORE_RECONNECT", 1)
+
+    vc = connection_module.VideoConnection(src="0")
+    vc.backoff = connection_module.Backoff(initial_s=0.01, max_s=0.01)
+    assert vc.get_frame() is None
+    assert vc.state == connection_module.ConnectionState.RECONNECTING
+    thread = vc._reconnect_thread
+    vc.close()
+    thread.join(timeout=2.0)
+    assert not thread.is_alive()
+    assert vc.state == connection_module.ConnectionState.CLOSED
+
+
 def test_connection_initializes_manual_flags(monkeypatch, mocker):
     # Publisher is only instantiated; using a simple mock avoids needing behavior.
     mock_pub = mocker.Mock(spec=connection_module.Publisher)
     monkeypatch.setattr(connection_module, "Publisher", mocker.Mock(return_value=mock_pub))
 
-    monkeypatch.setitem(connection_module.config.ROBOT_CONFIGS, "host", type("C", (), {"manual_only": True})())
+    monkeypatch.setitem(connection_module.config.ROBOT_CONFIGS, "host", ConnectionConfig(socket_host="host", socket_port=1, camera_index=0, manual_only=True, command_keepalive=1.0))
 
     conn = connection_module.Connection(host="host", port=1, video_connection=None)
     assert conn.is_manual is True
@@ -132,9 +185,9 @@ def test_connection_close_invokes_subcomponents(monkeypatch, mocker):
     mock_pub = mocker.Mock(spec=connection_module.Publisher)
     monkeypatch.setattr(connection_module, "Publisher", mocker.Mock(return_value=mock_pub))
 
-    monkeypatch.setitem(connection_module.config.ROBOT_CONFIGS, "host", type("C", (), {"manual_only": False})())
+    monkeypatch.setitem(connection_module.config.ROBOT_CONFIGS, "host", ConnectionConfig(socket_host="host", socket_port=1, camera_index=0, manual_only=False, command_keepalive=1.0))
 
-    vid_conn = mocker.Mock(spec=connection_module.VideoConnection)
+    vid_conn = mocker.Mock(spec=connection_module.VideoConnection, shape=(480, 640, 3))
     conn = connection_module.Connection(host="host", port=1, video_connection=vid_conn)
     conn.close()
 
@@ -234,3 +287,30 @@ def test_connection_collection_clear_calls_remove_termination_handler(monkeypatc
     assert called.get("term") is True
     assert called.get("removed") == 999
     conn_mock.close.assert_called_once()
+
+
+def test_connection_collection_reports_state_changes(monkeypatch, mocker, no_termination_handlers):
+    mock_pub = mocker.Mock(spec=connection_module.Publisher)
+    monkeypatch.setattr(connection_module, "Publisher", mocker.Mock(return_value=mock_pub))
+    monkeypatch.setitem(connection_module.config.ROBOT_CONFIGS, "host", ConnectionConfig(socket_host="host", socket_port=1, camera_index=0, manual_only=False, command_keepalive=1.0))
+    no_termination_handlers(connection_module)
+
+    events = []
+
+    def listener(event, hostname, connection):
+        events.append((event, hostname, connection))
+
+    coll = connection_module.ConnectionCollection()
+    coll.add_listener(listener)
+    conn = connection_module.Connection(host="host", port=1, video_connection=None)
+    coll["host"] = conn
+
+    # The publisher reports a dropped socket, the connection stays in the collection
+    mock_pub.on_state_change(connection_module.ConnectionState.RECONNECTING)
+    assert events[-1] == (connection_module.ConnectionCollectionEvent.STATE_CHANGED, "host", conn)
+    assert coll["host"] is conn
+
+    coll.pop("host")
+    mock_pub.on_state_change(connection_module.ConnectionState.CLOSED)
+    assert events[-1][0] == connection_module.ConnectionCollectionEvent.ACTIVE_CHANGED
+    coll.remove_listener(listener)
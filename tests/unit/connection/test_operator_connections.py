@@ -1,9 +1,14 @@
 import socket
+import threading
+import time
 
 import pytest
 
+from src.connection.io_loop import IOLoop
 from src.connection.operator_connections import OperatorConnection
-from src.icd_config import CTypesInt, toBytes
+from src.connection.reconnect import Backoff, ConnectionState
+from src.icd_codec import FrameDecoder, build_message
+from src.icd_config import Command, CTypesInt, toBytes
 
 
 class DummySocket(socket.socket):
@@ -23,8 +28,9 @@ class DummySocket(socket.socket):
         # Simulate successful connect
         self.connected_to = target
 
-    def sendall(self, data: bytes):
+    def send(self, data: bytes):
         self.sent += data
+        return len(data)
 
     def shutdown(self, _how):
         self.shutdown_called = True
@@ -39,31 +45,8 @@ class DummySocket(socket.socket):
         return 1
 
 
-class DummyThread:
-    def __init__(self, target=None, daemon=False):
-        self.target = target
-        self.join_called = False
-
-    def start(self):
-        if self.target:
-            self.target()
-
-    def join(self, timeout=None):
-        self.join_called = True
-
-
-@pytest.fixture(autouse=True)
-def patch_thread(monkeypatch):
-    """Patch threading.Thread so we can control thread behavior in tests."""
-
-    import threading
-
-    monkeypatch.setattr(threading, "Thread", DummyThread)
-    yield
-
-
 @pytest.fixture
-def operator_connection(monkeypatch):
+def operator_connection(monkeypatch, io_loop):
     """Create an OperatorConnection with a dummy socket."""
 
     dummy_socket = DummySocket()
@@ -71,8 +54,9 @@ def operator_connection(monkeypatch):
     # Patch socket.socket so the instance uses our dummy socket
     monkeypatch.setattr(socket, "socket", lambda *args, **kwargs: dummy_socket)
 
-    conn = OperatorConnection("localhost", 1234, connect_on_init=False)
+    conn = OperatorConnection("localhost", 1234, connect_on_init=False, io_loop=io_loop)
     conn.socket = dummy_socket
+    conn.is_connected = True
     return conn
 
 
@@ -88,6 +72,8 @@ def test_publish_builds_expected_packet_and_increments_command_id(operator_conne
 
     assert result == 0
     assert operator_connection.command_count == 2
+    # Sent by the I/O loop
+    assert operator_connection.io_loop.run_sync(lambda: None)
 
     expected_header = (
         toBytes(0, CTypesInt.UINT32)
@@ -96,66 +82,258 @@ def test_publish_builds_expected_packet_and_increments_command_id(operator_conne
         + toBytes(2, CTypesInt.UINT16)
     )
     expected_message = expected_header + b"AB"
-    expected_crc = toBytes(operator_connection.xor_checksum(expected_message), CTypesInt.UINT8)
+    expected_crc = toBytes(
+        operator_connection.xor_checksum(expected_message), CTypesInt.UINT8
+    )
 
     assert operator_connection.socket.sent == expected_message + expected_crc
 
 
 def test_publish_handles_socket_error(operator_connection, monkeypatch):
     class BadSocket(DummySocket):
-        def sendall(self, _: bytes):
+        def send(self, _: bytes):
             raise OSError("fail")
 
     bad_socket = BadSocket()
     operator_connection.socket = bad_socket
 
+    assert operator_connection.publish(command=1, payload=b"") == 0
+    assert operator_connection.io_loop.run_sync(lambda: None)
+
+    # The connection is considered lost
+    assert not operator_connection.is_connected
     assert operator_connection.publish(command=1, payload=b"") == -1
 
 
-def test_close_shuts_down_socket_and_joins_thread(operator_connection):
-    dummy_thread = DummyThread()
-    operator_connection.thread = dummy_thread
+def test_publish_fails_when_not_connected(operator_connection):
+    operator_connection.is_connected = False
+
+    assert operator_connection.publish(command=1) == -1
+    assert operator_connection.socket.sent == b""
 
+
+def test_close_shuts_down_socket(operator_connection):
     operator_connection.close()
 
     assert operator_connection.is_running is False
     assert operator_connection.socket.shutdown_called
-    assert dummy_thread.join_called
     assert operator_connection.socket.closed
 
 
-def test_connect_calls_listen_on_success(monkeypatch, operator_connection):
-    # Patch listen so it doesn't loop indefinitely
-    called = {"listen": False}
-
-    def fake_listen():
-        called["listen"] = True
+def test_close_clears_the_connected_flag_and_event(operator_connection):
+    operator_connection.is_running = True
+    operator_connection._connected_event.set()
 
-    operator_connection.listen = fake_listen
+    operator_connection.close()
 
-    operator_connection.connect()
+    assert not operator_connection.is_connected
+    assert not operator_connection.wait_connected(timeout=0)
 
-    assert called["listen"] is True
 
+def test_connect_finishing_after_close_is_ignored(operator_connection):
+    operator_connection.is_connected = False
+    operator_connection.is_running = True
+    operator_connection.close()
 
-def test_connect_retries_on_blockingio_then_succeeds(monkeypatch, operator_connection):
-    # Simulate connect raising BlockingIOError first, then succeeding
-    calls = {"count": 0}
+    # The connect completed just as close() ran, its write event was already dispatched
+    operator_connection._on_connect_ready(0)
 
-    def connect_side_effect(target):
-        if calls["count"] == 0:
-            calls["count"] += 1
-            raise BlockingIOError
-        return None
+    assert not operator_connection.is_connected
+    assert not operator_connection.wait_connected(timeout=0)
+    assert operator_connection.state == ConnectionState.CLOSED
 
-    operator_connection.socket.connect = connect_side_effect
 
-    # Make select.select report the socket as writeable, with no error
-    monkeypatch.setattr(
-        "select.select", lambda r, w, x, t: ([], [operator_connection.socket], [])
+@pytest.fixture
+def io_loop():
+    loop = IOLoop(name="test-io")
+    loop.start()
+    yield loop
+    loop.stop()
+
+
+def test_connects_and_dispatches_messages_on_the_loop(io_loop):
+    server = socket.create_server(("127.0.0.1", 0))
+    received = []
+    connection = OperatorConnection(
+        "127.0.0.1", server.getsockname()[1], connect_on_init=False, io_loop=io_loop
     )
-
-    operator_connection.listen = lambda: None
-    operator_connection.connect()
-
-    assert calls["count"] == 1
+    connection.on_response = lambda command_id, command, payload: received.append(
+        (command_id, command, bytes(payload), threading.current_thread().name)
+    )
+    connection.connect()
+    client, _ = server.accept()
+    assert connection.wait_connected(timeout=2.0)
+
+    # Two messages in one segment, then one split across segments
+    home = build_message(1, Command.HOME_RETURN, b"\x00\x01")
+    speed = build_message(3, Command.GET_SPEED_RETURN, b"\x32")
+    client.sendall(home + speed + home[:4])
+    time.sleep(0.05)
+    client.sendall(home[4:])
+    deadline = time.monotonic() + 2.0
+    while len(received) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert received == [
+        (1, Command.HOME_RETURN, b"\x00\x01", "test-io"),
+        (3, Command.GET_SPEED_RETURN, b"\x32", "test-io"),
+        (1, Command.HOME_RETURN, b"\x00\x01", "test-io"),
+    ]
+
+    connection.close()
+    client.close()
+    server.close()
+
+
+def test_connect_retries_with_a_fresh_socket(io_loop, monkeypatch):
+    monkeypatch.setattr("src.connection.operator_connections.CONNECT_TIMEOUT_S", 0.01)
+    unused = socket.create_server(("127.0.0.1", 0))
+    port = unused.getsockname()[1]
+    unused.close()  # Nothing listens on the port anymore, every attempt is refused
+    connection = OperatorConnection(
+        "127.0.0.1",
+        port,
+        connect_on_init=False,
+        io_loop=io_loop,
+        backoff=Backoff(initial_s=0.01, max_s=0.01),
+    )
+    first_socket = connection.socket
+    connection.connect()
+
+    # Attempts go on past the old limit of 5 until the connection is closed
+    deadline = time.monotonic() + 2.0
+    while connection._attempt < 8 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert connection._attempt >= 8
+    assert not connection.is_connected
+    assert connection.state == ConnectionState.CONNECTING
+    assert connection.socket is not first_socket
+    connection.close()
+    assert connection.state == ConnectionState.CLOSED
+
+
+def test_reconnects_after_the_operator_drops(io_loop):
+    server = socket.create_server(("127.0.0.1", 0))
+    states = []
+    dropped = []
+    connection = OperatorConnection(
+        "127.0.0.1",
+        server.getsockname()[1],
+        connect_on_init=False,
+        io_loop=io_loop,
+        backoff=Backoff(initial_s=0.01, max_s=0.01),
+    )
+    connection.on_state_change = states.append
+    connection.on_dropped = dropped.append
+    connection.connect()
+    client, _ = server.accept()
+    assert connection.wait_connected(timeout=2.0)
+
+    client.close()  # The operator went away
+    server.settimeout(2.0)
+    client, _ = server.accept()
+    deadline = time.monotonic() + 2.0
+    while connection.connect_count < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert connection.is_connected
+    assert states == [
+        ConnectionState.CONNECTING,
+        ConnectionState.CONNECTED,
+        ConnectionState.RECONNECTING,
+        ConnectionState.CONNECTED,
+    ]
+
+    # The same object keeps publishing on the new socket
+    assert connection.publish(command=1) >= 0
+    client.settimeout(2.0)
+    decoder = FrameDecoder()
+    decoder.feed(client.recv(1024))
+    assert [frame.command for frame in decoder.frames()] == [1]
+
+    connection.close()
+    client.close()
+    server.close()
+
+
+def test_unsent_bytes_are_flushed_when_writable(io_loop):
+    ours, theirs = socket.socketpair()
+    ours.setblocking(False)
+    connection = OperatorConnection("peer", 1, connect_on_init=False, io_loop=io_loop)
+    connection.socket = ours
+    connection.is_connected = True
+    io_loop.run_sync(connection._update_interest)
+
+    # Far more than the socket buffers hold, so most of it has to wait for the loop
+    payload = bytes(range(256)) * 200
+    for _ in range(100):
+        assert connection.publish(command=1, payload=payload) >= 0
+    expected = 100 * (10 + len(payload) + 1)
+    received = bytearray()
+    theirs.settimeout(2.0)
+    while len(received) < expected:
+        received += theirs.recv(1 << 16)
+    assert len(received) == expected
+    assert io_loop.run_sync(lambda: None)
+    assert not connection._outbox
+
+    connection.close()
+    theirs.close()
+
+
+def test_idle_loop_does_not_spin(io_loop):
+    pairs = [socket.socketpair() for _ in range(20)]
+    connections = []
+    for ours, _ in pairs:
+        ours.setblocking(False)
+        connection = OperatorConnection(
+            "peer", 1, connect_on_init=False, io_loop=io_loop
+        )
+        connection.socket = ours
+        connection.is_connected = True
+        io_loop.run_sync(connection._update_interest)
+        connections.append(connection)
+
+    start = time.process_time()
+    time.sleep(0.5)
+    assert time.process_time() - start < 0.1
+
+    for connection in connections:
+        connection.close()
+    for _, theirs in pairs:
+        theirs.close()
+
+
+def test_stop_preempts_and_starts_coalesce(operator_connection, monkeypatch):
+    connection = operator_connection
+    dropped = []
+    connection.on_dropped = dropped.append
+    # Queue commands without the loop draining them
+    monkeypatch.setattr(connection.io_loop, "call_soon", lambda callback: None)
+
+    speed = connection.publish(Command.SET_SPEED, b"\x10")
+    first_start = connection.publish(Command.POLAR_PAN_CONTINUOUS_START, b"\x01\x00")
+    second_start = connection.publish(Command.POLAR_PAN_CONTINUOUS_START, b"\x00\x01")
+    discrete = connection.publish(Command.POLAR_PAN_DISCRETE, bytes(16))
+    assert dropped == [first_start]
+    stop = connection.publish(Command.POLAR_PAN_CONTINUOUS_STOP)
+    assert dropped == [first_start, second_start, discrete]
+
+    connection._flush()
+    decoder = FrameDecoder()
+    decoder.feed(connection.socket.sent)
+    assert [(frame.command_id, frame.command) for frame in decoder.frames()] == [
+        (stop, Command.POLAR_PAN_CONTINUOUS_STOP),
+        (speed, Command.SET_SPEED),
+    ]
+    stats = connection.get_queue_stats()
+    assert stats["depth"] == 0 and stats["max_depth"] == 3
+    assert stats["coalesced"] == 1 and stats["preempted"] == 2 and stats["sent"] == 2
+
+
+def test_full_queue_rejects_commands_but_not_stops(operator_connection, monkeypatch):
+    connection = operator_connection
+    monkeypatch.setattr(connection.io_loop, "call_soon", lambda callback: None)
+    for _ in range(connection._queue.max_size):
+        assert connection.publish(Command.SET_SPEED, b"\x10") >= 0
+    assert connection.publish(Command.SET_SPEED, b"\x10") == -1
+    assert connection.publish(Command.HOME, bytes(4)) >= 0
+    assert connection.get_queue_stats()["rejected"] == 1
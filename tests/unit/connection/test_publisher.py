@@ -1,14 +1,21 @@
+import itertools
+
 import pytest
 from pytest_mock import MockerFixture
 
 from src.connection.publisher import Publisher
+from src.connection.reconnect import ConnectionState
 from src.icd_config import CTypesInt, Command, toBytes
 
 OPERATOR_CONNECTION_PATH = "src.connection.publisher.OperatorConnection"
 
 @pytest.fixture()
 def mockOperatorConnection(mocker: MockerFixture):
-    yield mocker.patch(OPERATOR_CONNECTION_PATH, autospec=True).return_value
+    connection = mocker.patch(OPERATOR_CONNECTION_PATH, autospec=True).return_value
+    # Returns the command id like the real connection
+    command_ids = itertools.count(0, 2)
+    connection.publish.side_effect = lambda **_: next(command_ids)
+    yield connection
 
 
 def test_init(mocker):
@@ -244,3 +251,99 @@ def test_execute_hardware_operation(mockOperatorConnection):
     mockOperatorConnection.publish.assert_called_once_with(
         command=Command.EXECUTE_HARDWARE_OPERATION, payload=expected_payload
     )
+
+
+def test_repeated_continuous_commands_are_suppressed(mockOperatorConnection, mocker):
+    mocker.patch("src.connection.publisher.time.monotonic", return_value=0.0)
+    publisher = Publisher("localhost", 12345, True, keepalive_s=1.0)
+    for _ in range(5):
+        publisher.polar_pan_continuous_start(1, 0)
+    assert mockOperatorConnection.publish.call_count == 1
+
+    # A different payload changes the state and is sent right away, stops are never suppressed
+    publisher.polar_pan_continuous_start(0, 1)
+    publisher.polar_pan_continuous_stop()
+    publisher.polar_pan_continuous_stop()
+    assert mockOperatorConnection.publish.call_count == 4
+    assert publisher.get_command_stats() == {"sent": 4, "suppressed": 4}
+    # The stop cleared the channel, the same start goes out again
+    publisher.polar_pan_continuous_start(0, 1)
+    assert mockOperatorConnection.publish.call_count == 5
+
+
+def test_failed_send_is_not_cached(mockOperatorConnection, mocker):
+    mocker.patch("src.connection.publisher.time.monotonic", return_value=0.0)
+    mockOperatorConnection.host = "localhost"
+    mockOperatorConnection.publish.side_effect = [-1, 0, -1, 2, 4]
+    publisher = Publisher("localhost", 12345, True, keepalive_s=1.0)
+
+    with pytest.raises(ConnectionError):
+        publisher.polar_pan_continuous_start(1, 0).result(timeout=1.0)
+    # The start never went out, the retry is sent
+    publisher.polar_pan_continuous_start(1, 0)
+    assert publisher.motion_history.velocity() != (0.0, 0.0)
+
+    with pytest.raises(ConnectionError):
+        publisher.polar_pan_continuous_stop().result(timeout=1.0)
+    # The arm is still moving as far as the publisher knows, and the stop is retried
+    assert publisher.motion_history.velocity() != (0.0, 0.0)
+    publisher.polar_pan_continuous_stop()
+    publisher.polar_pan_continuous_stop()
+    assert mockOperatorConnection.publish.call_count == 5
+    assert publisher.motion_history.velocity() == (0.0, 0.0)
+    assert publisher.get_command_stats() == {"sent": 3, "suppressed": 0}
+
+
+def test_keepalive_resends_unchanged_command(mockOperatorConnection, mocker):
+    clock = mocker.patch("src.connection.publisher.time.monotonic", return_value=0.0)
+    publisher = Publisher("localhost", 12345, True, keepalive_s=1.0)
+    publisher.polar_pan_continuous_start(1, 0)
+    clock.return_value = 0.5
+    publisher.polar_pan_continuous_start(1, 0)
+    clock.return_value = 1.0
+    publisher.polar_pan_continuous_start(1, 0)
+    assert mockOperatorConnection.publish.call_count == 2
+
+
+def test_motion_commands_invalidate_continuous_state(mockOperatorConnection):
+    publisher = Publisher("localhost", 12345, True)
+    publisher.polar_pan_continuous_start(1, 0)
+    publisher.home(0)
+    publisher.polar_pan_continuous_start(1, 0)
+    # Discrete moves are relative, so repeating them is never suppressed
+    publisher.polar_pan_discrete(10, 0, 0, 1000)
+    publisher.polar_pan_discrete(10, 0, 0, 1000)
+    assert mockOperatorConnection.publish.call_count == 5
+
+
+def test_keepalive_zero_sends_everything(mockOperatorConnection):
+    publisher = Publisher("localhost", 12345, True, keepalive_s=0)
+    for _ in range(3):
+        publisher.set_speed(50)
+    assert mockOperatorConnection.publish.call_count == 3
+
+
+def test_motion_history_follows_sent_commands(mockOperatorConnection):
+    publisher = Publisher("localhost", 12345, True)
+    publisher.set_speed(50)
+    publisher.polar_pan_continuous_start(-1, 1)
+    assert publisher.motion_history.velocity() == (-0.5, 0.5)
+    publisher.polar_pan_continuous_stop()
+    assert publisher.motion_history.velocity() == (0.0, 0.0)
+
+
+def test_lost_connection_fails_pending_and_forgets_state(mockOperatorConnection):
+    mockOperatorConnection.host = "localhost"
+    publisher = Publisher("localhost", 12345, True)
+    states = []
+    publisher.on_state_change = states.append
+    publisher.polar_pan_continuous_start(1, 0)
+    future = publisher.get_speed()
+
+    publisher.operator_connection.on_state_change(ConnectionState.RECONNECTING)
+    with pytest.raises(ConnectionError):
+        future.result(timeout=1.0)
+    # The arm state after the reconnect is unknown, the same start goes out again
+    publisher.polar_pan_continuous_start(1, 0)
+    assert mockOperatorConnection.publish.call_count == 3
+    assert states == [ConnectionState.RECONNECTING]
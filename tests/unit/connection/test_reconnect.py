@@ -0,0 +1,34 @@
+import random
+
+import pytest
+
+from src.connection.reconnect import Backoff
+
+
+def test_backoff_grows_exponentially_up_to_the_maximum():
+    backoff = Backoff(initial_s=0.5, max_s=4.0, multiplier=2.0, jitter=0)
+    assert [backoff.next_delay() for _ in range(6)] == [0.5, 1.0, 2.0, 4.0, 4.0, 4.0]
+    assert backoff.attempts == 6
+
+    backoff.reset()
+    assert backoff.next_delay() == 0.5
+
+
+def test_backoff_jitter_stays_below_the_nominal_delay():
+    backoff = Backoff(initial_s=1.0, max_s=1.0, jitter=0.5, rng=random.Random(1))
+    delays = [backoff.next_delay() for _ in range(200)]
+    assert all(0.5 <= delay <= 1.0 for delay in delays)
+    # Spread out, so connections that dropped together do not retry together
+    assert max(delays) - min(delays) > 0.3
+
+
+def test_backoff_does_not_overflow_after_many_attempts():
+    backoff = Backoff(initial_s=0.5, max_s=30.0, jitter=0)
+    for _ in range(5000):
+        delay = backoff.next_delay()
+    assert delay == 30.0
+
+
+def test_backoff_rejects_jitter_outside_unit_range():
+    with pytest.raises(ValueError):
+        Backoff(jitter=1.5)
@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+
+from src.connection.io_loop import IOLoop
+from src.connection.publisher import Publisher
+from src.connection.responses import ResponseRouter
+from src.icd_codec import CartesianPosition, PolarPosition
+from src.icd_config import RETURN_FLAG, Command, CTypesInt, toBytes
+from src.simulator import SimulatedArm, SimulatedOperator
+
+
+@pytest.fixture
+def io_loop():
+    loop = IOLoop("test-responses")
+    loop.start()
+    yield loop
+    loop.stop()
+
+
+def position(*values: int) -> bytes:
+    return b"".join(toBytes(value, CTypesInt.INT32) for value in values)
+
+
+def test_returns_resolve_their_command(io_loop):
+    router = ResponseRouter(io_loop)
+    speed = router.register(0, Command.GET_SPEED, time.monotonic())
+    polar = router.register(2, Command.GET_POLAR_POSITION, time.monotonic())
+    home = router.register(4, Command.HOME, time.monotonic())
+
+    # Returns may come back out of order
+    router.resolve(5, Command.HOME_RETURN, toBytes(1, CTypesInt.UINT16))
+    router.resolve(3, Command.GET_POLAR_POSITION_RETURN, position(-15, 300, 0))
+    router.resolve(1, Command.GET_SPEED_RETURN, b"\x32")
+
+    assert speed.result(0) == 50
+    assert polar.result(0) == PolarPosition(-15, 300, 0)
+    assert home.result(0) == 1
+    assert router.pending_count() == 0
+    stats = router.get_latency_stats()
+    assert set(stats) == {"GET_SPEED", "GET_POLAR_POSITION", "HOME"}
+    assert stats["HOME"]["count"] == 1 and stats["HOME"]["timeouts"] == 0
+
+
+def test_early_return_resolves_on_register(io_loop):
+    router = ResponseRouter(io_loop)
+    router.resolve(7, Command.GET_CARTESIAN_POSITION_RETURN, position(1, 2, 3))
+    future = router.register(6, Command.GET_CARTESIAN_POSITION, time.monotonic())
+    assert future.result(0) == CartesianPosition(1, 2, 3)
+
+
+def test_missing_return_times_out(io_loop):
+    router = ResponseRouter(io_loop)
+    future = router.register(0, Command.HOME, time.monotonic(), timeout=0.05)
+    with pytest.raises(TimeoutError):
+        future.result(1)
+    assert router.pending_count() == 0
+    assert router.get_latency_stats()["HOME"]["timeouts"] == 1
+    # A late return is kept as early, it does not resolve anything
+    router.resolve(1, Command.HOME_RETURN, toBytes(1, CTypesInt.UINT16))
+
+
+def test_mismatched_and_malformed_returns_fail(io_loop):
+    router = ResponseRouter(io_loop)
+    wrong = router.register(0, Command.GET_SPEED, time.monotonic())
+    short = router.register(2, Command.GET_POLAR_POSITION, time.monotonic())
+    router.resolve(1, Command.HOME | RETURN_FLAG, b"\x00\x01")
+    router.resolve(3, Command.GET_POLAR_POSITION_RETURN, b"\x00")
+    with pytest.raises(ValueError, match="does not answer"):
+        wrong.result(0)
+    with pytest.raises(ValueError, match="Malformed"):
+        short.result(0)
+
+
+def test_fail_all_on_close(io_loop):
+    router = ResponseRouter(io_loop)
+    future = router.register(0, Command.HOME, time.monotonic())
+    router.fail_all(ConnectionError("closed"))
+    with pytest.raises(ConnectionError):
+        future.result(0)
+
+
+def test_publisher_requests_against_simulated_operator():
+    arm = SimulatedArm(response_delay_s=0.0)
+    arm.pose.azimuth = 12.5
+    operator = SimulatedOperator(arm)
+    port = operator.start()
+    publisher = Publisher("127.0.0.1", port)
+    try:
+        assert publisher.operator_connection.wait_connected(2)
+        assert publisher.set_speed(40).result(2) == 1
+        assert publisher.get_speed().result(2) == 40
+        assert publisher.get_polar_position("current").result(2) == PolarPosition(
+            0, 125, 0
+        )
+        assert asyncio.run(publisher.get_speed_async()) == 40
+        # Suppressed repeats resolve right away without a round trip
+        assert publisher.request(Command.SET_SPEED, b"\x28").result(0) is None
+        stats = publisher.get_latency_stats()
+        assert stats["GET_SPEED"]["count"] == 2
+        assert stats["SET_SPEED"]["mean_ms"] > 0
+    finally:
+        publisher.close()
+        operator.stop()
+
+
+def test_dropped_commands_are_cancelled(io_loop):
+    router = ResponseRouter(io_loop)
+    queued = router.register(0, Command.POLAR_PAN_CONTINUOUS_START, time.monotonic())
+    router.cancel(0)
+    assert queued.cancelled()
+    # Dropped before the publisher registered it
+    router.cancel(2)
+    assert router.register(2, Command.HOME, time.monotonic()).cancelled()
+    assert router.pending_count() == 0
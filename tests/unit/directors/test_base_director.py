@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+import src.config as config
+from src.config.schema.robot import ConnectionConfig
+from src.connection.config_snapshot import ConnectionSnapshot
+from src.directors import ContinuousDirector
+from src.directors.geometry import compute_geometry
+from src.utils import calculate_acceptable_box, calculate_center_bbox
+
+
+def test_geometry_matches_scalar_helpers():
+    rng = np.random.default_rng(0)
+    sizes = rng.integers(160, 1920, size=(50, 2))
+    percents = rng.uniform(0.1, 0.9, size=50)
+    x1 = rng.integers(0, sizes[:, 0] - 10)
+    y1 = rng.integers(0, sizes[:, 1] - 10)
+    bboxes = np.stack([x1, y1, x1 + 10, y1 + 10], axis=1)
+    geometry = compute_geometry(bboxes, sizes, percents)
+    for i in range(50):
+        row = geometry.row(i)
+        left, top, right, bottom = calculate_acceptable_box(*sizes[i], percents[i])
+        cx, cy = calculate_center_bbox(bboxes[i])
+        assert row.acceptable_box == (left, top, right, bottom)
+        assert row.center == (cx, cy)
+        assert row.outside == (cx < left or cx > right or cy < top or cy > bottom)
+
+
+class FakeConnection:
+    def __init__(self, mocker, host, bbox, is_manual=False):
+        self.is_manual = is_manual
+        self.publisher = mocker.Mock()
+        self.video_connection = mocker.Mock(shape=(480, 640, 3))
+        self.snapshot = ConnectionSnapshot.build(
+            config.ROBOT_CONFIGS[host], self.video_connection.shape
+        )
+        self._bbox = bbox
+        self.sequence = 1
+
+    def snapshot_for_shape(self, frame_shape):
+        return self.snapshot.with_frame_shape(frame_shape)
+
+    def get_bboxes_with_sequence(self):
+        return self._bbox, self.sequence
+
+    def get_bbox_frame_time(self):
+        return None
+
+
+@pytest.fixture
+def connections(monkeypatch, mocker):
+    hosts = ["a", "b", "c"]
+    monkeypatch.setattr(
+        config,
+        "ROBOT_CONFIGS",
+        {
+            host: ConnectionConfig(
+                socket_host=host,
+                socket_port=1,
+                camera_index=0,
+                confirmation_delay=0,
+            )
+            for host in hosts
+        },
+    )
+    collection = mocker.MagicMock()
+    collection.__len__.return_value = 0
+    collection.items.return_value = [
+        ("a", FakeConnection(mocker, "a", [(600, 200, 630, 260)])),  # far right
+        ("b", FakeConnection(mocker, "b", [(10, 200, 40, 260)])),  # far left
+        ("c", FakeConnection(mocker, "c", [(600, 200, 630, 260)], is_manual=True)),
+    ]
+    by_host = dict(collection.items.return_value)
+    collection.keys.return_value = list(by_host)
+    collection.get.side_effect = by_host.get
+    return by_host, collection
+
+
+def test_every_automatic_host_is_directed_each_tick(connections):
+    by_host, collection = connections
+    director = ContinuousDirector(None, collection)
+    director.track_obj()
+    by_host["a"].publisher.polar_pan_continuous_direction_start.assert_called_once()
+    by_host["b"].publisher.polar_pan_continuous_direction_start.assert_called_once()
+    by_host["c"].publisher.polar_pan_continuous_direction_start.assert_not_called()
+    # Each host keeps its own state
+    assert set(director.states) == {"a", "b"}
+    assert director.states["a"] is not director.states["b"]
+
+
+def test_failing_host_does_not_stop_the_others(connections, mocker):
+    by_host, collection = connections
+    by_host["a"].snapshot_for_shape = mocker.Mock(side_effect=ValueError("broken"))
+    director = ContinuousDirector(None, collection)
+
+    assert set(director.track_obj()) == {"b"}
+    by_host["b"].publisher.polar_pan_continuous_direction_start.assert_called_once()
+
+
+def test_detections_are_processed_once_per_sequence(connections):
+    by_host, collection = connections
+    director = ContinuousDirector(None, collection)
+    assert set(director.on_detections({"a": [], "b": []})) == {"a", "b"}
+    # Same detections again, nothing new to process
+    assert director.on_detections({"a": [], "b": []}) == {}
+    by_host["a"].sequence += 1
+    assert set(director.on_detections({"a": [], "b": []})) == {"a"}
+
+
+def test_watchdog_stops_arm_when_detections_stop(connections, monkeypatch):
+    by_host, collection = connections
+    director = ContinuousDirector(None, collection)
+    clock = {"now": 100.0}
+    monkeypatch.setattr(
+        "src.directors.base_director.time.monotonic", lambda: clock["now"]
+    )
+    director.on_detections({"a": []})
+    director.check_watchdog()
+    by_host["a"].publisher.polar_pan_continuous_stop.assert_not_called()
+
+    clock["now"] += config.APP_SETTINGS.director_watchdog_timeout + 0.1
+    director.check_watchdog()
+    director.check_watchdog()
+    by_host["a"].publisher.polar_pan_continuous_stop.assert_called_once()
+    assert "a" not in director.states
@@ -0,0 +1,98 @@
+import pytest
+
+import src.config as config
+from src.config.schema.robot import ConnectionConfig
+from src.connection.arm_motion import ArmMotionHistory
+from src.connection.config_snapshot import ConnectionSnapshot
+from src.directors import ContinuousDirector
+from src.directors.latency import project_bbox
+
+
+def test_projection_moves_subject_against_the_pan():
+    bbox = (300, 220, 340, 260)  # centered in a 640x480 frame
+    projected, shift = project_bbox(bbox, (640, 480), (90, 90), (10.0, 0.0))
+    # Panning right moves the subject left
+    assert shift[0] < 0 and shift[1] == 0
+    assert projected == (300 + shift[0], 220, 340 + shift[0], 260)
+    _, shift = project_bbox(bbox, (640, 480), (90, 90), (0.0, 10.0))
+    # Tilting up moves the subject down
+    assert shift[0] == 0 and shift[1] > 0
+
+
+def test_projection_is_exact_for_pinhole_camera():
+    # 45 degrees off axis is the frame edge with a 90 degree field of view
+    _, shift = project_bbox((310, 230, 330, 250), (640, 480), (90, 90), (-45.0, 0.0))
+    assert shift == (320, 0)
+
+
+class LaggingConnection:
+    def __init__(self, mocker, bbox, frame_time):
+        self.is_manual = False
+        self.publisher = mocker.Mock()
+        self.publisher.motion_history = ArmMotionHistory()
+        self.video_connection = mocker.Mock(shape=(480, 640, 3))
+        self.snapshot = ConnectionSnapshot.build(
+            config.ROBOT_CONFIGS["a"], self.video_connection.shape
+        )
+        self._bbox = bbox
+        self.frame_time = frame_time
+
+    def snapshot_for_shape(self, frame_shape):
+        return self.snapshot.with_frame_shape(frame_shape)
+
+    def get_bboxes_with_sequence(self):
+        return self._bbox, 1
+
+    def get_bbox_frame_time(self):
+        return self.frame_time
+
+
+@pytest.fixture
+def lagging(monkeypatch, mocker):
+    def make(pan_speed, bbox):
+        monkeypatch.setattr(
+            config,
+            "ROBOT_CONFIGS",
+            {
+                "a": ConnectionConfig(
+                    socket_host="a",
+                    socket_port=1,
+                    camera_index=0,
+                    confirmation_delay=0,
+                    horizontal_field_of_view=90,
+                    pan_speed=pan_speed,
+                )
+            },
+        )
+        monkeypatch.setattr("src.directors.base_director.time.time", lambda: 100.0)
+        conn = LaggingConnection(mocker, [bbox], frame_time=99.8)
+        # Arm has been panning right at full speed since before the frame was captured
+        conn.publisher.motion_history.set_direction(1, 0, t=99.0)
+        collection = mocker.MagicMock()
+        collection.__len__.return_value = 0
+        collection.keys.return_value = ["a"]
+        collection.get.side_effect = {"a": conn}.get
+        return ContinuousDirector(None, collection), conn
+
+    return make
+
+
+def test_overshoot_is_avoided_by_projecting_forward(lagging):
+    # Subject just right of the acceptable box in the old frame, the arm has since panned 6 degrees
+    director, conn = lagging(pan_speed=30, bbox=(460, 220, 480, 260))
+    director.track_obj()
+    conn.publisher.polar_pan_continuous_direction_start.assert_not_called()
+    conn.publisher.polar_pan_continuous_stop.assert_called_once()
+    metrics = director.get_latency_metrics("a")
+    assert metrics["delay_ms"] == pytest.approx(200)
+    assert metrics["compensation_azimuth_deg"] == pytest.approx(6)
+    assert metrics["compensation_x_px"] < 0
+
+
+def test_delay_is_measured_without_compensation(lagging):
+    director, conn = lagging(pan_speed=None, bbox=(460, 220, 480, 260))
+    director.track_obj()
+    conn.publisher.polar_pan_continuous_direction_start.assert_called_once()
+    metrics = director.get_latency_metrics("a")
+    assert metrics["delay_ms"] == pytest.approx(200)
+    assert metrics["compensation_x_px"] == 0
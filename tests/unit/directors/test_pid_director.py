@@ -0,0 +1,131 @@
+import math
+
+import pytest
+
+import src.config as config
+import src.directors.pid_director as pid_director
+from src.config.schema.robot import ConnectionConfig
+from src.connection.arm_motion import ArmMotionHistory
+from src.connection.publisher import Direction
+from src.directors.pid import PIDController
+from src.directors.pid_director import PIDDirector, pixel_to_angle
+
+HOST = "robot"
+FRAME_SHAPE = (480, 640, 3)
+DEG_PER_SECOND_PER_SPEED = 0.5
+
+
+class SimulatedArm:
+    """Publisher stand-in that integrates the commanded pan speed into a camera angle"""
+
+    def __init__(self):
+        self.azimuth = 0.0
+        self.altitude = 0.0
+        self.speed = 0
+        self.moving = (0, 0)
+        self.commands = []
+        self.motion_history = ArmMotionHistory()
+
+    def set_speed(self, speed):
+        self.commands.append(("set_speed", speed))
+        self.speed = speed
+        self.motion_history.set_speed(speed)
+
+    def polar_pan_continuous_direction_start(self, direction):
+        self.commands.append(("start", direction))
+        self.moving = Direction.toDirectionTuple(direction)
+
+    def polar_pan_continuous_stop(self):
+        self.commands.append(("stop",))
+        self.moving = (0, 0)
+
+    def step(self, dt):
+        self.azimuth += self.moving[0] * self.speed * DEG_PER_SECOND_PER_SPEED * dt
+        self.altitude += self.moving[1] * self.speed * DEG_PER_SECOND_PER_SPEED * dt
+
+
+def subject_bbox(arm: SimulatedArm, subject_azimuth, subject_altitude, cfg):
+    height, width = FRAME_SHAPE[:2]
+    focal_x = (width / 2) / math.tan(math.radians(cfg.horizontal_field_of_view) / 2)
+    focal_y = (height / 2) / math.tan(math.radians(cfg.vertical_field_of_view) / 2)
+    x = width / 2 + focal_x * math.tan(math.radians(subject_azimuth - arm.azimuth))
+    y = height / 2 - focal_y * math.tan(math.radians(subject_altitude - arm.altitude))
+    return (int(x) - 20, int(y) - 30, int(x) + 20, int(y) + 30)
+
+
+@pytest.fixture
+def director(monkeypatch, mocker):
+    cfg = ConnectionConfig(socket_host=HOST, socket_port=1, camera_index=0)
+    monkeypatch.setattr(config, "ROBOT_CONFIGS", {HOST: cfg})
+    clock = {"now": 0.0}
+    monkeypatch.setattr(pid_director.time, "monotonic", lambda: clock["now"])
+    connections = mocker.MagicMock()
+    connections.__len__.return_value = 0
+    return PIDDirector(None, connections), cfg, clock
+
+
+def run(director, cfg, clock, arm, subject, seconds, rate=10):
+    dt = 1 / rate
+    for _ in range(int(seconds * rate)):
+        clock["now"] += dt
+        arm.step(dt)
+        director.process_frame(
+            HOST, [subject_bbox(arm, *subject, cfg)], FRAME_SHAPE, arm
+        )
+
+
+def test_pixel_to_angle_matches_field_of_view():
+    assert pixel_to_angle(320, 640, 90) == pytest.approx(45)
+    assert pixel_to_angle(0, 640, 90) == 0
+    assert pixel_to_angle(-160, 640, 90) < 0
+
+
+def test_pid_anti_windup_limits_integral():
+    pid = PIDController(kp=1, ki=1, kd=0, output_limit=10)
+    for _ in range(100):
+        assert pid.update(50, 0.1) == 10
+    # The integral did not wind up while saturated, so the output reverses as soon as the error does
+    assert pid.update(-5, 0.1) < 0
+
+
+def test_does_not_move_when_subject_in_box(director):
+    director, cfg, clock = director
+    arm = SimulatedArm()
+    run(director, cfg, clock, arm, (0, 0), 1)
+    assert arm.commands == []
+
+
+def test_converges_diagonally_with_few_commands(director):
+    director, cfg, clock = director
+    arm = SimulatedArm()
+    arm.set_speed(60)
+    arm.commands.clear()
+    run(director, cfg, clock, arm, (30, 12), 10)
+    directions = [c[1] for c in arm.commands if c[0] == "start"]
+    # Diagonal up and right
+    assert Direction.toDirectionTuple(directions[0]) == (1, 1)
+    # Stopped, then back at the speed the arm had before the director took over
+    assert arm.commands[-2:] == [("stop",), ("set_speed", 60)]
+    assert abs(arm.azimuth - 30) < cfg.horizontal_field_of_view * 0.2
+    assert abs(arm.altitude - 12) < cfg.vertical_field_of_view * 0.2
+    metrics = director.get_metrics(HOST)
+    assert metrics["last_convergence_s"] is not None
+    assert metrics["last_convergence_s"] < 10
+    # One start/stop pair plus a handful of speed changes, not one command per tick
+    assert metrics["commands_sent"] == len(arm.commands) < 40
+
+
+def test_handing_back_control_restores_speed(director, mocker):
+    director, cfg, clock = director
+    arm = SimulatedArm()
+    arm.set_speed(60)
+    director.connections.get.return_value = mocker.Mock(publisher=arm, host=HOST)
+    run(director, cfg, clock, arm, (30, 0), 0.5)
+    assert arm.speed != 60
+
+    director.stop_auto_control()
+    assert arm.commands[-1] == ("set_speed", 60)
+    # Nothing left to restore
+    sent = len(arm.commands)
+    director.stop_auto_control()
+    assert len(arm.commands) == sent
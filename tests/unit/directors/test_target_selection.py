@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from src.directors.target_selection import TargetPolicy, score_targets, select_target
+
+FRAME = (640, 480)
+BOXES = [
+    (10, 10, 60, 110),  # small, corner
+    (280, 200, 360, 280),  # medium, centered
+    (450, 100, 630, 470),  # large, right
+]
+
+
+def test_largest():
+    assert select_target(BOXES, FRAME, TargetPolicy.LARGEST) == 2
+
+
+def test_closest_to_center():
+    assert select_target(BOXES, FRAME, TargetPolicy.CENTER) == 1
+    scores = score_targets(BOXES, FRAME, TargetPolicy.CENTER)
+    assert np.all((scores >= 0) & (scores <= 1))
+
+
+def test_sticky_follows_previous_target_and_falls_back_to_largest():
+    previous = (15, 12, 62, 108)
+    assert select_target(BOXES, FRAME, TargetPolicy.STICKY, previous) == 0
+    # Shuffled model output order does not change the subject
+    assert select_target(BOXES[::-1], FRAME, TargetPolicy.STICKY, previous) == 2
+    assert select_target(BOXES, FRAME, TargetPolicy.STICKY, (0, 300, 5, 305)) == 2
+    assert select_target(BOXES, FRAME, TargetPolicy.STICKY) == 2
+
+
+@pytest.mark.parametrize(
+    "weights, expected", [((1, 0, 0), 2), ((0, 1, 0), 1), ((0.2, 0.2, 5), 0)]
+)
+def test_weighted(weights, expected):
+    previous = (10, 10, 60, 110)
+    assert select_target(BOXES, FRAME, "weighted", previous, weights) == expected
+
+
+def test_director_keeps_following_the_same_subject(mocker):
+    from src.config.schema.robot import ConnectionConfig
+    from src.connection.config_snapshot import ConnectionSnapshot
+    from src.directors import ContinuousDirector
+
+    director = ContinuousDirector(None, mocker.MagicMock(__len__=lambda _: 0))
+    snapshot = ConnectionSnapshot.build(
+        ConnectionConfig(socket_host="a", socket_port=1, camera_index=0),
+        (480, 640, 3),
+    )
+    first = director.order_targets("a", [BOXES[1], BOXES[2]], snapshot)
+    assert first[0] == BOXES[2]
+    # The other person is now listed first and the followed one moved a little
+    moved = (460, 110, 630, 470)
+    assert director.order_targets("a", [BOXES[1], moved], snapshot)[0] == moved
@@ -0,0 +1,117 @@
+import os
+
+import pytest
+
+from src.icd_codec import (
+    HEADER,
+    MAX_FRAME_SIZE,
+    FrameDecoder,
+    MessageEncoder,
+    PolarPosition,
+    build_message,
+    encode_payload,
+    xor_checksum,
+)
+from src.icd_config import RETURN_FLAG, Command, CTypesInt, toBytes
+
+
+@pytest.mark.parametrize("length", [0, 1, 7, 8, 9, 13, 64, 255, 4097])
+def test_xor_checksum_matches_bytewise_xor(length):
+    data = os.urandom(length)
+    expected = 0
+    for byte in data:
+        expected ^= byte
+    assert xor_checksum(data) == expected
+    assert xor_checksum(memoryview(bytearray(data))) == expected
+
+
+def test_payloads_match_the_icd_field_types():
+    assert encode_payload(Command.POLAR_PAN_DISCRETE, -1, 2, 0, 3000) == (
+        toBytes(-1, CTypesInt.INT32)
+        + toBytes(2, CTypesInt.INT32)
+        + toBytes(0, CTypesInt.UINT32)
+        + toBytes(3000, CTypesInt.UINT32)
+    )
+    assert encode_payload(Command.POLAR_PAN_CONTINUOUS_STOP) == b""
+    assert encode_payload(Command.SET_POLAR_POSITION, "pos", 1, -2, 3) == (
+        b"\x03pos"
+        + toBytes(1, CTypesInt.INT32)
+        + toBytes(-2, CTypesInt.INT32)
+        + toBytes(3, CTypesInt.INT32)
+    )
+    assert encode_payload(Command.SAVE_POSITION, "a", True, "") == b"\x01a\x01\x00"
+    assert encode_payload(Command.EXECUTE_HARDWARE_OPERATION, 1, 0, b"xyz") == (
+        b"\x01\x00\x00\x00\x00xyz"
+    )
+    # The length prefix counts encoded bytes, not characters
+    assert encode_payload(Command.GO_TO_POSITION, "é") == b"\x02\xc3\xa9"
+
+
+def test_payload_values_are_checked():
+    with pytest.raises(ValueError):
+        encode_payload(Command.HOME)
+    with pytest.raises(Exception):
+        encode_payload(Command.SET_SPEED, 256)
+
+
+def test_encoder_reuses_and_grows_its_buffer():
+    encoder = MessageEncoder(capacity=16)
+    first = bytes(encoder.encode(4, Command.SET_SPEED, b"\x10"))
+    assert first == build_message(4, Command.SET_SPEED, b"\x10")
+    large = bytes(range(256)) * 2
+    message = bytes(encoder.encode(6, Command.EXECUTE_HARDWARE_OPERATION, large))
+    assert len(message) == HEADER.size + len(large) + 1
+    decoder = FrameDecoder()
+    decoder.feed(first + message)
+    assert [tuple(frame) for frame in decoder.frames()] == [
+        (4, Command.SET_SPEED, b"\x10"),
+        (6, Command.EXECUTE_HARDWARE_OPERATION, large),
+    ]
+    assert bytes(encoder.encode(8, Command.GET_SPEED)) == build_message(
+        8, Command.GET_SPEED
+    )
+
+
+def test_decoder_reassembles_split_and_merged_messages():
+    stream = b"".join(
+        build_message(2 * i + 1, Command.HOME_RETURN, toBytes(i, CTypesInt.UINT16))
+        for i in range(50)
+    )
+    decoder = FrameDecoder()
+    frames = []
+    # One byte per read, then everything back to back in one read
+    for i in range(len(stream)):
+        decoder.feed(stream[i : i + 1])
+        frames.extend(frame.decode() for frame in decoder.frames())
+    decoder.feed(stream)
+    frames.extend(frame.decode() for frame in decoder.frames())
+    assert frames == list(range(50)) * 2
+    assert decoder.buffered == 0 and decoder.frames_decoded == 100
+
+
+def test_decoder_wraps_around_its_buffer():
+    position = b"".join(toBytes(value, CTypesInt.INT32) for value in (1, -2, 3))
+    message = build_message(1, Command.GET_POLAR_POSITION_RETURN, position)
+    count = 3 * MAX_FRAME_SIZE // len(message)
+    stream = message * count
+    decoder = FrameDecoder(capacity=0)
+    decoded = 0
+    # Reads rarely end on a message boundary, so a partial message is buffered whenever the end is reached
+    for offset in range(0, len(stream), 1000):
+        chunk = stream[offset : offset + 1000]
+        decoder.writable()[: len(chunk)] = chunk
+        decoder.advance(len(chunk))
+        for frame in decoder.frames():
+            assert frame.decode() == PolarPosition(1, -2, 3)
+            decoded += 1
+    assert decoded == count and decoder.bad_checksums == 0
+
+
+def test_frame_payloads_decode_without_copies():
+    decoder = FrameDecoder()
+    decoder.feed(build_message(3, Command.GET_SPEED | RETURN_FLAG, b"\x2a"))
+    decoder.feed(build_message(5, Command.GET_SPEED, b""))
+    speed, command = decoder.frames()
+    assert isinstance(speed.payload, memoryview) and speed.decode() == 42
+    with pytest.raises(ValueError):
+        command.decode()
@@ -0,0 +1,131 @@
+import time
+
+import numpy as np
+import pytest
+
+from src.connection.operator_connections import OperatorConnection
+from src.connection.publisher import Publisher
+from src.icd_codec import FrameDecoder, build_message
+from src.icd_config import Command, CTypesInt, toBytes
+from src.simulator import (
+    ArmPose,
+    SimulatedArm,
+    SimulatedOperator,
+    SimulatedVideoSource,
+    Subject,
+    VirtualCamera,
+    score_run,
+)
+
+
+def continuous_start(azimuth, altitude):
+    return toBytes(azimuth, CTypesInt.INT8) + toBytes(altitude, CTypesInt.INT8)
+
+
+def test_arm_integrates_commands_after_response_delay():
+    arm = SimulatedArm(pan_speed=30, response_delay_s=0.1)
+    arm.step(0.0)
+    arm.receive(Command.SET_SPEED, toBytes(50, CTypesInt.UINT8), now=0.0)
+    arm.receive(Command.POLAR_PAN_CONTINUOUS_START, continuous_start(1, -1), now=0.0)
+    arm.receive(Command.POLAR_PAN_CONTINUOUS_STOP, b"", now=1.0)
+    assert arm.step(0.1) == ArmPose(0.0, 0.0)
+    pose = arm.step(2.0)
+    # 15 deg/s for the second between the delayed start and the delayed stop
+    assert pose.azimuth == pytest.approx(15.0)
+    assert pose.altitude == pytest.approx(-15.0)
+
+
+def test_arm_discrete_pan_and_home():
+    arm = SimulatedArm(response_delay_s=0.0)
+    arm.step(0.0)
+    payload = (
+        toBytes(-10, CTypesInt.INT32)
+        + toBytes(4, CTypesInt.INT32)
+        + toBytes(0, CTypesInt.UINT32)
+        + toBytes(1000, CTypesInt.UINT32)
+    )
+    arm.receive(Command.POLAR_PAN_DISCRETE, payload, now=0.0)
+    # Negative deltas pan right like DiscreteDirector expects, the move stops after its duration
+    assert arm.step(5.0) == ArmPose(pytest.approx(10.0), pytest.approx(4.0))
+    arm.receive(Command.HOME, toBytes(0, CTypesInt.UINT32), now=5.0)
+    assert arm.step(5.0) == ArmPose(0.0, 0.0)
+
+
+def test_parses_operator_connection_wire_format(mocker):
+    connection = OperatorConnection("localhost", 1, connect_on_init=False)
+    connection.is_connected = True
+    sent = bytearray()
+    mocker.patch.object(connection, "socket").send.side_effect = lambda data: (
+        sent.extend(data) or len(data)
+    )
+    # Each command is sent by the I/O loop before the next one, a queued start would be dropped by the stop
+    connection.publish(Command.POLAR_PAN_CONTINUOUS_START, continuous_start(-1, 0))
+    assert connection.io_loop.run_sync(lambda: None)
+    connection.publish(Command.POLAR_PAN_CONTINUOUS_STOP)
+    assert connection.io_loop.run_sync(lambda: None)
+    corrupt = bytearray(build_message(9, Command.HOME, b"\x00\x00\x00\x00"))
+    corrupt[-1] ^= 0xFF
+    decoder = FrameDecoder()
+    decoder.feed(sent + corrupt + sent[:5])
+
+    messages = [tuple(frame) for frame in decoder.frames()]
+
+    assert messages == [
+        (0, Command.POLAR_PAN_CONTINUOUS_START, continuous_start(-1, 0)),
+        (2, Command.POLAR_PAN_CONTINUOUS_STOP, b""),
+    ]
+    assert decoder.bad_checksums == 1
+    # The incomplete message is kept for the next read
+    assert decoder.buffered == 5
+
+
+def test_camera_maps_subject_into_frame():
+    camera = VirtualCamera(frame_size=(640, 480), field_of_view=(80.0, 60.0))
+    subject = Subject(azimuth=10.0, altitude=0.0, width=8.0, height=12.0)
+    x1, y1, x2, y2 = camera.subject_bbox(subject, ArmPose(0.0, 0.0))
+    assert ((x1 + x2) / 2, (y1 + y2) / 2) == (400, 240)
+    # Panning towards the subject centers it
+    x1, _, x2, _ = camera.subject_bbox(subject, ArmPose(10.0, 0.0))
+    assert (x1 + x2) / 2 == 320
+    assert camera.subject_bbox(subject, ArmPose(-60.0, 0.0)) is None
+    frame = camera.render(ArmPose(10.0, 0.0), [subject])
+    assert frame.shape == (480, 640, 3)
+    assert tuple(frame[240, 320]) == (40, 40, 200)
+
+
+def test_score_run_reports_settle_and_overshoot():
+    times = np.arange(0, 3, 0.1)
+    outside = (times >= 0.5) & (times < 1.0)
+    errors = np.zeros((len(times), 2))
+    errors[outside, 0] = 20.0
+    errors[(times >= 1.0) & (times < 1.3), 0] = -3.0  # camera went past the subject
+
+    metrics = score_run(times, errors, outside, commands=6)
+
+    assert metrics["settle_time_mean_s"] == pytest.approx(0.5)
+    assert metrics["overshoot_max_deg"] == pytest.approx(3.0)
+    assert metrics["time_outside_s"] == pytest.approx(0.5)
+    assert metrics["commands_per_second"] == pytest.approx(6 / 2.9)
+    assert metrics["unsettled_excursions"] == 0
+
+
+def test_publisher_drives_simulated_arm_over_tcp():
+    arm = SimulatedArm(response_delay_s=0.0)
+    operator = SimulatedOperator(arm)
+    port = operator.start()
+    publisher = Publisher("127.0.0.1", port)
+    try:
+        assert operator.wait_for_client()
+        publisher.polar_pan_continuous_start(1, 0)
+        deadline = time.monotonic() + 2
+        while arm.commands_received == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        source = SimulatedVideoSource(VirtualCamera(), arm, [Subject()])
+        frame, captured = source.get_frame_with_time()
+        assert frame is not None and frame.shape == source.shape
+        assert captured == pytest.approx(time.time(), abs=1)
+        assert arm.step().azimuth > 0
+    finally:
+        publisher.close()
+        operator.stop()
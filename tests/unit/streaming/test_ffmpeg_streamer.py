@@ -0,0 +1,173 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.streaming.ffmpeg_streamer import (
+    DEFAULT_FPS,
+    FfmpegStreamConfig,
+    FfmpegStreamController,
+)
+
+
+class _RecordingPipe:
+    """Stands in for the ffmpeg stdin, accepts at most chunk bytes per write like a full pipe"""
+
+    def __init__(self, chunk: int | None = None):
+        self.chunk = chunk
+        self.data = bytearray()
+        self.writes = 0
+
+    def write(self, view) -> int:
+        self.writes += 1
+        count = len(view) if self.chunk is None else min(self.chunk, len(view))
+        self.data += view[:count]
+        return count
+
+
+def _controller(frame_getter, fps: int | None = 1000, stdin=None):
+    controller = FfmpegStreamController(
+        frame_getter, FfmpegStreamConfig(output_url="rtsp://localhost/stream", fps=fps)
+    )
+    controller._process = type("Process", (), {"stdin": stdin or _RecordingPipe()})()
+    return controller
+
+
+def _stop_after(controller: FfmpegStreamController, frames):
+    """Frame getter returning frames in order, stopping the loop once they ran out"""
+    frames = iter(frames)
+
+    def getter():
+        frame = next(frames, None)
+        if frame is None:
+            controller._stop_event.set()
+        return frame
+
+    return getter
+
+
+@pytest.fixture()
+def frame() -> np.ndarray:
+    return np.arange(2 * 3 * 3, dtype=np.uint8).reshape(2, 3, 3)
+
+
+def test_fps_defaults_when_not_configured():
+    assert _controller(lambda: None, fps=None).fps == DEFAULT_FPS
+
+
+def test_build_command_sets_input_and_output_rate():
+    command = _controller(lambda: None, fps=12)._build_command(3, 2)
+
+    rates = [command[i + 1] for i, arg in enumerate(command) if arg == "-r"]
+    assert rates == ["12", "12"]
+    assert command.index("-r") < command.index("-i")
+
+
+def test_write_frame_handles_partial_writes(frame):
+    pipe = _RecordingPipe(chunk=4)
+
+    FfmpegStreamController._write_frame(pipe, frame)
+
+    assert bytes(pipe.data) == frame.tobytes()
+    assert pipe.writes == -(-frame.nbytes // 4)
+
+
+def test_write_frame_makes_views_contiguous(frame):
+    pipe = _RecordingPipe()
+    sliced = frame[:, ::-1]
+
+    FfmpegStreamController._write_frame(pipe, sliced)
+
+    assert bytes(pipe.data) == sliced.tobytes()
+
+
+def test_stream_loop_skips_unchanged_frames(frame):
+    second = frame + 1
+    pipe = _RecordingPipe()
+    controller = _controller(None, stdin=pipe)
+    controller._frame_getter = _stop_after(controller, [frame, frame, second])
+
+    controller._stream_loop(width=3, height=2)
+
+    assert bytes(pipe.data) == frame.tobytes() + second.tobytes()
+    assert controller.stats.frames_written == 2
+    # The repeated frame and the final None
+    assert controller.stats.frames_missing == 2
+
+
+def test_stream_loop_resizes_mismatched_frames(frame):
+    pipe = _RecordingPipe()
+    controller = _controller(None, stdin=pipe)
+    controller._frame_getter = _stop_after(controller, [frame])
+
+    controller._stream_loop(width=6, height=4)
+
+    assert len(pipe.data) == 6 * 4 * 3
+
+
+def test_stream_loop_paces_at_fps(mocker, frame):
+    now = [0.0]
+    waits = []
+
+    def wait(timeout):
+        waits.append(timeout)
+        now[0] += timeout
+        return False
+
+    mocker.patch(
+        "src.streaming.ffmpeg_streamer.time.monotonic", side_effect=lambda: now[0]
+    )
+    controller = _controller(None, fps=10)
+    controller._stop_event = mocker.Mock(spec=threading.Event)
+    controller._stop_event.is_set.return_value = False
+    controller._stop_event.wait.side_effect = wait
+    frames = [frame + i for i in range(4)]
+
+    def getter():
+        if len(frames) == 1:
+            controller._stop_event.is_set.return_value = True
+        return frames.pop(0)
+
+    controller._frame_getter = getter
+
+    controller._stream_loop(width=3, height=2)
+
+    assert waits == pytest.approx([0.1, 0.1, 0.1])
+    assert controller.stats.frames_written == 4
+    assert controller.stats.frames_dropped == 0
+
+
+def test_stream_loop_drops_ticks_overrun_by_stalled_writes(mocker, frame):
+    now = [0.0]
+
+    class _SlowPipe(_RecordingPipe):
+        def write(self, view) -> int:
+            now[0] += 0.35  # three and a half frame periods at 10 fps
+            return super().write(view)
+
+    mocker.patch(
+        "src.streaming.ffmpeg_streamer.time.monotonic", side_effect=lambda: now[0]
+    )
+    controller = _controller(None, fps=10, stdin=_SlowPipe())
+    controller._frame_getter = _stop_after(controller, [frame])
+
+    controller._stream_loop(width=3, height=2)
+
+    assert controller.stats.frames_written == 1
+    # The ticks at 0.1s and 0.2s passed during the write, the one at 0.3s runs late
+    assert controller.stats.frames_dropped == 2
+    assert controller.stats.stall_s == pytest.approx(0.35)
+    assert controller.stats.max_stall_s == pytest.approx(0.35)
+
+
+def test_stream_loop_stops_on_broken_pipe(frame):
+    class _BrokenPipe:
+        def write(self, view) -> int:
+            raise BrokenPipeError
+
+    controller = _controller(lambda: frame, stdin=_BrokenPipe())
+
+    controller._stream_loop(width=3, height=2)
+
+    assert controller._stop_event.is_set()
+    assert controller.get_stats()["frames_written"] == 0
@@ -0,0 +1,238 @@
+import socket
+import threading
+import time
+
+import pytest
+
+import src.flight_recorder as flight_recorder
+from src.connection.io_loop import IOLoop
+from src.connection.operator_connections import OperatorConnection
+from src.flight_recorder import (
+    DATA_SIZE,
+    FRAME,
+    MAX_RECORDED_BBOXES,
+    FlightRecorder,
+    RecordKind,
+    read_records,
+    replay,
+)
+from src.icd_codec import build_message, encode_payload
+from src.icd_config import RETURN_FLAG, Command
+from src.simulator.arm import SimulatedArm
+
+
+def test_records_round_trip_through_the_file(tmp_path):
+    path = str(tmp_path / "recorder.bin")
+    recorder = FlightRecorder(path, slot_count=16)
+    recorder.record_frame(
+        RecordKind.COMMAND_SENT, "alpha", 4, Command.SET_SPEED, b"\x28"
+    )
+    recorder.record_frame(
+        RecordKind.RETURN_RECEIVED,
+        "alpha",
+        5,
+        Command.SET_SPEED | RETURN_FLAG,
+        memoryview(b"\x00\x01"),
+    )
+    recorder.record_detection("beta", 1234.5, [(10, 20, 110, 220), (-5, 0, 40000, 30)])
+    recorder.record_decision("beta", (-42, 0), True)
+    recorder.close()
+
+    records = read_records(path)
+    assert [record.kind for record in records] == [
+        RecordKind.COMMAND_SENT,
+        RecordKind.RETURN_RECEIVED,
+        RecordKind.DETECTION,
+        RecordKind.DIRECTOR_DECISION,
+    ]
+    assert [record.host for record in records] == ["alpha", "alpha", "beta", "beta"]
+    assert records[0].data == {
+        "command_id": 4,
+        "command": Command.SET_SPEED,
+        "payload": b"\x28",
+        "truncated": False,
+    }
+    assert records[1].data["payload"] == b"\x00\x01"
+    # Coordinates are stored as INT16
+    assert records[2].data == {
+        "frame_time": 1234.5,
+        "count": 2,
+        "bboxes": [(10, 20, 110, 220), (-5, 0, 32767, 30)],
+    }
+    assert records[3].data == {"box_error": (-42, 0), "outside": True}
+    assert records[0].time <= records[3].time
+    assert abs(records[0].wall_time - time.time()) < 5
+
+
+def test_long_payloads_are_truncated(tmp_path):
+    path = str(tmp_path / "recorder.bin")
+    recorder = FlightRecorder(path, slot_count=4)
+    payload = bytes(range(200))
+    recorder.record_frame(
+        RecordKind.COMMAND_SENT, "alpha", 0, Command.EXECUTE_HARDWARE_OPERATION, payload
+    )
+    recorder.close()
+
+    (record,) = read_records(path)
+    assert record.data["payload"] == payload[: DATA_SIZE - FRAME.size]
+    assert record.data["truncated"]
+
+
+def test_ring_keeps_the_newest_records(tmp_path):
+    recorder = FlightRecorder(None, slot_count=8)
+    for command_id in range(20):
+        recorder.record_frame(
+            RecordKind.COMMAND_SENT, "alpha", command_id, Command.HOME, None
+        )
+    path = recorder.dump(str(tmp_path / "dump.bin"))
+    recorder.close()
+
+    records = read_records(path)
+    assert [record.sequence for record in records] == list(range(13, 21))
+    assert [record.data["command_id"] for record in records] == list(range(12, 20))
+
+
+def test_detections_beyond_the_slot_are_counted_not_stored(tmp_path):
+    recorder = FlightRecorder(None, slot_count=4)
+    boxes = [(i, i, i + 10, i + 10) for i in range(MAX_RECORDED_BBOXES + 3)]
+    recorder.record_detection("alpha", None, boxes)
+    path = recorder.dump(str(tmp_path / "dump.bin"))
+    recorder.close()
+
+    (record,) = read_records(path)
+    assert record.data["count"] == len(boxes)
+    assert record.data["bboxes"] == boxes[:MAX_RECORDED_BBOXES]
+
+
+def test_dump_drops_records_written_while_copying(tmp_path, monkeypatch):
+    recorder = FlightRecorder(None, slot_count=8)
+    for command_id in range(3):
+        recorder.record_frame(
+            RecordKind.COMMAND_SENT, "alpha", command_id, Command.HOME, None
+        )
+
+    def copy_racing_a_writer(source):
+        # Records written during the copy may be torn in it, whatever state they are in
+        for command_id in range(3, 5):
+            recorder.record_frame(
+                RecordKind.COMMAND_SENT, "alpha", command_id, Command.HOME, None
+            )
+        return bytearray(source)
+
+    monkeypatch.setattr(
+        flight_recorder, "bytearray", copy_racing_a_writer, raising=False
+    )
+    path = recorder.dump(str(tmp_path / "dump.bin"))
+    monkeypatch.undo()
+    recorder.close()
+
+    assert [record.sequence for record in read_records(path)] == [1, 2, 3]
+
+
+def test_previous_ring_is_kept_on_start(tmp_path):
+    path = str(tmp_path / "recorder.bin")
+    first = FlightRecorder(path, slot_count=4)
+    first.record_decision("alpha", (1, 2), False)
+    # No close, like a process that was killed
+    second = FlightRecorder(path, slot_count=4)
+    assert len(read_records(second.previous_path)) == 1
+    assert read_records(path) == []
+    first.close()
+    second.close()
+
+
+def test_uncaught_thread_exception_dumps_the_ring(tmp_path, monkeypatch):
+    monkeypatch.setattr(threading, "excepthook", lambda args: None)
+    monkeypatch.setattr(flight_recorder.sys, "excepthook", lambda *args: None)
+    monkeypatch.setattr(flight_recorder, "DUMP_DIRECTORY", str(tmp_path / "dumps"))
+    monkeypatch.setattr(flight_recorder, "_last_crash_dump", None)
+    recorder = flight_recorder.start_flight_recorder(
+        str(tmp_path / "recorder.bin"), slot_count=4
+    )
+    try:
+        assert flight_recorder.get_flight_recorder() is recorder
+        recorder.record_decision("alpha", (3, 4), True)
+
+        def crash():
+            raise RuntimeError("arm misbehaved")
+
+        thread = threading.Thread(target=crash)
+        thread.start()
+        thread.join()
+        # A second failure right after does not dump again
+        thread = threading.Thread(target=crash)
+        thread.start()
+        thread.join()
+    finally:
+        flight_recorder.stop_flight_recorder()
+    (dump,) = (tmp_path / "dumps").iterdir()
+    assert read_records(str(dump))[0].data == {"box_error": (3, 4), "outside": True}
+    assert flight_recorder.get_flight_recorder() is None
+
+
+def test_replay_drives_the_simulated_arm(tmp_path):
+    recorder = FlightRecorder(None, slot_count=16)
+    recorder.record_frame(
+        RecordKind.COMMAND_SENT,
+        "alpha",
+        0,
+        Command.POLAR_PAN_CONTINUOUS_START,
+        encode_payload(Command.POLAR_PAN_CONTINUOUS_START, 1, 0),
+    )
+    time.sleep(0.1)
+    recorder.record_frame(
+        RecordKind.COMMAND_SENT, "alpha", 2, Command.POLAR_PAN_CONTINUOUS_STOP, None
+    )
+    recorder.record_decision("beta", (0, 0), False)
+    path = recorder.dump(str(tmp_path / "dump.bin"))
+    recorder.close()
+
+    poses = [
+        pose
+        for _, pose in replay(
+            read_records(path), SimulatedArm(response_delay_s=0), host="alpha"
+        )
+    ]
+    assert len(poses) == 2
+    # Panned right at 30 degrees per second for the 0.1s between start and stop
+    assert poses[1].azimuth == pytest.approx(3.0, abs=1.0)
+
+
+def test_operator_connection_records_sent_and_received_frames(tmp_path, monkeypatch):
+    recorder = FlightRecorder(None, slot_count=16)
+    monkeypatch.setattr(flight_recorder, "_recorder", recorder)
+    io_loop = IOLoop(name="test-io")
+    io_loop.start()
+    ours, theirs = socket.socketpair()
+    ours.setblocking(False)
+    connection = OperatorConnection("alpha", 1, connect_on_init=False, io_loop=io_loop)
+    connection.socket = ours
+    connection.is_connected = True
+    io_loop.run_sync(connection._update_interest)
+
+    command_id = connection.publish(
+        command=Command.HOME, payload=encode_payload(Command.HOME, 0)
+    )
+    io_loop.run_sync(lambda: None)
+    theirs.sendall(
+        build_message(command_id + 1, Command.HOME | RETURN_FLAG, b"\x00\x01")
+    )
+    deadline = time.monotonic() + 2.0
+    while recorder.records_written < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    sent, received = read_records(recorder.dump(str(tmp_path / "dump.bin")))
+    assert (sent.kind, sent.host, sent.data["command_id"]) == (
+        RecordKind.COMMAND_SENT,
+        "alpha",
+        command_id,
+    )
+    assert (received.kind, received.data["command"], received.data["payload"]) == (
+        RecordKind.RETURN_RECEIVED,
+        Command.HOME | RETURN_FLAG,
+        b"\x00\x01",
+    )
+    connection.close()
+    theirs.close()
+    io_loop.stop()
+    recorder.close()
@@ -216,3 +216,26 @@ def test_lifespan_shutdown_stops_stream(monkeypatch):
         pass
 
     assert app.stop_stream_calls == 1
+
+
+def test_flight_recorder_dump_requires_a_running_recorder(monkeypatch):
+    monkeypatch.setattr(talos_endpoint, "get_flight_recorder", lambda: None)
+
+    with TestClient(talos_endpoint.app) as client:
+        response = client.post("/flight-recorder/dump")
+
+    assert response.status_code == 503
+
+
+def test_flight_recorder_dump_returns_the_path(monkeypatch):
+    class DummyRecorder:
+        def dump(self):
+            return ".flight/flight_1.bin"
+
+    monkeypatch.setattr(talos_endpoint, "get_flight_recorder", lambda: DummyRecorder())
+
+    with TestClient(talos_endpoint.app) as client:
+        response = client.post("/flight-recorder/dump")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "dumped", "path": ".flight/flight_1.bin"}
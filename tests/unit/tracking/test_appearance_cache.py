@@ -0,0 +1,64 @@
+import numpy as np
+
+from src.tracking.keep_away.appearance_cache import (
+    AppearanceCache,
+    get_appearance_embedding,
+    get_torso_crop,
+)
+
+
+def solid_image(bgr, shape=(40, 20)):
+    image = np.zeros((*shape, 3), dtype=np.uint8)
+    image[:] = bgr
+    return image
+
+
+def test_embedding_is_unit_length_and_stable():
+    red = get_appearance_embedding(solid_image((0, 0, 255)))
+    assert red.dtype == np.float32
+    assert np.isclose(np.linalg.norm(red), 1.0)
+    assert np.allclose(red, get_appearance_embedding(solid_image((0, 0, 255))))
+
+
+def test_torso_crop_handles_float_bboxes():
+    frame = np.zeros((100, 100, 3), dtype=np.uint8)
+    crop = get_torso_crop((10.5, 0.0, 50.2, 100.0), frame)
+    assert crop.shape == (40, 20, 3)
+
+
+def test_match_returns_closest_candidate_and_identity():
+    cache = AppearanceCache(capacity=4)
+    red = get_appearance_embedding(solid_image((0, 0, 255)))
+    blue = get_appearance_embedding(solid_image((255, 0, 0)))
+    red_id = cache.add(red)
+    blue_id = cache.add(blue)
+
+    candidates = np.stack([blue, red])
+    assert cache.match(candidates, threshold=0.1) in [(0, blue_id), (1, red_id)]
+    assert cache.match(candidates, threshold=0.1, identity=red_id) == (1, red_id)
+    assert cache.match(candidates[:1], threshold=0.1, identity=red_id) is None
+
+
+def test_distances_ignores_empty_slots():
+    cache = AppearanceCache(capacity=3)
+    cache.add(get_appearance_embedding(solid_image((0, 255, 0))))
+    dist = cache.distances(get_appearance_embedding(solid_image((0, 255, 0))))
+    assert dist.shape == (1, 3)
+    assert np.isclose(dist[0, 0], 0.0, atol=1e-6)
+    assert np.all(np.isinf(dist[0, 1:]))
+
+
+def test_least_recently_used_identity_is_evicted():
+    cache = AppearanceCache(capacity=2)
+    red = get_appearance_embedding(solid_image((0, 0, 255)))
+    green = get_appearance_embedding(solid_image((0, 255, 0)))
+    blue = get_appearance_embedding(solid_image((255, 0, 0)))
+    red_id = cache.add(red)
+    green_id = cache.add(green)
+    # Matching red makes green the least recently used identity
+    assert cache.match(red[None], threshold=0.1) == (0, red_id)
+
+    blue_id = cache.add(blue)
+    assert len(cache) == 2
+    assert red_id in cache and blue_id in cache
+    assert green_id not in cache
@@ -0,0 +1,57 @@
+from src.tracking.cascade import CascadeModel, EscalationReason
+from src.tracking.detector import ObjectModel
+
+
+class ScriptedModel(ObjectModel):
+    def __init__(self):
+        self.outputs = []
+        self.calls = 0
+
+    def detect_person(self, frame):
+        return self.detect_with_scores(frame)[0]
+
+    def detect_with_scores(self, frame):
+        self.calls += 1
+        return self.outputs.pop(0) if self.outputs else ([], [])
+
+
+class ScriptedCascade(CascadeModel):
+    cheap_model_class = ScriptedModel
+    accurate_model_class = ScriptedModel
+    min_confidence = 0.5
+    refresh_interval = 3
+
+
+def test_first_frame_escalates_then_trusts_cheap_model():
+    model = ScriptedCascade()
+    model.cheap_model.outputs = [([[0, 0, 10, 10]], [0.9])] * 2
+    model.accurate_model.outputs = [([[1, 1, 11, 11]], [0.95])]
+    assert model.detect_person(None) == [[1, 1, 11, 11]]
+    assert model.detect_person(None) == [[0, 0, 10, 10]]
+    assert model.accurate_model.calls == 1
+    assert model.escalation_counts[EscalationReason.REFRESH] == 1
+
+
+def test_low_confidence_and_count_change_escalate():
+    model = ScriptedCascade()
+    box = [0, 0, 10, 10]
+    model.cheap_model.outputs = [
+        ([box], [0.9]),
+        ([box], [0.2]),
+        ([box, box], [0.9, 0.9]),
+    ]
+    for _ in range(3):
+        model.detect_person(None)
+    assert model.escalation_counts[EscalationReason.LOW_CONFIDENCE] == 1
+    assert model.escalation_counts[EscalationReason.COUNT_CHANGED] == 1
+    assert model.accurate_model.calls == 3
+
+
+def test_periodic_refresh():
+    model = ScriptedCascade()
+    model.cheap_model.outputs = [([[0, 0, 10, 10]], [0.9])] * 8
+    for _ in range(8):
+        model.detect_person(None)
+    # First frame, then every refresh_interval trusted frames
+    assert model.escalation_counts[EscalationReason.REFRESH] == 2
+    assert model.escalation_rate() == 2 / 8
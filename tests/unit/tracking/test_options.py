@@ -0,0 +1,36 @@
+import sys
+
+from src.tracking.options import ModelDescriptor, _register_models
+
+
+def test_register_models_skips_missing_dependencies_without_importing():
+    available = ModelDescriptor("json", "json", "JSONDecoder", dependencies=("json",))
+    missing = ModelDescriptor(
+        "missing",
+        "definitely_not_a_module.model",
+        "Model",
+        dependencies=("definitely_not_a_module",),
+        extra_name="missing",
+    )
+
+    usable = _register_models([available, missing])
+
+    assert list(usable) == ["json"]
+    assert missing.is_available() is False
+    assert "definitely_not_a_module" not in sys.modules
+
+
+def test_descriptor_load_resolves_class():
+    import json
+
+    descriptor = ModelDescriptor("json", "json", "JSONDecoder")
+
+    assert descriptor.load() is json.JSONDecoder
+
+
+def test_descriptor_is_picklable():
+    import pickle
+
+    descriptor = ModelDescriptor("json", "json", "JSONDecoder", ("json",), "extra")
+
+    assert pickle.loads(pickle.dumps(descriptor)) == descriptor
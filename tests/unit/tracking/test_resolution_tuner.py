@@ -0,0 +1,56 @@
+from src.tracking.resolution_tuner import ResolutionTuner
+
+
+def run(tuner: ResolutionTuner, latency_at_height, frames: int) -> int:
+    for _ in range(frames):
+        tuner.update(latency_at_height(tuner.height))
+    return tuner.height
+
+
+def test_shrinks_input_to_meet_budget():
+    tuner = ResolutionTuner(500, 240, 1080, budget_ms=20, cooldown=5)
+    # Latency grows with pixel count, 500px takes 40ms
+    height = run(tuner, lambda h: 40 * (h / 500) ** 2, 100)
+    assert 240 <= height < 500
+    assert 40 * (height / 500) ** 2 <= 20
+
+
+def test_grows_input_when_under_budget_and_respects_bounds():
+    tuner = ResolutionTuner(500, 240, 720, budget_ms=50, cooldown=1)
+    assert run(tuner, lambda h: 1.0, 100) == 704  # largest multiple of 32 within bounds
+
+
+def test_stays_at_min_height_when_budget_cannot_be_met():
+    tuner = ResolutionTuner(500, 256, 1080, budget_ms=1, cooldown=1)
+    assert run(tuner, lambda h: 100.0, 50) == 256
+
+
+def test_holds_height_during_cooldown():
+    tuner = ResolutionTuner(512, 240, 1080, budget_ms=10, cooldown=10)
+    for _ in range(9):
+        assert tuner.update(100.0) == 512
+    assert tuner.update(100.0) < 512
+
+
+def test_keeps_initial_height_and_returns_to_it():
+    tuner = ResolutionTuner(500, 240, 1080, budget_ms=20, cooldown=1)
+    assert tuner.height == 500
+    run(tuner, lambda h: 40.0, 5)
+    assert tuner.height < 480
+    # Growing back stops at the initial height instead of skipping from 480 to 512
+    heights = set()
+    for _ in range(20):
+        heights.add(tuner.update(1.0))
+    assert 500 in heights
+
+
+def test_is_adjusting_until_it_settles():
+    tuner = ResolutionTuner(512, 240, 1080, budget_ms=20, cooldown=3)
+    assert tuner.adjusting
+    for _ in range(3):
+        tuner.update(15.0)
+    # Within budget without headroom to grow, nothing left to change
+    assert tuner.height == 512
+    assert not tuner.adjusting
+    tuner.update(100.0)
+    assert tuner.adjusting
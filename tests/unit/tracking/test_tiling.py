@@ -0,0 +1,71 @@
+import numpy as np
+
+from src.tracking.detector import ObjectModel
+from src.tracking.tiling import TiledModel, compute_tiles, non_max_suppression
+
+
+def test_tiles_cover_frame_with_overlap():
+    tiles = compute_tiles((2160, 3840, 3), 1280, overlap=0.2)
+    assert tiles[:, 0].min() == 0 and tiles[:, 1].min() == 0
+    assert tiles[:, 2].max() == 3840 and tiles[:, 3].max() == 2160
+    assert np.all(tiles[:, 2] - tiles[:, 0] == 1280)
+    xs = np.unique(tiles[:, 0])
+    assert np.all(np.diff(xs) < 1280)
+
+
+def test_tile_larger_than_frame_is_clamped():
+    tiles = compute_tiles((480, 640, 3), 1280)
+    assert tiles.tolist() == [[0, 0, 640, 480]]
+
+
+def test_nms_keeps_best_and_merges_cut_boxes():
+    boxes = np.array(
+        [
+            [0, 0, 100, 200],  # whole person
+            [0, 0, 40, 200],  # same person cut by a tile edge
+            [300, 0, 400, 200],  # someone else
+        ]
+    )
+    scores = np.array([0.9, 0.6, 0.8])
+    assert sorted(non_max_suppression(boxes, scores, 0.6, "iou").tolist()) == [0, 1, 2]
+    assert non_max_suppression(boxes, scores, 0.6, "ios").tolist() == [0, 2]
+    assert non_max_suppression(np.empty((0, 4)), np.empty(0)).tolist() == []
+
+
+class CornerModel(ObjectModel):
+    """Finds one 10x10 box in the top left corner of every crop"""
+
+    def detect_person(self, frame):
+        return [(0, 0, 10, 10)]
+
+
+class CornerTiledModel(TiledModel):
+    base_model_class = CornerModel
+    tile_sizes = (500, 1000)
+    overlap = 0.0
+
+
+def test_tiled_model_offsets_boxes_into_frame_coordinates():
+    model = CornerTiledModel(target_fps=30)
+    model.tile_size = 500
+    model.frame_count = 1
+    bboxes = model.detect_person(np.zeros((1000, 1000, 3), dtype=np.uint8))
+    # Full frame crop and top left tile overlap at (0, 0)
+    assert sorted(map(tuple, bboxes)) == [
+        (0, 0, 10, 10),
+        (0, 500, 10, 510),
+        (500, 0, 510, 10),
+        (500, 500, 510, 510),
+    ]
+
+
+def test_tile_size_fits_latency_budget():
+    model = CornerTiledModel(target_fps=10)  # 100ms budget
+    shape = (1500, 2000, 3)
+    model.crop_latency_ms = {None: 20.0}
+    # 500px tiles need 12 crops + full frame, 1000px tiles need 4 + 1
+    assert model.select_tile_size(shape) == 1000
+    model.crop_latency_ms = {None: 5.0}
+    assert model.select_tile_size(shape) == 500
+    model.crop_latency_ms = {None: 50.0}
+    assert model.select_tile_size(shape) is None